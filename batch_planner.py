@@ -0,0 +1,274 @@
+"""
+批量操作的预估
+根据模型信息、哈希缓存和以往任务测得的速度（哈希 MB/s、每个网站每个模型的抓取用时），
+在开始前列出要处理的模型、跳过的模型及原因、需要读取的数据量和预计用时
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import time  # 时间相关
+import logging  # 日志记录
+import threading  # 多线程
+
+# 测得的速度保存在这里（与 model_info.json 放在同一目录）
+THROUGHPUT_FILE = 'batch_throughput.json'
+THROUGHPUT_VERSION = 1
+
+# 新测量值的权重（指数平均，速度随硬盘和网络变化逐渐调整）
+THROUGHPUT_SMOOTHING = 0.3
+
+# 单次测量的最少数据量，太小的文件主要是打开文件的开销，不反映读取速度
+MIN_HASH_SAMPLE_BYTES = 16 * 1024 * 1024
+
+# 还没有测量值时使用的默认速度
+DEFAULT_RATES = {
+    'hash': 150 * 1024 * 1024,  # 字节/秒
+    'civitai.com': 2.0,  # 秒/个
+    'liblib.art': 3.0,  # 秒/个
+}
+
+# 各操作的网络请求发往的网站
+FETCH_HOSTS = {
+    'civitai': 'civitai.com',
+    'liblib': 'liblib.art',
+}
+
+# 写文件的操作每个模型的大致用时（秒）
+WRITE_SECONDS = 0.005
+
+# 跳过原因
+SKIP_HASHED = "已有有效的哈希值"
+SKIP_NO_LIBLIB_URL = "没有Liblib网址"
+SKIP_HAS_LIBLIB_URL = "已有Liblib网址"
+SKIP_HAS_PREVIEW = "已有预览图"
+SKIP_NO_EMBEDDED_THUMBNAIL = "没有内嵌预览图"
+SKIP_MISSING = "文件不存在"
+
+
+def format_size(size):
+    """格式化文件大小"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_estimate(seconds):
+    """格式化预计用时"""
+    if seconds < 60:
+        return "不到 1 分钟"
+    minutes = int(seconds / 60 + 0.5)
+    if minutes < 60:
+        return f"约 {minutes} 分钟"
+    return f"约 {minutes // 60} 小时 {minutes % 60} 分钟"
+
+
+class ThroughputStats:
+    """
+    以往任务测得的速度（可在多个线程中记录）
+    hash 记录读取文件计算哈希的速度（字节/秒），网站名记录抓取每个模型的平均用时（秒）
+    """
+
+    def __init__(self, stats_file=THROUGHPUT_FILE):
+        self.stats_file = stats_file
+        self.lock = threading.Lock()
+        self.rates = {}  # 名称 -> {'value', 'samples', 'updated'}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载测得的速度"""
+        with self.lock:
+            self.rates = {}
+            if not os.path.exists(self.stats_file):
+                return
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == THROUGHPUT_VERSION:
+                    self.rates = data.get('rates', {})
+            except Exception as e:
+                logging.error(f"读取任务速度记录时发生错误：{str(e)}")
+
+    def save(self):
+        """保存到磁盘（先写临时文件再替换）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': THROUGHPUT_VERSION, 'rates': self.rates}
+            temp_file = self.stats_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_file, self.stats_file)
+                self.dirty = False
+            except Exception as e:
+                logging.error(f"保存任务速度记录时发生错误：{str(e)}")
+
+    def _update(self, name, value):
+        with self.lock:
+            entry = self.rates.get(name)
+            if entry:
+                entry['value'] += (value - entry['value']) * THROUGHPUT_SMOOTHING
+                entry['samples'] += 1
+            else:
+                entry = self.rates[name] = {'value': value, 'samples': 1}
+            entry['updated'] = time.time()
+            self.dirty = True
+
+    def record_hash(self, nbytes, seconds):
+        """记录一次完整读取文件计算哈希"""
+        if nbytes >= MIN_HASH_SAMPLE_BYTES and seconds > 0:
+            self._update('hash', nbytes / seconds)
+
+    def record_fetch(self, host, seconds):
+        """记录抓取一个模型的用时"""
+        if seconds > 0:
+            self._update(host, seconds)
+
+    def get(self, name):
+        """
+        Returns:
+            tuple: (速度, 是否为实测值)
+        """
+        with self.lock:
+            entry = self.rates.get(name)
+        if entry:
+            return entry['value'], True
+        return DEFAULT_RATES[name], False
+
+
+class BatchPlan:
+    """
+    一次批量操作的预估
+    Attributes:
+        items: 需要处理的模型 [(文件名, 相对路径)]，按原顺序
+        skipped: {跳过原因: 模型数}
+        total_bytes: 范围内模型的总大小
+        read_count / read_bytes: 需要完整读取（计算哈希）的模型数和数据量
+        fetch_count: 需要联网抓取的模型数
+        seconds: 预计用时
+        measured: 预计用时是否全部基于实测速度
+    """
+
+    def __init__(self):
+        self.items = []
+        self.skipped = {}
+        self.total_bytes = 0
+        self.read_count = 0
+        self.read_bytes = 0
+        self.fetch_count = 0
+        self.seconds = 0
+        self.measured = True
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def summary_line(self):
+        """一行简要说明（用于范围选项）"""
+        total = len(self.items) + sum(self.skipped.values())
+        text = f"{total} 个模型，共 {format_size(self.total_bytes)}，处理 {len(self.items)} 个"
+        if self.items:
+            text += f"，{format_estimate(self.seconds)}"
+        return text
+
+    def describe(self):
+        """完整说明：处理和跳过的数量、读取的数据量和预计用时"""
+        lines = [f"将处理 {len(self.items)} 个模型"]
+        for reason, count in self.skipped.items():
+            lines.append(f"跳过 {count} 个：{reason}")
+        if self.read_count:
+            lines.append(f"需要读取 {self.read_count} 个文件，共 {format_size(self.read_bytes)}")
+        if self.fetch_count:
+            lines.append(f"需要联网抓取 {self.fetch_count} 个模型")
+        if self.items:
+            basis = "根据以往任务的速度" if self.measured else "按默认速度估计，完成一次后会更准确"
+            lines.append(f"预计用时：{format_estimate(self.seconds)}（{basis}）")
+        return "\n".join(lines)
+
+
+class BatchPlanner:
+    """
+    批量操作预估
+    只读取元数据（文件大小、哈希缓存、预览图是否存在），不读取模型文件，不联网
+    """
+
+    def __init__(self, base_path, hash_cache, throughput, has_preview=None, has_embedded_thumbnail=None):
+        """
+        Args:
+            has_preview: has_preview((文件名, 相对路径)) -> bool
+            has_embedded_thumbnail: has_embedded_thumbnail(模型相对路径) -> bool 或 None（未知）
+        """
+        self.base_path = base_path
+        self.hash_cache = hash_cache
+        self.throughput = throughput
+        self.has_preview = has_preview
+        self.has_embedded_thumbnail = has_embedded_thumbnail
+
+    def plan(self, kind, models, catalog, workers=1):
+        """
+        Args:
+            kind: 操作类型（hash / cs / sd / thumbnail / liblib / civitai）
+            models: [(文件名, 相对路径)]
+            catalog: 一次读取的全部模型信息 {模型相对路径: 信息}
+            workers: 联网抓取的并发数
+        Returns:
+            BatchPlan
+        """
+        plan = BatchPlan()
+        host = FETCH_HOSTS.get(kind)
+        for file, path in models:
+            model_path = os.path.join(path, file)
+            full_path = os.path.join(self.base_path, model_path)
+            try:
+                size = os.path.getsize(full_path)
+            except OSError:
+                plan.skip(SKIP_MISSING)
+                continue
+            plan.total_bytes += size
+            info = catalog.get(model_path) or {}
+            url = info.get('url', '').strip()
+            has_liblib_url = bool(url and 'liblib.art' in url)
+
+            if kind == 'hash':
+                cached_hash = self.hash_cache.lookup(full_path)
+                if cached_hash and info.get('hash') == cached_hash:
+                    plan.skip(SKIP_HASHED)
+                    continue
+                if not cached_hash:
+                    plan.read_count += 1
+                    plan.read_bytes += size
+            elif kind == 'civitai':
+                if has_liblib_url:
+                    plan.skip(SKIP_HAS_LIBLIB_URL)
+                    continue
+                if not self.hash_cache.lookup(full_path):
+                    plan.read_count += 1
+                    plan.read_bytes += size
+                plan.fetch_count += 1
+            elif kind == 'liblib':
+                if not has_liblib_url:
+                    plan.skip(SKIP_NO_LIBLIB_URL)
+                    continue
+                plan.fetch_count += 1
+            elif kind == 'thumbnail':
+                if self.has_preview and self.has_preview((file, path)):
+                    plan.skip(SKIP_HAS_PREVIEW)
+                    continue
+                if self.has_embedded_thumbnail and self.has_embedded_thumbnail(model_path) is False:
+                    plan.skip(SKIP_NO_EMBEDDED_THUMBNAIL)
+                    continue
+            plan.items.append((file, path))
+
+        # 预计用时：顺序读取文件的时间 + 并发抓取的时间 + 写文件的时间
+        if plan.read_bytes:
+            rate, measured = self.throughput.get('hash')
+            plan.seconds += plan.read_bytes / rate
+            plan.measured = plan.measured and measured
+        if plan.fetch_count and host:
+            seconds_per_item, measured = self.throughput.get(host)
+            plan.seconds += plan.fetch_count * seconds_per_item / max(1, workers)
+            plan.measured = plan.measured and measured
+        plan.seconds += len(plan.items) * WRITE_SECONDS
+        return plan
@@ -0,0 +1,258 @@
+"""
+批量处理框架
+有限线程数的并发执行、取消令牌、每一项的处理结果和结束汇总，
+以及由 Tk 主线程定时读取的进度事件队列（工作线程不直接操作控件）
+"""
+
+import time  # 时间相关
+import queue  # 队列
+import logging  # 日志记录
+import threading  # 多线程
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # 线程池
+
+# 默认并发线程数
+DEFAULT_WORKERS = 4
+
+# 每一项的状态
+ITEM_PENDING = 'pending'
+ITEM_DONE = 'done'
+ITEM_SKIPPED = 'skipped'
+ITEM_FAILED = 'failed'
+
+ITEM_STATE_NAMES = {
+    ITEM_PENDING: '待处理',
+    ITEM_DONE: '完成',
+    ITEM_SKIPPED: '跳过',
+    ITEM_FAILED: '失败',
+}
+
+# 进度事件
+EVENT_JOB_STARTED = 'job_started'
+EVENT_ITEM_DONE = 'item_done'
+EVENT_JOB_DONE = 'job_done'
+
+# 汇总中最多列出的失败项
+SUMMARY_MAX_FAILURES = 10
+
+
+class CancelToken:
+    """
+    取消令牌
+    可以直接作为 cancel_check 传给各处理函数；取消时依次调用注册的回调（如立即停止网络重试）
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.reason = None
+        self.callbacks = []
+
+    def __call__(self):
+        return self.event.is_set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+    def on_cancel(self, callback):
+        """注册取消时调用的回调（已取消时立即调用）"""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self, reason=None):
+        """请求取消（只有第一次生效），reason 记录取消的原因（如暂停或取消）"""
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.reason = reason
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"执行取消回调时发生错误：{str(e)}")
+
+
+class ItemResult:
+    """
+    一项的处理结果
+    处理函数可以直接返回状态，需要说明原因时返回 ItemResult(状态, 说明)
+    """
+
+    def __init__(self, status, message='', elapsed=0):
+        self.status = status
+        self.message = message
+        self.elapsed = elapsed
+
+    @classmethod
+    def from_value(cls, value):
+        """把处理函数的返回值或异常转换为结果；被中断（返回 None）时返回 None"""
+        if value is None:
+            return None
+        if isinstance(value, ItemResult):
+            return value
+        if isinstance(value, Exception):
+            return cls(ITEM_FAILED, str(value) or value.__class__.__name__)
+        return cls(value)
+
+
+def run_concurrent(func, items, max_workers=DEFAULT_WORKERS, cancel_check=None):
+    """
+    用有限的线程数并发处理任务，按完成顺序返回结果
+    items 可以是生成器（如边计算哈希边提交），同时进行的任务不超过 max_workers * 2 个
+    Yields:
+        tuple: (任务, 结果或异常)
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        items = iter(items)
+        exhausted = False
+        while pending or not exhausted:
+            # 补充任务，限制排队数量
+            while not exhausted and len(pending) < max_workers * 2:
+                if cancel_check and cancel_check():
+                    exhausted = True
+                    break
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = item
+            if not pending:
+                break
+
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield item, result
+
+
+def timed_call(func, *args):
+    """
+    调用处理函数并记录耗时
+    Returns:
+        ItemResult 或 None（被中断）；出错时返回失败的结果，不抛出异常
+    """
+    start = time.monotonic()
+    try:
+        result = ItemResult.from_value(func(*args))
+    except Exception as e:
+        result = ItemResult.from_value(e)
+    if result is not None:
+        result.elapsed = time.monotonic() - start
+    return result
+
+
+def summarize(statuses, messages=None, elapsed=0):
+    """
+    汇总一批处理结果
+    Args:
+        statuses: {项: 状态}
+        messages: {项: 说明}（失败原因、跳过原因）
+        elapsed: 总耗时（秒）
+    Returns:
+        dict: {'total', 'done', 'skipped', 'failed', 'pending', 'elapsed', 'failures': [(项, 原因)]}
+    """
+    messages = messages or {}
+    counts = {ITEM_PENDING: 0, ITEM_DONE: 0, ITEM_SKIPPED: 0, ITEM_FAILED: 0}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    return {
+        'total': len(statuses),
+        'done': counts[ITEM_DONE],
+        'skipped': counts[ITEM_SKIPPED],
+        'failed': counts[ITEM_FAILED],
+        'pending': counts[ITEM_PENDING],
+        'elapsed': elapsed,
+        'failures': [(key, messages.get(key, '')) for key, status in statuses.items() if status == ITEM_FAILED]
+    }
+
+
+def format_summary(summary):
+    """把汇总转换为显示给用户的文字"""
+    lines = [f"共 {summary['total']} 项：完成 {summary['done']}，跳过 {summary['skipped']}，失败 {summary['failed']}"]
+    if summary['pending']:
+        lines.append(f"未处理 {summary['pending']} 项")
+    if summary['elapsed']:
+        lines.append(f"用时 {format_duration(summary['elapsed'])}")
+    failures = summary['failures']
+    if failures:
+        lines.append("")
+        lines.append("失败的项：")
+        for key, message in failures[:SUMMARY_MAX_FAILURES]:
+            lines.append(f"{key}：{message}" if message else key)
+        if len(failures) > SUMMARY_MAX_FAILURES:
+            lines.append(f"……等 {len(failures)} 项")
+    return "\n".join(lines)
+
+
+def format_duration(seconds):
+    """把秒数格式化为 “1小时5分” / “3分20秒” / “15秒”"""
+    if seconds is None:
+        return ''
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
+
+
+def format_speed(items_per_second):
+    """把处理速度格式化为 “2.5 个/秒” 或 “12 个/分”"""
+    if not items_per_second:
+        return ''
+    if items_per_second >= 1:
+        return f"{items_per_second:.1f} 个/秒"
+    return f"{items_per_second * 60:.0f} 个/分"
+
+
+class ProgressStream:
+    """
+    进度事件队列
+    工作线程通过 emit() 提交事件，Tk 主线程定时取出，把同一时间段内的事件一次交给处理函数，
+    处理大量小文件时界面每个周期只刷新一次
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def emit(self, kind, job_id, **data):
+        """提交一个事件（可在任意线程调用）"""
+        data['kind'] = kind
+        data['job_id'] = job_id
+        self.queue.put(data)
+
+    def drain(self):
+        """取出所有待处理的事件"""
+        events = []
+        try:
+            while True:
+                events.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def attach(self, master, handler, interval=200):
+        """在 Tk 主线程中每 interval 毫秒调用一次 handler(事件列表)（有事件时）"""
+        def poll():
+            events = self.drain()
+            if events:
+                try:
+                    handler(events)
+                except Exception as e:
+                    logging.error(f"处理进度事件时发生错误：{str(e)}")
+            try:
+                master.after(interval, poll)
+            except Exception:
+                # 窗口已关闭
+                pass
+        master.after(interval, poll)
@@ -115,6 +115,7 @@ def build():
         '--hidden-import=tkinterdnd2',
         '--hidden-import=playwright',
         '--hidden-import=playwright.sync_api',
+        '--hidden-import=playwright.async_api',
         '--hidden-import=datetime',
         '--collect-data=tkinterdnd2',
         '--collect-data=playwright',
@@ -0,0 +1,379 @@
+"""
+Civitai 网络请求
+共享连接池的 Session、按域名限制并发、429/5xx 指数退避重试，并支持取消
+查询结果保存在本地响应缓存中，再次查询时直接使用或发送条件请求
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import time  # 时间相关
+import random  # 退避抖动
+import logging  # 日志记录
+import threading  # 多线程
+import urllib.parse  # URL解析
+import requests  # HTTP请求
+from requests.adapters import HTTPAdapter  # 连接池
+
+CIVITAI_API_BASE = 'https://civitai.com/api/v1'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 批量抓取的并发线程数
+FETCH_WORKERS = 4
+
+# 同一域名同时进行的请求数
+HOST_CONCURRENCY = 4
+
+# 请求超时（秒）
+REQUEST_TIMEOUT = 30
+
+# 重试次数和退避时间（秒）
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# 需要重试的状态码
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 批量按哈希查询时每次请求的哈希数量
+BULK_LOOKUP_SIZE = 100
+
+# 批量查询接口返回这些状态码时视为不支持，本次任务之后改为逐个查询
+BULK_UNSUPPORTED_CODES = (404, 405, 501)
+
+# 批量查询返回这些状态码时（如某个哈希格式不正确）只有这一批改为逐个查询
+BULK_REJECTED_CODES = (400,)
+
+# 响应缓存文件（与 model_info.json 放在同一目录）
+RESPONSE_CACHE_FILE = 'civitai_cache.json'
+RESPONSE_CACHE_VERSION = 1
+
+# 缓存有效期（秒）：找到的结果 7 天，未找到（404）1 天
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_NEGATIVE_TTL = 24 * 3600
+
+# 缓存最多保存的记录数，超过时删除最久未使用的记录
+RESPONSE_CACHE_MAX_ENTRIES = 20000
+
+
+class FetchCancelled(Exception):
+    """抓取已被用户取消"""
+    pass
+
+
+class ResponseCache:
+    """
+    持久化的 API 响应缓存
+    以 “接口/参数” 为键，保存解析后的 JSON、状态码和 ETag / Last-Modified
+    """
+
+    def __init__(self, cache_file=RESPONSE_CACHE_FILE, ttl=RESPONSE_CACHE_TTL,
+                 negative_ttl=RESPONSE_CACHE_NEGATIVE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.entries = {}  # 键 -> {'status', 'data', 'etag', 'last_modified', 'fetched_at', 'used_at'}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存"""
+        with self.lock:
+            self.entries = {}
+            if not os.path.exists(self.cache_file):
+                return
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == RESPONSE_CACHE_VERSION:
+                    self.entries = data.get('entries', {})
+            except Exception as e:
+                logging.error(f"读取响应缓存时发生错误：{str(e)}")
+
+    def save(self):
+        """保存缓存到磁盘（先写临时文件再替换）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.evict()
+            data = {'version': RESPONSE_CACHE_VERSION, 'entries': self.entries}
+            temp_file = self.cache_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_file, self.cache_file)
+                self.dirty = False
+            except Exception as e:
+                logging.error(f"保存响应缓存时发生错误：{str(e)}")
+
+    def evict(self):
+        """记录数超过上限时删除最久未使用的记录"""
+        with self.lock:
+            excess = len(self.entries) - self.max_entries
+            if excess <= 0:
+                return
+            oldest = sorted(self.entries, key=lambda key: self.entries[key].get('used_at', 0))[:excess]
+            for key in oldest:
+                del self.entries[key]
+            self.dirty = True
+
+    def get(self, key):
+        """取出缓存记录（不判断是否过期）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                entry['used_at'] = time.time()
+                self.dirty = True
+            return entry
+
+    def is_fresh(self, entry):
+        """缓存记录是否仍在有效期内（未找到的结果有效期更短）"""
+        ttl = self.ttl if entry.get('status') == 200 else self.negative_ttl
+        return time.time() - entry.get('fetched_at', 0) < ttl
+
+    def put(self, key, status, data=None, etag=None, last_modified=None):
+        """保存一次查询结果"""
+        now = time.time()
+        with self.lock:
+            self.entries[key] = {
+                'status': status,
+                'data': data,
+                'etag': etag,
+                'last_modified': last_modified,
+                'fetched_at': now,
+                'used_at': now
+            }
+            self.dirty = True
+
+    def refresh(self, key):
+        """服务器返回 304 时延长记录的有效期"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                entry['fetched_at'] = time.time()
+                self.dirty = True
+
+
+class CivitaiClient:
+    """
+    Civitai 请求客户端（可在多个线程中共用）
+    所有请求共用一个 Session 以保持连接；每个域名的并发数由信号量限制
+    """
+
+    def __init__(self, api_base=CIVITAI_API_BASE, pool_size=FETCH_WORKERS * 2, host_concurrency=HOST_CONCURRENCY,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, response_cache=None):
+        self.api_base = api_base.rstrip('/')
+        self.response_cache = response_cache
+        self.host_concurrency = host_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.host_slots = {}  # 域名 -> 信号量
+        self.bulk_supported = True  # 批量查询接口返回不支持后，本次任务中不再尝试
+        self.stats = {'requests': 0, 'retries': 0, 'cache_hits': 0, 'not_modified': 0, 'bulk_requests': 0}
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def cancel(self):
+        """取消所有正在等待或重试的请求"""
+        self.cancel_event.set()
+
+    def reset(self):
+        """开始新的批量任务前清除取消状态，并重新尝试批量查询"""
+        self.cancel_event.clear()
+        self.bulk_supported = True
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _host_slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return self.host_slots[host]
+
+    def _retry_delay(self, attempt, response=None):
+        """计算重试等待时间：优先使用 Retry-After，否则指数退避加随机抖动"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(BACKOFF_MAX, float(retry_after))
+                except ValueError:
+                    pass
+        delay = min(BACKOFF_MAX, self.backoff_base * (2 ** attempt))
+        return delay + random.uniform(0, self.backoff_base)
+
+    def request(self, method, url, **kwargs):
+        """
+        发送请求，429/5xx 和连接错误按指数退避重试
+        Returns:
+            Response: 最后一次请求的响应
+        Raises:
+            FetchCancelled: 已取消
+            requests.RequestException: 重试次数用完仍然连接失败
+        """
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        slot = self._host_slot(url)
+        attempt = 0
+        while True:
+            if self.is_cancelled():
+                raise FetchCancelled()
+            response = None
+            error = None
+            with slot:
+                try:
+                    with self.lock:
+                        self.stats['requests'] += 1
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+            if error is None and response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._retry_delay(attempt, response)
+            logging.warning(f"请求失败，{delay:.1f} 秒后重试（第 {attempt + 1} 次）：{url} "
+                            f"{response.status_code if response is not None else str(error)}")
+            if response is not None:
+                response.close()
+            with self.lock:
+                self.stats['retries'] += 1
+            # 等待期间可以被取消
+            if self.cancel_event.wait(delay):
+                raise FetchCancelled()
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def get_version_by_hash(self, hash_value, force_refresh=False):
+        """
+        按哈希值查询模型版本
+        缓存未过期时直接使用缓存；过期时带上 ETag / Last-Modified 发送条件请求
+        Args:
+            force_refresh: 忽略缓存重新查询
+        Returns:
+            dict: 模型版本信息，未找到返回 None
+        """
+        cache_key = f"by-hash/{hash_value.upper()}"
+        entry = self.response_cache.get(cache_key) if self.response_cache else None
+        if entry and not force_refresh and self.response_cache.is_fresh(entry):
+            self._count('cache_hits')
+            return entry.get('data')
+
+        headers = {}
+        if entry and not force_refresh and entry.get('status') == 200:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.get(f"{self.api_base}/model-versions/by-hash/{hash_value}", headers=headers)
+        if response.status_code == 304 and entry:
+            self._count('not_modified')
+            self.response_cache.refresh(cache_key)
+            return entry.get('data')
+        if response.status_code == 404:
+            if self.response_cache:
+                self.response_cache.put(cache_key, 404)
+            return None
+        response.raise_for_status()
+        data = response.json()
+        data = data if isinstance(data, dict) and data else None
+        if self.response_cache:
+            self.response_cache.put(
+                cache_key, 200 if data else 404, data,
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+        return data
+
+    def get_versions_by_hashes(self, hash_values, force_refresh=False):
+        """
+        批量按哈希值查询模型版本：先查缓存，其余每 BULK_LOOKUP_SIZE 个合并为一次请求
+        批量接口不可用或请求失败的哈希不在结果中，由调用方用 get_version_by_hash 逐个查询
+        Args:
+            force_refresh: 忽略缓存重新查询
+        Returns:
+            dict: {哈希值: 模型版本信息，未找到为 None}
+        """
+        results = {}
+        missing = []
+        for hash_value in hash_values:
+            entry = self.response_cache.get(f"by-hash/{hash_value.upper()}") if self.response_cache else None
+            if entry and not force_refresh and self.response_cache.is_fresh(entry):
+                self._count('cache_hits')
+                results[hash_value] = entry.get('data')
+            else:
+                missing.append(hash_value)
+
+        for start in range(0, len(missing), BULK_LOOKUP_SIZE):
+            if not self.bulk_supported:
+                break
+            chunk = missing[start:start + BULK_LOOKUP_SIZE]
+            try:
+                found = self._bulk_lookup(chunk)
+            except FetchCancelled:
+                raise
+            except Exception as e:
+                logging.error(f"批量查询哈希失败，改为逐个查询：{str(e)}")
+                continue
+            if found is not None:
+                results.update(found)
+        return results
+
+    def _bulk_lookup(self, hash_values):
+        """
+        发送一次批量查询
+        Returns:
+            dict: {哈希值: 模型版本信息或 None}；接口不支持时返回 None
+        """
+        response = self.request('POST', f"{self.api_base}/model-versions/by-hash", json=hash_values)
+        self._count('bulk_requests')
+        if response.status_code in BULK_UNSUPPORTED_CODES:
+            logging.warning(f"批量查询接口不可用（{response.status_code}），改为逐个查询")
+            self.bulk_supported = False
+            return None
+        if response.status_code in BULK_REJECTED_CODES:
+            logging.warning(f"批量查询被拒绝（{response.status_code}），这一批改为逐个查询")
+            return None
+        response.raise_for_status()
+        versions = response.json()
+        if not isinstance(versions, list):
+            return None
+
+        # 返回的版本不保证顺序，按文件哈希对应回请求的哈希值
+        wanted = {hash_value.upper(): hash_value for hash_value in hash_values}
+        results = dict.fromkeys(hash_values)
+        for version in versions:
+            if not isinstance(version, dict):
+                continue
+            for file_info in version.get('files') or []:
+                for value in (file_info.get('hashes') or {}).values():
+                    hash_value = wanted.get(str(value).upper())
+                    if hash_value:
+                        results[hash_value] = version
+
+        if self.response_cache:
+            for hash_value, version in results.items():
+                self.response_cache.put(f"by-hash/{hash_value.upper()}", 200 if version else 404, version)
+        return results
+
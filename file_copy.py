@@ -0,0 +1,254 @@
+"""
+模型文件复制
+单次复制：优先使用内核复制（copy_file_range / sendfile），不可用时分块读写；
+复制过程中报告进度，完成后保留文件属性并校验大小（可选校验哈希），
+先写入临时文件，成功后再替换为目标文件。
+源文件和目标在同一文件系统时还可以创建写时复制副本（reflink）或硬链接，不占用额外空间，
+不支持时自动改为完整复制
+"""
+
+import os  # 操作系统相关
+import sys  # 系统相关
+import time  # 时间相关
+import errno  # 错误码
+import shutil  # 文件属性
+import logging  # 日志记录
+from model_hash import calculate_digests  # 哈希校验
+
+# 每次复制的数据块大小
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 两次进度回调的最短间隔（秒），完成时总会回调一次
+PROGRESS_INTERVAL = 0.1
+
+# 复制中的临时文件后缀
+PARTIAL_SUFFIX = '.part'
+
+# 内核复制不支持时（跨文件系统、文件系统或内核不支持）改用下一种方式
+KERNEL_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM,
+    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)
+}
+
+# 复制方式
+METHOD_COPY_FILE_RANGE = 'copy_file_range'
+METHOD_SENDFILE = 'sendfile'
+METHOD_READ_WRITE = 'read_write'
+METHOD_REFLINK = 'reflink'
+METHOD_HARDLINK = 'hardlink'
+
+# 复制模式
+COPY_MODE_COPY = 'copy'
+COPY_MODE_REFLINK = 'reflink'
+COPY_MODE_HARDLINK = 'hardlink'
+
+COPY_MODE_NAMES = {
+    COPY_MODE_COPY: '完整复制',
+    COPY_MODE_REFLINK: '写时复制（reflink，btrfs / XFS）',
+    COPY_MODE_HARDLINK: '硬链接',
+}
+
+# Linux 的 FICLONE ioctl（_IOW(0x94, 9, int)），让目标文件与源文件共享数据块
+FICLONE = 0x40049409
+
+# 创建链接失败时改为完整复制的错误码（文件系统不支持、跨文件系统、链接数达到上限等）
+LINK_FALLBACK_ERRNOS = KERNEL_FALLBACK_ERRNOS | {errno.ENOTTY, errno.EMLINK, errno.EACCES}
+
+
+class CopyCancelled(Exception):
+    """复制被取消"""
+
+
+def get_copy_methods():
+    """当前系统可用的复制方式（按优先顺序）"""
+    methods = []
+    if hasattr(os, 'copy_file_range'):
+        methods.append(METHOD_COPY_FILE_RANGE)
+    # 只有 Linux 支持文件到文件的 sendfile
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        methods.append(METHOD_SENDFILE)
+    methods.append(METHOD_READ_WRITE)
+    return methods
+
+
+def same_filesystem(source_path, target_dir):
+    """源文件和目标文件夹是否在同一文件系统（可以创建链接）"""
+    try:
+        return os.stat(source_path).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def get_link_modes():
+    """当前系统可用的链接模式"""
+    modes = []
+    if sys.platform.startswith('linux'):
+        modes.append(COPY_MODE_REFLINK)
+    if hasattr(os, 'link'):
+        modes.append(COPY_MODE_HARDLINK)
+    return modes
+
+
+def reflink_file(source_path, target_path):
+    """
+    创建写时复制副本（先写临时文件再替换）
+    Raises:
+        OSError: 系统或文件系统不支持
+    """
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "当前系统不支持写时复制")
+    import fcntl  # 只在 Linux 上使用
+
+    temp_path = target_path + PARTIAL_SUFFIX
+    try:
+        with open(source_path, 'rb') as fsrc, open(temp_path, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def link_file(source_path, target_path, mode):
+    """
+    以链接方式“复制”文件（瞬间完成，不占用额外空间）
+    Returns:
+        str: 使用的方式（METHOD_REFLINK / METHOD_HARDLINK）
+    Raises:
+        OSError: 不支持或创建失败
+    """
+    if mode == COPY_MODE_REFLINK:
+        reflink_file(source_path, target_path)
+        return METHOD_REFLINK
+    if mode == COPY_MODE_HARDLINK:
+        os.link(source_path, target_path)
+        return METHOD_HARDLINK
+    raise ValueError(f"未知的复制模式：{mode}")
+
+
+def _make_step(method, fsrc, fdst):
+    """返回每次复制一块数据的函数 step(最大字节数) -> 实际字节数（0 表示结束）"""
+    src_fd = fsrc.fileno()
+    dst_fd = fdst.fileno()
+    if method == METHOD_COPY_FILE_RANGE:
+        return lambda count: os.copy_file_range(src_fd, dst_fd, count)
+    if method == METHOD_SENDFILE:
+        return lambda count: os.sendfile(dst_fd, src_fd, None, count)
+
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+
+    def read_write(count):
+        n = fsrc.readinto(view[:count])
+        if n:
+            fdst.write(view[:n])
+        return n or 0
+    return read_write
+
+
+def _copy_data(fsrc, fdst, total, progress_callback, cancel_check, io_throttle):
+    """
+    复制文件内容（只读写一次）
+    Returns:
+        str: 使用的复制方式
+    """
+    for method in get_copy_methods():
+        step = _make_step(method, fsrc, fdst)
+        copied = 0
+        last_report = 0
+        try:
+            while True:
+                if cancel_check and cancel_check():
+                    raise CopyCancelled()
+                n = step(COPY_CHUNK_SIZE)
+                if not n:
+                    break
+                copied += n
+                if io_throttle:
+                    io_throttle(n)
+                if progress_callback and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    progress_callback(copied, total)
+        except OSError as e:
+            # 第一块就失败说明不支持这种方式，从头改用下一种；复制到一半出错则直接报错
+            if copied or method == METHOD_READ_WRITE or e.errno not in KERNEL_FALLBACK_ERRNOS:
+                raise
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            continue
+        if fdst.tell() < copied:
+            # 内核复制没有移动 Python 文件对象的位置，这里同步一下
+            fdst.seek(copied)
+        if progress_callback:
+            progress_callback(copied, total)
+        return method
+    return METHOD_READ_WRITE
+
+
+def copy_file(source_path, target_path, progress_callback=None, cancel_check=None,
+              verify_hash=False, expected_hash=None, io_throttle=None, mode=COPY_MODE_COPY):
+    """
+    复制一个文件
+    Args:
+        mode: 复制模式；链接模式只在同一文件系统内使用，不支持或失败时改为完整复制
+        progress_callback: progress_callback(已复制字节数, 总字节数)，在复制线程中调用
+        cancel_check: 返回 True 时停止复制并删除临时文件
+        verify_hash: 复制后计算目标文件的 SHA-256 并与源文件比较
+        expected_hash: 已知的源文件 SHA-256（校验哈希时不必再读取源文件）
+        io_throttle: 每复制一块数据调用一次（如 IOScheduler.bulk_throttle）
+    Returns:
+        str: 使用的复制方式
+    Raises:
+        CopyCancelled: 被取消
+        OSError: 复制失败或校验不一致
+    """
+    total = os.path.getsize(source_path)
+    if mode != COPY_MODE_COPY and same_filesystem(source_path, os.path.dirname(os.path.abspath(target_path))):
+        try:
+            method = link_file(source_path, target_path, mode)
+            if progress_callback:
+                progress_callback(total, total)
+            return method
+        except OSError as e:
+            if e.errno not in LINK_FALLBACK_ERRNOS:
+                raise
+            logging.info(f"无法创建{COPY_MODE_NAMES[mode]}，改为完整复制：{str(e)}")
+
+    temp_path = target_path + PARTIAL_SUFFIX
+    try:
+        with open(source_path, 'rb') as fsrc, open(temp_path, 'wb') as fdst:
+            method = _copy_data(fsrc, fdst, total, progress_callback, cancel_check, io_throttle)
+
+        # 保留修改时间、权限等属性
+        shutil.copystat(source_path, temp_path)
+
+        copied_size = os.path.getsize(temp_path)
+        if copied_size != total:
+            raise OSError(f"复制后文件大小不一致：{copied_size} / {total}")
+
+        if verify_hash:
+            if not expected_hash:
+                source_digests = calculate_digests(source_path, ('sha256',), cancel_check=cancel_check,
+                                                   io_throttle=io_throttle)
+                if source_digests is None:
+                    raise CopyCancelled()
+                expected_hash = source_digests['sha256']
+            digests = calculate_digests(temp_path, ('sha256',), cancel_check=cancel_check, io_throttle=io_throttle)
+            if digests is None:
+                raise CopyCancelled()
+            if digests['sha256'].upper() != expected_hash.upper():
+                raise OSError("复制后文件哈希值不一致")
+
+        os.replace(temp_path, target_path)
+        return method
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,394 @@
+"""
+模型文件的事务式移动 / 复制
+先列出一个模型的全部相关文件（模型、所有格式的预览图、同名 .json、CS 配置文件夹）和模型信息的变化，
+写入日志后再逐个执行：同一磁盘内直接重命名，跨磁盘时复制并校验，全部完成后才删除源文件。
+中途出错或取消时按日志撤销已完成的步骤；程序意外退出后，下次启动时根据日志撤销或继续
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import time  # 时间相关
+import uuid  # 事务编号
+import errno  # 错误码
+import shutil  # 文件操作
+import logging  # 日志记录
+from file_copy import copy_file, same_filesystem, PARTIAL_SUFFIX, COPY_MODE_COPY, METHOD_REFLINK, METHOD_HARDLINK  # 文件复制
+
+# 未完成事务的日志保存在这个文件夹中（每个事务一个文件，完成后删除）
+JOURNAL_DIR = 'file_journal'
+JOURNAL_VERSION = 1
+
+# 操作类型
+OP_MOVE = 'move'
+OP_COPY = 'copy'
+
+# 事务状态
+TX_EXECUTING = 'executing'  # 正在移动或复制文件，出错时撤销
+TX_COMMITTING = 'committing'  # 文件和模型信息都已更新，正在删除跨磁盘移动的源文件，出错时继续
+
+# 每一步的状态
+STEP_PENDING = 'pending'
+STEP_RUNNING = 'running'
+STEP_DONE = 'done'
+
+# 每一步的执行方式
+STEP_RENAME = 'rename'
+STEP_COPY = 'copy'
+
+
+class TransactionError(Exception):
+    """无法执行事务（如目标文件已存在）"""
+
+
+def get_tree_size(path):
+    """文件或文件夹的总大小"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def remove_path(path):
+    """删除文件或文件夹（不存在时忽略）"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def get_catalog_key(base_path, full_path):
+    """
+    模型在 model_info.json 中的键（相对路径）
+    Returns:
+        str 或 None（不在程序目录下）
+    """
+    try:
+        relative_path = os.path.relpath(full_path, base_path)
+    except ValueError:  # 在不同驱动器的情况
+        return None
+    if relative_path == '.' or relative_path.startswith('..'):
+        return None
+    return relative_path
+
+
+class FileTransaction:
+    """
+    一个模型的移动或复制
+    Attributes:
+        steps: [{'source', 'target', 'is_dir', 'is_model', 'size', 'status', 'method'}]，第一步为模型文件
+        catalog_old / catalog_new: 模型信息的键（不在程序目录下时为 None，不更新模型信息）
+        catalog_applied: 是否已开始更新模型信息（撤销时只恢复已更新的模型信息）
+        link_type: 模型文件以链接方式复制时为 reflink / hardlink
+    """
+
+    def __init__(self, op, steps, catalog_old=None, catalog_new=None, journal_dir=JOURNAL_DIR, tx_id=None):
+        self.id = tx_id or uuid.uuid4().hex
+        self.op = op
+        self.steps = steps
+        self.catalog_old = catalog_old
+        self.catalog_new = catalog_new
+        self.link_type = None
+        self.catalog_applied = False
+        self.state = TX_EXECUTING
+        self.created = time.time()
+        self.journal_dir = journal_dir
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.journal_dir, f"{self.id}.json")
+
+    @property
+    def model_target(self):
+        return self.steps[0]['target']
+
+    @property
+    def total_bytes(self):
+        return sum(step['size'] for step in self.steps)
+
+    def to_dict(self):
+        return {
+            'version': JOURNAL_VERSION,
+            'id': self.id,
+            'op': self.op,
+            'state': self.state,
+            'created': self.created,
+            'steps': self.steps,
+            'catalog_old': self.catalog_old,
+            'catalog_new': self.catalog_new,
+            'catalog_applied': self.catalog_applied,
+            'link_type': self.link_type
+        }
+
+    @classmethod
+    def from_dict(cls, data, journal_dir=JOURNAL_DIR):
+        tx = cls(data['op'], data['steps'], data.get('catalog_old'), data.get('catalog_new'),
+                 journal_dir=journal_dir, tx_id=data['id'])
+        tx.state = data.get('state', TX_EXECUTING)
+        tx.created = data.get('created', tx.created)
+        tx.link_type = data.get('link_type')
+        tx.catalog_applied = data.get('catalog_applied', False)
+        return tx
+
+    def save(self):
+        """写入日志（先写临时文件再替换，日志本身不会不完整）"""
+        os.makedirs(self.journal_dir, exist_ok=True)
+        temp_file = self.journal_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.journal_path)
+
+    def discard_journal(self):
+        """事务结束后删除日志"""
+        try:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        except OSError as e:
+            logging.error(f"删除文件操作日志时发生错误：{str(e)}")
+
+    def execute(self, apply_catalog=None, progress_callback=None, cancel_check=None, copy_mode=COPY_MODE_COPY,
+                verify_hash=False, expected_hash=None, io_throttle=None):
+        """
+        执行事务，出错或取消时撤销已完成的步骤后重新抛出异常
+        Args:
+            apply_catalog: apply_catalog(事务, reverse=False)，所有文件就位后更新模型信息
+            progress_callback: progress_callback(已处理字节数, 总字节数)
+            copy_mode: 复制模型文件的方式（完整复制 / reflink / 硬链接），只用于复制
+            verify_hash: 复制模型文件后校验哈希值（跨磁盘移动时总是校验）
+            expected_hash: 已知的模型文件 SHA-256
+        Raises:
+            TransactionError / CopyCancelled / OSError
+        """
+        total = self.total_bytes
+        done_bytes = [0]
+
+        def step_progress(copied, _):
+            if progress_callback:
+                progress_callback(done_bytes[0] + copied, total)
+
+        self.save()
+        try:
+            for step in self.steps:
+                if not os.path.lexists(step['source']):
+                    # 计划后被删除的相关文件（预览图等）跳过；模型文件不存在时无法继续
+                    if step['is_model']:
+                        raise TransactionError(f"文件不存在：{step['source']}")
+                    step['status'] = STEP_DONE
+                    continue
+                if os.path.lexists(step['target']):
+                    raise TransactionError(f"目标已存在：{step['target']}")
+
+                step['method'] = self._choose_method(step)
+                step['status'] = STEP_RUNNING
+                self.save()
+                if step['method'] == STEP_RENAME:
+                    try:
+                        os.rename(step['source'], step['target'])
+                    except OSError as e:
+                        # 设备号相同但实际不能重命名（如不同的挂载点），改为复制
+                        if e.errno != errno.EXDEV:
+                            raise
+                        step['method'] = STEP_COPY
+                        self.save()
+                if step['method'] == STEP_COPY:
+                    method = self._copy_step(step, step_progress, cancel_check, copy_mode,
+                                             verify_hash, expected_hash, io_throttle)
+                    if step['is_model'] and method in (METHOD_REFLINK, METHOD_HARDLINK):
+                        self.link_type = method
+                step['status'] = STEP_DONE
+                done_bytes[0] += step['size']
+                step_progress(0, total)
+                self.save()
+
+            # 所有文件就位后更新模型信息（先记录到日志，更新到一半时意外退出也会撤销）
+            if apply_catalog and self.catalog_new:
+                self.catalog_applied = True
+                self.save()
+                apply_catalog(self)
+        except BaseException:
+            self.rollback(apply_catalog)
+            raise
+
+        # 之后只剩删除源文件，出错时继续而不是撤销
+        self.state = TX_COMMITTING
+        self.save()
+        self.commit()
+
+    def _choose_method(self, step):
+        """移动时同一磁盘内重命名，否则复制"""
+        if self.op == OP_MOVE and same_filesystem(step['source'], os.path.dirname(step['target'])):
+            return STEP_RENAME
+        return STEP_COPY
+
+    def _copy_step(self, step, progress_callback, cancel_check, copy_mode, verify_hash, expected_hash, io_throttle):
+        """复制一个文件或文件夹（跨磁盘移动时校验后再删除源文件）"""
+        verify = verify_hash or self.op == OP_MOVE
+        if not step['is_dir']:
+            return copy_file(
+                step['source'], step['target'],
+                progress_callback=progress_callback,
+                cancel_check=cancel_check,
+                verify_hash=verify and step['is_model'],
+                expected_hash=expected_hash if step['is_model'] else None,
+                io_throttle=io_throttle,
+                mode=copy_mode if (step['is_model'] and self.op == OP_COPY) else COPY_MODE_COPY
+            )
+
+        # 文件夹先复制到临时文件夹，完成后再重命名
+        temp_dir = step['target'] + PARTIAL_SUFFIX
+        remove_path(temp_dir)
+        try:
+            shutil.copytree(step['source'], temp_dir, copy_function=lambda src, dst: copy_file(
+                src, dst, cancel_check=cancel_check, io_throttle=io_throttle))
+            os.rename(temp_dir, step['target'])
+        finally:
+            if os.path.exists(temp_dir):
+                remove_path(temp_dir)
+        return STEP_COPY
+
+    def rollback(self, apply_catalog=None):
+        """撤销已完成的步骤（从后往前），恢复已更新的模型信息"""
+        if apply_catalog and self.catalog_new and self.catalog_applied:
+            try:
+                apply_catalog(self, reverse=True)
+            except Exception as e:
+                logging.error(f"恢复模型信息时发生错误：{str(e)}")
+
+        for step in reversed(self.steps):
+            if step['status'] == STEP_PENDING or not step.get('method'):
+                continue
+            try:
+                if step['method'] == STEP_RENAME:
+                    # 重命名是原子操作：目标存在而源不存在说明已经移动
+                    if os.path.lexists(step['target']) and not os.path.lexists(step['source']):
+                        os.rename(step['target'], step['source'])
+                else:
+                    # 目标在计划时不存在，存在的目标都是本事务创建的
+                    if os.path.lexists(step['source']):
+                        remove_path(step['target'])
+                    remove_path(step['target'] + PARTIAL_SUFFIX)
+                step['status'] = STEP_PENDING
+            except OSError as e:
+                logging.error(f"撤销文件操作时发生错误 {step['target']}：{str(e)}")
+        self.discard_journal()
+
+    def commit(self):
+        """删除跨磁盘移动的源文件，完成后删除日志"""
+        if self.op == OP_MOVE:
+            for step in self.steps:
+                if step.get('method') == STEP_COPY and os.path.lexists(step['target']):
+                    try:
+                        remove_path(step['source'])
+                    except OSError as e:
+                        logging.error(f"删除已移动的源文件时发生错误 {step['source']}：{str(e)}")
+        self.discard_journal()
+
+
+def plan_model_transfer(op, base_path, model_path, target_dir, image_extensions, new_basename=None,
+                        journal_dir=JOURNAL_DIR):
+    """
+    列出移动或复制一个模型需要处理的全部文件
+    Args:
+        model_path: 模型文件的完整路径
+        image_extensions: 预览图扩展名（所有格式的预览图都会处理）
+        new_basename: 目标文件名（不含扩展名），默认与原文件相同
+    Returns:
+        FileTransaction
+    Raises:
+        TransactionError: 目标与源相同，或目标已存在
+    """
+    model_dir = os.path.dirname(model_path)
+    model_name = os.path.basename(model_path)
+    model_basename, model_ext = os.path.splitext(model_name)
+    new_basename = new_basename or model_basename
+    target_model = os.path.join(target_dir, new_basename + model_ext)
+
+    if os.path.normcase(os.path.abspath(target_model)) == os.path.normcase(os.path.abspath(model_path)):
+        raise TransactionError("模型已在目标文件夹中")
+
+    # 模型文件、同名 .json、所有格式的预览图、CS 配置文件夹
+    candidates = [(model_name, new_basename + model_ext, True)]
+    candidates.append((model_basename + '.json', new_basename + '.json', False))
+    for ext in image_extensions:
+        candidates.append((model_basename + ext, new_basename + ext, False))
+    candidates.append((model_basename, new_basename, False))
+
+    steps = []
+    for source_name, target_name, is_model in candidates:
+        source = os.path.join(model_dir, source_name)
+        if not is_model and not os.path.lexists(source):
+            continue
+        is_dir = os.path.isdir(source)
+        if not is_model and source_name == model_basename and not is_dir:
+            continue
+        target = os.path.join(target_dir, target_name)
+        if os.path.lexists(target):
+            raise TransactionError(f"目标已存在：{target}")
+        steps.append({
+            'source': source,
+            'target': target,
+            'is_dir': is_dir,
+            'is_model': is_model,
+            'size': get_tree_size(source),
+            'status': STEP_PENDING,
+            'method': None
+        })
+
+    catalog_old = get_catalog_key(base_path, model_path)
+    catalog_new = get_catalog_key(base_path, target_model)
+    if catalog_old is None:
+        catalog_new = None
+    return FileTransaction(op, steps, catalog_old, catalog_new, journal_dir=journal_dir)
+
+
+def recover_transactions(apply_catalog=None, journal_dir=JOURNAL_DIR):
+    """
+    程序启动时处理上次未完成的事务：文件没有全部就位的撤销，已经就位的继续完成
+    Returns:
+        tuple: (撤销的事务列表, 继续完成的事务列表)
+    """
+    rolled_back = []
+    resumed = []
+    if not os.path.isdir(journal_dir):
+        return rolled_back, resumed
+
+    for name in sorted(os.listdir(journal_dir)):
+        path = os.path.join(journal_dir, name)
+        if name.endswith('.tmp'):
+            # 没有写完的日志，对应的步骤还没有开始
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != JOURNAL_VERSION:
+                continue
+            tx = FileTransaction.from_dict(data, journal_dir=journal_dir)
+        except Exception as e:
+            logging.error(f"读取文件操作日志时发生错误 {name}：{str(e)}")
+            continue
+
+        try:
+            if tx.state == TX_COMMITTING:
+                if apply_catalog and tx.catalog_new:
+                    apply_catalog(tx)
+                tx.commit()
+                resumed.append(tx)
+            else:
+                tx.rollback(apply_catalog)
+                rolled_back.append(tx)
+        except Exception as e:
+            logging.error(f"恢复文件操作时发生错误 {name}：{str(e)}")
+    return rolled_back, resumed
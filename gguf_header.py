@@ -0,0 +1,184 @@
+"""
+GGUF 文件头读取
+顺序读取文件头（魔数、版本、键值元数据、张量信息表），不读取张量数据
+"""
+
+import struct  # 二进制解析
+from model_analysis import analyze_tensor_table  # 模型结构分析
+
+GGUF_MAGIC = b'GGUF'
+
+# 文件头最多读取的字节数（大语言模型的词表可能有数 MB，超过此值视为文件损坏）
+GGUF_HEADER_LIMIT = 64 * 1024 * 1024
+
+# 读取文件时使用的缓冲区大小
+GGUF_BUFFER_SIZE = 1024 * 1024
+
+# 数组元素超过此数量时只记录长度，不保存内容（如词表）
+GGUF_ARRAY_KEEP = 16
+
+# 元数据值类型
+GGUF_TYPE_UINT8 = 0
+GGUF_TYPE_INT8 = 1
+GGUF_TYPE_UINT16 = 2
+GGUF_TYPE_INT16 = 3
+GGUF_TYPE_UINT32 = 4
+GGUF_TYPE_INT32 = 5
+GGUF_TYPE_FLOAT32 = 6
+GGUF_TYPE_BOOL = 7
+GGUF_TYPE_STRING = 8
+GGUF_TYPE_ARRAY = 9
+GGUF_TYPE_UINT64 = 10
+GGUF_TYPE_INT64 = 11
+GGUF_TYPE_FLOAT64 = 12
+
+# 定长类型的 struct 格式
+GGUF_SCALAR_FORMATS = {
+    GGUF_TYPE_UINT8: '<B',
+    GGUF_TYPE_INT8: '<b',
+    GGUF_TYPE_UINT16: '<H',
+    GGUF_TYPE_INT16: '<h',
+    GGUF_TYPE_UINT32: '<I',
+    GGUF_TYPE_INT32: '<i',
+    GGUF_TYPE_FLOAT32: '<f',
+    GGUF_TYPE_BOOL: '<?',
+    GGUF_TYPE_UINT64: '<Q',
+    GGUF_TYPE_INT64: '<q',
+    GGUF_TYPE_FLOAT64: '<d',
+}
+
+# 张量量化类型（ggml_type）
+GGML_TYPE_NAMES = {
+    0: 'F32', 1: 'F16', 2: 'Q4_0', 3: 'Q4_1', 6: 'Q5_0', 7: 'Q5_1', 8: 'Q8_0', 9: 'Q8_1',
+    10: 'Q2_K', 11: 'Q3_K', 12: 'Q4_K', 13: 'Q5_K', 14: 'Q6_K', 15: 'Q8_K',
+    16: 'IQ2_XXS', 17: 'IQ2_XS', 18: 'IQ3_XXS', 19: 'IQ1_S', 20: 'IQ4_NL', 21: 'IQ3_S',
+    22: 'IQ2_S', 23: 'IQ4_XS', 24: 'I8', 25: 'I16', 26: 'I32', 27: 'I64', 28: 'F64',
+    29: 'IQ1_M', 30: 'BF16', 34: 'TQ1_0', 35: 'TQ2_0',
+}
+
+# general.architecture -> 架构（其他值原样显示）
+GGUF_ARCHITECTURE_NAMES = {
+    'sd1': 'SD1.5',
+    'sd2': 'SD2',
+    'sdxl': 'SDXL',
+    'sd3': 'SD3',
+    'flux': 'Flux',
+}
+
+
+class GGUFHeaderReader:
+    """顺序读取 GGUF 文件头，记录已读取的字节数"""
+
+    def __init__(self, f, limit=GGUF_HEADER_LIMIT):
+        self.f = f
+        self.limit = limit
+        self.offset = 0
+        self.version = 0
+
+    def read(self, size):
+        if self.offset + size > self.limit:
+            raise ValueError(f"文件头超过 {self.limit} 字节，文件可能已损坏")
+        data = self.f.read(size)
+        if len(data) < size:
+            raise ValueError("文件头不完整")
+        self.offset += size
+        return data
+
+    def skip(self, size):
+        # 跳过的数据（如词表字符串）同样受文件头大小限制
+        if self.offset + size > self.limit:
+            raise ValueError(f"文件头超过 {self.limit} 字节，文件可能已损坏")
+        self.f.seek(size, 1)
+        self.offset += size
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.read(struct.calcsize(fmt)))[0]
+
+    def read_count(self):
+        # 版本 1 的长度和数量为 32 位，之后为 64 位
+        return self.unpack('<I' if self.version == 1 else '<Q')
+
+    def read_string(self):
+        return self.read(self.read_count()).decode('utf-8', errors='replace')
+
+    def read_value(self, value_type):
+        """读取一个元数据值；过长的数组只返回长度说明"""
+        if value_type == GGUF_TYPE_STRING:
+            return self.read_string()
+        if value_type in GGUF_SCALAR_FORMATS:
+            return self.unpack(GGUF_SCALAR_FORMATS[value_type])
+        if value_type == GGUF_TYPE_ARRAY:
+            item_type = self.unpack('<I')
+            count = self.read_count()
+            if count <= GGUF_ARRAY_KEEP:
+                return [self.read_value(item_type) for _ in range(count)]
+            # 大数组直接跳过：定长类型按字节数跳过，字符串逐个跳过
+            if item_type in GGUF_SCALAR_FORMATS:
+                self.skip(count * struct.calcsize(GGUF_SCALAR_FORMATS[item_type]))
+            else:
+                for _ in range(count):
+                    if item_type == GGUF_TYPE_STRING:
+                        self.skip(self.read_count())
+                    else:
+                        self.read_value(item_type)
+            return f"[{count} 项]"
+        raise ValueError(f"未知的元数据类型：{value_type}")
+
+
+def read_gguf_header(file_path, limit=GGUF_HEADER_LIMIT):
+    """
+    读取 GGUF 文件头
+    Returns:
+        tuple: (文件头长度, 版本, 元数据 dict, 张量信息 {名称: (量化类型, 形状)})
+    Raises:
+        ValueError: 不是有效的 GGUF 文件或文件头损坏
+    """
+    with open(file_path, 'rb', buffering=GGUF_BUFFER_SIZE) as f:
+        reader = GGUFHeaderReader(f, limit)
+        if reader.read(4) != GGUF_MAGIC:
+            raise ValueError("不是有效的 GGUF 文件")
+        reader.version = reader.unpack('<I')
+        if reader.version not in (1, 2, 3):
+            raise ValueError(f"不支持的 GGUF 版本：{reader.version}")
+        tensor_count = reader.read_count()
+        metadata_count = reader.read_count()
+
+        metadata = {}
+        for _ in range(metadata_count):
+            key = reader.read_string()
+            metadata[key] = reader.read_value(reader.unpack('<I'))
+
+        tensors = {}
+        for _ in range(tensor_count):
+            name = reader.read_string()
+            dims = [reader.read_count() for _ in range(reader.unpack('<I'))]
+            tensor_type = reader.unpack('<I')
+            reader.unpack('<Q')  # 数据偏移
+            # GGUF 的维度从最内层开始，反转为 PyTorch 的顺序
+            tensors[name] = (GGML_TYPE_NAMES.get(tensor_type, f"TYPE_{tensor_type}"), dims[::-1])
+
+    return reader.offset, reader.version, metadata, tensors
+
+
+def summarize_gguf_header(header_length, version, metadata, tensors):
+    """从 GGUF 文件头提取需要缓存的信息（与 safetensors 摘要格式相同）"""
+    gguf_architecture = str(metadata.get('general.architecture', ''))
+    architecture_hint = GGUF_ARCHITECTURE_NAMES.get(gguf_architecture.lower(), gguf_architecture)
+    analysis = analyze_tensor_table(tensors, architecture_hint)
+    # general.architecture 是转换工具写入的，优先于张量名称推断
+    if gguf_architecture:
+        analysis['architecture'] = architecture_hint
+
+    summary_metadata = {'gguf.version': str(version)}
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value = ', '.join(str(item) for item in value)
+        summary_metadata[str(key)] = str(value)
+
+    return {
+        'format': 'gguf',
+        'header_length': header_length,
+        'tensor_count': len(tensors),
+        'metadata': summary_metadata,
+        'analysis': analysis
+    }
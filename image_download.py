@@ -0,0 +1,126 @@
+"""
+预览图下载
+分块流式下载，边下载边解码，直接写入最终的预览图文件（先写临时文件再替换），不在内存或临时目录中保留完整副本
+"""
+
+import os  # 操作系统相关
+import time  # 时间相关
+import logging  # 日志记录
+import threading  # 多线程
+import requests  # HTTP请求
+from PIL import Image, ImageFile  # 图片处理
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 每次读取的数据块大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 单张图片的最大下载大小（超过时放弃，避免误下载视频或超大文件）
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+
+# 下载超时（秒）
+DOWNLOAD_TIMEOUT = 30
+
+# PNG 支持直接保存的颜色模式，其他模式（如 CMYK）先转换
+PNG_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+
+class RateLimiter:
+    """
+    下载限速（多个线程共用，限制总带宽）
+    """
+
+    def __init__(self, mb_per_second=0):
+        self.lock = threading.Lock()
+        self.rate_limit = 0
+        self.rate_start = time.monotonic()
+        self.rate_bytes = 0
+        self.set_rate_limit(mb_per_second)
+
+    def set_rate_limit(self, mb_per_second):
+        """设置限速（MB/s），0 表示不限速"""
+        with self.lock:
+            self.rate_limit = max(0, mb_per_second or 0) * 1024 * 1024
+            self.rate_start = time.monotonic()
+            self.rate_bytes = 0
+
+    def consume(self, nbytes):
+        """记录已下载的字节数，超过限速时等待"""
+        with self.lock:
+            if not self.rate_limit:
+                return
+            self.rate_bytes += nbytes
+            delay = self.rate_bytes / self.rate_limit - (time.monotonic() - self.rate_start)
+            # 长时间空闲后重新计时，避免积累的额度造成突发下载
+            if delay < -1:
+                self.rate_start = time.monotonic()
+                self.rate_bytes = 0
+                delay = 0
+        if delay > 0:
+            time.sleep(delay)
+
+
+def prepare_for_png(img, max_side=None):
+    """转换为 PNG 支持的颜色模式，并按需缩小（保持比例）"""
+    if img.mode not in PNG_MODES:
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    return img
+
+
+def download_image(url, dest_path, session=None, max_bytes=MAX_IMAGE_BYTES, max_side=None,
+                   rate_limiter=None, cancel_check=None):
+    """
+    下载图片并保存为 PNG 预览图
+    Args:
+        dest_path: 最终的预览图路径
+        session: 发送请求的对象（requests.Session 或 CivitaiClient），默认直接使用 requests
+        max_side: 长边超过此值时缩小，None 表示保持原尺寸
+        rate_limiter: 共用的 RateLimiter
+        cancel_check: 返回 True 时停止下载
+    Returns:
+        bool: 是否成功
+    """
+    temp_path = dest_path + '.tmp'
+    try:
+        response = (session or requests).get(url, headers=DOWNLOAD_HEADERS, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        with response:
+            if response.status_code != 200:
+                logging.error(f"下载图片失败（{response.status_code}）：{url}")
+                return False
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > max_bytes:
+                logging.error(f"图片超过 {max_bytes // (1024 * 1024)}MB，已跳过：{url}")
+                return False
+
+            # 边下载边交给 PIL 解码
+            parser = ImageFile.Parser()
+            received = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                if cancel_check and cancel_check():
+                    return False
+                received += len(chunk)
+                if received > max_bytes:
+                    logging.error(f"图片超过 {max_bytes // (1024 * 1024)}MB，已跳过：{url}")
+                    return False
+                parser.feed(chunk)
+                if rate_limiter:
+                    rate_limiter.consume(len(chunk))
+            img = parser.close()
+
+        img = prepare_for_png(img, max_side)
+        img.save(temp_path, "PNG")
+        os.replace(temp_path, dest_path)
+        return True
+    except Exception as e:
+        logging.error(f"下载图片时发生错误：{str(e)}")
+        return False
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,136 @@
+"""
+后台 I/O 调度
+按优先级协调磁盘读取，并把工作线程的界面更新转交给 Tk 主线程
+"""
+
+import time  # 时间相关
+import queue  # 队列
+import logging  # 日志记录
+import threading  # 多线程
+from contextlib import contextmanager  # 上下文管理
+
+# 优先级：交互（预览图、缩略图）> 普通（扫描）> 批量（哈希、复制）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+# 批量读取遇到交互任务时，每块数据最多等待的时间（秒），避免交互任务持续时批量任务完全停止
+YIELD_TIMEOUT = 0.5
+
+# 普通任务进行时，批量读取每块数据后让出的时间（秒）
+NORMAL_YIELD = 0.005
+
+
+class IOScheduler:
+    """
+    I/O 优先级调度器
+    交互和普通任务用上下文管理器标记自己正在读取磁盘；
+    批量任务每读取一块数据调用 throttle()，在有更高优先级任务时让出磁盘，并可按 MB/s 限速
+    """
+
+    def __init__(self, bulk_rate_limit=0):
+        self.condition = threading.Condition()
+        self.active = {PRIORITY_INTERACTIVE: 0, PRIORITY_NORMAL: 0}
+        self.bulk_rate_limit = 0
+        self.rate_start = time.monotonic()
+        self.rate_bytes = 0
+        self.set_rate_limit(bulk_rate_limit)
+
+    def set_rate_limit(self, mb_per_second):
+        """设置批量读取限速（MB/s），0 表示不限速"""
+        with self.condition:
+            self.bulk_rate_limit = max(0, mb_per_second or 0) * 1024 * 1024
+            self.rate_start = time.monotonic()
+            self.rate_bytes = 0
+
+    @contextmanager
+    def _mark(self, priority):
+        with self.condition:
+            self.active[priority] += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active[priority] -= 1
+                self.condition.notify_all()
+
+    def interactive(self):
+        """标记交互任务（预览图、缩略图加载）"""
+        return self._mark(PRIORITY_INTERACTIVE)
+
+    def normal(self):
+        """标记普通任务（文件扫描）"""
+        return self._mark(PRIORITY_NORMAL)
+
+    def is_busy(self, priority=PRIORITY_BULK):
+        """是否有比指定优先级更高的任务正在进行"""
+        with self.condition:
+            return any(count > 0 for level, count in self.active.items() if level < priority)
+
+    def throttle(self, nbytes=0, priority=PRIORITY_BULK):
+        """
+        读取一块数据后调用
+        Args:
+            nbytes: 本次读取的字节数（用于限速）
+            priority: 调用者的优先级
+        """
+        with self.condition:
+            # 有交互任务时让出磁盘
+            if priority > PRIORITY_INTERACTIVE and self.active[PRIORITY_INTERACTIVE]:
+                self.condition.wait_for(lambda: not self.active[PRIORITY_INTERACTIVE], timeout=YIELD_TIMEOUT)
+            normal_active = priority == PRIORITY_BULK and self.active[PRIORITY_NORMAL] > 0
+
+            # 批量任务限速
+            delay = 0
+            if priority == PRIORITY_BULK and self.bulk_rate_limit:
+                self.rate_bytes += nbytes
+                expected = self.rate_bytes / self.bulk_rate_limit
+                elapsed = time.monotonic() - self.rate_start
+                delay = expected - elapsed
+                # 长时间空闲后重新计时，避免积累的额度造成突发读取
+                if delay < -1:
+                    self.rate_start = time.monotonic()
+                    self.rate_bytes = 0
+                    delay = 0
+
+        if normal_active:
+            delay = max(delay, NORMAL_YIELD)
+        if delay > 0:
+            time.sleep(delay)
+
+    def bulk_throttle(self, nbytes=0):
+        """批量任务使用的限速回调"""
+        self.throttle(nbytes, PRIORITY_BULK)
+
+
+class UiDispatcher:
+    """
+    界面更新队列
+    工作线程通过 post() 提交界面更新，Tk 主线程定时取出执行，工作线程不直接操作控件
+    """
+
+    def __init__(self, master, interval=50):
+        self.master = master
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.master.after(self.interval, self._poll)
+
+    def post(self, func, *args, **kwargs):
+        """提交一个需要在主线程执行的调用（可在任意线程调用）"""
+        self.queue.put((func, args, kwargs))
+
+    def _poll(self):
+        try:
+            while True:
+                func, args, kwargs = self.queue.get_nowait()
+                try:
+                    func(*args, **kwargs)
+                except Exception as e:
+                    logging.error(f"执行界面更新时发生错误：{str(e)}")
+        except queue.Empty:
+            pass
+        try:
+            self.master.after(self.interval, self._poll)
+        except Exception:
+            # 窗口已关闭
+            pass
@@ -0,0 +1,376 @@
+"""
+后台批量任务队列
+每个任务的计划（要处理的模型列表）和每一项的状态保存在 batch_jobs.json 中，
+程序关闭或崩溃后可以从中断处继续；支持暂停、继续、取消和只重试失败的项
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import time  # 时间相关
+import uuid  # 任务编号
+import logging  # 日志记录
+import threading  # 多线程
+from collections import deque  # 速度统计
+from batch_runner import (ITEM_PENDING, ITEM_FAILED, EVENT_JOB_STARTED, EVENT_ITEM_DONE, EVENT_JOB_DONE,
+                          CancelToken, run_concurrent, timed_call, summarize)  # 批量处理框架
+
+# 任务文件（与 model_info.json 放在同一目录）
+JOBS_FILE = 'batch_jobs.json'
+JOBS_VERSION = 1
+
+# 处理过程中保存任务状态的最短间隔（秒），暂停、取消和完成时立即保存
+SAVE_INTERVAL = 2.0
+
+# 按最近多少项计算处理速度
+SPEED_WINDOW = 30
+
+# 最多保留的已结束任务数
+MAX_FINISHED_JOBS = 20
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED = 'finished'
+
+JOB_STATE_NAMES = {
+    JOB_QUEUED: '等待中',
+    JOB_RUNNING: '进行中',
+    JOB_PAUSED: '已暂停',
+    JOB_CANCELLED: '已取消',
+    JOB_FINISHED: '已完成',
+}
+
+
+class JobType:
+    """
+    任务类型
+    Args:
+        title: 显示名称
+        run_item: run_item(模型相对路径, 任务选项, 预处理数据, cancel_check)
+                  返回 ITEM_DONE / ITEM_SKIPPED 或 ItemResult（附带说明），被中断时返回 None（保持待处理），出错时抛出异常
+        workers: 同时处理的项数
+        prepare: prepare(模型相对路径列表, 任务选项, cancel_check) -> {路径: 预处理数据}，
+                 分发前按批预处理（如批量查询），可选
+        batch_size: prepare 每次处理的项数
+        on_start / on_stop / on_finish: 开始运行、请求暂停或取消（注册到取消令牌）、运行结束时调用，可选
+    """
+
+    def __init__(self, title, run_item, workers=1, prepare=None, batch_size=1,
+                 on_start=None, on_stop=None, on_finish=None):
+        self.title = title
+        self.run_item = run_item
+        self.workers = workers
+        self.prepare = prepare
+        self.batch_size = batch_size
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self.on_finish = on_finish
+
+
+class JobQueue:
+    """
+    持久化的任务队列
+    任务按提交顺序在一个后台线程中依次运行，每个任务内部按任务类型的 workers 并发处理
+    """
+
+    def __init__(self, job_types, jobs_file=JOBS_FILE, events=None):
+        """
+        Args:
+            job_types: {任务类型名: JobType}
+            events: ProgressStream，接收任务开始、每一项完成和任务结束（暂停、取消或完成）的事件
+        """
+        self.job_types = job_types
+        self.jobs_file = jobs_file
+        self.events = events
+        self.lock = threading.RLock()
+        self.jobs = []  # 按提交顺序
+        self.running_id = None
+        self.token = None  # 运行中任务的取消令牌，reason 为暂停或取消后的状态
+        self.progress = {}  # 任务编号 -> {'times': 最近完成时间, 'current': 当前项}
+        self.wakeup = threading.Event()
+        self.last_save = 0
+        self.load()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def load(self):
+        """从磁盘加载任务；上次运行中被中断的任务改为已暂停"""
+        with self.lock:
+            self.jobs = []
+            if not os.path.exists(self.jobs_file):
+                return
+            try:
+                with open(self.jobs_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != JOBS_VERSION:
+                    return
+                for job in data.get('jobs', []):
+                    if job.get('kind') not in self.job_types:
+                        continue
+                    if job['state'] in (JOB_RUNNING, JOB_QUEUED):
+                        job['state'] = JOB_PAUSED
+                    job.setdefault('elapsed', 0)
+                    self.jobs.append(job)
+            except Exception as e:
+                logging.error(f"读取批量任务时发生错误：{str(e)}")
+
+    def save(self):
+        """保存任务到磁盘（先写临时文件再替换）"""
+        with self.lock:
+            data = {'version': JOBS_VERSION, 'jobs': self.jobs}
+            temp_file = self.jobs_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_file, self.jobs_file)
+                self.last_save = time.monotonic()
+            except Exception as e:
+                logging.error(f"保存批量任务时发生错误：{str(e)}")
+
+    def _get(self, job_id):
+        for job in self.jobs:
+            if job['id'] == job_id:
+                return job
+        return None
+
+    def submit(self, kind, items, options=None, title=None):
+        """
+        提交任务
+        Args:
+            kind: 任务类型名
+            items: 要处理的模型相对路径列表
+            options: 任务选项（保存到磁盘，需可 JSON 序列化）
+        Returns:
+            str: 任务编号
+        """
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'kind': kind,
+            'title': title or self.job_types[kind].title,
+            'options': options or {},
+            'state': JOB_QUEUED,
+            'created': time.time(),
+            'items': {key: ITEM_PENDING for key in items},
+            'messages': {},  # 失败或跳过的原因
+            'elapsed': 0  # 累计运行时间（秒）
+        }
+        with self.lock:
+            self.jobs.append(job)
+            self._prune_finished()
+            self.save()
+        self.wakeup.set()
+        return job['id']
+
+    def _prune_finished(self):
+        finished = [job for job in self.jobs if job['state'] in (JOB_FINISHED, JOB_CANCELLED)]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self.jobs.remove(job)
+
+    def pause(self, job_id):
+        """暂停任务（正在处理的项完成后停止）"""
+        with self.lock:
+            job = self._get(job_id)
+            if not job:
+                return
+            if job['id'] == self.running_id:
+                self.token.cancel(JOB_PAUSED)
+            elif job['state'] == JOB_QUEUED:
+                job['state'] = JOB_PAUSED
+                self.save()
+
+    def resume(self, job_id):
+        """继续已暂停或已取消的任务（只处理未完成的项）"""
+        with self.lock:
+            job = self._get(job_id)
+            if job and job['id'] != self.running_id and job['state'] in (JOB_PAUSED, JOB_CANCELLED):
+                job['state'] = JOB_QUEUED
+                self.save()
+        self.wakeup.set()
+
+    def cancel(self, job_id):
+        """取消任务（保留状态，之后仍可继续）"""
+        with self.lock:
+            job = self._get(job_id)
+            if not job:
+                return
+            if job['id'] == self.running_id:
+                self.token.cancel(JOB_CANCELLED)
+            elif job['state'] in (JOB_QUEUED, JOB_PAUSED):
+                job['state'] = JOB_CANCELLED
+                self.save()
+
+    def retry_failed(self, job_id):
+        """把失败的项改为待处理并重新排队"""
+        with self.lock:
+            job = self._get(job_id)
+            if not job or job['id'] == self.running_id:
+                return
+            failed = [key for key, status in job['items'].items() if status == ITEM_FAILED]
+            if not failed:
+                return
+            for key in failed:
+                job['items'][key] = ITEM_PENDING
+                job['messages'].pop(key, None)
+            job['state'] = JOB_QUEUED
+            self.save()
+        self.wakeup.set()
+
+    def remove(self, job_id):
+        """删除没有在运行的任务"""
+        with self.lock:
+            job = self._get(job_id)
+            if job and job['id'] != self.running_id:
+                self.jobs.remove(job)
+                self.progress.pop(job_id, None)
+                self.save()
+
+    def has_unfinished(self):
+        """是否有未完成的任务（用于启动时提示继续）"""
+        with self.lock:
+            return any(job['state'] in (JOB_QUEUED, JOB_RUNNING, JOB_PAUSED) for job in self.jobs)
+
+    def snapshot(self):
+        """
+        所有任务的当前状态（用于界面显示）
+        Returns:
+            list: [{'id', 'title', 'state', 'total', 'done', 'skipped', 'failed', 'pending', 'speed', 'eta', 'current'}]
+        """
+        with self.lock:
+            result = []
+            for job in self.jobs:
+                summary = summarize(job['items'])
+                progress = self.progress.get(job['id'], {})
+                times = progress.get('times') or []
+                speed = 0
+                if job['id'] == self.running_id and len(times) >= 2 and times[-1] > times[0]:
+                    speed = (len(times) - 1) / (times[-1] - times[0])
+                result.append({
+                    'id': job['id'],
+                    'title': job['title'],
+                    'state': job['state'],
+                    'total': summary['total'],
+                    'done': summary['done'],
+                    'skipped': summary['skipped'],
+                    'failed': summary['failed'],
+                    'pending': summary['pending'],
+                    'speed': speed,
+                    'eta': summary['pending'] / speed if speed else None,
+                    'current': progress.get('current', '') if job['id'] == self.running_id else ''
+                })
+            return result
+
+    def summary(self, job_id):
+        """
+        任务的处理结果汇总（见 batch_runner.summarize），另含每一项的状态和说明
+        Returns:
+            dict 或 None（任务不存在）
+        """
+        with self.lock:
+            job = self._get(job_id)
+            if not job:
+                return None
+            result = summarize(job['items'], job['messages'], job['elapsed'])
+            result['title'] = job['title']
+            result['state'] = job['state']
+            result['items'] = dict(job['items'])
+            result['messages'] = dict(job['messages'])
+            return result
+
+    def _emit(self, kind, job_id, **data):
+        if self.events:
+            self.events.emit(kind, job_id, **data)
+
+    def _next_job(self):
+        with self.lock:
+            for job in self.jobs:
+                if job['state'] == JOB_QUEUED:
+                    self.running_id = job['id']
+                    self.token = CancelToken()
+                    job['state'] = JOB_RUNNING
+                    self.save()
+                    return job
+            return None
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if not job:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            self._emit(EVENT_JOB_STARTED, job['id'], title=job['title'])
+            try:
+                self._run_job(job, self.token)
+            except Exception as e:
+                logging.error(f"运行批量任务时发生错误：{str(e)}")
+                with self.lock:
+                    job['state'] = JOB_PAUSED
+            with self.lock:
+                self.running_id = None
+                self.save()
+            self._emit(EVENT_JOB_DONE, job['id'], title=job['title'], state=job['state'],
+                       summary=self.summary(job['id']))
+
+    def _run_job(self, job, token):
+        job_type = self.job_types[job['kind']]
+        options = job['options']
+        with self.lock:
+            pending = [key for key, status in job['items'].items() if status == ITEM_PENDING]
+            self.progress[job['id']] = {'times': deque(maxlen=SPEED_WINDOW), 'current': ''}
+        if job_type.on_stop:
+            token.on_cancel(job_type.on_stop)
+        if job_type.on_start:
+            job_type.on_start()
+        started = time.monotonic()
+
+        def prepared_items():
+            """按批预处理后逐项交给线程池"""
+            for start in range(0, len(pending), job_type.batch_size):
+                if token():
+                    return
+                chunk = pending[start:start + job_type.batch_size]
+                extras = job_type.prepare(chunk, options, token) if job_type.prepare else {}
+                for key in chunk:
+                    yield key, extras.get(key)
+
+        def run(task):
+            key, extra = task
+            return timed_call(job_type.run_item, key, options, extra, token)
+
+        try:
+            for (key, extra), result in run_concurrent(run, prepared_items(), job_type.workers, token):
+                if isinstance(result, Exception):
+                    # 预处理之外的异常已由 timed_call 转换为失败结果，这里只可能是线程池本身的错误
+                    raise result
+                if result is None or (token() and result.status == ITEM_FAILED):
+                    # 暂停或取消时被中断的项保持待处理
+                    continue
+                if result.status == ITEM_FAILED:
+                    logging.error(f"处理 {key} 时发生错误：{result.message}")
+                with self.lock:
+                    job['items'][key] = result.status
+                    if result.message:
+                        job['messages'][key] = result.message
+                    progress = self.progress[job['id']]
+                    progress['times'].append(time.monotonic())
+                    progress['current'] = key
+                    if time.monotonic() - self.last_save >= SAVE_INTERVAL:
+                        self.save()
+                self._emit(EVENT_ITEM_DONE, job['id'], key=key, status=result.status,
+                           message=result.message, elapsed=result.elapsed)
+        finally:
+            if job_type.on_finish:
+                job_type.on_finish()
+            with self.lock:
+                job['elapsed'] = job.get('elapsed', 0) + time.monotonic() - started
+
+        with self.lock:
+            if token.reason:
+                job['state'] = token.reason
+            elif any(status == ITEM_PENDING for status in job['items'].values()):
+                # 被跳过分发的项（如预处理被中断）留到下次继续
+                job['state'] = JOB_PAUSED
+            else:
+                job['state'] = JOB_FINISHED
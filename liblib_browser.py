@@ -0,0 +1,277 @@
+"""
+Liblib 页面抓取使用的浏览器池
+只启动一次 Firefox，按需创建有限数量的页面并行抓取；屏蔽图片、字体和统计脚本以加快加载，
+每个上下文使用一定次数后重新创建，退出时统一关闭
+"""
+
+import os  # 操作系统相关
+import sys  # 系统相关
+import asyncio  # 浏览器在独立线程的事件循环中运行
+import logging  # 日志记录
+import threading  # 多线程
+from concurrent.futures import TimeoutError as FutureTimeoutError  # 等待超时
+from playwright.async_api import async_playwright  # 浏览器自动化
+from liblib_page import (LIBLIB_SELECTORS, IMAGE_URL_ATTRIBUTES, DESCRIPTION_TEXT_SCRIPT, empty_page_info,
+                         fetch_liblib_html, is_image_url)  # Liblib 页面解析
+
+# 同时打开的页面数
+PAGE_POOL_SIZE = 3
+
+# 批量抓取时每次读取模型信息后处理的模型数
+LIBLIB_BATCH_SIZE = 100
+
+# 每个上下文打开多少个页面后重新创建（释放内存和缓存）
+CONTEXT_RECYCLE_PAGES = 50
+
+# 屏蔽的资源类型（只需要读取页面结构，不需要加载这些资源）
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+
+# 屏蔽的统计、广告脚本
+BLOCKED_URL_PATTERNS = (
+    'google-analytics.com', 'googletagmanager.com', 'hm.baidu.com', 'cnzz.com',
+    'doubleclick.net', 'sentry.io', 'clarity.ms'
+)
+
+# 关闭浏览器时最多等待的时间（秒）
+SHUTDOWN_TIMEOUT = 10
+
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def get_browser_path():
+    """获取 Firefox 浏览器路径（打包环境使用内置的 Firefox，开发环境使用 playwright 自带的）"""
+    try:
+        if getattr(sys, 'frozen', False):
+            base_dir = sys._MEIPASS
+            firefox_path = os.path.join(base_dir, 'firefox', 'firefox', 'firefox.exe')  # 注意这里添加了两次 firefox
+            if os.path.exists(firefox_path):
+                print(f"使用打包的Firefox: {firefox_path}")
+                return firefox_path
+        return None
+    except Exception as e:
+        logging.error(f"获取浏览器路径失败：{str(e)}")
+    return None
+
+
+class BrowserPool:
+    """
+    浏览器池（可在多个线程中共用）
+    浏览器和事件循环运行在一个独立线程中，其他线程通过 run() 提交抓取任务并等待结果
+    """
+
+    def __init__(self, size=PAGE_POOL_SIZE, recycle_after=CONTEXT_RECYCLE_PAGES, executable_path=None,
+                 headless=True, block_resources=True):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.executable_path = executable_path
+        self.headless = headless
+        self.block_resources = block_resources
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.start_error = None
+        self.stats = {'launches': 0, 'contexts': 0, 'pages': 0, 'blocked': 0}
+
+        # 以下属性只在浏览器线程中使用
+        self.playwright = None
+        self.browser = None
+        self.page_slots = None  # 限制同时使用的页面数
+        self.idle_slots = []  # 空闲的 {'context', 'page', 'uses'}
+        self.all_slots = []
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """启动浏览器（已启动时直接返回，其他线程正在启动时等待启动完成）"""
+        with self.lock:
+            if not self.is_running():
+                self.loop = asyncio.new_event_loop()
+                self.ready.clear()
+                self.start_error = None
+                self.thread = threading.Thread(target=self._run_loop, daemon=True)
+                self.thread.start()
+        # 浏览器线程已经在运行不代表已经启动完成，提交任务前都要等待
+        self.ready.wait()
+        if self.start_error:
+            raise self.start_error
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._launch())
+        except Exception as e:
+            logging.error(f"启动浏览器失败：{str(e)}")
+            self.start_error = e
+            self.loop.close()
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _launch(self):
+        self.playwright = await async_playwright().start()
+        try:
+            self.browser = await self.playwright.firefox.launch(
+                headless=self.headless,
+                executable_path=self.executable_path
+            )
+        except Exception:
+            await self.playwright.stop()
+            raise
+        self.page_slots = asyncio.Semaphore(self.size)
+        self.idle_slots = []
+        self.all_slots = []
+        self.stats['launches'] += 1
+
+    async def _filter_request(self, route):
+        """屏蔽图片、字体和统计脚本"""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+                pattern in request.url for pattern in BLOCKED_URL_PATTERNS):
+            self.stats['blocked'] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_slot(self):
+        context = await self.browser.new_context(user_agent=BROWSER_USER_AGENT)
+        if self.block_resources:
+            await context.route('**/*', self._filter_request)
+        page = await context.new_page()
+        slot = {'context': context, 'page': page, 'uses': 0}
+        self.all_slots.append(slot)
+        self.stats['contexts'] += 1
+        return slot
+
+    async def _close_slot(self, slot):
+        if slot in self.all_slots:
+            self.all_slots.remove(slot)
+        try:
+            await slot['context'].close()
+        except Exception as e:
+            logging.error(f"关闭浏览器上下文失败：{str(e)}")
+
+    async def _run_job(self, job, args):
+        async with self.page_slots:
+            slot = self.idle_slots.pop() if self.idle_slots else await self._new_slot()
+            broken = False
+            try:
+                self.stats['pages'] += 1
+                return await job(slot['page'], *args)
+            except Exception:
+                # 出错的页面可能停留在异常状态，不再复用
+                broken = True
+                raise
+            finally:
+                slot['uses'] += 1
+                if broken or slot['uses'] >= self.recycle_after:
+                    await self._close_slot(slot)
+                else:
+                    self.idle_slots.append(slot)
+
+    def run(self, job, *args, timeout=None):
+        """
+        在浏览器池中执行抓取任务（阻塞直到完成）
+        Args:
+            job: 协程函数 job(page, *args)
+        Returns:
+            job 的返回值
+        """
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._run_job(job, args), self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # 超时后取消任务，释放占用的页面
+            future.cancel()
+            raise
+
+    async def _close(self):
+        # 取消还在等待页面的任务
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for slot in list(self.all_slots):
+            await self._close_slot(slot)
+        self.idle_slots = []
+        try:
+            await self.browser.close()
+        except Exception as e:
+            logging.error(f"关闭浏览器失败：{str(e)}")
+        await self.playwright.stop()
+
+    def shutdown(self):
+        """关闭浏览器并结束浏览器线程"""
+        with self.lock:
+            if not self.is_running():
+                return
+            future = asyncio.run_coroutine_threadsafe(self._close(), self.loop)
+            try:
+                future.result(SHUTDOWN_TIMEOUT)
+            except Exception as e:
+                logging.error(f"关闭浏览器池时发生错误：{str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(SHUTDOWN_TIMEOUT)
+            self.thread = None
+
+
+async def _wait_for(page, field):
+    selector, timeout = LIBLIB_SELECTORS[field]
+    # 图片已被屏蔽，不会“可见”，只等待元素出现
+    return await page.wait_for_selector(selector, timeout=timeout, state='attached')
+
+
+async def extract_liblib_page(page, url, need_preview=True):
+    """
+    在浏览器页面中读取 Liblib 模型信息
+    Returns:
+        dict: {'image_url', 'trigger_words', 'description_lines'}，未找到的项为空
+    """
+    await page.goto(url)
+    result = empty_page_info()
+
+    if need_preview:
+        try:
+            img_element = await _wait_for(page, 'preview')
+            if img_element:
+                for attribute in IMAGE_URL_ATTRIBUTES:
+                    image_url = await img_element.get_attribute(attribute)
+                    if is_image_url(image_url):
+                        result['image_url'] = image_url
+                        break
+        except Exception as e:
+            logging.error(f"获取预览图失败：{str(e)}")
+
+    try:
+        if await _wait_for(page, 'trigger_words'):
+            trigger_elements = await page.query_selector_all(LIBLIB_SELECTORS['trigger_words'][0])
+            result['trigger_words'] = [await element.inner_text() for element in trigger_elements]
+    except Exception as e:
+        logging.error(f"获取触发词失败：{str(e)}")
+
+    try:
+        description_container = await _wait_for(page, 'description')
+        if description_container:
+            result['description_lines'] = await description_container.evaluate(DESCRIPTION_TEXT_SCRIPT)
+    except Exception as e:
+        logging.error(f"获取描述失败：{str(e)}")
+
+    return result
+
+
+def fetch_liblib_info(url, browser_pool, need_preview=True, session=None):
+    """
+    抓取 Liblib 模型信息：先直接请求网页解析，没有找到内容时再用浏览器
+    Returns:
+        tuple: (抓取结果, 'http' 或 'browser')
+    """
+    page_info = fetch_liblib_html(url, session, need_preview)
+    if page_info:
+        return page_info, 'http'
+    return browser_pool.run(extract_liblib_page, url, need_preview), 'browser'
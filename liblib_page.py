@@ -0,0 +1,172 @@
+"""
+Liblib 模型页面解析
+页面元素的选择器和提取规则集中在这里，浏览器抓取和直接请求网页两种方式共用
+"""
+
+import json  # JSON处理
+import logging  # 日志记录
+import requests  # HTTP请求
+from bs4 import BeautifulSoup  # HTML解析
+
+LIBLIB_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9'
+}
+
+# 直接请求网页的超时（秒）
+PAGE_TIMEOUT = 15
+
+# Liblib 页面元素（选择器, 浏览器中的等待时间毫秒）
+LIBLIB_SELECTORS = {
+    'preview': (".ModelVersion_modelVersion__4cm1k .relative.cursor-pointer img", 3000),
+    'trigger_words': (".ModelDetailCard_triggerTxt__cKZOL", 1000),
+    'description': ('.ModelDescription_desc__EoTMz', 1000),
+}
+
+# 预览图地址所在的属性（懒加载的图片地址可能在 data-src 中）
+IMAGE_URL_ATTRIBUTES = ('src', 'data-src')
+
+# 页面中 Next.js 数据（__NEXT_DATA__）的字段名，选择器找不到内容时使用
+NEXT_DATA_KEYS = {
+    'preview': ('coverUrl', 'imageUrl'),
+    'trigger_words': ('triggerWord', 'triggerWords'),
+    'description': ('versionDesc', 'modelDesc'),
+}
+
+# 在浏览器中提取描述文字（与 get_description_lines 相同的规则）
+DESCRIPTION_TEXT_SCRIPT = """
+(element) => {
+    const texts = [];
+    const walk = (node) => {
+        if (node.nodeType === 3 && node.textContent.trim()) {  // 文本节点
+            texts.push(node.textContent.trim());
+        } else if (node.nodeType === 1) {  // 元素节点
+            if (node.tagName === 'BR') {
+                texts.push('');
+            }
+            for (const child of node.childNodes) {
+                walk(child);
+            }
+            if (['P', 'DIV', 'LI'].includes(node.tagName)) {
+                texts.push('');
+            }
+        }
+    };
+    walk(element);
+    return texts.filter(text => text !== '');
+}
+"""
+
+
+def empty_page_info():
+    """抓取结果的格式：{'image_url', 'trigger_words', 'description_lines'}"""
+    return {'image_url': '', 'trigger_words': [], 'description_lines': []}
+
+
+def has_page_info(page_info, need_preview=True):
+    """是否抓取到了内容（需要预览图时必须有预览图地址）"""
+    if need_preview and not page_info['image_url']:
+        return False
+    return bool(page_info['trigger_words'] or page_info['description_lines'] or page_info['image_url'])
+
+
+def is_image_url(value):
+    """是否是真实的图片地址（懒加载的占位图通常是 data: 地址）"""
+    return bool(value) and not value.startswith('data:')
+
+
+def get_description_lines(element):
+    """提取描述文字：每个非空文本节点一行"""
+    return [text.strip() for text in element.find_all(string=True) if text.strip()]
+
+
+def find_next_data_value(data, keys):
+    """在 Next.js 数据中按字段名查找第一个非空值"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            for key in keys:
+                if value.get(key):
+                    return value[key]
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+    return None
+
+
+def parse_next_data(soup, page_info, need_preview):
+    """从 __NEXT_DATA__ 补充选择器没有找到的内容"""
+    script = soup.find('script', id='__NEXT_DATA__')
+    if not script or not script.string:
+        return
+    try:
+        data = json.loads(script.string).get('props', {}).get('pageProps', {})
+    except ValueError as e:
+        logging.error(f"解析页面数据失败：{str(e)}")
+        return
+
+    if need_preview and not page_info['image_url']:
+        image_url = find_next_data_value(data, NEXT_DATA_KEYS['preview'])
+        if isinstance(image_url, str):
+            page_info['image_url'] = image_url
+
+    if not page_info['trigger_words']:
+        trigger_words = find_next_data_value(data, NEXT_DATA_KEYS['trigger_words'])
+        if isinstance(trigger_words, str):
+            trigger_words = [word.strip() for word in trigger_words.split(',')]
+        if isinstance(trigger_words, list):
+            page_info['trigger_words'] = [str(word) for word in trigger_words if str(word).strip()]
+
+    if not page_info['description_lines']:
+        description = find_next_data_value(data, NEXT_DATA_KEYS['description'])
+        if isinstance(description, str):
+            page_info['description_lines'] = get_description_lines(BeautifulSoup(description, 'html.parser'))
+
+
+def parse_liblib_html(html, need_preview=True):
+    """
+    从网页源码中解析模型信息（服务端渲染的元素优先，其次是 __NEXT_DATA__）
+    Returns:
+        dict: {'image_url', 'trigger_words', 'description_lines'}
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    page_info = empty_page_info()
+
+    if need_preview:
+        img_element = soup.select_one(LIBLIB_SELECTORS['preview'][0])
+        if img_element:
+            for attribute in IMAGE_URL_ATTRIBUTES:
+                if is_image_url(img_element.get(attribute)):
+                    page_info['image_url'] = img_element[attribute]
+                    break
+
+    page_info['trigger_words'] = [
+        element.get_text(strip=True) for element in soup.select(LIBLIB_SELECTORS['trigger_words'][0])
+        if element.get_text(strip=True)
+    ]
+
+    description_container = soup.select_one(LIBLIB_SELECTORS['description'][0])
+    if description_container:
+        page_info['description_lines'] = get_description_lines(description_container)
+
+    parse_next_data(soup, page_info, need_preview)
+    return page_info
+
+
+def fetch_liblib_html(url, session=None, need_preview=True):
+    """
+    直接请求网页并解析（不启动浏览器）
+    Returns:
+        dict: 抓取结果；请求失败或没有找到内容时返回 None
+    """
+    try:
+        response = (session or requests).get(url, headers=LIBLIB_HEADERS, timeout=PAGE_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        # 传入原始字节，由 BeautifulSoup 根据页面声明的编码解码
+        page_info = parse_liblib_html(response.content, need_preview)
+    except Exception as e:
+        logging.error(f"直接请求Liblib页面失败：{str(e)}")
+        return None
+    return page_info if has_page_info(page_info, need_preview) else None
@@ -0,0 +1,242 @@
+"""
+模型结构分析
+只根据文件头中的张量名称、形状和精度判断模型架构、类型、参数量和精度组成
+"""
+
+# 模型类型的显示名称（用于自动填写模型类型）
+MODEL_KIND_NAMES = {
+    'checkpoint': '大模型',
+    'UNet': 'UNet',
+    'LoRA': 'LoRA',
+    'LyCORIS': 'LyCORIS',
+    'VAE': 'VAE',
+    'ControlNet': 'ControlNet',
+    'embedding': 'Embedding',
+    'upscaler': '放大模型',
+    'text_encoder': '文本编码器',
+}
+
+# LoRA / LyCORIS 的张量名称特征
+LORA_MARKERS = ('lora_up', 'lora_down', 'lora_A', 'lora_B', '.lora.')
+LYCORIS_MARKERS = ('hada_w1', 'hada_w2', 'lokr_w1', 'lokr_w2', 'oft_blocks', 'oft_diag')
+
+# 嵌入（Textual Inversion）的张量名称
+EMBEDDING_KEYS = ('emb_params', 'clip_l', 'clip_g', 'string_to_param')
+
+# 各部件的张量名称前缀
+UNET_PREFIXES = (
+    'model.diffusion_model.', 'double_blocks.', 'single_blocks.', 'joint_blocks.',
+    'input_blocks.', 'transformer_blocks.', 'single_transformer_blocks.', 'time_embedding.'
+)
+TEXT_ENCODER_PREFIXES = ('cond_stage_model.', 'conditioner.', 'text_encoders.', 'text_model.', 'encoder.block.', 'shared.')
+
+# 交叉注意力的上下文维度 -> 架构
+CONTEXT_DIM_ARCHITECTURES = {768: 'SD1.5', 1024: 'SD2', 2048: 'SDXL'}
+
+# 元数据中的底模描述 -> 架构（按顺序匹配）
+METADATA_ARCHITECTURE_HINTS = [
+    ('flux', 'Flux'),
+    ('stable-diffusion-3', 'SD3'),
+    ('sd3', 'SD3'),
+    ('xl', 'SDXL'),
+    ('v2', 'SD2'),
+    ('v1', 'SD1.5'),
+]
+
+
+def count_elements(shape):
+    """计算张量元素数量"""
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
+
+
+def get_tensors(header):
+    """从 safetensors 文件头中取出张量信息 {名称: (dtype, shape)}"""
+    tensors = {}
+    for name, value in header.items():
+        if name == '__metadata__' or not isinstance(value, dict):
+            continue
+        tensors[name] = (value.get('dtype', ''), value.get('shape') or [])
+    return tensors
+
+
+def detect_model_kind(names):
+    """根据张量名称判断模型类型"""
+    if any(marker in name for name in names for marker in LYCORIS_MARKERS):
+        return 'LyCORIS'
+    if any(marker in name for name in names for marker in LORA_MARKERS):
+        return 'LoRA'
+    if names and all(name.split('.')[0] in EMBEDDING_KEYS for name in names):
+        return 'embedding'
+    if any(name.startswith('control_model.') or 'input_hint_block' in name
+           or 'controlnet_cond_embedding' in name for name in names):
+        return 'ControlNet'
+    if any('RRDB' in name or name.startswith('conv_first.') or name.startswith('model.1.sub.')
+           for name in names):
+        return 'upscaler'
+
+    has_unet = any(name.startswith(UNET_PREFIXES) for name in names)
+    has_vae = any(name.startswith('first_stage_model.') or 'decoder.conv_in' in name for name in names)
+    has_text_encoder = any(name.startswith(TEXT_ENCODER_PREFIXES) for name in names)
+    if has_unet:
+        return 'checkpoint' if has_vae or has_text_encoder else 'UNet'
+    if has_vae:
+        return 'VAE'
+    if has_text_encoder:
+        return 'text_encoder'
+    return ''
+
+
+def detect_context_architecture(tensors):
+    """根据交叉注意力 to_k 的输入维度判断 SD1.5 / SD2 / SDXL"""
+    for name, (dtype, shape) in tensors.items():
+        if 'attn2' not in name or 'to_k' not in name or len(shape) < 2:
+            continue
+        # LoRA 只有 down 矩阵的输入维度是上下文维度
+        if any(marker in name for marker in ('lora_up', 'lora_B', 'alpha')):
+            continue
+        architecture = CONTEXT_DIM_ARCHITECTURES.get(shape[1])
+        if architecture:
+            return architecture
+    return ''
+
+
+def detect_architecture(tensors, kind):
+    """根据张量名称和形状判断模型架构"""
+    names = list(tensors)
+
+    if any('double_blocks' in name or 'single_blocks' in name or 'single_transformer_blocks' in name
+           for name in names):
+        return 'Flux'
+    if any('joint_blocks' in name or 'context_block' in name for name in names):
+        return 'SD3'
+    for name, (dtype, shape) in tensors.items():
+        # diffusers 格式的 MMDiT：Flux 隐藏维度为 3072，SD3 为 1536/2432
+        if 'add_k_proj' in name and 'lora_B' not in name and len(shape) >= 2:
+            return 'Flux' if shape[1] == 3072 else 'SD3'
+
+    if kind == 'embedding':
+        if 'clip_g' in tensors:
+            return 'SDXL'
+        for dtype, shape in tensors.values():
+            if shape:
+                return CONTEXT_DIM_ARCHITECTURES.get(shape[-1], '')
+        return ''
+
+    if kind == 'upscaler':
+        return 'ESRGAN'
+
+    architecture = detect_context_architecture(tensors)
+    if architecture:
+        return architecture
+    if any('conditioner.embedders.1' in name or 'lora_te2_' in name or 'label_emb' in name
+           or 'add_embedding' in name for name in names):
+        return 'SDXL'
+    if any(name.startswith('cond_stage_model.model.') for name in names):
+        return 'SD2'
+
+    if kind == 'VAE':
+        # 潜空间通道数：4 通道为 SD1.5/SDXL，16 通道为 SD3/Flux
+        for name, (dtype, shape) in tensors.items():
+            if name.endswith('decoder.conv_in.weight') and len(shape) >= 2:
+                return {4: 'SD1.5/SDXL', 16: 'SD3/Flux'}.get(shape[1], '')
+
+    if kind == 'text_encoder':
+        if any(name.startswith(('encoder.block.', 'shared.')) for name in names):
+            return 'T5'
+        return 'CLIP'
+    return ''
+
+
+def detect_metadata_architecture(metadata):
+    """张量无法判断时，根据训练元数据中的底模描述判断架构"""
+    for key in ('modelspec.architecture', 'ss_base_model_version'):
+        value = str(metadata.get(key, '')).lower()
+        for hint, architecture in METADATA_ARCHITECTURE_HINTS:
+            if hint in value:
+                return architecture
+    if str(metadata.get('ss_v2', '')).lower() == 'true':
+        return 'SD2'
+    return ''
+
+
+def analyze_safetensors_header(header):
+    """
+    分析 safetensors 文件头
+    Returns:
+        dict: {'architecture', 'model_kind', 'parameters', 'dtypes'}，dtypes 为 {精度: 参数量}
+    """
+    metadata = header.get('__metadata__') or {}
+    return analyze_tensor_table(get_tensors(header), detect_metadata_architecture(metadata))
+
+
+def analyze_tensor_table(tensors, architecture_hint=''):
+    """
+    分析张量表（各格式通用）
+    Args:
+        tensors: {名称: (精度, 形状)}，形状按 PyTorch 顺序
+        architecture_hint: 张量无法判断架构时使用的架构（来自元数据）
+    Returns:
+        dict: {'architecture', 'model_kind', 'parameters', 'dtypes'}
+    """
+    kind = detect_model_kind(list(tensors))
+    architecture = detect_architecture(tensors, kind) or architecture_hint
+
+    parameters = 0
+    dtypes = {}
+    for dtype, shape in tensors.values():
+        count = count_elements(shape)
+        parameters += count
+        dtypes[dtype] = dtypes.get(dtype, 0) + count
+
+    return {
+        'architecture': architecture,
+        'model_kind': kind,
+        'parameters': parameters,
+        'dtypes': dtypes
+    }
+
+
+def format_parameter_count(count):
+    """把参数量格式化为 1.2B / 860M / 35K"""
+    if not count:
+        return ''
+    for unit, scale in (('B', 1e9), ('M', 1e6), ('K', 1e3)):
+        if count >= scale:
+            return f"{count / scale:.3g}{unit}"
+    return str(count)
+
+
+def format_dtype_mix(dtypes):
+    """把精度组成格式化为 F16 / F16+F32（按参数量从多到少）"""
+    if not dtypes:
+        return ''
+    return '+'.join(dtype for dtype, count in sorted(dtypes.items(), key=lambda x: -x[1]) if count)
+
+
+def format_model_kind(analysis):
+    """把分析结果格式化为模型类型文字（如 “SDXL LoRA”），用于自动填写模型类型"""
+    if not analysis:
+        return ''
+    kind = MODEL_KIND_NAMES.get(analysis.get('model_kind'), analysis.get('model_kind', ''))
+    return ' '.join(part for part in (analysis.get('architecture', ''), kind) if part)
+
+
+def get_catalog_fields(analysis):
+    """
+    从分析结果生成写入 model_info.json 的索引字段（用于搜索和排序）
+    Returns:
+        dict: {'arch', 'model_kind', 'params', 'dtype'}，pickle 格式另有 'safety'
+    """
+    fields = {
+        'arch': analysis.get('architecture', ''),
+        'model_kind': analysis.get('model_kind', ''),
+        'params': analysis.get('parameters', 0),
+        'dtype': format_dtype_mix(analysis.get('dtypes', {}))
+    }
+    # pickle 格式的模型另有安全检查结果
+    if analysis.get('safety'):
+        fields['safety'] = analysis['safety']
+    return fields
@@ -0,0 +1,753 @@
+"""
+模型哈希工具
+提供带持久化缓存的模型哈希计算
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import hashlib  # 哈希
+import logging  # 日志记录
+import threading  # 多线程
+import struct  # 二进制解析
+import zlib  # CRC32
+from concurrent.futures import ThreadPoolExecutor, as_completed  # 线程池
+
+# 哈希缓存文件（与 model_info.json 放在同一目录）
+HASH_CACHE_FILE = 'hash_cache.json'
+HASH_CACHE_VERSION = 1
+
+# 读取文件时使用的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 支持的摘要算法（单次顺序读取同时计算）
+# sha256: 完整 SHA-256（Civitai 的 SHA256/AutoV2）
+# autov1: WebUI 旧版哈希，文件 0x100000 处 0x10000 字节的 SHA-256
+# autov3: safetensors 去掉文件头后张量数据的 SHA-256
+# crc32 / blake2b: 其他工具常用的校验值
+DIGEST_ALGORITHMS = ('sha256', 'autov1', 'autov3', 'crc32', 'blake2b')
+
+AUTOV1_OFFSET = 0x100000
+AUTOV1_LENGTH = 0x10000
+
+# 抽样摘要每段读取的字节数（开头、中间、结尾各一段）
+SAMPLE_SIZE = 64 * 1024
+
+# 并行计算哈希的默认线程数
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# 写入 model_info.json 时使用的名称，与 Civitai 显示的名称一致
+HASH_DISPLAY_NAMES = {
+    'sha256': 'SHA256',
+    'autov1': 'AutoV1',
+    'autov3': 'AutoV3',
+    'crc32': 'CRC32',
+    'blake2b': 'BLAKE2B'
+}
+
+# model_info.json 中记录链接副本的字段：链接来源的相对路径和链接方式（reflink / hardlink）
+LINK_FIELDS = ('linked_from', 'link_type')
+
+
+def get_file_stat(file_path):
+    """获取用于校验缓存的文件状态"""
+    stat = os.stat(file_path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'dev': stat.st_dev,
+        'ino': stat.st_ino
+    }
+
+
+def get_storage_key(file_path):
+    """
+    文件实际存储的标识（设备号, inode），硬链接到同一文件的路径返回相同的值
+    Returns:
+        tuple 或 None（无法读取或文件系统不提供 inode）
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if not stat.st_ino:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def resolve_link_root(rel_path, linked_from):
+    """沿链接记录找到最初的文件（链接副本的链接副本同样共享存储）"""
+    root = rel_path
+    seen = {root}
+    while linked_from.get(root) and linked_from[root] not in seen:
+        root = linked_from[root]
+        seen.add(root)
+    return root
+
+
+def get_shared_storage(base_path, rel_paths, linked_from=None):
+    """
+    找出共享存储的文件：硬链接到同一文件，或 model_info.json 中记录的链接副本
+    Args:
+        linked_from: {模型相对路径: 链接来源的相对路径}
+    Returns:
+        dict: {相对路径: 存储标识}，标识相同的文件只占用一份空间
+    """
+    linked_from = linked_from or {}
+    keys = {}
+    for rel_path in rel_paths:
+        root = resolve_link_root(rel_path, linked_from)
+        keys[rel_path] = get_storage_key(os.path.join(base_path, root)) or root
+    return keys
+
+
+def get_link_records(all_info):
+    """从 model_info.json 的内容中取出链接记录 {模型相对路径: 链接来源的相对路径}"""
+    return {
+        rel_path: info['linked_from'] for rel_path, info in all_info.items()
+        if not rel_path.startswith('_') and isinstance(info, dict) and info.get('linked_from')
+    }
+
+
+def rename_link_records(all_info, renamed):
+    """
+    模型移动或重命名后更新指向它的链接记录
+    Args:
+        all_info: model_info.json 的内容，会被直接修改
+        renamed: {旧相对路径: 新相对路径}
+    """
+    if not renamed:
+        return
+    for rel_path, info in all_info.items():
+        if not rel_path.startswith('_') and isinstance(info, dict) and info.get('linked_from') in renamed:
+            info['linked_from'] = renamed[info['linked_from']]
+
+
+def get_safetensors_data_offset(file_path, file_size=None):
+    """
+    获取 safetensors 张量数据的起始位置（8 字节长度前缀 + JSON 文件头）
+    Returns:
+        int: 数据起始偏移，不是有效的 safetensors 文件时返回 None
+    """
+    if not file_path.lower().endswith('.safetensors'):
+        return None
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    try:
+        with open(file_path, 'rb') as f:
+            prefix = f.read(8)
+            if len(prefix) < 8:
+                return None
+            header_length = struct.unpack('<Q', prefix)[0]
+            if f.read(1) != b'{':
+                return None
+    except OSError:
+        return None
+    if 8 + header_length > file_size:
+        return None
+    return 8 + header_length
+
+
+class MultiDigest:
+    """在一次顺序读取中同时计算多种摘要"""
+
+    def __init__(self, algorithms, data_offset=None):
+        self.algorithms = tuple(algorithms)
+        self.data_offset = data_offset
+        self.position = 0
+        self.hashers = {}
+        self.crc32 = 0
+        if 'sha256' in self.algorithms:
+            self.hashers['sha256'] = hashlib.sha256()
+        if 'blake2b' in self.algorithms:
+            self.hashers['blake2b'] = hashlib.blake2b()
+        if 'autov1' in self.algorithms:
+            self.hashers['autov1'] = hashlib.sha256()
+        if 'autov3' in self.algorithms and data_offset is not None:
+            self.hashers['autov3'] = hashlib.sha256()
+
+    def update(self, chunk):
+        """按文件顺序送入下一块数据"""
+        start = self.position
+        end = start + len(chunk)
+        self.position = end
+
+        for name in ('sha256', 'blake2b'):
+            if name in self.hashers:
+                self.hashers[name].update(chunk)
+        if 'crc32' in self.algorithms:
+            self.crc32 = zlib.crc32(chunk, self.crc32)
+
+        # AutoV1 只取固定窗口内的数据
+        if 'autov1' in self.hashers:
+            window_start = max(start, AUTOV1_OFFSET)
+            window_end = min(end, AUTOV1_OFFSET + AUTOV1_LENGTH)
+            if window_start < window_end:
+                self.hashers['autov1'].update(chunk[window_start - start:window_end - start])
+
+        # AutoV3 跳过 safetensors 文件头
+        if 'autov3' in self.hashers and end > self.data_offset:
+            self.hashers['autov3'].update(chunk[max(0, self.data_offset - start):])
+
+    def hexdigests(self):
+        """返回 {算法名: 摘要值}"""
+        digests = {}
+        for name, hasher in self.hashers.items():
+            digests[name] = hasher.hexdigest()
+        if 'autov1' in digests:
+            digests['autov1'] = digests['autov1'][:8]
+        if 'crc32' in self.algorithms:
+            digests['crc32'] = f"{self.crc32 & 0xFFFFFFFF:08X}"
+        return digests
+
+
+def calculate_digests(file_path, algorithms=DIGEST_ALGORITHMS, progress_callback=None, cancel_check=None, io_throttle=None):
+    """
+    单次顺序读取文件，计算所有请求的摘要
+    Args:
+        file_path: 文件完整路径
+        algorithms: 需要计算的算法，见 DIGEST_ALGORITHMS
+        progress_callback: 进度回调 callback(bytes_read, file_size)
+        cancel_check: 返回 True 时中止计算
+        io_throttle: 每读取一块数据后调用 io_throttle(nbytes)，用于让出磁盘或限速
+    Returns:
+        dict: {算法名: 摘要值}，取消时返回 None
+    """
+    file_size = os.path.getsize(file_path)
+    data_offset = None
+    if 'autov3' in algorithms:
+        data_offset = get_safetensors_data_offset(file_path, file_size)
+    digest = MultiDigest(algorithms, data_offset)
+    bytes_read = 0
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            if cancel_check and cancel_check():
+                return None
+            digest.update(byte_block)
+            bytes_read += len(byte_block)
+            if progress_callback:
+                progress_callback(bytes_read, file_size)
+            if io_throttle:
+                io_throttle(len(byte_block))
+    return digest.hexdigests()
+
+
+def format_model_hashes(digests):
+    """把摘要转换为写入 model_info.json 的格式（包含 AutoV2）"""
+    hashes = {}
+    for name, value in digests.items():
+        if name in HASH_DISPLAY_NAMES:
+            hashes[HASH_DISPLAY_NAMES[name]] = value.upper()
+    if 'sha256' in digests:
+        hashes['AutoV2'] = digests['sha256'][:10].upper()
+    return hashes
+
+
+def parse_model_hashes(info):
+    """
+    从 model_info.json 的记录中取出已保存的摘要（format_model_hashes 的逆操作）
+    Returns:
+        dict: {算法名: 摘要值}，大小写与 calculate_digests 的结果一致
+    """
+    algorithms = {display_name: name for name, display_name in HASH_DISPLAY_NAMES.items()}
+    digests = {}
+    for display_name, value in info.get('hashes', {}).items():
+        name = algorithms.get(display_name)
+        if name and value:
+            digests[name] = value.upper() if name == 'crc32' else value.lower()
+    if info.get('hash') and 'sha256' not in digests:
+        digests['sha256'] = info['hash'].lower()
+    return digests
+
+
+def match_model_hash(query, info):
+    """
+    判断搜索的哈希值是否属于该模型
+    支持 SHA256、AutoV1、AutoV2、AutoV3、CRC32、BLAKE2B 等任意一种标识（不区分大小写，可只输入前缀）
+    """
+    query = query.strip().lower()
+    if len(query) < 8:
+        return False
+    values = list(info.get('hashes', {}).values())
+    if info.get('hash'):
+        values.append(info['hash'])
+    for value in values:
+        if value and value.lower().startswith(query):
+            return True
+    return False
+
+
+def stat_matches(entry, stat):
+    """判断缓存记录是否仍与文件状态一致"""
+    return (entry.get('size') == stat['size'] and
+            entry.get('mtime_ns') == stat['mtime_ns'] and
+            entry.get('dev') == stat['dev'] and
+            entry.get('ino') == stat['ino'])
+
+
+class HashCache:
+    """
+    持久化的哈希缓存
+    每条记录以模型相对路径为键，同时保存 size、mtime_ns 和 inode，
+    文件被替换或修改后记录自动失效；在 BASE_PATH 内移动的文件可通过 inode 找回记录
+    """
+
+    def __init__(self, base_path, cache_file=HASH_CACHE_FILE, io_scheduler=None):
+        self.base_path = base_path
+        self.cache_file = cache_file
+        self.io_scheduler = io_scheduler  # 计算完整哈希时按批量优先级读取
+        self.lock = threading.RLock()
+        self.entries = {}  # 相对路径 -> 记录
+        self.inode_index = {}  # (dev, ino) -> 相对路径
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存"""
+        with self.lock:
+            self.entries = {}
+            self.inode_index = {}
+            if not os.path.exists(self.cache_file):
+                return
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != HASH_CACHE_VERSION:
+                    logging.info("哈希缓存版本不匹配，已忽略旧缓存")
+                    return
+                self.entries = data.get('entries', {})
+                for rel_path, entry in self.entries.items():
+                    self.inode_index[(entry.get('dev'), entry.get('ino'))] = rel_path
+            except Exception as e:
+                logging.error(f"读取哈希缓存时发生错误：{str(e)}")
+                self.entries = {}
+                self.inode_index = {}
+
+    def save(self):
+        """保存缓存到磁盘（先写临时文件再替换，避免写入中断损坏缓存）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': HASH_CACHE_VERSION, 'entries': self.entries}
+            temp_file = self.cache_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_file, self.cache_file)
+                self.dirty = False
+            except Exception as e:
+                logging.error(f"保存哈希缓存时发生错误：{str(e)}")
+
+    def get_relative_path(self, file_path):
+        """把完整路径转换为相对于 BASE_PATH 的路径"""
+        if os.path.isabs(file_path):
+            try:
+                return os.path.relpath(file_path, self.base_path)
+            except ValueError:  # 在不同驱动器的情况
+                return file_path
+        return file_path
+
+    def get_full_path(self, file_path):
+        """把相对路径转换为完整路径"""
+        return os.path.join(self.base_path, self.get_relative_path(file_path))
+
+    def _remove(self, rel_path):
+        entry = self.entries.pop(rel_path, None)
+        if entry is not None:
+            key = (entry.get('dev'), entry.get('ino'))
+            if self.inode_index.get(key) == rel_path:
+                del self.inode_index[key]
+            self.dirty = True
+
+    def _find_entry(self, rel_path, stat):
+        """查找与文件状态一致的记录，必要时通过 inode 找回被移动文件的记录"""
+        entry = self.entries.get(rel_path)
+        if entry is not None:
+            if stat_matches(entry, stat):
+                return entry
+            # 文件已被修改或替换，旧记录失效
+            self._remove(rel_path)
+
+        old_rel_path = self.inode_index.get((stat['dev'], stat['ino']))
+        if not old_rel_path or old_rel_path == rel_path:
+            return None
+        old_entry = self.entries.get(old_rel_path)
+        if old_entry is None or not stat_matches(old_entry, stat):
+            return None
+
+        # 同一个文件（移动或硬链接），把记录迁移到新路径
+        entry = dict(old_entry)
+        if not os.path.exists(os.path.join(self.base_path, old_rel_path)):
+            self._remove(old_rel_path)
+        self.entries[rel_path] = entry
+        self.inode_index[(stat['dev'], stat['ino'])] = rel_path
+        self.dirty = True
+        return entry
+
+    def lookup(self, file_path, algorithm='sha256'):
+        """
+        查询仍然有效的摘要
+        Returns:
+            str: 摘要值；没有记录或文件已变化时返回 None
+        """
+        try:
+            stat = get_file_stat(self.get_full_path(file_path))
+        except OSError:
+            return None
+        with self.lock:
+            entry = self._find_entry(self.get_relative_path(file_path), stat)
+            if entry is None:
+                return None
+            return entry.get('digests', {}).get(algorithm)
+
+    def store(self, file_path, digests, stat):
+        """
+        保存摘要
+        Args:
+            digests: {算法名: 摘要值}
+            stat: 计算摘要之前获取的文件状态，文件在计算期间变化时不保存
+        """
+        full_path = self.get_full_path(file_path)
+        try:
+            current_stat = get_file_stat(full_path)
+        except OSError:
+            return
+        if current_stat != stat:
+            logging.warning(f"文件在计算哈希期间发生变化，未写入缓存：{full_path}")
+            return
+        rel_path = self.get_relative_path(file_path)
+        with self.lock:
+            entry = self._find_entry(rel_path, stat)
+            if entry is None:
+                entry = dict(stat)
+                entry['digests'] = {}
+                self.entries[rel_path] = entry
+                self.inode_index[(stat['dev'], stat['ino'])] = rel_path
+            entry['digests'].update(digests)
+            self.dirty = True
+
+    def lookup_digests(self, file_path):
+        """查询文件所有仍然有效的摘要"""
+        try:
+            stat = get_file_stat(self.get_full_path(file_path))
+        except OSError:
+            return {}
+        with self.lock:
+            entry = self._find_entry(self.get_relative_path(file_path), stat)
+            if entry is None:
+                return {}
+            return dict(entry.get('digests', {}))
+
+    def seed_from_model_info(self, all_info):
+        """
+        用 model_info.json 中已保存的哈希值补充缓存，缓存文件丢失或删除后不必重新计算全部模型
+        只采用快速指纹与文件当前指纹（本次扫描写入缓存的记录）一致的模型，内容已变化的文件仍会重新计算
+        Returns:
+            int: 补充了摘要的模型数量
+        """
+        seeded = 0
+        for rel_path, info in all_info.items():
+            if rel_path.startswith('_') or not isinstance(info, dict) or not info.get('fingerprint'):
+                continue
+            digests = parse_model_hashes(info)
+            if not digests:
+                continue
+            try:
+                stat = get_file_stat(self.get_full_path(rel_path))
+            except OSError:
+                continue
+            with self.lock:
+                entry = self._find_entry(rel_path, stat)
+                if entry is None or entry.get('digests', {}).get('fingerprint') != info['fingerprint']:
+                    continue
+                missing = {name: value for name, value in digests.items() if name not in entry['digests']}
+                if missing:
+                    entry['digests'].update(missing)
+                    self.dirty = True
+                    seeded += 1
+        return seeded
+
+    def get_or_compute_digests(self, file_path, algorithms=DIGEST_ALGORITHMS, progress_callback=None, cancel_check=None, save=True):
+        """
+        获取文件的多种摘要，缓存中已有全部摘要时不读取文件
+        缺少任意一种时，单次读取文件计算所有请求的摘要
+        Returns:
+            dict: {算法名: 摘要值}，取消时返回 None
+        """
+        cached = self.lookup_digests(file_path)
+        full_path = self.get_full_path(file_path)
+        wanted = [name for name in algorithms if name not in cached]
+        # AutoV3 只适用于有效的 safetensors 文件
+        if 'autov3' in wanted and get_safetensors_data_offset(full_path) is None:
+            wanted.remove('autov3')
+        if cached and not wanted:
+            return cached
+
+        stat = get_file_stat(full_path)
+        io_throttle = self.io_scheduler.bulk_throttle if self.io_scheduler else None
+        digests = calculate_digests(full_path, algorithms, progress_callback, cancel_check, io_throttle)
+        if digests is None:
+            return None
+        self.store(file_path, digests, stat)
+        if save:
+            self.save()
+        cached.update(digests)
+        return cached
+
+    def get_or_compute(self, file_path, progress_callback=None, cancel_check=None, save=True):
+        """
+        获取文件的 SHA-256，缓存有效时不读取文件
+        需要读取文件时会顺带计算其他摘要，避免之后再次读取
+        Returns:
+            str: 十六进制哈希值，取消时返回 None
+        """
+        cached = self.lookup(file_path)
+        if cached:
+            return cached
+
+        digests = self.get_or_compute_digests(file_path, progress_callback=progress_callback,
+                                              cancel_check=cancel_check, save=save)
+        if not digests:
+            return None
+        return digests.get('sha256')
+
+    def get_or_compute_fingerprint(self, file_path):
+        """获取文件的快速指纹，文件未变化时直接使用缓存"""
+        cached = self.lookup(file_path, 'fingerprint')
+        if cached:
+            return cached
+        full_path = self.get_full_path(file_path)
+        stat = get_file_stat(full_path)
+        fingerprint = calculate_quick_fingerprint(full_path, stat['size'])
+        self.store(file_path, {'fingerprint': fingerprint}, stat)
+        return fingerprint
+
+    def rename(self, old_path, new_path):
+        """模型在程序内移动后同步更新缓存键"""
+        old_rel_path = self.get_relative_path(old_path)
+        new_rel_path = self.get_relative_path(new_path)
+        with self.lock:
+            entry = self.entries.pop(old_rel_path, None)
+            if entry is None:
+                return
+            self.entries[new_rel_path] = entry
+            self.inode_index[(entry.get('dev'), entry.get('ino'))] = new_rel_path
+            self.dirty = True
+
+    def discard(self, file_path):
+        """删除某个文件的缓存记录"""
+        with self.lock:
+            self._remove(self.get_relative_path(file_path))
+
+
+def calculate_sample_digest(file_path, file_size=None, sample_size=SAMPLE_SIZE):
+    """
+    读取文件开头、中间、结尾三段数据计算抽样摘要
+    大小相同但抽样摘要不同的文件一定不是重复文件
+    """
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    sample_hash = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        if file_size <= sample_size * 3:
+            sample_hash.update(f.read())
+        else:
+            for offset in (0, (file_size - sample_size) // 2, file_size - sample_size):
+                f.seek(offset)
+                sample_hash.update(f.read(sample_size))
+    return sample_hash.hexdigest()
+
+
+def hash_files_parallel(hash_cache, file_paths, max_workers=HASH_WORKERS, progress_callback=None, cancel_check=None):
+    """
+    使用线程池并行计算多个文件的 SHA-256（优先使用哈希缓存）
+    Args:
+        hash_cache: HashCache 实例
+        file_paths: 文件路径列表（相对或完整路径）
+        progress_callback: 每完成一个文件回调 callback(done, total, file_path)
+        cancel_check: 返回 True 时停止提交新的文件
+    Returns:
+        dict: {文件路径: SHA-256}，计算失败的文件不在结果中
+    """
+    results = {}
+    total = len(file_paths)
+    done = 0
+
+    def hash_one(file_path):
+        if cancel_check and cancel_check():
+            return None
+        return hash_cache.get_or_compute(file_path, cancel_check=cancel_check, save=False)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(hash_one, file_path): file_path for file_path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                hash_value = future.result()
+                if hash_value:
+                    results[file_path] = hash_value
+            except Exception as e:
+                logging.error(f"计算哈希值时发生错误 {file_path}：{str(e)}")
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, file_path)
+
+    hash_cache.save()
+    return results
+
+
+def find_duplicate_files(hash_cache, files, max_workers=HASH_WORKERS, progress_callback=None, cancel_check=None,
+                         linked_from=None):
+    """
+    查找重复文件：先按大小分组，再比较抽样摘要，最后只对剩余候选计算完整哈希
+    共享存储的文件（硬链接、链接副本）只计算一次占用空间，全部共享存储的组不算重复
+    Args:
+        hash_cache: HashCache 实例
+        files: [(相对路径, 文件大小)]，来自扫描得到的文件列表
+        progress_callback: 进度回调 callback(stage, done, total)
+        cancel_check: 返回 True 时中止
+        linked_from: {模型相对路径: 链接来源的相对路径}，来自 model_info.json
+    Returns:
+        list: 重复组列表，每组为 {'hash', 'size', 'files', 'linked', 'reclaimable'}，按可释放空间从大到小排序
+              linked 为与组内其他文件共享存储的文件
+    """
+    # 第一步：按文件大小分组，大小唯一的文件不可能重复
+    size_buckets = {}
+    for rel_path, file_size in files:
+        if file_size > 0:
+            size_buckets.setdefault(file_size, []).append(rel_path)
+    candidates = [(size, paths) for size, paths in size_buckets.items() if len(paths) > 1]
+
+    # 第二步：比较抽样摘要
+    sample_total = sum(len(paths) for _, paths in candidates)
+    sample_done = 0
+    full_candidates = []
+    for file_size, paths in candidates:
+        sample_buckets = {}
+        for rel_path in paths:
+            if cancel_check and cancel_check():
+                return []
+            try:
+                sample = calculate_sample_digest(hash_cache.get_full_path(rel_path), file_size)
+                sample_buckets.setdefault(sample, []).append(rel_path)
+            except OSError as e:
+                logging.error(f"读取抽样数据时发生错误 {rel_path}：{str(e)}")
+            sample_done += 1
+            if progress_callback:
+                progress_callback('sample', sample_done, sample_total)
+        for sample_paths in sample_buckets.values():
+            if len(sample_paths) > 1:
+                full_candidates.append((file_size, sample_paths))
+
+    # 第三步：并行计算剩余候选的完整哈希
+    hash_paths = [rel_path for _, paths in full_candidates for rel_path in paths]
+    hashes = hash_files_parallel(
+        hash_cache,
+        hash_paths,
+        max_workers=max_workers,
+        progress_callback=(lambda done, total, _: progress_callback('hash', done, total)) if progress_callback else None,
+        cancel_check=cancel_check
+    )
+    if cancel_check and cancel_check():
+        return []
+
+    groups = []
+    for file_size, paths in full_candidates:
+        hash_buckets = {}
+        for rel_path in paths:
+            if rel_path in hashes:
+                hash_buckets.setdefault(hashes[rel_path], []).append(rel_path)
+        for hash_value, same_paths in hash_buckets.items():
+            if len(same_paths) < 2:
+                continue
+            storage = get_shared_storage(hash_cache.base_path, same_paths, linked_from)
+            storage_counts = {}
+            for key in storage.values():
+                storage_counts[key] = storage_counts.get(key, 0) + 1
+            if len(storage_counts) < 2:
+                continue
+            groups.append({
+                'hash': hash_value,
+                'size': file_size,
+                'files': sorted(same_paths),
+                'linked': sorted(path for path, key in storage.items() if storage_counts[key] > 1),
+                'reclaimable': file_size * (len(storage_counts) - 1)
+            })
+
+    groups.sort(key=lambda group: group['reclaimable'], reverse=True)
+    return groups
+
+
+def calculate_quick_fingerprint(file_path, file_size=None):
+    """
+    计算快速内容指纹：文件大小 + safetensors 文件头长度 + 抽样摘要
+    只读取约 192KB 数据，用于判断文件是否变化以及找回被移动或重命名的模型
+    """
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    data_offset = get_safetensors_data_offset(file_path, file_size)
+    header_length = data_offset - 8 if data_offset else 0
+    sample = calculate_sample_digest(file_path, file_size)
+    return f"{file_size}:{header_length}:{sample}"
+
+
+def reconcile_model_records(all_info, fingerprints, base_path):
+    """
+    根据快速指纹同步 model_info.json 中的记录
+    - 指纹变化的模型（文件被替换）清除已保存的哈希值
+    - 没有记录的模型按指纹匹配已不存在的旧记录（程序外移动或重命名），迁移旧记录
+    Args:
+        all_info: model_info.json 的内容，会被直接修改
+        fingerprints: {模型相对路径: 指纹}，来自本次扫描
+        base_path: 模型根目录
+    Returns:
+        tuple: (moved, invalidated)，moved 为 [(旧路径, 新路径)]，invalidated 为清除了哈希值的模型列表
+    """
+    moved = []
+    invalidated = []
+
+    # 已不存在的旧记录，按指纹建立索引（同一指纹有多条记录时无法确定，忽略）
+    orphans = {}
+    for rel_path, info in all_info.items():
+        if rel_path.startswith('_') or not isinstance(info, dict):
+            continue
+        fingerprint = info.get('fingerprint')
+        if not fingerprint or rel_path in fingerprints:
+            continue
+        if os.path.exists(os.path.join(base_path, rel_path)):
+            continue
+        orphans.setdefault(fingerprint, []).append(rel_path)
+
+    # 同一指纹对应多个新文件时同样无法确定
+    fingerprint_counts = {}
+    for rel_path, fingerprint in fingerprints.items():
+        if rel_path not in all_info:
+            fingerprint_counts[fingerprint] = fingerprint_counts.get(fingerprint, 0) + 1
+
+    for rel_path, fingerprint in fingerprints.items():
+        info = all_info.get(rel_path)
+        if info is not None:
+            old_fingerprint = info.get('fingerprint')
+            if old_fingerprint == fingerprint:
+                continue
+            if old_fingerprint and (info.get('hash') or info.get('hashes')):
+                # 文件内容已变化，保存的哈希值失效
+                info['hash'] = ''
+                info.pop('hashes', None)
+                invalidated.append(rel_path)
+            if old_fingerprint:
+                # 文件被替换后不再与链接来源共享存储
+                for field in LINK_FIELDS:
+                    info.pop(field, None)
+            info['fingerprint'] = fingerprint
+            continue
+
+        candidates = orphans.get(fingerprint, [])
+        if len(candidates) == 1 and fingerprint_counts.get(fingerprint) == 1:
+            old_path = candidates.pop()
+            all_info[rel_path] = all_info.pop(old_path)
+            moved.append((old_path, rel_path))
+
+    # 链接记录跟随移动的模型
+    rename_link_records(all_info, dict(moved))
+
+    return moved, invalidated
@@ -0,0 +1,353 @@
+"""
+模型文件头读取
+只读取文件头部区域获取模型元数据，不读取张量数据
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import base64  # 内嵌预览图解码
+import struct  # 二进制解析
+import logging  # 日志记录
+import threading  # 多线程
+from concurrent.futures import ThreadPoolExecutor  # 线程池
+from model_analysis import analyze_safetensors_header, format_model_kind, format_parameter_count, format_dtype_mix  # 模型结构分析
+from gguf_header import read_gguf_header, summarize_gguf_header  # GGUF 文件头
+from pickle_inspector import inspect_pickle_model, VERDICT_NAMES, VERDICT_SAFE  # pickle 模型检查
+
+# 文件头缓存文件（与 model_info.json 放在同一目录）
+HEADER_CACHE_FILE = 'header_cache.json'
+HEADER_CACHE_VERSION = 6
+
+# safetensors 文件头最多读取的字节数（含 8 字节长度前缀不超过 1MB）
+SAFETENSORS_HEADER_LIMIT = 1024 * 1024 - 8
+
+# 内嵌预览图所在的元数据键（base64 data URI），不保存到文件头缓存
+THUMBNAIL_METADATA_KEY = 'modelspec.thumbnail'
+
+# 内嵌预览图的 MIME 类型 -> 文件扩展名
+THUMBNAIL_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/webp': '.webp',
+}
+
+# 使用 pickle 保存的模型格式（静态检查，不加载）
+PICKLE_MODEL_EXTENSIONS = ('.ckpt', '.pt', '.pth', '.bin')
+
+# 批量读取文件头的默认线程数
+HEADER_WORKERS = 8
+
+# 在界面上显示的训练元数据（键，显示名称）
+METADATA_DISPLAY_KEYS = [
+    ('modelspec.title', '标题'),
+    ('general.name', '名称'),
+    ('ss_base_model_version', '底模'),
+    ('modelspec.architecture', '架构'),
+    ('ss_network_module', '网络'),
+    ('ss_network_dim', '维度'),
+    ('ss_network_alpha', 'Alpha'),
+    ('ss_resolution', '分辨率'),
+    ('ss_num_train_images', '训练图片'),
+    ('ss_epoch', '轮数'),
+    ('ss_steps', '步数'),
+    ('ss_learning_rate', '学习率'),
+    ('ss_sd_model_name', '训练底模'),
+]
+
+
+def read_safetensors_header(file_path, max_header_size=SAFETENSORS_HEADER_LIMIT):
+    """
+    读取 safetensors 文件头（8 字节长度前缀 + JSON），不读取张量数据
+    Returns:
+        tuple: (文件头长度, 解析后的文件头 dict)
+    Raises:
+        ValueError: 不是有效的 safetensors 文件或文件头过大
+    """
+    with open(file_path, 'rb') as f:
+        prefix = f.read(8)
+        if len(prefix) < 8:
+            raise ValueError("文件过小，不是有效的 safetensors 文件")
+        header_length = struct.unpack('<Q', prefix)[0]
+        if header_length > max_header_size:
+            raise ValueError(f"文件头过大：{header_length} 字节")
+        header_bytes = f.read(header_length)
+    if len(header_bytes) < header_length:
+        raise ValueError("文件头不完整")
+    header = json.loads(header_bytes.decode('utf-8'))
+    if not isinstance(header, dict):
+        raise ValueError("文件头格式错误")
+    return header_length, header
+
+
+def summarize_safetensors_header(header_length, header):
+    """从文件头提取需要缓存的信息（元数据、张量数量和结构分析结果）"""
+    metadata = header.get('__metadata__') or {}
+    tensor_count = sum(1 for key in header if key != '__metadata__')
+    return {
+        'format': 'safetensors',
+        'header_length': header_length,
+        'tensor_count': tensor_count,
+        'metadata': {str(key): str(value) for key, value in metadata.items() if key != THUMBNAIL_METADATA_KEY},
+        'analysis': analyze_safetensors_header(header),
+        # 只记录是否有内嵌预览图，需要显示时再从文件头读取
+        'embedded_thumbnail': bool(metadata.get(THUMBNAIL_METADATA_KEY))
+    }
+
+
+def read_model_header(file_path):
+    """
+    读取模型文件头信息
+    Returns:
+        dict: 文件头摘要，不支持的格式返回 None
+    """
+    lower_path = file_path.lower()
+    if lower_path.endswith('.safetensors'):
+        header_length, header = read_safetensors_header(file_path)
+        return summarize_safetensors_header(header_length, header)
+    if lower_path.endswith('.gguf'):
+        return summarize_gguf_header(*read_gguf_header(file_path))
+    if lower_path.endswith(PICKLE_MODEL_EXTENSIONS):
+        return inspect_pickle_model(file_path)
+    return None
+
+
+def decode_data_uri(value):
+    """
+    解码 base64 图片（支持 data:image/png;base64,... 和不带前缀的 base64）
+    Returns:
+        tuple: (图片数据, 扩展名)，解码失败返回 None
+    """
+    extension = None
+    if value.startswith('data:'):
+        header, _, value = value.partition(',')
+        extension = THUMBNAIL_EXTENSIONS.get(header[5:].split(';')[0].lower())
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (ValueError, TypeError):
+        return None
+    if not data:
+        return None
+    if extension is None:
+        # 没有 MIME 类型时按文件头判断
+        if data.startswith(b'\xff\xd8'):
+            extension = '.jpg'
+        elif data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+            extension = '.webp'
+        else:
+            extension = '.png'
+    return data, extension
+
+
+def read_embedded_thumbnail(file_path):
+    """
+    读取 safetensors 元数据中内嵌的预览图（modelspec.thumbnail），只读取文件头
+    Returns:
+        tuple: (图片数据, 扩展名)，没有内嵌预览图返回 None
+    """
+    if not file_path.lower().endswith('.safetensors'):
+        return None
+    header_length, header = read_safetensors_header(file_path)
+    value = (header.get('__metadata__') or {}).get(THUMBNAIL_METADATA_KEY)
+    if not value:
+        return None
+    return decode_data_uri(str(value))
+
+
+def get_metadata_json(metadata, key):
+    """解析元数据中以 JSON 字符串保存的值（如 ss_tag_frequency），解析失败返回 None"""
+    value = metadata.get(key)
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_header_summary(summary):
+    """把文件头摘要格式化为一行文字，用于详情页显示"""
+    if not summary:
+        return ""
+    if summary.get('error'):
+        return f"无法读取文件头：{summary['error']}"
+    metadata = summary.get('metadata', {})
+    parts = []
+    analysis = summary.get('analysis')
+    pickle_info = summary.get('pickle')
+    if pickle_info and pickle_info.get('verdict') != VERDICT_SAFE:
+        parts.append(f"安全检查: {VERDICT_NAMES.get(pickle_info.get('verdict'), '')}")
+    if analysis:
+        if format_model_kind(analysis):
+            parts.append(format_model_kind(analysis))
+        if analysis.get('parameters'):
+            parts.append(f"参数: {format_parameter_count(analysis['parameters'])}")
+        if analysis.get('dtypes'):
+            parts.append(f"精度: {format_dtype_mix(analysis['dtypes'])}")
+    for key, label in METADATA_DISPLAY_KEYS:
+        value = metadata.get(key)
+        if value and value != 'None':
+            parts.append(f"{label}: {value}")
+    if not parts:
+        parts.append(f"张量: {summary.get('tensor_count', 0)}")
+    return " | ".join(parts)
+
+
+def format_header_details(summary):
+    """把文件头摘要格式化为多行文字，用于详情窗口"""
+    if not summary:
+        return "不支持读取该格式的文件头"
+    if summary.get('error'):
+        return f"无法读取文件头：{summary['error']}"
+    lines = [
+        f"格式: {summary.get('format', '')}",
+        f"文件头长度: {summary.get('header_length', 0)} 字节",
+        f"张量数量: {summary.get('tensor_count', 0)}"
+    ]
+    analysis = summary.get('analysis')
+    if analysis:
+        lines.append(f"架构: {analysis.get('architecture') or '未知'}")
+        lines.append(f"类型: {analysis.get('model_kind') or '未知'}")
+        lines.append(f"参数量: {format_parameter_count(analysis.get('parameters', 0))}")
+        dtypes = analysis.get('dtypes', {})
+        total = sum(dtypes.values()) or 1
+        mix = ", ".join(f"{dtype} {count * 100 / total:.1f}%" for dtype, count in sorted(dtypes.items(), key=lambda x: -x[1]))
+        lines.append(f"精度组成: {mix}")
+    pickle_info = summary.get('pickle')
+    if pickle_info:
+        lines.append(f"存储数量: {pickle_info.get('storage_count', 0)}")
+        lines.append(f"存储大小: {pickle_info.get('storage_bytes', 0) / 1024 / 1024:.1f} MB")
+        lines.append(f"安全检查: {VERDICT_NAMES.get(pickle_info.get('verdict'), '')}（静态检查，未加载文件）")
+        if pickle_info.get('scan_error'):
+            lines.append(f"pickle 数据格式错误，只检查了出错前的部分：{pickle_info['scan_error']}")
+        if pickle_info.get('suspicious'):
+            lines.append("可疑的全局引用:")
+            lines.extend(f"  {name}" for name in pickle_info['suspicious'])
+    lines.append("")
+    metadata = summary.get('metadata', {})
+    if metadata:
+        lines.append("元数据:")
+        for key in sorted(metadata):
+            value = metadata[key]
+            parsed = get_metadata_json(metadata, key)
+            if isinstance(parsed, (dict, list)):
+                value = json.dumps(parsed, ensure_ascii=False, indent=2)
+            lines.append(f"{key}: {value}")
+    else:
+        lines.append("没有元数据")
+    return "\n".join(lines)
+
+
+class HeaderCache:
+    """
+    持久化的文件头缓存
+    以模型相对路径为键，按 (size, mtime_ns) 判断是否失效
+    """
+
+    def __init__(self, base_path, cache_file=HEADER_CACHE_FILE):
+        self.base_path = base_path
+        self.cache_file = cache_file
+        self.lock = threading.RLock()
+        self.entries = {}  # 相对路径 -> {'size', 'mtime_ns', 'summary'}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存"""
+        with self.lock:
+            self.entries = {}
+            if not os.path.exists(self.cache_file):
+                return
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == HEADER_CACHE_VERSION:
+                    self.entries = data.get('entries', {})
+            except Exception as e:
+                logging.error(f"读取文件头缓存时发生错误：{str(e)}")
+
+    def save(self):
+        """保存缓存到磁盘（先写临时文件再替换）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': HEADER_CACHE_VERSION, 'entries': self.entries}
+            temp_file = self.cache_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_file, self.cache_file)
+                self.dirty = False
+            except Exception as e:
+                logging.error(f"保存文件头缓存时发生错误：{str(e)}")
+
+    def get_relative_path(self, file_path):
+        """把完整路径转换为相对于 BASE_PATH 的路径"""
+        if os.path.isabs(file_path):
+            try:
+                return os.path.relpath(file_path, self.base_path)
+            except ValueError:  # 在不同驱动器的情况
+                return file_path
+        return file_path
+
+    def get(self, file_path):
+        """
+        获取文件头摘要，文件未变化时直接使用缓存
+        Returns:
+            dict: 文件头摘要；读取失败时包含 'error'；不支持的格式返回 None
+        """
+        rel_path = self.get_relative_path(file_path)
+        full_path = os.path.join(self.base_path, rel_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(rel_path)
+            if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+                return entry.get('summary')
+
+        try:
+            summary = read_model_header(full_path)
+        except Exception as e:
+            logging.warning(f"读取文件头失败 {rel_path}：{str(e)}")
+            summary = {'error': str(e)}
+
+        with self.lock:
+            self.entries[rel_path] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'summary': summary
+            }
+            self.dirty = True
+        return summary
+
+    def index(self, file_paths, max_workers=HEADER_WORKERS, progress_callback=None, cancel_check=None):
+        """
+        并行读取多个文件的文件头（只读取文件头部，整库索引只需几秒）
+        Returns:
+            dict: {文件路径: 文件头摘要}
+        """
+        results = {}
+        total = len(file_paths)
+
+        def read_one(file_path):
+            if cancel_check and cancel_check():
+                return file_path, None
+            return file_path, self.get(file_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for done, (file_path, summary) in enumerate(executor.map(read_one, file_paths), 1):
+                results[file_path] = summary
+                if progress_callback:
+                    progress_callback(done, total, file_path)
+
+        self.save()
+        return results
+
+    def discard(self, file_path):
+        """删除某个文件的缓存记录"""
+        with self.lock:
+            if self.entries.pop(self.get_relative_path(file_path), None) is not None:
+                self.dirty = True
@@ -0,0 +1,458 @@
+"""
+PyTorch pickle 模型检查（.ckpt / .pt / .pth / .bin）
+只静态解析 pickle 操作码，不执行任何代码：统计张量、存储大小，推断架构，并检查可疑的全局引用
+"""
+
+import zipfile  # zip 格式（只读取中央目录和 data.pkl）
+import pickletools  # pickle 操作码解析（不执行）
+from model_analysis import analyze_tensor_table  # 模型结构分析
+
+# pickle 最多解析的字节数（超过视为异常文件）
+PICKLE_SCAN_LIMIT = 256 * 1024 * 1024
+
+# 旧版 torch.save 格式开头的魔数
+LEGACY_MAGIC_NUMBER = 0x1950a86a20f9469cfc6c
+
+# 存储类型 -> (精度, 每个元素的字节数)
+STORAGE_DTYPES = {
+    'FloatStorage': ('F32', 4),
+    'HalfStorage': ('F16', 2),
+    'BFloat16Storage': ('BF16', 2),
+    'DoubleStorage': ('F64', 8),
+    'LongStorage': ('I64', 8),
+    'IntStorage': ('I32', 4),
+    'ShortStorage': ('I16', 2),
+    'CharStorage': ('I8', 1),
+    'ByteStorage': ('U8', 1),
+    'BoolStorage': ('BOOL', 1),
+}
+
+# 重建张量的函数
+TENSOR_REBUILD_FUNCTIONS = ('_rebuild_tensor', '_rebuild_tensor_v2')
+PARAMETER_REBUILD_FUNCTIONS = ('_rebuild_parameter', '_rebuild_parameter_with_state')
+
+# 只包裹 state_dict 的顶层键，推断架构时去掉
+WRAPPER_KEYS = ('state_dict', 'module', 'params', 'params_ema')
+
+# 加载权重时常见且无害的全局引用
+SAFE_GLOBALS = {
+    'collections.OrderedDict',
+    'torch.Size',
+    'torch.device',
+    'torch._utils._rebuild_tensor',
+    'torch._utils._rebuild_tensor_v2',
+    'torch._utils._rebuild_parameter',
+    'torch._utils._rebuild_parameter_with_state',
+    'torch._utils._rebuild_qtensor',
+    'torch.storage._load_from_bytes',
+    'torch.serialization._get_layout',
+    'numpy.core.multiarray._reconstruct',
+    'numpy.core.multiarray.scalar',
+    'numpy._core.multiarray._reconstruct',
+    'numpy._core.multiarray.scalar',
+    'numpy.ndarray',
+    'numpy.dtype',
+    '_codecs.encode',
+    'builtins.set',
+    'builtins.frozenset',
+    '__builtin__.set',
+}
+
+# torch 中无害的名称（存储类型、精度）
+SAFE_TORCH_NAMES = ('float16', 'float32', 'float64', 'bfloat16', 'int8', 'int16', 'int32', 'int64', 'uint8', 'bool')
+
+# 可以执行代码或访问系统的模块
+DANGEROUS_MODULES = (
+    'os', 'posix', 'nt', 'subprocess', 'sys', 'socket', 'shutil', 'runpy', 'pty', 'webbrowser',
+    'importlib', 'pickle', '_pickle', 'marshal', 'ctypes', 'code', 'commands', 'asyncio', 'requests', 'urllib'
+)
+DANGEROUS_BUILTINS = (
+    'eval', 'exec', 'compile', 'getattr', 'setattr', 'delattr', '__import__', 'open',
+    'apply', 'globals', 'locals', 'vars', 'breakpoint', 'input', 'execfile'
+)
+
+# 安全检查结果
+VERDICT_SAFE = 'safe'
+VERDICT_UNKNOWN = 'unknown'
+VERDICT_DANGEROUS = 'dangerous'
+VERDICT_NAMES = {
+    VERDICT_SAFE: '安全',
+    VERDICT_UNKNOWN: '需注意',
+    VERDICT_DANGEROUS: '危险',
+}
+
+
+class PickleGlobal:
+    """pickle 中引用的全局对象（只记录名称，不导入）"""
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def full_name(self):
+        return f"{self.module}.{self.name}"
+
+
+class PickleCall:
+    """pickle 中的函数调用或对象创建（只记录，不执行）"""
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+
+class PicklePersistent:
+    """持久化引用（torch 用来引用张量存储）"""
+
+    def __init__(self, pid):
+        self.pid = pid
+
+
+MARK = object()
+
+
+def pop_mark(stack):
+    """弹出到最近的 MARK 为止的元素"""
+    for index in range(len(stack) - 1, -1, -1):
+        if stack[index] is MARK:
+            items = stack[index + 1:]
+            del stack[index:]
+            return items
+    raise ValueError("pickle 数据格式错误：缺少 MARK")
+
+
+def simulate_pickle(stream, globals_found, limit=PICKLE_SCAN_LIMIT):
+    """
+    模拟 pickle 栈机得到数据结构，全局对象和调用都用占位对象表示，不执行任何代码
+    Args:
+        stream: 二进制流，读取到 STOP 为止
+        globals_found: 收集遇到的全局引用（set），用于安全检查；解析出错时保留出错前已收集的引用
+    Returns:
+        object: 还原出的数据结构（含占位对象）
+    Raises:
+        ValueError 等: pickle 数据格式错误或不完整
+    """
+    stack = []
+    memo = {}
+    for opcode, arg, pos in pickletools.genops(stream):
+        if pos is not None and pos > limit:
+            raise ValueError(f"pickle 数据超过 {limit} 字节")
+        name = opcode.name
+
+        if name in ('PROTO', 'FRAME'):
+            continue
+        if name == 'STOP':
+            break
+        if name == 'MARK':
+            stack.append(MARK)
+        elif name in ('GLOBAL', 'INST'):
+            module, global_name = arg.split(' ', 1)
+            func = PickleGlobal(module, global_name)
+            globals_found.add(func.full_name())
+            if name == 'GLOBAL':
+                stack.append(func)
+            else:
+                stack.append(PickleCall(func, tuple(pop_mark(stack))))
+        elif name == 'STACK_GLOBAL':
+            global_name = stack.pop()
+            module = stack.pop()
+            func = PickleGlobal(str(module), str(global_name))
+            globals_found.add(func.full_name())
+            stack.append(func)
+        elif name in ('EXT1', 'EXT2', 'EXT4'):
+            func = PickleGlobal('copyreg.extension', str(arg))
+            globals_found.add(func.full_name())
+            stack.append(func)
+        elif name == 'REDUCE':
+            args = stack.pop()
+            stack.append(PickleCall(stack.pop(), args))
+        elif name == 'NEWOBJ':
+            args = stack.pop()
+            stack.append(PickleCall(stack.pop(), args))
+        elif name == 'NEWOBJ_EX':
+            stack.pop()  # kwargs
+            args = stack.pop()
+            stack.append(PickleCall(stack.pop(), args))
+        elif name == 'OBJ':
+            items = pop_mark(stack)
+            stack.append(PickleCall(items[0], tuple(items[1:])))
+        elif name == 'BUILD':
+            stack.pop()  # 对象状态，不需要
+        elif name == 'PERSID':
+            stack.append(PicklePersistent(arg))
+        elif name == 'BINPERSID':
+            stack.append(PicklePersistent(stack.pop()))
+        elif name in ('PUT', 'BINPUT', 'LONG_BINPUT'):
+            memo[arg] = stack[-1]
+        elif name == 'MEMOIZE':
+            memo[len(memo)] = stack[-1]
+        elif name in ('GET', 'BINGET', 'LONG_BINGET'):
+            stack.append(memo[arg])
+        elif name == 'POP':
+            stack.pop()
+        elif name == 'POP_MARK':
+            pop_mark(stack)
+        elif name == 'DUP':
+            stack.append(stack[-1])
+        elif name == 'NONE':
+            stack.append(None)
+        elif name == 'NEWTRUE':
+            stack.append(True)
+        elif name == 'NEWFALSE':
+            stack.append(False)
+        elif name == 'EMPTY_TUPLE':
+            stack.append(())
+        elif name == 'EMPTY_LIST':
+            stack.append([])
+        elif name == 'EMPTY_DICT':
+            stack.append({})
+        elif name == 'EMPTY_SET':
+            stack.append(set())
+        elif name == 'TUPLE':
+            stack.append(tuple(pop_mark(stack)))
+        elif name in ('TUPLE1', 'TUPLE2', 'TUPLE3'):
+            count = int(name[-1])
+            items = tuple(stack[-count:])
+            del stack[-count:]
+            stack.append(items)
+        elif name == 'LIST':
+            stack.append(pop_mark(stack))
+        elif name == 'DICT':
+            items = pop_mark(stack)
+            stack.append(make_dict(items))
+        elif name == 'APPEND':
+            item = stack.pop()
+            append_items(stack[-1], [item])
+        elif name == 'APPENDS':
+            items = pop_mark(stack)
+            append_items(stack[-1], items)
+        elif name == 'SETITEM':
+            value = stack.pop()
+            key = stack.pop()
+            set_items(stack[-1], [key, value])
+        elif name == 'SETITEMS':
+            items = pop_mark(stack)
+            set_items(stack[-1], items)
+        elif name == 'ADDITEMS':
+            items = pop_mark(stack)
+            append_items(stack[-1], items)
+        elif name == 'FROZENSET':
+            stack.append(tuple(pop_mark(stack)))
+        elif name in ('NEXT_BUFFER', 'READONLY_BUFFER'):
+            stack.append(None)
+        else:
+            # 其余操作码都是把参数值压栈（整数、浮点数、字符串、字节）
+            stack.append(arg)
+    else:
+        raise ValueError("pickle 数据不完整")
+    return stack[-1] if stack else None
+
+
+def make_dict(items):
+    result = {}
+    set_items(result, items)
+    return result
+
+
+def set_items(target, items):
+    """SETITEMS：只处理字典和可识别的对象，键无法哈希时忽略"""
+    if isinstance(target, PickleCall):
+        # OrderedDict 等对象：把键值对记录在调用上
+        if not hasattr(target, 'items'):
+            target.items = {}
+        target = target.items
+    if not isinstance(target, dict):
+        return
+    for index in range(0, len(items) - 1, 2):
+        try:
+            target[items[index]] = items[index + 1]
+        except TypeError:
+            pass
+
+
+def append_items(target, items):
+    if isinstance(target, list):
+        target.extend(items)
+    elif isinstance(target, set):
+        for item in items:
+            try:
+                target.add(item)
+            except TypeError:
+                pass
+
+
+def get_mapping(value):
+    """取出字典或 OrderedDict 的键值对"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, PickleCall):
+        return getattr(value, 'items', None)
+    return None
+
+
+def describe_tensor(value):
+    """
+    识别重建张量的调用
+    Returns:
+        tuple: (存储引用 pid, 形状) ，不是张量返回 None
+    """
+    if not isinstance(value, PickleCall) or not isinstance(value.func, PickleGlobal):
+        return None
+    if value.func.name in PARAMETER_REBUILD_FUNCTIONS and value.args:
+        return describe_tensor(value.args[0])
+    if value.func.name not in TENSOR_REBUILD_FUNCTIONS or len(value.args) < 3:
+        return None
+    storage = value.args[0]
+    if not isinstance(storage, PicklePersistent) or not isinstance(storage.pid, tuple):
+        return None
+    shape = value.args[2]
+    if not isinstance(shape, tuple) or not all(isinstance(dim, int) for dim in shape):
+        return None
+    return storage.pid, list(shape)
+
+
+def collect_tensors(value, prefix='', tensors=None, storages=None, depth=0):
+    """
+    遍历还原出的数据结构，收集张量
+    Returns:
+        tuple: ({名称: (精度, 形状)}, {存储键: (存储类型, 元素数量)})
+    """
+    if tensors is None:
+        tensors = {}
+        storages = {}
+    if depth > 8:
+        return tensors, storages
+
+    mapping = get_mapping(value)
+    if mapping is None:
+        return tensors, storages
+    for key, item in mapping.items():
+        key = str(key)
+        if depth == 0 and key in WRAPPER_KEYS:
+            name = ''
+        else:
+            name = f"{prefix}.{key}" if prefix else key
+
+        tensor = describe_tensor(item)
+        if tensor is None:
+            collect_tensors(item, name, tensors, storages, depth + 1)
+            continue
+
+        pid, shape = tensor
+        # pid: ('storage', 存储类型, 键, 设备, 元素数量[, 视图信息])
+        storage_type = pid[1].name if len(pid) > 1 and isinstance(pid[1], PickleGlobal) else ''
+        storage_key = str(pid[2]) if len(pid) > 2 else ''
+        numel = pid[4] if len(pid) > 4 and isinstance(pid[4], int) else 0
+        dtype = STORAGE_DTYPES.get(storage_type, (storage_type, 0))[0]
+        tensors[name] = (dtype, shape)
+        storages[storage_key] = (storage_type, numel)
+    return tensors, storages
+
+
+def judge_globals(globals_found):
+    """
+    根据全局引用给出安全结论
+    Returns:
+        tuple: (结论, 可疑的全局引用列表)
+    """
+    dangerous = []
+    unknown = []
+    for full_name in sorted(globals_found):
+        module, _, name = full_name.rpartition('.')
+        root = module.split('.')[0]
+        if full_name in SAFE_GLOBALS:
+            continue
+        if module in ('torch', 'torch.storage') and (name.endswith('Storage') or name in SAFE_TORCH_NAMES):
+            continue
+        if root in DANGEROUS_MODULES or (root in ('builtins', '__builtin__') and name in DANGEROUS_BUILTINS):
+            dangerous.append(full_name)
+        else:
+            unknown.append(full_name)
+    if dangerous:
+        return VERDICT_DANGEROUS, dangerous + unknown
+    if unknown:
+        return VERDICT_UNKNOWN, unknown
+    return VERDICT_SAFE, []
+
+
+def inspect_pickle_model(file_path):
+    """
+    静态检查 PyTorch pickle 模型文件，不执行其中的任何代码
+    Returns:
+        dict: 文件头摘要（与 safetensors 摘要格式相同，另含 'pickle' 检查结果）
+    Raises:
+        ValueError: 不是 zip 或 pickle 格式
+    """
+    globals_found = set()
+    storage_sizes = {}
+    result = None
+    scan_error = None
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+        f.seek(0)
+        if magic == b'PK\x03\x04':
+            # 新格式：zip 压缩包，只读取中央目录和 data.pkl
+            file_format = 'torch-zip'
+            with zipfile.ZipFile(f) as archive:
+                pickle_names = [name for name in archive.namelist() if name.endswith('data.pkl')]
+                if not pickle_names:
+                    raise ValueError("zip 中没有 data.pkl，不是 PyTorch 模型")
+                pickle_name = pickle_names[0]
+                data_prefix = pickle_name[:-len('data.pkl')] + 'data/'
+                for info in archive.infolist():
+                    if info.filename.startswith(data_prefix):
+                        storage_sizes[info.filename[len(data_prefix):]] = info.file_size
+                bytes_read = archive.getinfo(pickle_name).file_size
+                try:
+                    with archive.open(pickle_name) as stream:
+                        result = simulate_pickle(stream, globals_found)
+                except Exception as e:
+                    scan_error = e
+        elif magic[:1] == b'\x80':
+            # 旧格式：依次为魔数、协议版本、系统信息、数据，之后是存储的原始数据
+            file_format = 'torch-legacy'
+            try:
+                result = simulate_pickle(f, globals_found)
+                if result == LEGACY_MAGIC_NUMBER:
+                    simulate_pickle(f, globals_found)  # 协议版本
+                    simulate_pickle(f, globals_found)  # 系统信息
+                    result = simulate_pickle(f, globals_found)
+                else:
+                    file_format = 'pickle'
+            except Exception as e:
+                scan_error = e
+            bytes_read = f.tell()
+        else:
+            raise ValueError("不是 zip 或 pickle 格式的模型文件")
+
+    tensors, storages = collect_tensors(result)
+    storage_bytes = 0
+    for key, (storage_type, numel) in storages.items():
+        if key in storage_sizes:
+            storage_bytes += storage_sizes[key]
+        else:
+            storage_bytes += numel * STORAGE_DTYPES.get(storage_type, ('', 0))[1]
+
+    verdict, suspicious = judge_globals(globals_found)
+    if scan_error is not None:
+        # 解析中途出错（可能是故意构造的错误字节）：已发现的引用仍然有效，
+        # 有可疑引用时按危险处理，否则无法确认安全
+        verdict = VERDICT_DANGEROUS if suspicious else VERDICT_UNKNOWN
+    analysis = analyze_tensor_table(tensors)
+    analysis['safety'] = verdict
+
+    return {
+        'format': file_format,
+        'header_length': bytes_read,
+        'tensor_count': len(tensors),
+        'metadata': {},
+        'analysis': analysis,
+        'pickle': {
+            'storage_count': len(storage_sizes) or len(storages),
+            'storage_bytes': storage_bytes,
+            'verdict': verdict,
+            'suspicious': suspicious,
+            'globals': sorted(globals_found),
+            'scan_error': str(scan_error) if scan_error is not None else ''
+        }
+    }
@@ -20,7 +20,6 @@ import logging  # 日志记录
 from functools import lru_cache  # 缓存
 import tkinter.font as tkfont  # 字体
 import tempfile  # 临时文件
-import urllib.request  # URL请求
 import subprocess  # 子进程
 import platform  # 平台相关
 from tkinterdnd2 import DND_FILES, TkinterDnD  # 拖放
@@ -29,23 +28,47 @@ from ttkbootstrap.constants import *  # GUI主题相关
 from ttkbootstrap.style import Style  # GUI主题相关
 import threading  # 多线程
 import time  # 时间相关
-import hashlib  # 哈希
 import urllib.parse  # URL解析
 import requests  # HTTP请求
 from bs4 import BeautifulSoup  # HTML解析
 import shutil  # 文件操作
 import ctypes  # Windows相关
-from playwright.sync_api import sync_playwright  # 浏览器自动化
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError  # 浏览器自动化
 from bs4 import NavigableString, Tag  # HTML解析
 from PIL import Image, ImageTk  # 确保导入PIL库
 import queue  # 队列
 import math
+import io  # 内存字节流
+from io_scheduler import IOScheduler, UiDispatcher, PRIORITY_NORMAL  # I/O 优先级调度
+from model_header import HeaderCache, format_header_summary, format_header_details, read_embedded_thumbnail  # 模型文件头
+from model_analysis import get_catalog_fields, format_model_kind  # 模型结构分析
+from tag_index import TagIndex  # 训练标签索引
+from civitai_client import CivitaiClient, ResponseCache, FetchCancelled, BULK_LOOKUP_SIZE, FETCH_WORKERS  # Civitai 网络请求
+from liblib_browser import (BrowserPool, PAGE_POOL_SIZE, LIBLIB_BATCH_SIZE, fetch_liblib_info,
+                            get_browser_path)  # Liblib 浏览器池
+from image_download import download_image, RateLimiter  # 预览图下载
+from file_copy import (CopyCancelled, same_filesystem, get_link_modes, COPY_MODE_COPY, COPY_MODE_NAMES,
+                       METHOD_REFLINK, METHOD_HARDLINK)  # 模型文件复制
+from file_transaction import (plan_model_transfer, recover_transactions, get_catalog_key,
+                              OP_MOVE, OP_COPY)  # 事务式移动 / 复制
+from batch_runner import (ITEM_DONE, ITEM_SKIPPED, ITEM_FAILED, ITEM_STATE_NAMES, EVENT_ITEM_DONE, EVENT_JOB_DONE,
+                          ItemResult, ProgressStream, format_summary, format_duration, format_speed)  # 批量处理框架
+from job_queue import JobQueue, JobType, JOB_RUNNING, JOB_FINISHED, JOB_STATE_NAMES  # 后台批量任务
+from batch_planner import BatchPlanner, ThroughputStats, FETCH_HOSTS  # 批量操作预估
+from sidecar_export import (SIDECAR_CS, SIDECAR_SD, SIDECAR_WORKERS, SIDECAR_BATCH_SIZE,
+                            export_sidecars, sync_sidecars)  # CS / SD 配置文件导出
+from model_hash import (HashCache, format_model_hashes, match_model_hash, find_duplicate_files, reconcile_model_records,
+                        LINK_FIELDS, get_link_records, rename_link_records, get_storage_key, resolve_link_root)  # 哈希缓存
 
 def get_base_path():
     return os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__))
 
 BASE_PATH = get_base_path()
 
+# 鼠标点击时的修饰键（event.state）
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
 def get_resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -93,12 +116,46 @@ class SafetensorsViewer:
         self.loading_lock = threading.Lock()
         self.loading_thread = None
         self.loading_cancelled = False
+        self.catalog_generation = 0  # 每次扫描递增，用于停止旧的目录更新线程
         self.is_loading = False
         self.load_queue = queue.Queue()
 
         # 添加文件系统缓存 - 移到前面
         self.fs_cache = FileSystemCache()
 
+        # I/O 优先级调度：预览图加载时批量读取（哈希、复制）让出磁盘
+        self.io_scheduler = IOScheduler(self.get_saved_io_limit())
+        
+        # 工作线程的界面更新统一通过队列交给主线程执行
+        self.ui_dispatcher = UiDispatcher(self.master)
+
+        # 持久化哈希缓存（按 size、mtime、inode 校验）
+        self.hash_cache = HashCache(BASE_PATH, io_scheduler=self.io_scheduler)
+        
+        # 模型文件头缓存（只读取文件头，按 size、mtime 校验）
+        self.header_cache = HeaderCache(BASE_PATH)
+        self.tag_index = TagIndex(BASE_PATH)
+        # Civitai 查询结果缓存在本地，重复抓取时不再请求或只发送条件请求
+        self.civitai_client = CivitaiClient(response_cache=ResponseCache())
+        self.liblib_browser_pool = None  # 直接请求网页失败时才启动
+        self.liblib_session = requests.Session()
+        self.download_limiter = RateLimiter(self.get_saved_download_limit())  # 所有预览图下载共用的限速
+        
+        # 批量操作开始前根据以往测得的速度预估用时
+        self.throughput = ThroughputStats()
+        self.batch_planner = BatchPlanner(BASE_PATH, self.hash_cache, self.throughput,
+                                          has_preview=self.has_preview,
+                                          has_embedded_thumbnail=self.model_has_embedded_thumbnail)
+        
+        # 批量操作在后台任务队列中运行，进度保存到 batch_jobs.json，重启后可以继续
+        self.job_queue = self.create_job_queue()
+        self.job_panel = None
+        self.job_panel_refresh = None
+        self.model_info_lock = threading.RLock()  # 多个线程写入 model_info.json 时使用
+        
+        # 上次意外退出时未完成的移动或复制，根据日志撤销或继续
+        self.recover_file_transactions()
+
         # DPI 缩放相关属性初始化
         try:
             if os.name == 'nt':
@@ -159,6 +216,8 @@ class SafetensorsViewer:
         
         # 其他属性初始化
         self.current_file = None
+        self.selected_files = set()  # 多选的模型（Ctrl/Shift 点击），包含当前模型
+        self.selection_anchor = None  # Shift 范围选择的起点
         self.current_subfolder = None
         self.current_sort = 'name_asc'  # 设置默认排序方式
         self.current_batch = 0
@@ -190,6 +249,7 @@ class SafetensorsViewer:
         # 初始化顺序调整
         self.add_favorite_field_to_model_info()
         self.favorites = self.load_favorites()
+        self.model_links = self.load_model_links()  # 链接副本 {模型相对路径: 链接来源}
         self.setup_ui()  # 确保在设置完字体后再创建UI
         self.load_categories()
         
@@ -211,6 +271,10 @@ class SafetensorsViewer:
         # 添加字体设置
         self.update_fonts()
         
+        # 有上次未完成的后台任务时打开任务面板，由用户选择继续
+        if self.job_queue.has_unfinished():
+            self.master.after(1000, self.show_job_panel)
+        
     def get_saved_theme(self):
         """从 model_info.json 获取保存的主题设置"""
         try:
@@ -225,6 +289,45 @@ class SafetensorsViewer:
             logging.error(f"读取主题设置时发生错误：{str(e)}")
         return None
 
+    def get_saved_io_limit(self):
+        """从 model_info.json 获取批量读取限速设置（MB/s，0 表示不限速）"""
+        try:
+            info_file = 'model_info.json'
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+                    if "_app_settings" in all_info:
+                        return float(all_info["_app_settings"].get("bulk_io_limit_mb", 0))
+        except Exception as e:
+            logging.error(f"读取限速设置时发生错误：{str(e)}")
+        return 0
+
+    def get_saved_download_limit(self):
+        """从 model_info.json 获取预览图下载限速设置（MB/s，0 表示不限速）"""
+        try:
+            info_file = 'model_info.json'
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+                    if "_app_settings" in all_info:
+                        return float(all_info["_app_settings"].get("download_limit_mb", 0))
+        except Exception as e:
+            logging.error(f"读取下载限速设置时发生错误：{str(e)}")
+        return 0
+
+    def get_saved_copy_verify(self):
+        """从 model_info.json 获取复制模型后是否校验哈希值"""
+        try:
+            info_file = 'model_info.json'
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+                    if "_app_settings" in all_info:
+                        return bool(all_info["_app_settings"].get("copy_verify_hash", False))
+        except Exception as e:
+            logging.error(f"读取复制校验设置时发生错误：{str(e)}")
+        return False
+
     def save_theme(self, theme_name):
         """保存主题设置到 model_info.json"""
         try:
@@ -318,13 +421,36 @@ class SafetensorsViewer:
                 files.sort(key=lambda x: (bool(all_info.get(os.path.join(x[1], x[0]), {}).get('url')), name_key(x)))
             else:
                 files.sort(key=name_key)
+        elif sort_method in ('arch', 'params_desc'):
+            # 按文件头分析得到的架构或参数量排序
+            info_file = 'model_info.json'
+            all_info = {}
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+            get_info = lambda x: all_info.get(os.path.join(x[1], x[0]), {})
+            if sort_method == 'arch':
+                # 未识别的模型排在最后
+                files.sort(key=lambda x: (not get_info(x).get('arch'), get_info(x).get('arch', ''),
+                                          get_info(x).get('model_kind', ''), name_key(x)))
+            else:
+                files.sort(key=lambda x: (-get_info(x).get('params', 0), name_key(x)))
         
         return files
 
     def filter_files(self, category, search_term=''):
-        """优化的文件筛选，支持搜索模型类型"""
+        """优化的文件筛选，支持搜索模型类型和训练标签（tag:标签 精确查找用该标签训练的模型）"""
         search_term = search_term.lower()
         
+        # 训练标签匹配的模型（一次查询，避免逐个文件遍历标签）
+        exact_tag = search_term.startswith('tag:')
+        if exact_tag:
+            tag_matches = {path for path, _ in self.tag_index.models_with_tag(search_term[4:])}
+        elif search_term:
+            tag_matches = self.tag_index.search(search_term)
+        else:
+            tag_matches = set()
+        
         def matches_filter(file_tuple):
             file, path = file_tuple
             full_path = os.path.join(path, file)
@@ -349,6 +475,12 @@ class SafetensorsViewer:
             
             # 搜索词检查
             if search_term:
+                # 检查训练标签
+                if full_path in tag_matches:
+                    return True
+                if exact_tag:
+                    return False
+                
                 # 检查文件名和路径
                 if search_term in file.lower() or search_term in path.lower():
                     return True
@@ -358,6 +490,16 @@ class SafetensorsViewer:
                 if model_info and 'type' in model_info:
                     if search_term in model_info['type'].lower():
                         return True
+                
+                # 检查文件头分析得到的架构、类型、精度和安全检查结果（如 sdxl、lora、bf16、dangerous）
+                if model_info:
+                    for key in ('arch', 'model_kind', 'dtype', 'safety'):
+                        if search_term in str(model_info.get(key, '')).lower():
+                            return True
+                
+                # 检查哈希值（SHA256、AutoV1、AutoV2、AutoV3、CRC32 等）
+                if model_info and match_model_hash(search_term, model_info):
+                    return True
                     
                 # 如果都不匹配，返回 False
                 return False
@@ -1653,10 +1795,13 @@ v{VERSION} 更新内容：
         # 创建模型信息输入框
         self.model_name = self.create_info_entry("模型名称", with_button=True, button_text="复制", button_command=self.copy_model_name)
         self.model_info = self.create_info_entry("基础信息", is_readonly=True, with_button=True, button_text="路径", button_command=self.open_model_path)
+        self.model_header = self.create_info_entry("训练信息", is_readonly=True, with_button=True, button_text="详情", button_command=self.show_header_details)
         self.model_hash = self.create_info_entry("哈希值", is_readonly=True, with_button=True, button_text="复制", button_command=self.copy_model_hash)
         self.model_type = self.create_info_entry("模型类型", is_context_menu=True, with_button=True, button_text="同类", button_command=lambda: self.search_similar_type(self.model_type.get()))
         self.model_url = self.create_info_entry("模型网址", is_context_menu=True, with_button=True, button_text="前往", button_command=self.open_url)
         self.trigger_words = self.create_info_entry("触发词", is_context_menu=True, with_button=True, button_text="复制", button_command=self.copy_trigger_words)
+        # 触发词的右键菜单另外包含训练标签推荐
+        self.trigger_words.bind('<Button-3>', self.show_trigger_words_menu)
         self.model_desc = self.create_info_entry("模型描述", is_context_menu=True, with_button=True, button_text="详情", button_command=self.show_full_description)
         
         # 5. 操作按钮区域 - 使用普通 Frame 并添加描边
@@ -1875,64 +2020,61 @@ v{VERSION} 更新内容：
         status_label = ttk.Label(main_frame, text="正在计算哈希值...")
         status_label.pack(fill=tk.X, pady=(0, 10))
         
+        model_file = self.current_file
+        
         def calculate():
             try:
                 # 获取文件大小用于计算进度
-                full_path = os.path.join(BASE_PATH, self.current_file)
+                full_path = os.path.join(BASE_PATH, model_file)
                 file_size = os.path.getsize(full_path)
                 
-                # 使用 SHA-256 算法
-                sha256_hash = hashlib.sha256()
-                
-                # 已读取的字节数
-                bytes_read = 0
-                last_update_time = time.time()
+                last_update_time = [time.time()]
                 update_interval = 0.1  # 每0.1秒更新一次界面
                 
-                # 以二进制模式读取文件
-                with open(full_path, "rb") as f:
-                    # 分块读取文件以处理大文件，使用1MB的块大小
-                    for byte_block in iter(lambda: f.read(1024 * 1024), b""):  # 增加到1MB
-                        sha256_hash.update(byte_block)
-                        # 更新进度
-                        bytes_read += len(byte_block)
-                        current_time = time.time()
-                        
-                        # 每隔一定时间更新一次界面
-                        if current_time - last_update_time >= update_interval:
-                            progress = (bytes_read / file_size) * 100
-                            progress_var.set(progress)
-                            # 更新状态文本
-                            status_label.config(text=f"已处理: {bytes_read/1024/1024:.1f} MB / {file_size/1024/1024:.1f} MB")
-                            # 更新界面
-                            dialog.update()
-                            last_update_time = current_time
+                def show_progress(bytes_read, total_size):
+                    if not dialog.winfo_exists():
+                        return
+                    progress_var.set((bytes_read / total_size) * 100 if total_size else 100)
+                    # 更新状态文本
+                    status_label.config(text=f"已处理: {bytes_read/1024/1024:.1f} MB / {total_size/1024/1024:.1f} MB")
                 
-                # 最后更新一次进度到100%
-                progress_var.set(100)
-                status_label.config(text=f"已处理: {file_size/1024/1024:.1f} MB / {file_size/1024/1024:.1f} MB")
-                dialog.update()
+                def on_progress(bytes_read, total_size):
+                    current_time = time.time()
+                    # 每隔一定时间更新一次界面（交给主线程执行）
+                    if current_time - last_update_time[0] >= update_interval:
+                        self.ui_dispatcher.post(show_progress, bytes_read, total_size)
+                        last_update_time[0] = current_time
                 
-                # 获取哈希值
-                hash_value = sha256_hash.hexdigest()
+                # 优先使用哈希缓存，文件未变化时无需重新读取
+                hash_value = self.hash_cache.get_or_compute(model_file, progress_callback=on_progress)
+                
+                # 最后更新一次进度到100%
+                self.ui_dispatcher.post(show_progress, file_size, file_size)
+                self.ui_dispatcher.post(on_finished, hash_value)
                 
-                # 更新显示
+            except Exception as e:
+                self.ui_dispatcher.post(on_error, str(e))
+        
+        def on_finished(hash_value):
+            dialog.destroy()
+            
+            # 用户可能已切换到其他模型，只在仍选中该模型时更新显示
+            if self.current_file == model_file:
                 self.model_hash.configure(state='normal')
                 self.model_hash.delete(0, tk.END)
                 self.model_hash.insert(0, hash_value)
                 self.model_hash.configure(state='readonly')
-                
-                # 更新 model_info.json
-                info = self.get_model_info(self.current_file)
-                info['hash'] = hash_value
-                self.save_model_info(self.current_file, info)
-                
-                dialog.destroy()
-                self.show_popup_message("哈希值已更新")
-                
-            except Exception as e:
-                dialog.destroy()
-                self.show_popup_message(f"计算哈希值时发生错误：{str(e)}")
+            
+            # 更新 model_info.json
+            info = self.get_model_info(model_file)
+            info['hash'] = hash_value
+            self.save_model_info(model_file, info)
+            
+            self.show_popup_message("哈希值已更新")
+        
+        def on_error(message):
+            dialog.destroy()
+            self.show_popup_message(f"计算哈希值时发生错误：{message}")
         
         # 在新线程中执行计算
         threading.Thread(target=calculate, daemon=True).start()
@@ -1966,6 +2108,9 @@ v{VERSION} 更新内容：
             # 保存到 model_info.json
             self.save_model_info(self.current_file, info)
             
+            # 更新已经导出过的CS、SD配置文件
+            sync_sidecars(os.path.join(BASE_PATH, self.current_file), info)
+            
         except Exception as e:
             logging.error(f"自动保存时发生错误：{str(e)}")
 
@@ -1999,6 +2144,9 @@ v{VERSION} 更新内容：
             # 保存到 model_info.json
             self.save_model_info(self.current_file, info)
             
+            # 更新已经导出过的CS、SD配置文件
+            sync_sidecars(os.path.join(BASE_PATH, self.current_file), info)
+            
             # 显示成功消息
             self.show_popup_message("更改已保存")
             
@@ -2107,8 +2255,10 @@ v{VERSION} 更新内容：
         # 清空文件框架字典
         self.file_frames.clear()
         
-        # 重置当前文件和批次
+        # 重置当前文件、多选和批次
         self.current_file = None
+        self.selected_files = set()
+        self.selection_anchor = None
         self.current_batch = 0
         
         # 清空滚动框架中的所有内容
@@ -2203,12 +2353,18 @@ v{VERSION} 更新内容：
         """加载预览图"""
         logging.debug(f"Loading preview for {file_name} in {relative_path}")
         image_path = self.get_image_path(file_name, relative_path)
+        image_source = image_path
         if not image_path:
-            logging.warning("No specific preview image found, using default null image")
-            image_path = get_resource_path('ui/null.png')
+            # 没有预览图文件时使用模型内嵌的预览图
+            image_source = self.get_embedded_thumbnail(file_name, relative_path)
+            if not image_source:
+                logging.warning("No specific preview image found, using default null image")
+                image_path = get_resource_path('ui/null.png')
+                image_source = image_path
 
         try:
-            with Image.open(image_path) as img:
+            # 标记为交互任务，后台批量读取会暂时让出磁盘
+            with self.io_scheduler.interactive(), Image.open(image_source) as img:
                 # 计算基础尺寸和实际显示尺寸
                 base_size = self.base_preview_size  # 基础尺寸反向调整
 
@@ -2229,10 +2385,15 @@ v{VERSION} 更新内容：
                 self.preview_label.image = photo
                 self.preview_image = photo  # 保存引用以防止垃圾回收
                 
-                # 绑定点击事件以显示全尺寸图
-                self.preview_label.bind("<Button-1>", lambda e: self.show_full_size_image(image_path))
-                self.preview_label.bind("<Enter>", lambda e: e.widget.configure(cursor="hand2"))
-                self.preview_label.bind("<Leave>", lambda e: e.widget.configure(cursor=""))
+                # 绑定点击事件以显示全尺寸图（内嵌预览图没有文件，不显示全尺寸图）
+                if image_path:
+                    self.preview_label.bind("<Button-1>", lambda e: self.show_full_size_image(image_path))
+                    self.preview_label.bind("<Enter>", lambda e: e.widget.configure(cursor="hand2"))
+                    self.preview_label.bind("<Leave>", lambda e: e.widget.configure(cursor=""))
+                else:
+                    self.preview_label.unbind("<Button-1>")
+                    self.preview_label.unbind("<Enter>")
+                    self.preview_label.unbind("<Leave>")
                 
                 # 居中显示预览图
                 self.master.update_idletasks()  # 确保容器尺寸已更新
@@ -2528,6 +2689,17 @@ v{VERSION} 更新内容：
             self.model_info.insert(0, basic_info)
             self.model_info.configure(state='readonly')
         
+        # 训练信息（来自模型文件头）
+        if isinstance(self.model_header, ttk.Entry):
+            with self.io_scheduler.interactive():
+                header_summary = self.header_cache.get(self.current_file)
+            if self.header_cache.dirty:
+                self.header_cache.save()
+            self.model_header.configure(state='normal')
+            self.model_header.delete(0, tk.END)
+            self.model_header.insert(0, format_header_summary(header_summary))
+            self.model_header.configure(state='readonly')
+        
         # 哈希值使用 Entry
         if self.model_hash:
             self.model_hash.configure(state='normal')
@@ -2600,21 +2772,30 @@ v{VERSION} 更新内容：
     def save_model_info(self, file_path, info):
         """保存模型信息"""
         info_file = 'model_info.json'
-        all_info = {}
-        if os.path.exists(info_file):
-            with open(info_file, 'r', encoding='utf-8') as f:
-                all_info = json.load(f)
-        
-        # 保持收藏状态
-        current_info = all_info.get(file_path, {})
-        info['is_favorite'] = current_info.get('is_favorite', False)
-        
-        # 添加最后修改时间戳
-        info['last_modified'] = time.time()
-        
-        all_info[file_path] = info
-        with open(info_file, 'w', encoding='utf-8') as f:
-            json.dump(all_info, f, ensure_ascii=False, indent=2)
+        with self.model_info_lock:
+            all_info = {}
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+            
+            # 保持收藏状态和链接记录
+            current_info = all_info.get(file_path, {})
+            info['is_favorite'] = current_info.get('is_favorite', False)
+            for field in LINK_FIELDS:
+                if field in current_info:
+                    info[field] = current_info[field]
+            
+            # 同步保存哈希缓存中的所有哈希值
+            digests = self.hash_cache.lookup_digests(file_path)
+            if digests and digests.get('sha256') == info.get('hash'):
+                info['hashes'] = format_model_hashes(digests)
+            
+            # 添加最后修改时间戳
+            info['last_modified'] = time.time()
+            
+            all_info[file_path] = info
+            with open(info_file, 'w', encoding='utf-8') as f:
+                json.dump(all_info, f, ensure_ascii=False, indent=2)
 
     def create_info_entry(self, label_text, is_context_menu=False, is_text=True, is_readonly=False, with_button=False, button_text="", button_command=None):
         """创建信息输入框"""
@@ -2768,6 +2949,33 @@ v{VERSION} 更新内容：
         else:
             messagebox.showinfo("提示", "网址为空")
 
+    def show_trigger_words_menu(self, event):
+        """触发词右键菜单：通用编辑功能和根据训练标签推荐的触发词"""
+        menu = self.create_context_menu(self.trigger_words)
+        suggestions = self.tag_index.suggest_trigger_words(self.current_file) if self.current_file else []
+        if suggestions:
+            menu.add_separator()
+            menu.add_command(
+                label=f"填入推荐触发词（前 {len(suggestions)} 个训练标签）",
+                command=lambda: self.fill_trigger_words(suggestions)
+            )
+            suggest_menu = tk.Menu(menu, tearoff=0, font=self.base_font)
+            for tag in suggestions:
+                suggest_menu.add_command(label=tag, command=lambda t=tag: self.fill_trigger_words([t], append=True))
+            menu.add_cascade(label="添加训练标签", menu=suggest_menu)
+        self.show_context_menu(event, menu)
+
+    def fill_trigger_words(self, tags, append=False):
+        """把训练标签填入触发词并保存"""
+        current = self.trigger_words.get("1.0", tk.END).strip()
+        if append and current:
+            words = current + ", " + ", ".join(tags)
+        else:
+            words = ", ".join(tags)
+        self.trigger_words.delete("1.0", tk.END)
+        self.trigger_words.insert("1.0", words)
+        self.auto_save_changes()
+
     def copy_trigger_words(self):
         text = self.trigger_words.get("1.0", tk.END).strip()
         self.master.clipboard_clear()
@@ -2928,6 +3136,32 @@ v{VERSION} 更新内容：
         # 添加最大化/还原按钮
         desc_window.resizable(True, True)
 
+    def show_header_details(self):
+        """显示模型文件头中的全部元数据"""
+        if not self.current_file:
+            self.show_popup_message("请先选择一个模型文件")
+            return
+        
+        summary = self.header_cache.get(self.current_file)
+        details = format_header_details(summary)
+        
+        # 创建详情窗口
+        detail_window = tk.Toplevel(self.master)
+        detail_window.title(f"训练信息 - {os.path.basename(self.current_file)}")
+        detail_window.geometry("800x600")
+        detail_window.minsize(600, 400)
+        
+        main_frame = ttk.Frame(detail_window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        text_widget = tk.Text(main_frame, wrap="word", font=self.base_font)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=text_widget.yview)
+        text_widget.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text_widget.insert("1.0", details)
+        text_widget.configure(state='disabled')
+
     def copy_model_name(self):
         """复制模型名称（不包含后缀名）"""
         if self.current_file:
@@ -3032,7 +3266,7 @@ v{VERSION} 更新内容：
         
         # 绑定点击事件
         full_path = os.path.join(relative_path, file_name)
-        thumbnail_label.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.select_file(fn, rp))
+        thumbnail_label.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.on_file_click(e, fn, rp))
         
         # 如果是收藏的模型，添加收藏图标
         if self.is_favorite(full_path):
@@ -3061,7 +3295,7 @@ v{VERSION} 更新内容：
                     highlightthickness=0
                 )
                 favorite_label.place(x=2, y=2)
-                favorite_label.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.select_file(fn, rp))
+                favorite_label.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.on_file_click(e, fn, rp))
 
                 pass
         
@@ -3096,7 +3330,7 @@ v{VERSION} 更新内容：
         
         # 为所有组件绑定左键点击事件
         for widget in [frame, content_frame, thumbnail_container, thumbnail_label, text_container, path_label, name_label]:
-            widget.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.select_file(fn, rp))
+            widget.bind("<Button-1>", lambda e, fn=file_name, rp=relative_path: self.on_file_click(e, fn, rp))
             widget.bind('<Button-3>', lambda e, fp=full_path: self.show_model_context_menu(e, fp))
         
         # 设置鼠标样式为手型
@@ -3117,11 +3351,18 @@ v{VERSION} 更新内容：
         # 检查预览图
         for ext in self.supported_image_extensions:
             test_path = os.path.join(folder_path, os.path.splitext(file_name)[0] + ext)
-            if self.fs_cache.get_file_info(test_path):
+            # 缓存对不存在的文件返回 None 或 exists 为 False 的记录
+            file_info = self.fs_cache.get_file_info(test_path)
+            if file_info and file_info['exists']:
                 image_path = test_path
                 break
         
         if not image_path:
+            # 没有预览图文件时使用模型内嵌的预览图
+            embedded_image = self.get_embedded_thumbnail(file_name, relative_path)
+            if embedded_image:
+                return self.process_image(embedded_image, size, crop)
+            
             # 使用默认图片
             null_image_path = get_resource_path('ui/null.png')
             if os.path.exists(null_image_path):
@@ -3130,9 +3371,31 @@ v{VERSION} 更新内容：
         
         return self.process_image(image_path, size, crop)
 
+    def get_embedded_thumbnail(self, file_name, relative_path):
+        """
+        获取模型文件头中内嵌的预览图（modelspec.thumbnail）
+        Returns:
+            BytesIO: 图片数据，没有内嵌预览图返回 None
+        """
+        if not file_name.lower().endswith('.safetensors'):
+            return None
+        model_path = os.path.join(relative_path, file_name)
+        try:
+            with self.io_scheduler.interactive():
+                # 文件头缓存中记录了是否有内嵌预览图，没有时不再读取文件
+                summary = self.header_cache.get(model_path)
+                if not summary or not summary.get('embedded_thumbnail'):
+                    return None
+                thumbnail = read_embedded_thumbnail(os.path.join(BASE_PATH, model_path))
+            if thumbnail:
+                return io.BytesIO(thumbnail[0])
+        except Exception as e:
+            logging.error(f"读取内嵌预览图时发生错误 {model_path}：{str(e)}")
+        return None
+
     def process_image(self, image_path, size, crop=True):
         try:
-            with Image.open(image_path) as img:
+            with self.io_scheduler.interactive(), Image.open(image_path) as img:
                 if crop:
                     width, height = img.size
                     if width / height > size[0] / size[1]:
@@ -3149,36 +3412,73 @@ v{VERSION} 更新内容：
             logging.error(f"Error processing image {image_path}: {str(e)}")
         return None
 
-    def select_file(self, file_name, relative_path):
+    def on_file_click(self, event, file_name, relative_path):
+        """列表项点击：Ctrl 加入或移出多选，Shift 选中从上次点击到这里的范围，直接点击只选中这一个"""
+        model_path = os.path.join(relative_path, file_name)
+        if event.state & SHIFT_MASK and self.selection_anchor in self.file_frames:
+            # 按列表中的显示顺序选中范围
+            displayed = list(self.file_frames)
+            start, end = sorted((displayed.index(self.selection_anchor), displayed.index(model_path)))
+            for selected_path in self.selected_files:
+                self.set_file_entry_style(selected_path, False)
+            self.selected_files = set(displayed[start:end + 1])
+            for selected_path in self.selected_files:
+                self.set_file_entry_style(selected_path, True)
+            self.select_file(file_name, relative_path, keep_selection=True)
+        elif event.state & CONTROL_MASK:
+            self.selection_anchor = model_path
+            if model_path in self.selected_files and len(self.selected_files) > 1:
+                self.selected_files.discard(model_path)
+                self.set_file_entry_style(model_path, False)
+                # 移出的是当前模型时，改为显示另一个选中的模型
+                if model_path == self.current_file:
+                    other_path = next(path for path in self.file_frames if path in self.selected_files)
+                    self.select_file(os.path.basename(other_path), os.path.dirname(other_path), keep_selection=True)
+            else:
+                self.select_file(file_name, relative_path, keep_selection=True)
+        else:
+            self.select_file(file_name, relative_path)
+
+    def set_file_entry_style(self, model_path, selected):
+        """设置列表项的选中样式"""
+        if model_path not in self.file_frames:
+            return
+        frame_style = 'Selected.TFrame' if selected else 'List.TFrame'  # 选中使用 secondary 颜色
+        label_style = 'Selected.TLabel' if selected else 'Left.TLabel'
+        frame, path_label, name_label = self.file_frames[model_path]
+        frame.configure(style=frame_style)
+        path_label.configure(style=label_style)
+        name_label.configure(style=label_style)
+        # 设置所有子部件的样式
+        for widget in frame.winfo_children():
+            if isinstance(widget, ttk.Frame):
+                widget.configure(style=frame_style)
+            elif isinstance(widget, ttk.Label):
+                widget.configure(style=label_style)
+
+    def select_file(self, file_name, relative_path, keep_selection=False):
+        """
+        选中模型并显示其信息
+        Args:
+            keep_selection: 保留其他多选的模型（Ctrl/Shift 点击时使用）
+        """
         logging.debug(f"Selecting file: {file_name} in {relative_path}")
         new_current_file = os.path.join(relative_path, file_name)
         
         # 取消之前选中项的样式
-        if self.current_file and self.current_file in self.file_frames:
-            frame, path_label, name_label = self.file_frames[self.current_file]
-            frame.configure(style='List.TFrame')
-            path_label.configure(style='Left.TLabel')
-            name_label.configure(style='Left.TLabel')
-            # 重置所有子部件的样式
-            for widget in frame.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='List.TFrame')
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Left.TLabel')
+        if not keep_selection:
+            for selected_path in self.selected_files:
+                self.set_file_entry_style(selected_path, False)
+            self.selected_files = set()
+            self.selection_anchor = new_current_file
+        if self.current_file and self.current_file not in self.selected_files:
+            self.set_file_entry_style(self.current_file, False)
         
         # 设置新选中项的样式
         if new_current_file in self.file_frames:
             self.current_file = new_current_file
-            frame, path_label, name_label = self.file_frames[new_current_file]
-            frame.configure(style='Selected.TFrame')  # 使用 secondary 颜色
-            path_label.configure(style='Selected.TLabel')  # 使用 secondary 颜色
-            name_label.configure(style='Selected.TLabel')  # 使用 secondary 颜色
-            # 设置所有子部件的样式
-            for widget in frame.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='Selected.TFrame')  # 使用 secondary 颜色
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Selected.TLabel')  # 使用 secondary 颜色
+            self.selected_files.add(new_current_file)
+            self.set_file_entry_style(new_current_file, True)
             
             self.load_preview(file_name, relative_path)
             self.load_model_info()
@@ -3242,20 +3542,27 @@ v{VERSION} 更新内容：
         else:
             self.show_popup_message("请先选择一个模型文件")
 
-    def replace_preview_image_from_url(self, url):
+    def get_preview_save_path(self, file_name, relative_path):
+        """模型预览图的保存路径（与模型同名的 PNG）"""
+        return os.path.join(BASE_PATH, relative_path, f"{os.path.splitext(file_name)[0]}.png")
+
+    def replace_preview_image_from_url(self, url, session=None):
+        """
+        从网址下载并替换当前模型的预览图（流式下载，直接写入预览图文件）
+        Returns:
+            bool: 是否成功
+        """
         logging.debug(f"Attempting to replace preview image from URL: {url}")
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                logging.debug(f"Created temporary file: {temp_file.name}")
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-                req = urllib.request.Request(url, headers=headers)
-                with urllib.request.urlopen(req) as response:
-                    temp_file.write(response.read())
-                logging.debug(f"Downloaded image to temporary file")
-                self.replace_preview_image(temp_file.name)
-        except Exception as e:
-            logging.error(f"Error downloading image from URL: {str(e)}")
-            self.show_popup_message(f"从URL下图片时发生误：{str(e)}")
+        if not self.current_file:
+            self.show_popup_message("请先选择一个模型文件")
+            return False
+        preview_path = self.get_preview_save_path(os.path.basename(self.current_file), os.path.dirname(self.current_file))
+        if not download_image(url, preview_path, session=session, rate_limiter=self.download_limiter):
+            self.show_popup_message("从URL下载图片失败")
+            return False
+        self.refresh_current_preview()
+        self.show_popup_message("预览图已成功替换")
+        return True
 
     def replace_preview_image(self, new_image_path):
         """替换预览图"""
@@ -3273,54 +3580,7 @@ v{VERSION} 更新内容：
             with Image.open(new_image_path) as img:
                 img.save(new_image_path_full, "PNG")
             
-            # 清除缓存
-            self.load_thumbnail.cache_clear()
-            self._preview_exists_cache.clear()  # 清除预览图存在状态的缓存
-            
-            # 重新加载预览图
-            self.load_preview(os.path.basename(self.current_file), os.path.dirname(self.current_file))
-            
-            # 获取当前文件的frame
-            if self.current_file in self.file_frames:
-                frame, _, _ = self.file_frames[self.current_file]
-                
-                # 查找并更新缩略图
-                for child in frame.winfo_children():
-                    if isinstance(child, ttk.Frame):  # 找到内容框架
-                        for content_child in child.winfo_children():
-                            if isinstance(content_child, ttk.Frame):  # 找到左侧容器
-                                # 重新加载缩略图
-                                new_image = self.load_thumbnail(
-                                    os.path.basename(self.current_file),
-                                    os.path.dirname(self.current_file),
-                                    size=self.thumbnail_size,
-                                    crop=True
-                                )
-                                
-                                if new_image:
-                                    # 更新缩略图
-                                    for label in content_child.winfo_children():
-                                        if isinstance(label, ttk.Label) and hasattr(label, 'image'):
-                                            label.configure(image=new_image)
-                                            label.image = new_image
-                                            
-                                            # 如果是收藏的模型，重新添加收藏图标
-                                            if self.is_favorite(self.current_file):
-                                                if self.favorite_icon:
-                                                    favorite_label = tk.Label(
-                                                        label,
-                                                        image=self.favorite_icon,
-                                                        bg=self.style.colors.bg,
-                                                        bd=0,
-                                                        highlightthickness=0
-                                                    )
-                                                    favorite_label.place(x=2, y=2)
-                                                    favorite_label.bind(
-                                                        "<Button-1>",
-                                                        lambda e, fn=os.path.basename(self.current_file),
-                                                        rp=os.path.dirname(self.current_file): self.select_file(fn, rp)
-                                                    )
-            
+            self.refresh_current_preview()
             self.show_popup_message("预览图已成功替换")
             
         except Exception as e:
@@ -3333,6 +3593,56 @@ v{VERSION} 更新内容：
                 except:
                     pass
 
+    def refresh_current_preview(self):
+        """当前模型的预览图文件更新后，刷新预览区和列表中的缩略图"""
+        # 清除缓存
+        self.load_thumbnail.cache_clear()
+        self._preview_exists_cache.clear()  # 清除预览图存在状态的缓存
+        
+        # 重新加载预览图
+        self.load_preview(os.path.basename(self.current_file), os.path.dirname(self.current_file))
+        
+        # 获取当前文件的frame
+        if self.current_file in self.file_frames:
+            frame, _, _ = self.file_frames[self.current_file]
+            
+            # 查找并更新缩略图
+            for child in frame.winfo_children():
+                if isinstance(child, ttk.Frame):  # 找到内容框架
+                    for content_child in child.winfo_children():
+                        if isinstance(content_child, ttk.Frame):  # 找到左侧容器
+                            # 重新加载缩略图
+                            new_image = self.load_thumbnail(
+                                os.path.basename(self.current_file),
+                                os.path.dirname(self.current_file),
+                                size=self.thumbnail_size,
+                                crop=True
+                            )
+                            
+                            if new_image:
+                                # 更新缩略图
+                                for label in content_child.winfo_children():
+                                    if isinstance(label, ttk.Label) and hasattr(label, 'image'):
+                                        label.configure(image=new_image)
+                                        label.image = new_image
+                                        
+                                        # 如果是收藏的模型，重新添加收藏图标
+                                        if self.is_favorite(self.current_file):
+                                            if self.favorite_icon:
+                                                favorite_label = tk.Label(
+                                                    label,
+                                                    image=self.favorite_icon,
+                                                    bg=self.style.colors.bg,
+                                                    bd=0,
+                                                    highlightthickness=0
+                                                )
+                                                favorite_label.place(x=2, y=2)
+                                                favorite_label.bind(
+                                                    "<Button-1>",
+                                                    lambda e, fn=os.path.basename(self.current_file),
+                                                    rp=os.path.dirname(self.current_file): self.select_file(fn, rp)
+                                                )
+
     def refresh_thumbnail(self, file_name, relative_path):
         """刷新缩略图"""
         full_path = os.path.join(relative_path, file_name)
@@ -3503,6 +3813,14 @@ v{VERSION} 更新内容：
                 if self.current_file in self.favorites:
                     self.favorites.remove(self.current_file)
 
+                # 从哈希缓存和文件头缓存中移除
+                self.hash_cache.discard(self.current_file)
+                self.hash_cache.save()
+                self.header_cache.discard(self.current_file)
+                self.header_cache.save()
+                self.tag_index.discard(self.current_file)
+                self.tag_index.save()
+
                 # 重置当前文件
                 self.current_file = None
 
@@ -3792,6 +4110,17 @@ v{VERSION} 更新内容：
             command=lambda: self.sort_files('no_url_first'),
             font=self.base_font
         )
+        menu.add_separator()
+        menu.add_command(
+            label="✓ 按模型架构" if current_sort == 'arch' else "按模型架构",
+            command=lambda: self.sort_files('arch'),
+            font=self.base_font
+        )
+        menu.add_command(
+            label="✓ 按参数量最多" if current_sort == 'params_desc' else "按参数量最多",
+            command=lambda: self.sort_files('params_desc'),
+            font=self.base_font
+        )
         
         # 在按钮下方显示菜单
         x = self.sort_button.winfo_rootx()
@@ -3947,6 +4276,23 @@ v{VERSION} 更新内容：
                 logging.error(f"Error loading favorites: {str(e)}")
         return favorites
 
+    def load_model_links(self):
+        """从 model_info.json 中加载链接副本记录"""
+        info_file = 'model_info.json'
+        if os.path.exists(info_file):
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    return get_link_records(json.load(f))
+            except Exception as e:
+                logging.error(f"读取链接记录时发生错误：{str(e)}")
+        return {}
+
+    def set_catalog_state(self, favorites, model_links):
+        """模型信息被其他线程修改后，更新收藏和链接副本记录（在主线程中调用）"""
+        self.favorites = favorites
+        self.model_links = model_links
+        self.update_stats_label()
+
     def save_favorites(self, favorites):
         with open('favorites.json', 'w', encoding='utf-8') as f:
             json.dump(list(favorites), f, ensure_ascii=False, indent=2)
@@ -4114,12 +4460,13 @@ v{VERSION} 更新内容：
             with self.loading_lock:
                 try:
                     temp_files = []  # 使用临时列表存储文件
-                    for category in self.categories:
-                        if self.loading_cancelled:
-                            return
-                            
-                        category_path = os.path.join(BASE_PATH, category)
-                        self.recursive_load_all_files_to_list(category_path, category, temp_files)
+                    with self.io_scheduler.normal():  # 扫描属于普通优先级
+                        for category in self.categories:
+                            if self.loading_cancelled:
+                                return
+                                
+                            category_path = os.path.join(BASE_PATH, category)
+                            self.recursive_load_all_files_to_list(category_path, category, temp_files)
                     
                     # 加载完成后，一次性更新 all_files，并应用默认排序
                     if not self.loading_cancelled:
@@ -4127,7 +4474,7 @@ v{VERSION} 更新内容：
                         # 应用默认排序
                         self.all_files = self.sort_filtered_files(self.all_files, self.current_sort)
                         # 加载完成后在主线程中更新UI
-                        self.master.after(0, self.on_files_loaded)
+                        self.ui_dispatcher.post(self.on_files_loaded)
                 except Exception as e:
                     logging.error(f"Error in load_files_thread: {str(e)}")
         
@@ -4161,6 +4508,155 @@ v{VERSION} 更新内容：
         if hasattr(self, 'category_combobox'):
             category = self.category_combobox.get()
             self.load_files(category, self.search_var.get(), self.current_sort)
+        
+        # 在后台更新快速指纹和文件头，不阻塞文件列表显示
+        self.catalog_generation += 1
+        threading.Thread(
+            target=self.update_model_catalog,
+            args=(list(self.all_files), self.catalog_generation),
+            daemon=True
+        ).start()
+
+    def update_model_catalog(self, files, generation):
+        """扫描完成后在后台更新模型目录（快速指纹、文件头）"""
+        self.update_model_fingerprints(files, generation)
+        self.index_model_headers(files, generation)
+
+    def index_model_headers(self, files, generation):
+        """读取所有模型的文件头（已缓存且未变化的文件不再读取）"""
+        if generation != self.catalog_generation:
+            return
+        with self.io_scheduler.normal():
+            summaries = self.header_cache.index(
+                [os.path.join(path, file) for file, path in files],
+                cancel_check=lambda: generation != self.catalog_generation
+            )
+        if generation != self.catalog_generation:
+            return
+        
+        # 增量更新训练标签索引
+        self.tag_index.update(summaries)
+        self.tag_index.prune(set(summaries))
+        self.tag_index.save()
+        
+        analyses = {
+            model_path: summary['analysis']
+            for model_path, summary in summaries.items()
+            if summary and summary.get('analysis')
+        }
+        if analyses:
+            self.apply_model_analysis(analyses)
+
+    def apply_model_analysis(self, analyses):
+        """
+        把模型结构分析结果（架构、类型、参数量、精度）写入 model_info.json，模型类型为空时自动填写
+        在后台线程中读写文件，只把自动填写的类型交给主线程显示
+        """
+        info_file = 'model_info.json'
+        with self.model_info_lock:
+            try:
+                all_info = {}
+                if os.path.exists(info_file):
+                    with open(info_file, 'r', encoding='utf-8') as f:
+                        all_info = json.load(f)
+            
+                changed = False
+                filled_types = {}
+                for model_path, analysis in analyses.items():
+                    info = all_info.setdefault(model_path, {})
+                    fields = get_catalog_fields(analysis)
+                    if any(info.get(key) != value for key, value in fields.items()):
+                        info.update(fields)
+                        changed = True
+                        if fields.get('safety') == 'dangerous':
+                            logging.warning(f"模型文件包含可执行代码的引用，请勿直接加载: {model_path}")
+                    if not info.get('type', '').strip() and format_model_kind(analysis):
+                        info['type'] = format_model_kind(analysis)
+                        filled_types[model_path] = info['type']
+                        changed = True
+            
+                if not changed:
+                    return
+                with open(info_file, 'w', encoding='utf-8') as f:
+                    json.dump(all_info, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                logging.error(f"保存模型结构分析结果时发生错误：{str(e)}")
+                return
+        
+        if filled_types:
+            logging.info(f"已根据文件头自动填写 {len(filled_types)} 个模型的类型")
+            self.ui_dispatcher.post(self.show_filled_model_type, filled_types)
+
+    def show_filled_model_type(self, filled_types):
+        """当前模型的类型输入框为空时同步显示自动填写的类型（在主线程中调用）"""
+        if self.current_file in filled_types and isinstance(self.model_type, tk.Text):
+            if not self.model_type.get("1.0", tk.END).strip():
+                self.model_type.insert("1.0", filled_types[self.current_file])
+
+    def update_model_fingerprints(self, files, generation):
+        """计算所有模型的快速指纹（文件未变化时直接使用缓存）"""
+        fingerprints = {}
+        with self.io_scheduler.normal():
+            for file, path in files:
+                if generation != self.catalog_generation:
+                    return
+                # 有预览图等交互任务时先让出磁盘
+                self.io_scheduler.throttle(0, PRIORITY_NORMAL)
+                model_path = os.path.join(path, file)
+                try:
+                    fingerprints[model_path] = self.hash_cache.get_or_compute_fingerprint(model_path)
+                except OSError as e:
+                    logging.error(f"计算快速指纹时发生错误 {model_path}：{str(e)}")
+        self.hash_cache.save()
+        if generation == self.catalog_generation:
+            self.apply_model_fingerprints(fingerprints)
+
+    def apply_model_fingerprints(self, fingerprints):
+        """
+        根据快速指纹更新模型信息：清除失效的哈希值，找回被移动或重命名模型的信息
+        在后台线程中读写 model_info.json，界面只在有变化时刷新
+        """
+        info_file = 'model_info.json'
+        with self.model_info_lock:
+            if not os.path.exists(info_file):
+                return
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+            
+                before = json.dumps(all_info, sort_keys=True)
+                moved, invalidated = reconcile_model_records(all_info, fingerprints, BASE_PATH)
+                # 指纹未变化的模型直接使用已保存的哈希值，之后只重新计算内容变化的文件
+                if self.hash_cache.seed_from_model_info(all_info):
+                    self.hash_cache.save()
+                if json.dumps(all_info, sort_keys=True) == before:
+                    return
+            
+                with open(info_file, 'w', encoding='utf-8') as f:
+                    json.dump(all_info, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                logging.error(f"更新模型指纹时发生错误：{str(e)}")
+                return
+        
+        for old_path, new_path in moved:
+            logging.info(f"已找回模型信息: {old_path} -> {new_path}")
+        for model_path in invalidated:
+            logging.info(f"模型文件已变化，清除旧哈希值: {model_path}")
+        
+        # 收藏状态和链接记录跟随模型信息迁移（直接使用已读取的模型信息，不再重新读取文件）
+        favorites = {model_path for model_path, info in all_info.items() if info.get('is_favorite', False)}
+        changed_paths = set(invalidated) | {new_path for _, new_path in moved}
+        self.ui_dispatcher.post(
+            self.on_model_records_reconciled, favorites, get_link_records(all_info), changed_paths, len(moved))
+
+    def on_model_records_reconciled(self, favorites, model_links, changed_paths, moved_count):
+        """指纹更新修改了模型信息后刷新界面（在主线程中调用）"""
+        self.set_catalog_state(favorites, model_links)
+        # 刷新当前模型的显示
+        if self.current_file in changed_paths:
+            self.load_model_info()
+        if moved_count:
+            self.show_popup_message(f"已找回 {moved_count} 个模型的信息")
 
     def add_favorite_field_to_model_info(self):
         """为所有模型信息添加收藏字段"""
@@ -4380,24 +4876,24 @@ https://pan.quark.cn/s/75450b122a53"""
             width=event.width
         )
 
-    def calculate_file_hash(self, file_path):
-        """计算文件的哈希值"""
+    def calculate_file_hash(self, file_path, progress_callback=None, cancel_check=None):
+        """计算文件的哈希值（优先使用哈希缓存，需要读取文件时记录读取速度）"""
         try:
-            import hashlib
-            # 使用 SHA-256 算法
-            sha256_hash = hashlib.sha256()
-            
-            # 以二进制模式读取文件
-            with open(file_path, "rb") as f:
-                # 分块读取文件以处理大文件
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            
-            # 返回十六进制格式的哈希值
-            return sha256_hash.hexdigest()
+            cached = self.hash_cache.lookup(file_path)
+            if cached:
+                return cached
+            start = time.monotonic()
+            hash_value = self.hash_cache.get_or_compute(
+                file_path,
+                progress_callback=progress_callback,
+                cancel_check=cancel_check
+            )
+            if hash_value:
+                self.throughput.record_hash(os.path.getsize(file_path), time.monotonic() - start)
+            return hash_value
         except Exception as e:
             logging.error(f"计算哈希值时发生错误：{str(e)}")
-            return "无法计算哈希值"
+            return None
 
     def copy_model_hash(self):
         """复制模型哈希值"""
@@ -4409,153 +4905,20 @@ https://pan.quark.cn/s/75450b122a53"""
         else:
             self.show_popup_message("哈希值为空")
 
-    def show_hash_dialog(self):
-        """显示哈希值计算对话框"""
-        dialog = tk.Toplevel(self.master)
-        dialog.title("计算模型哈希值")
-        dialog.geometry("400x150")
-        dialog.transient(self.master)
-        dialog.grab_set()
-        
-        # 居中显示
-        dialog.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
-        
-        # 创建主框架
-        main_frame = ttk.Frame(dialog)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # 创建进度条
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(
-            main_frame,
-            variable=progress_var,
-            maximum=100,
-            mode='determinate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
-        
-        # 创建状态标签
-        status_label = ttk.Label(main_frame, text="可能需要较长的时间，和模型数量以及磁盘性能有关")
-        status_label.pack(fill=tk.X, pady=(0, 10))
-        
-        # 创建按钮框架
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        # 取消标志
-        cancel_flag = {'value': False}
-        
-        def calculate_hashes():
-            try:
-                # 获取所有模型文件
-                all_files = [(f, p) for f, p in self.all_files]
-                total = len(all_files)
-                
-                # 读取现有的模型信息
-                info_file = 'model_info.json'
-                if os.path.exists(info_file):
-                    with open(info_file, 'r', encoding='utf-8') as f:
-                        all_info = json.load(f)
-                else:
-                    all_info = {}
-                
-                # 计算每个文件的进度比例
-                progress_step = 100.0 / total if total > 0 else 0
-                
-                # 遍历所有文件计算哈希值
-                for i, (file, path) in enumerate(all_files):
-                    if cancel_flag['value']:
-                        break
-                    
-                    full_path = os.path.join(BASE_PATH, path, file)
-                    model_path = os.path.join(path, file)
-                    
-                    # 检查是否已有有效的哈希值
-                    if model_path in all_info and 'hash' in all_info[model_path]:
-                        existing_hash = all_info[model_path]['hash']
-                        if existing_hash and len(existing_hash) == 64:  # SHA-256 哈希值长度为64
-                            logging.info(f"跳过已有哈希值的模型: {model_path}")
-                            status_label.config(text=f"跳过: {file} (已有哈希值)")
-                            progress_var.set((i + 1) * progress_step)
-                            dialog.update()
-                            continue
-                    
-                    status_label.config(text=f"正在计算: {file}")
-                    
-                    # 计算哈希值
-                    hash_value = self.calculate_file_hash(full_path)
-                    
-                    # 更新模型信息
-                    if model_path not in all_info:
-                        all_info[model_path] = {}
-                    all_info[model_path]['hash'] = hash_value
-                    
-                    # 更新进度
-                    progress_var.set((i + 1) * progress_step)
-                    dialog.update()
-                
-                # 保存更新后的信息
-                if not cancel_flag['value']:
-                    with open(info_file, 'w', encoding='utf-8') as f:
-                        json.dump(all_info, f, ensure_ascii=False, indent=2)
-                    
-                    # 如果当前有选中的文件，刷新显示
-                    if self.current_file:
-                        self.load_model_info()
-                    
-                    status_label.config(text="计算完成！")
-                    self.show_popup_message("哈希值计算完成")
-                else:
-                    status_label.config(text="已取消计算")
-                
-            except Exception as e:
-                status_label.config(text=f"发生错误：{str(e)}")
-                messagebox.showerror("错误", f"计算哈希值时发生错误：{str(e)}")
-            finally:
-                start_btn.configure(state='normal')
-        
-        def start_calculation():
-            cancel_flag['value'] = False
-            start_btn.configure(state='disabled')
-            progress_var.set(0)
-            threading.Thread(target=calculate_hashes, daemon=True).start()
-        
-        
-        # 建开始和取消按钮
-        start_btn = ttk.Button(
-            button_frame,
-            text="开始计算",
-            command=start_calculation,
-            width=10,
-            style='primary.TButton'  # 使用统一的按钮样式
-        )
-        start_btn.pack(side=tk.LEFT, padx=5)
-        
-        close_btn = ttk.Button(
-            button_frame,
-            text="关闭",
-            command=dialog.destroy,
-            width=10,
-            style='primary.TButton'  # 使用统一的按钮样式
-        )
-        close_btn.pack(side=tk.RIGHT, padx=5)
-
-    def handle_save_shortcut(self, event=None):
-        """处理 Ctrl+S 快捷键"""
-        # 检查窗口是否处于激活状态
-        if self.master.focus_displayof() is not None:
-            # 执行保存操作
-            self.save_changes()
-        return "break"  # 阻止事件继续传播
-
-    def update_announcement_colors(self, event=None):
-        """更新公告栏颜色以匹配当前主题"""
-        self.announcement_text.configure(
-            bg=self.style.colors.bg,
-            fg=self.style.colors.fg,
-            insertbackground=self.style.colors.fg  # 光标颜色
+    def handle_save_shortcut(self, event=None):
+        """处理 Ctrl+S 快捷键"""
+        # 检查窗口是否处于激活状态
+        if self.master.focus_displayof() is not None:
+            # 执行保存操作
+            self.save_changes()
+        return "break"  # 阻止事件继续传播
+
+    def update_announcement_colors(self, event=None):
+        """更新公告栏颜色以匹配当前主题"""
+        self.announcement_text.configure(
+            bg=self.style.colors.bg,
+            fg=self.style.colors.fg,
+            insertbackground=self.style.colors.fg  # 光标颜色
         )
 
     def search_on_liblib(self):
@@ -4578,8 +4941,20 @@ https://pan.quark.cn/s/75450b122a53"""
             self.show_popup_message(f"打开搜索页面失败：{str(e)}")
 
 
+    def get_liblib_browser_pool(self):
+        """获取Liblib浏览器池（创建时不启动浏览器，第一次需要时才启动，之后一直复用）"""
+        if self.liblib_browser_pool is None:
+            self.liblib_browser_pool = BrowserPool(executable_path=get_browser_path())
+        return self.liblib_browser_pool
+
+    def close_liblib_browser_pool(self):
+        """关闭Liblib浏览器池"""
+        if self.liblib_browser_pool is not None:
+            self.liblib_browser_pool.shutdown()
+            self.liblib_browser_pool = None
+
     def fetch_from_liblib(self):
-        """从Liblib抓取模型信息"""
+        """从Liblib抓取模型信息（网络请求和下载在后台线程中进行，结果交给主线程填写）"""
         if not self.current_file:
             self.show_popup_message("请先选择一个模型文件")
             return
@@ -4594,235 +4969,98 @@ https://pan.quark.cn/s/75450b122a53"""
             self.show_popup_message("请输入正确的Liblib模型页面网址")
             return
         
-        # 创建进度提示框
-        progress_window = tk.Toplevel(self.master)
-        progress_window.title("Liblib抓取")
-        progress_window.geometry("400x150")
-        progress_window.transient(self.master)
-        progress_window.grab_set()
+        model_file = self.current_file
+        file_name = os.path.basename(model_file)
+        relative_path = os.path.dirname(model_file)
         
-        # 居中显示
-        progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                           f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
+        # 如果已有预览图，先询问是否替换（后台线程中不能弹出对话框）
+        replace_preview = True
+        if self.get_image_path(file_name, relative_path) is not None:
+            replace_preview = messagebox.askyesno("确认", "当前模型已有预览图，是否需要替换？")
         
-        # 创建主框架
-        main_frame = ttk.Frame(progress_window)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # 创建状态标签
-        status_label = ttk.Label(main_frame, text="正在准备抓取...", wraplength=380)
-        status_label.pack(pady=(0, 10))
+        progress_window, update_status = self.create_fetch_progress_window("Liblib抓取")
         
-        # 创建进度条
-        progress_bar = ttk.Progressbar(
-            main_frame,
-            mode='indeterminate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
-        progress_bar.start(10)
+        def close_later(status_text, message):
+            update_status(status_text)
+            progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
+            self.show_popup_message(message)
         
-        def update_status(text):
-            status_label.config(text=text)
-            progress_window.update()
-
-        def get_browser_path():
-            """获取 Firefox 浏览器路径"""
+        def fetch():
             try:
-                if getattr(sys, 'frozen', False):
-                    # 打包环境
-                    base_dir = sys._MEIPASS
-                    firefox_path = os.path.join(base_dir, 'firefox', 'firefox', 'firefox.exe')  # 注意这里添加了两次 firefox
-                    if os.path.exists(firefox_path):
-                        print(f"使用打包的Firefox: {firefox_path}")
-                        return firefox_path
+                self.ui_dispatcher.post(update_status, "正在从Liblib获取模型信息...")
                 
-                # 开发环境
-                return None
+                # 先直接请求网页解析，失败时才使用浏览器（浏览器池只启动一次 Firefox）
+                page_info, source = fetch_liblib_info(url, self.get_liblib_browser_pool(), replace_preview,
+                                                      session=self.liblib_session)
+                logging.debug(f"Liblib抓取方式：{source}")
+                
+                # 下载预览图（直接写入预览图文件）
+                preview_saved = None
+                img_url = page_info['image_url']
+                if replace_preview and img_url:
+                    self.ui_dispatcher.post(update_status, "正在获取预览图...")
+                    preview_saved = download_image(img_url, self.get_preview_save_path(file_name, relative_path),
+                                                   session=self.liblib_session, rate_limiter=self.download_limiter)
+                self.ui_dispatcher.post(on_fetched, page_info, preview_saved)
+            except PlaywrightTimeoutError:
+                self.ui_dispatcher.post(close_later, "等待页面加载超时...", "页面加载超时，请检查网络连接或稍后重试")
             except Exception as e:
-                logging.error(f"获取浏览器路径失败：{str(e)}")
-            return None     
+                logging.error(f"抓取信息时发生错误：{str(e)}")
+                self.ui_dispatcher.post(close_later, "发生错误...", f"抓取信息时发生错误：{str(e)}")
         
-        try:
-            update_status("正在从Liblib获取模型信息...")
+        def on_fetched(page_info, preview_saved):
+            # 用户可能已切换到其他模型，只填写到原来的模型
+            if self.current_file != model_file:
+                close_later("模型已切换...", "已切换到其他模型，抓取的信息未填写")
+                return
             
-            with sync_playwright() as p:
-                browser = None
-                browser_path = get_browser_path()
-                print(f"浏览器路径: {browser_path}")
-                try:
-                    # 启动浏览器时显式指定可执行文件路径
-                    browser = p.firefox.launch(
-                        headless=True,
-                        executable_path = browser_path # 指定浏览器路径
-                    )
-                    page = browser.new_page()
-                    
-                    # 访问页面
-                    page.goto(url)
-                    
-                    # 标记是否有任何内容被抓取
-                    content_found = False
-                    
-                    # 尝试获取预览图
-                    try:
-                        update_status("正在获取预览图...")
-                        if page.wait_for_selector(".ModelVersion_modelVersion__4cm1k .relative.cursor-pointer img", timeout=3000):
-                            img_element = page.query_selector(".ModelVersion_modelVersion__4cm1k .relative.cursor-pointer img")
-                            if img_element:
-                                img_url = img_element.get_attribute("src")
-                                if img_url:
-                                    # 检查是否已有预览图
-                                    file_name = os.path.basename(self.current_file)
-                                    relative_path = os.path.dirname(self.current_file)
-                                    has_preview = self.get_image_path(file_name, relative_path) is not None
-                                    
-                                    # 如果已有预览图，询问是否替换
-                                    replace_preview = True
-                                    if has_preview:
-                                        progress_window.withdraw()  # 暂时隐藏进度窗口
-                                        replace_preview = messagebox.askyesno("确认", "当前模型已有预览图，是否需要替换？")
-                                        progress_window.deiconify()  # 重新显示进度窗口
-                                    
-                                    if replace_preview:
-                                        headers = {
-                                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                                        }
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                                            img_response = requests.get(img_url, headers=headers)
-                                            if img_response.status_code == 200:
-                                                temp_file.write(img_response.content)
-                                                self.replace_preview_image(temp_file.name)
-                                                content_found = True
-                    except Exception as e:
-                        print(f"获取预览图失败：{str(e)}")
-                    
-                    # 尝试获取触发词
-                    try:
-                        update_status("正在获取触发词...")
-                        self.trigger_words.delete("1.0", tk.END)  # 先清空触发词
-                        if page.wait_for_selector(".ModelDetailCard_triggerTxt__cKZOL", timeout=1000):
-                            trigger_elements = page.query_selector_all(".ModelDetailCard_triggerTxt__cKZOL")
-                            if trigger_elements:
-                                trigger_words = [element.inner_text() for element in trigger_elements]
-                                if trigger_words:
-                                    self.trigger_words.insert("1.0", ", ".join(trigger_words))
-                                    content_found = True
-                    except Exception as e:
-                        print(f"获取触发词失败：{str(e)}")
-                    
-                    # 尝试获取描述
-                    try:
-                        update_status("正在获取模型描述...")
-                        if page.wait_for_selector('.ModelDescription_desc__EoTMz', timeout=1000):
-                            description_container = page.query_selector('.ModelDescription_desc__EoTMz')
-                            if description_container:
-                                # 获取所有文本节点，包括嵌套的
-                                description_lines = []
-                                
-                                # 使用 evaluate 在浏览器中执行 JavaScript 来获取所有文本内容
-                                script = """
-                                (element) => {
-                                    const texts = [];
-                                    const walk = (node) => {
-                                        if (node.nodeType === 3 && node.textContent.trim()) {  // 文本节点
-                                            texts.push(node.textContent.trim());
-                                        } else if (node.nodeType === 1) {  // 元素节点
-                                            if (node.tagName === 'BR') {
-                                                texts.push('');
-                                            }
-                                            for (const child of node.childNodes) {
-                                                walk(child);
-                                            }
-                                            if (['P', 'DIV', 'LI'].includes(node.tagName)) {
-                                                texts.push('');
-                                            }
-                                        }
-                                    };
-                                    walk(element);
-                                    return texts.filter(text => text !== '');
-                                }
-                                """
-                                description_lines = description_container.evaluate(script)
-                                
-                                if description_lines:
-                                    # 将抓取的内容添加到模型描述中
-                                    current_desc = self.model_desc.get("1.0", tk.END).strip()
-                                    liblib_marker = "=== 从Liblib抓取的描述 ==="
-                                    civitai_marker = "=== 从Civitai抓取的描述 ==="
-                                    
-                                    if current_desc=="":
-                                        new_desc = liblib_marker + "\n" + "\n\n".join(description_lines)
-                                    else:
-                                        # 分割现有描述
-                                        parts = current_desc.split(liblib_marker)
-                                        if len(parts) > 1:
-                                            # 已存在Liblib描述，更新它
-                                            user_desc = parts[0].strip()
-                                            if user_desc=="":
-                                                new_desc = liblib_marker + "\n" + "\n\n".join(description_lines)
-                                            else:
-                                                new_desc = user_desc + "\n\n" + liblib_marker + "\n" + "\n\n".join(description_lines)
-                                        else:
-                                            # 检查是否存在Civitai描述
-                                            parts = current_desc.split(civitai_marker)
-                                            if len(parts) > 1:
-                                                # 存在Civitai描述，在其后添加Liblib描述
-                                                user_desc = parts[0].strip()
-                                                new_desc = user_desc + "\n\n" + civitai_marker + parts[1] + "\n\n" + liblib_marker  +"\n" +  "\n\n".join(description_lines)
-                                            else:
-                                                # 没有任何抓取的描述，直接添加
-                                                if current_desc=="":
-                                                    new_desc = liblib_marker +"\n" +  "\n\n".join(description_lines)
-                                                else:   
-                                                    new_desc = current_desc + "\n\n" + liblib_marker +"\n" +  "\n\n".join(description_lines)
-                                        
-                                    self.model_desc.delete("1.0", tk.END)
-                                    self.model_desc.insert("1.0", new_desc)
-                                    content_found = True
-                    except Exception as e:
-                        print(f"获取描述失败：{str(e)}")
-                    
-                    # 检查是否有任何内容被抓取
-                    if not content_found:
-                        update_status("未找到任何模型信息...")
-                        progress_window.after(1000, progress_window.destroy)
-                        self.show_popup_message("在Liblib上未找到此模型的任何信息")
-                        return
-                    
-                    # 自动保存更改
-                    self.auto_save_changes()
-                    
-                    # 显示成功消息
-                    progress_window.destroy()
-                    self.show_popup_message("信息抓取成功")
-                    
-                except Exception as e:                    
-                    if "TimeoutError" in str(e):
-                        update_status("等待页面加载超时...")
-                        progress_window.after(1000, progress_window.destroy)
-                        self.show_popup_message("页面加载超时，请检查网络连接或稍后重试")
-                    else:
-                        raise e
-                finally:
-                    browser.close()
-                    
-        except Exception as e:
-            progress_window.destroy()
-            self.show_popup_message(f"抓取信息时发生错误：{str(e)}")
-            print(f"抓取信息时发生错误：{str(e)}")
-        finally:
+            # 标记是否有任何内容被抓取
+            content_found = False
+            
+            if preview_saved:
+                self.refresh_current_preview()
+                content_found = True
+            elif preview_saved is not None:
+                self.show_popup_message("从URL下载图片失败")
+            
+            # 填写触发词
+            self.trigger_words.delete("1.0", tk.END)  # 先清空触发词
+            if page_info['trigger_words']:
+                self.trigger_words.insert("1.0", ", ".join(page_info['trigger_words']))
+                content_found = True
+            
+            # 填写描述
+            description_lines = page_info['description_lines']
+            if description_lines:
+                current_desc = self.model_desc.get("1.0", tk.END).strip()
+                new_desc = self.merge_fetched_description(current_desc, "\n\n".join(description_lines),
+                                                          "=== 从Liblib抓取的描述 ===", "=== 从Civitai抓取的描述 ===")
+                self.model_desc.delete("1.0", tk.END)
+                self.model_desc.insert("1.0", new_desc)
+                content_found = True
+            
+            # 检查是否有任何内容被抓取
+            if not content_found:
+                close_later("未找到任何模型信息...", "在Liblib上未找到此模型的任何信息")
+                return
+            
+            # 自动保存更改
+            self.auto_save_changes()
+            
+            # 显示成功消息
             progress_window.destroy()
-
-    def fetch_from_civitai(self):
-        """从Civitai抓取模型信息"""
-        if not self.current_file:
-            self.show_popup_message("请先选择一个模型文件")
-            return
+            self.show_popup_message("信息抓取成功")
         
-        # 创建进度提示框
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def create_fetch_progress_window(self, title):
+        """
+        创建抓取信息的进度提示框（在主线程中调用）
+        Returns:
+            tuple: (进度窗口, update_status(文字))；update_status 只能在主线程中调用，后台线程通过 ui_dispatcher 转交
+        """
         progress_window = tk.Toplevel(self.master)
-        progress_window.title("从Civitai抓取")
+        progress_window.title(title)
         progress_window.geometry("400x150")
         progress_window.transient(self.master)
         progress_window.grab_set()
@@ -4849,227 +5087,187 @@ https://pan.quark.cn/s/75450b122a53"""
         progress_bar.start(10)
         
         def update_status(text):
-            status_label.config(text=text)
-            progress_window.update()
+            # 进度窗口可能已被关闭
+            if progress_window.winfo_exists():
+                status_label.config(text=text)
         
-        try:
-            # 检查预览图
-            file_name = os.path.basename(self.current_file)
-            relative_path = os.path.dirname(self.current_file)
-            has_preview = self.get_image_path(file_name, relative_path) is not None
-            
-            # 如果已有预览图，询问是否替换
-            replace_preview = True
-            if has_preview:
-                progress_window.withdraw()  # 暂时隐藏进度窗口
-                replace_preview = messagebox.askyesno("确认", "当前模型已有预览图，是否需要替换？")
-                progress_window.deiconify()  # 重新显示进度窗口
-            
-            # 获取哈希值
-            update_status("正在获取模型哈希值...")
-            hash_value = self.model_hash.get()
-            if not hash_value:
-                full_path = os.path.join(BASE_PATH, self.current_file)
-                file_size = os.path.getsize(full_path)
-                
-                # 使用 SHA-256 算法
-                sha256_hash = hashlib.sha256()
-                
-                # 已读取的字节数
-                bytes_read = 0
-                last_update_time = time.time()
-                update_interval = 0.1  # 每0.1秒更新一次界面
-                
-                # 以二进制模式读取文件
-                with open(full_path, "rb") as f:
-                    while True:
-                        # 读取数据块
-                        chunk = f.read(8192)
-                        if not chunk:
-                            break
-                            
-                        sha256_hash.update(chunk)
-                        bytes_read += len(chunk)
-                        
-                        # 更新进度
+        return progress_window, update_status
+
+    def merge_fetched_description(self, current_desc, text, marker, other_marker):
+        """
+        把抓取的描述合并到模型描述中
+        已有同一来源的描述时替换它，已有另一来源的描述时保留并追加在其后，用户自己写的内容始终保留在最前面
+        """
+        if current_desc == "":
+            return marker + "\n" + text
+        
+        # 分割现有描述
+        parts = current_desc.split(marker)
+        if len(parts) > 1:
+            # 已存在同一来源的描述，更新它
+            user_desc = parts[0].strip()
+            if user_desc == "":
+                return marker + "\n" + text
+            return user_desc + "\n\n" + marker + "\n" + text
+        
+        # 存在另一来源的描述，在其后添加
+        parts = current_desc.split(other_marker)
+        if len(parts) > 1:
+            user_desc = parts[0].strip()
+            return user_desc + "\n\n" + other_marker + parts[1] + "\n\n" + marker + "\n" + text
+        
+        # 没有任何抓取的描述，直接添加
+        return current_desc + "\n\n" + marker + "\n" + text
+
+    def fetch_from_civitai(self):
+        """从Civitai抓取模型信息（计算哈希值和网络请求在后台线程中进行，结果交给主线程填写）"""
+        if not self.current_file:
+            self.show_popup_message("请先选择一个模型文件")
+            return
+        
+        model_file = self.current_file
+        file_name = os.path.basename(model_file)
+        relative_path = os.path.dirname(model_file)
+        
+        # 如果已有预览图，先询问是否替换（后台线程中不能弹出对话框）
+        replace_preview = True
+        if self.get_image_path(file_name, relative_path) is not None:
+            replace_preview = messagebox.askyesno("确认", "当前模型已有预览图，是否需要替换？")
+        
+        progress_window, update_status = self.create_fetch_progress_window("从Civitai抓取")
+        
+        def close_later(status_text, message):
+            update_status(status_text)
+            progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
+            self.show_popup_message(message)
+        
+        def fetch():
+            try:
+                # 获取哈希值
+                self.ui_dispatcher.post(update_status, "正在获取模型哈希值...")
+                full_path = os.path.join(BASE_PATH, model_file)
+                # 哈希缓存会校验文件是否被替换，已保存的哈希值失效时重新计算
+                hash_value = self.hash_cache.lookup(full_path)
+                if not hash_value:
+                    last_update_time = [time.time()]
+                    update_interval = 0.1  # 每0.1秒更新一次界面
+                    
+                    def on_progress(bytes_read, file_size):
                         current_time = time.time()
-                        if current_time - last_update_time >= update_interval:
+                        if current_time - last_update_time[0] >= update_interval:
                             progress = (bytes_read / file_size) * 100
-                            update_status(f"正在计算哈希值... {progress:.1f}%")
-                            last_update_time = current_time
+                            self.ui_dispatcher.post(update_status, f"正在计算哈希值... {progress:.1f}%")
+                            last_update_time[0] = current_time
+                    
+                    hash_value = self.hash_cache.get_or_compute(full_path, progress_callback=on_progress)
+                    if not hash_value:
+                        raise Exception("无法计算模型哈希值")
                 
-                hash_value = sha256_hash.hexdigest()
-                if not hash_value:
-                    raise Exception("无法计算模型哈希值")
+                # 使用API获取信息
+                self.ui_dispatcher.post(update_status, "正在从Civitai获取模型信息...")
+                api_url = f"https://civitai.com/api/v1/model-versions/by-hash/{hash_value}"
+                headers = {
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                }
                 
-                self.model_hash.configure(state='normal')
-                self.model_hash.delete(0, tk.END)
-                self.model_hash.insert(0, hash_value)
-                self.model_hash.configure(state='readonly')
-            
-            # 使用API获取信息
-            update_status("正在从Civitai获取模型信息...")
-            api_url = f"https://civitai.com/api/v1/model-versions/by-hash/{hash_value}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            try:
-                response = requests.get(api_url, headers=headers, timeout=30)  # 添加超时设置
+                # 使用共享连接池的客户端，429/5xx 时自动退避重试
+                self.civitai_client.reset()
+                response = self.civitai_client.get(api_url, headers=headers, timeout=30)  # 添加超时设置
                 
-                if response.status_code == 404:
-                    update_status("未找到模型信息...")
-                    progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                    self.show_popup_message("在Civitai上未找到此模型")
+                if response.status_code != 200:
+                    if response.status_code == 404:
+                        self.ui_dispatcher.post(close_later, "未找到模型信息...", "在Civitai上未找到此模型")
+                    else:
+                        self.ui_dispatcher.post(close_later, f"请求失败: {response.status_code}",
+                                                f"API请求失败：{response.status_code}")
                     return
-                    
-                elif response.status_code == 200:
-                    data = response.json()
-                    if not data or not isinstance(data, dict):
-                        update_status("未找到模型信息...")
-                        progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                        self.show_popup_message("在Civitai上未找到此模型")
-                        return
-                    
-                    # 获取模型URL
-                    model_id = data.get('modelId')
-                    version_id = data.get('id')
-                    if not model_id or not version_id:
-                        update_status("未找到模型信息...")
-                        progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                        self.show_popup_message("在Civitai上未找到此模型")
-                        return
-                    
-                    model_url = f"https://civitai.com/models/{model_id}?modelVersionId={version_id}"
-                    self.model_url.delete("1.0", tk.END)
-                    self.model_url.insert("1.0", model_url)
-                    
-                    update_status("正在获取预览图和模型信息...")
-                    # 如果用户同意替换预览图，且有可用的预览图
-                    if replace_preview and 'images' in data and len(data['images']) > 0:
-                        image_url = data['images'][0].get('url')
-                        print(image_url)
-                        if image_url:
-                            # 下载并设置预览图
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                                img_response = requests.get(image_url, headers=headers)
-                                temp_file.write(img_response.content)
-                                self.replace_preview_image(temp_file.name)
                 
-                    # 获取触发词
-                    if 'trainedWords' in data:
-                        trigger_words = ", ".join(data['trainedWords'])
-                        self.trigger_words.delete("1.0", tk.END)
-                        self.trigger_words.insert("1.0", trigger_words)
-                    
-                    update_status("正在获取模型描述...")
-                    # 使用 json-ld 获取描述
-                    try:
-                        # 发送请求获取页面内容
-                        page_response = requests.get(model_url, headers=headers, timeout=30)
-                        if page_response.status_code == 200:
-                            soup = BeautifulSoup(page_response.text, 'html.parser')
-                            
-                            # 查找 json-ld 脚本
-                            json_script = soup.find('script', type='application/ld+json')
-                            if json_script:
-                                json_data = json.loads(json_script.string)
-                                description = json_data.get('description', '')
-                                if description:
-                                    # 解析HTML并保持原始格式
-                                    desc_soup = BeautifulSoup(description, 'html.parser')
-                                    
-                                    # 获取所有文本，保持段落结构
-                                    description_lines = []
-                                    for element in desc_soup.descendants:
-                                        if isinstance(element, NavigableString):
-                                            text = element.strip()
-                                            if text:
-                                                description_lines.append(text)
-                                        elif element.name in ['p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                                            description_lines.append('')  # 添加空行作为段落分隔
-                                    
-                                    # 清理连续的空行
-                                    clean_description = []
-                                    prev_empty = False
-                                    for line in description_lines:
-                                        if line:
-                                            clean_description.append(line)
-                                            prev_empty = False
-                                        elif not prev_empty:
-                                            clean_description.append(line)
-                                            prev_empty = True
-                                    
-                                    # 合并文本
-                                    formatted_description = '\n'.join(clean_description).strip()
-                                    
-                                    if formatted_description:
-                                        # 将抓取的内容添加到模型描述中
-                                        current_desc = self.model_desc.get("1.0", tk.END).strip()
-                                        civitai_marker = "=== 从Civitai抓取的描述 ==="
-                                        liblib_marker = "=== 从Liblib抓取的描述 ==="
-                                        
-                                        if current_desc=="":
-                                            new_desc = civitai_marker + "\n" + formatted_description
-                                        else:
-                                            # 分割现有描述
-                                            parts = current_desc.split(civitai_marker)
-                                            if len(parts) > 1:
-                                                # 已存在Civitai描述，更新它
-                                                user_desc = parts[0].strip()
-                                                if user_desc=="":
-                                                    new_desc = civitai_marker + "\n" + formatted_description
-                                                else:   
-                                                    new_desc = user_desc + "\n\n" + civitai_marker + "\n" + formatted_description
-                                            else:
-                                                # 检查是否存在Liblib描述
-                                                parts = current_desc.split(liblib_marker)
-                                                if len(parts) > 1:
-                                                    # 存在Liblib描述，在其后添加Civitai描述
-                                                    user_desc = parts[0].strip()
-                                                    new_desc = user_desc + "\n\n" + liblib_marker + parts[1] + "\n\n" + civitai_marker + "\n" + formatted_description
-                                                else:
-                                                    # 没有任何抓取的描述，直接添加
-                                                    if current_desc=="":
-                                                        new_desc = civitai_marker + "\n" + formatted_description
-                                                    else:
-                                                        new_desc = current_desc + "\n\n" + civitai_marker + "\n" + formatted_description
-                                        
-                                        self.model_desc.delete("1.0", tk.END)
-                                        self.model_desc.insert("1.0", new_desc)
-                    except Exception as e:
-                        print(f"获取描述失败：{str(e)}")
-                    
-                    # 自动保存更改
-                    self.auto_save_changes()
-                    
-                    progress_window.destroy()
-                    self.show_popup_message("信息抓取成功")
-                else:
-                    update_status(f"请求失败: {response.status_code}")
-                    progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                    self.show_popup_message(f"API请求失败：{response.status_code}")
+                data = response.json()
+                model_id = data.get('modelId') if isinstance(data, dict) else None
+                version_id = data.get('id') if isinstance(data, dict) else None
+                if not model_id or not version_id:
+                    self.ui_dispatcher.post(close_later, "未找到模型信息...", "在Civitai上未找到此模型")
                     return
                 
+                result = {
+                    'hash': hash_value,
+                    'url': f"https://civitai.com/models/{model_id}?modelVersionId={version_id}",
+                    'preview_saved': None,
+                    'trigger_words': ", ".join(data['trainedWords']) if 'trainedWords' in data else None,
+                    'description': ''
+                }
+                
+                # 如果用户同意替换预览图，且有可用的预览图
+                self.ui_dispatcher.post(update_status, "正在获取预览图和模型信息...")
+                if replace_preview and 'images' in data and len(data['images']) > 0:
+                    image_url = data['images'][0].get('url')
+                    if image_url:
+                        # 通过 Civitai 客户端下载（共用连接池和退避重试）
+                        result['preview_saved'] = download_image(
+                            image_url, self.get_preview_save_path(file_name, relative_path),
+                            session=self.civitai_client, rate_limiter=self.download_limiter)
+                
+                # 使用 json-ld 获取描述
+                self.ui_dispatcher.post(update_status, "正在获取模型描述...")
+                try:
+                    page_response = self.civitai_client.get(result['url'], headers=headers, timeout=30)
+                    if page_response.status_code == 200:
+                        result['description'] = self.parse_civitai_description(page_response.text)
+                except Exception as e:
+                    logging.error(f"获取描述失败：{str(e)}")
+                
+                self.ui_dispatcher.post(on_fetched, result)
             except requests.exceptions.Timeout:
-                update_status("请求超时...")
-                progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                self.show_popup_message("请求超时，请检查网络连接")
-                return
+                self.ui_dispatcher.post(close_later, "请求超时...", "请求超时，请检查网络连接")
             except requests.exceptions.RequestException as e:
-                update_status("网络请求失败...")
-                progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-                self.show_popup_message(f"网络请求失败：{str(e)}")
+                self.ui_dispatcher.post(close_later, "网络请求失败...", f"网络请求失败：{str(e)}")
+            except Exception as e:
+                logging.error(f"抓取信息时发生错误：{str(e)}")
+                self.ui_dispatcher.post(close_later, "发生错误...", f"抓取信息时发生错误：{str(e)}")
+        
+        def on_fetched(result):
+            # 用户可能已切换到其他模型，只填写到原来的模型
+            if self.current_file != model_file:
+                close_later("模型已切换...", "已切换到其他模型，抓取的信息未填写")
                 return
             
-        except Exception as e:
-            update_status("发生错误...")
-            progress_window.after(1000, progress_window.destroy)  # 延迟关闭窗口
-            self.show_popup_message(f"抓取信息时发生错误：{str(e)}")
-            return
+            if result['hash'] != self.model_hash.get():
+                self.model_hash.configure(state='normal')
+                self.model_hash.delete(0, tk.END)
+                self.model_hash.insert(0, result['hash'])
+                self.model_hash.configure(state='readonly')
+            
+            self.model_url.delete("1.0", tk.END)
+            self.model_url.insert("1.0", result['url'])
+            
+            if result['preview_saved']:
+                self.refresh_current_preview()
+            elif result['preview_saved'] is not None:
+                self.show_popup_message("从URL下载图片失败")
+            
+            # 填写触发词
+            if result['trigger_words'] is not None:
+                self.trigger_words.delete("1.0", tk.END)
+                self.trigger_words.insert("1.0", result['trigger_words'])
+            
+            # 将抓取的描述添加到模型描述中
+            if result['description']:
+                current_desc = self.model_desc.get("1.0", tk.END).strip()
+                new_desc = self.merge_fetched_description(current_desc, result['description'],
+                                                          "=== 从Civitai抓取的描述 ===", "=== 从Liblib抓取的描述 ===")
+                self.model_desc.delete("1.0", tk.END)
+                self.model_desc.insert("1.0", new_desc)
+            
+            # 自动保存更改
+            self.auto_save_changes()
+            
+            progress_window.destroy()
+            self.show_popup_message("信息抓取成功")
+        
+        threading.Thread(target=fetch, daemon=True).start()
 
     def move_model(self):
-        """移动模型及其相关文件"""
+        """移动模型及其相关文件（选中多个模型时批量移动）"""
         if not self.current_file:
             self.show_popup_message("请先选择一个模型文件")
             return
@@ -5083,93 +5281,211 @@ https://pan.quark.cn/s/75450b122a53"""
         if not target_dir:
             return
         
+        if len(self.selected_files) > 1:
+            self.batch_move_models(target_dir)
+            return
+        
         try:
-            # 检查目标路径是否在程序路径内的子目录
-            try:
-                relative_path = os.path.relpath(target_dir, BASE_PATH)
-                # 检查是否为程序路径下的子目录
-                is_sub_directory = not (relative_path == '.' or relative_path.startswith('..'))
-            except ValueError:  # 在不同驱动器的情况
-                is_sub_directory = False
-            
-            # 获取当前模型文件的路径信息
-            model_dir = os.path.dirname(current_path)
             model_name = os.path.basename(current_path)
-            model_basename = os.path.splitext(model_name)[0]
+            
+            # 列出所有相关文件（模型、所有预览图、同名json、CS配置文件夹）
+            transaction = plan_model_transfer(OP_MOVE, BASE_PATH, current_path, target_dir,
+                                              self.supported_image_extensions)
             
             # 确认是否要移动，并提示是否会更新JSON
             confirm_message = f"是否要将模型 {model_name} 及相关文件移动到:\n{target_dir}"
-            if not is_sub_directory:
+            if not transaction.catalog_new:
                 confirm_message += "\n\n注意：移动到此位置将不会更新模型信息"
             
             if not messagebox.askyesno("确认", confirm_message):
                 return
-            # 检查并移动同名json文件
-            json_path = os.path.join(model_dir, f"{model_basename}.json")
-            new_json_path = os.path.join(target_dir, f"{model_basename}.json")
-            
-            # 移动模型文件
-            new_model_path = os.path.join(target_dir, model_name)
-            shutil.move(current_path, new_model_path)
-            
-            # 如果存在json文件，也移动它
-            if os.path.exists(json_path):
-                shutil.move(json_path, new_json_path)
-            
-            # 移动预览图（如果存在）
-            for ext in self.supported_image_extensions:
-                preview_name = model_basename + ext
-                preview_path = os.path.join(model_dir, preview_name)
-                if os.path.exists(preview_path):
-                    new_preview_path = os.path.join(target_dir, preview_name)
-                    shutil.move(preview_path, new_preview_path)
-                    break
-            
-            # 移动适配CS生成的配置文件夹（如果存在）
-            cs_folder = os.path.join(model_dir, model_basename)
-            if os.path.exists(cs_folder) and os.path.isdir(cs_folder):
-                new_cs_folder = os.path.join(target_dir, model_basename)
-                shutil.move(cs_folder, new_cs_folder)
-            
-            # 只有当移动到程序路径下的子目录时才更新 json
-            if is_sub_directory:
-                info_file = 'model_info.json'
-                if os.path.exists(info_file):
-                    with open(info_file, 'r', encoding='utf-8') as f:
-                        all_info = json.load(f)
-                    
-                    # 获取当前模型的相对路径
-                    old_relative_path = self.current_file
-                    
-                    # 计算新的相对路径
-                    new_relative_path = os.path.relpath(new_model_path, BASE_PATH)
-                    
-                    # 如果有模型信息，更新路径
-                    if old_relative_path in all_info:
-                        # 保存模型信息，包括收藏状态
-                        model_info = all_info.pop(old_relative_path)
-                        all_info[new_relative_path] = model_info
-                        
-                        # 更新收藏集合
-                        if model_info.get('is_favorite', False):
-                            self.favorites.remove(old_relative_path)
-                            self.favorites.add(new_relative_path)
-                        
-                        # 保存更新后的信息
-                        with open(info_file, 'w', encoding='utf-8') as f:
-                            json.dump(all_info, f, ensure_ascii=False, indent=2)
-            
+        except Exception as e:
+            self.show_popup_message(f"移动模型时发生错误：{str(e)}")
+            return
+        
+        def on_moved(transaction):
             # 刷新文件列表
             self.refresh_files()
             
             # 根据是否更新了json给出不同的提示
-            if is_sub_directory:
+            if transaction.catalog_new:
                 self.show_popup_message("模型移动成功，并已更新信息")
             else:
                 self.show_popup_message("模型移动成功，但未更新信息（目标路径不在程序目录下）")
+        
+        self.run_model_transfer("移动模型", transaction, on_moved)
+
+    def batch_move_models(self, target_dir=None):
+        """批量移动模型及相关文件（在后台任务队列中运行）"""
+        if target_dir is None:
+            target_dir = filedialog.askdirectory(title="选择要移动到的文件夹", initialdir=BASE_PATH)
+            if not target_dir:
+                return
+        
+        message = f"是否要将以下范围内的模型及相关文件移动到:\n{target_dir}"
+        if get_catalog_key(BASE_PATH, os.path.join(target_dir, '_')) is None:
+            message += "\n\n注意：移动到此位置将不会更新模型信息"
+        self.choose_batch_scope('move', message,
+                                lambda models: self.submit_batch_job('move', models, {'target_dir': target_dir}))
+
+    def apply_model_transfer(self, transaction, reverse=False):
+        """
+        移动或复制模型后更新模型信息和各缓存（可在任意线程调用，重复调用结果不变）
+        Args:
+            reverse: 撤销事务时恢复原来的记录
+        """
+        old_path, new_path = transaction.catalog_old, transaction.catalog_new
+        info_file = 'model_info.json'
+        with self.model_info_lock:
+            all_info = {}
+            if os.path.exists(info_file):
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    all_info = json.load(f)
+            before = json.dumps(all_info, sort_keys=True)
+            
+            if transaction.op == OP_MOVE:
+                if reverse:
+                    old_path, new_path = new_path, old_path
+                # 同步更新哈希缓存，文件头缓存在下次扫描时重新读取
+                self.hash_cache.rename(old_path, new_path)
+                self.hash_cache.save()
+                self.header_cache.discard(old_path)
+                self.tag_index.rename(old_path, new_path)
+                self.tag_index.save()
+                
+                # 保存模型信息，包括收藏状态，并更新链接记录
+                if old_path in all_info and new_path not in all_info:
+                    all_info[new_path] = all_info.pop(old_path)
+                    rename_link_records(all_info, {old_path: new_path})
+            elif reverse:
+                all_info.pop(new_path, None)
+            elif new_path not in all_info and (old_path in all_info or transaction.link_type):
+                # 复制模型信息，但重置收藏状态
+                model_info = dict(all_info.get(old_path, {}))
+                model_info['is_favorite'] = False
+                for field in LINK_FIELDS:
+                    model_info.pop(field, None)
+                if transaction.link_type:
+                    # 记录链接关系，查找重复和统计大小时不重复计算
+                    model_info['linked_from'] = old_path
+                    model_info['link_type'] = transaction.link_type
+                all_info[new_path] = model_info
+            
+            if json.dumps(all_info, sort_keys=True) != before:
+                with open(info_file, 'w', encoding='utf-8') as f:
+                    json.dump(all_info, f, ensure_ascii=False, indent=2)
             
-        except Exception as e:
-            self.show_popup_message(f"移动模型时发生错误：{str(e)}")
+            favorites = {path for path, info in all_info.items() if isinstance(info, dict) and info.get('is_favorite', False)}
+            self.ui_dispatcher.post(self.set_catalog_state, favorites, get_link_records(all_info))
+
+    def recover_file_transactions(self):
+        """处理上次意外退出时未完成的移动或复制"""
+        rolled_back, resumed = recover_transactions(self.apply_model_transfer)
+        for transaction in rolled_back:
+            logging.info(f"已撤销未完成的文件操作：{transaction.steps[0]['source']}")
+        for transaction in resumed:
+            logging.info(f"已完成上次未完成的文件操作：{transaction.model_target}")
+        if rolled_back or resumed:
+            self.master.after(1000, lambda: self.show_popup_message(
+                f"已恢复 {len(rolled_back) + len(resumed)} 个未完成的文件操作"))
+
+    def run_model_transfer(self, title, transaction, on_finished, copy_mode=COPY_MODE_COPY):
+        """
+        在后台线程中执行移动或复制，显示进度；出错或取消时撤销已完成的步骤
+        Args:
+            on_finished: on_finished(事务)，成功后在主线程中调用
+        """
+        source_path = transaction.steps[0]['source']
+        verify_hash = self.get_saved_copy_verify()
+        
+        # 创建进度提示框
+        progress_window = tk.Toplevel(self.master)
+        progress_window.title(title)
+        progress_window.geometry("400x150")
+        progress_window.transient(self.master)
+        progress_window.grab_set()
+        
+        # 居中显示
+        progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
+                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
+        
+        # 创建主框架
+        main_frame = ttk.Frame(progress_window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # 创建状态标签
+        status_label = ttk.Label(main_frame, text=f"准备{title}...", wraplength=380)
+        status_label.pack(pady=(0, 10))
+        
+        # 创建进度条
+        progress_bar = ttk.Progressbar(
+            main_frame,
+            mode='determinate',
+            style='primary.Horizontal.TProgressbar'
+        )
+        progress_bar.pack(fill=tk.X, pady=(0, 10))
+        
+        # 取消标志
+        cancel_flag = {'value': False}
+        
+        def cancel_transfer():
+            cancel_flag['value'] = True
+            cancel_btn.configure(state='disabled')
+            status_label.config(text="正在取消...")
+        
+        cancel_btn = ttk.Button(
+            main_frame,
+            text="取消",
+            command=cancel_transfer,
+            width=10,
+            style='primary.TButton'
+        )
+        cancel_btn.pack(side=tk.BOTTOM)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel_transfer)
+        
+        def show_progress(done_size, total_size):
+            if not progress_window.winfo_exists() or cancel_flag['value']:
+                return
+            progress_bar['value'] = (done_size / total_size) * 100 if total_size else 100
+            status_label.config(text=f"正在{title}... {done_size/1024/1024:.1f}MB / {total_size/1024/1024:.1f}MB")
+        
+        def on_progress(done_size, total_size):
+            # 在工作线程中调用，交给主线程更新界面
+            self.ui_dispatcher.post(show_progress, done_size, total_size)
+        
+        def transfer():
+            try:
+                transaction.execute(
+                    apply_catalog=self.apply_model_transfer,
+                    progress_callback=on_progress,
+                    cancel_check=lambda: cancel_flag['value'],
+                    copy_mode=copy_mode,
+                    verify_hash=verify_hash,
+                    expected_hash=self.hash_cache.lookup(source_path),
+                    io_throttle=self.io_scheduler.bulk_throttle
+                )
+                self.ui_dispatcher.post(on_done)
+            except CopyCancelled:
+                self.ui_dispatcher.post(on_cancelled)
+            except Exception as e:
+                logging.error(f"{title}时发生错误：{str(e)}")
+                self.ui_dispatcher.post(on_error, str(e))
+        
+        def on_done():
+            progress_window.destroy()
+            on_finished(transaction)
+        
+        def on_cancelled():
+            progress_window.destroy()
+            self.refresh_files()
+            self.show_popup_message(f"已取消{title}")
+        
+        def on_error(message):
+            progress_window.destroy()
+            self.refresh_files()
+            self.show_popup_message(f"{title}时发生错误：{message}")
+        
+        threading.Thread(target=transfer, daemon=True).start()
 
     def on_canvas_configure(self, event):
         """处理画布大小变化"""
@@ -5393,137 +5709,121 @@ https://pan.quark.cn/s/75450b122a53"""
             menu.grab_release()
 
     def copy_model(self):
-        """复制模型及相关文件"""
+        """复制模型及相关文件（在后台线程中复制，模型文件只读写一次）"""
         if not self.current_file:
             self.show_popup_message("请先选择一个模型文件")
             return
         
-        # 创建进度提示框
-        progress_window = tk.Toplevel(self.master)
-        progress_window.title("复制模型")
-        progress_window.geometry("400x150")
-        progress_window.transient(self.master)
-        progress_window.grab_set()
+        # 获取源文件路径信息
+        model_file = self.current_file
+        source_path = os.path.join(BASE_PATH, model_file)
+        source_dir = os.path.dirname(source_path)
+        model_name = os.path.basename(source_path)
+        model_basename, model_ext = os.path.splitext(model_name)
         
-        # 居中显示
-        progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
+        # 获取目标路径,并使用当前目录作为初始目录
+        target_dir = filedialog.askdirectory(title="选择要复制到的文件夹", initialdir=source_dir)
+        if not target_dir:
+            return
         
-        # 创建主框架
-        main_frame = ttk.Frame(progress_window)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # 检查目标文件是否存在，如果存在则重命名
+        target_path = os.path.join(target_dir, model_name)
+        counter = 1
+        while os.path.exists(target_path):
+            new_basename = f"{model_basename}(副本){counter if counter > 1 else ''}"
+            target_path = os.path.join(target_dir, new_basename + model_ext)
+            counter += 1
+        
+        # 同一文件系统内可以选择创建链接副本
+        if same_filesystem(source_path, target_dir) and get_link_modes():
+            self.choose_copy_mode(lambda mode: self.start_model_copy(model_file, target_path, mode))
+        else:
+            self.start_model_copy(model_file, target_path, COPY_MODE_COPY)
+    
+    def choose_copy_mode(self, on_confirm):
+        """
+        选择复制方式（完整复制、写时复制或硬链接）
+        Args:
+            on_confirm: on_confirm(复制模式)，确认后调用
+        """
+        dialog = tk.Toplevel(self.master)
+        dialog.title("复制方式")
+        dialog.transient(self.master)
+        dialog.grab_set()
         
-        # 创建状态标签
-        status_label = ttk.Label(main_frame, text="准备复制...", wraplength=380)
-        status_label.pack(pady=(0, 10))
+        # 居中显示对话框
+        dialog.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
+                        f"{self.master.winfo_y() + self.master.winfo_height()//2 - 100}")
         
-        # 创建进度条
-        progress_bar = ttk.Progressbar(
+        main_frame = ttk.Frame(dialog)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        ttk.Label(
             main_frame,
-            mode='determinate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
+            text="目标文件夹与模型在同一磁盘，可以创建不占用额外空间的副本\n"
+                 "写时复制的副本可以单独修改；硬链接的副本与原文件是同一个文件",
+            wraplength=380,
+            justify=tk.LEFT
+        ).pack(anchor='w', pady=(0, 10))
+        
+        # 默认使用写时复制（不支持时自动改为完整复制）
+        modes = get_link_modes() + [COPY_MODE_COPY]
+        mode_var = tk.StringVar(value=modes[0])
+        for mode in modes:
+            ttk.Radiobutton(
+                main_frame,
+                text=COPY_MODE_NAMES[mode],
+                variable=mode_var,
+                value=mode
+            ).pack(anchor='w', pady=2)
         
-        def update_status(text, progress=None):
-            status_label.config(text=text)
-            if progress is not None:
-                progress_bar['value'] = progress
-            progress_window.update()
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
         
+        def confirm():
+            mode = mode_var.get()
+            dialog.destroy()
+            on_confirm(mode)
+        
+        ttk.Button(
+            button_frame,
+            text="取消",
+            command=dialog.destroy,
+            style='primary.TButton',
+            width=10
+        ).pack(side=tk.RIGHT, padx=(5, 0))
+        
+        ttk.Button(
+            button_frame,
+            text="确认",
+            command=confirm,
+            style='primary.TButton',
+            width=10
+        ).pack(side=tk.RIGHT)
+    
+    def start_model_copy(self, model_file, target_path, mode):
+        """复制模型及所有相关文件（出错或取消时删除已复制的文件）"""
+        source_path = os.path.join(BASE_PATH, model_file)
+        target_dir = os.path.dirname(target_path)
+        new_model_basename = os.path.splitext(os.path.basename(target_path))[0]
         try:
-            # 获取源文件路径信息
-            source_path = os.path.join(BASE_PATH, self.current_file)
-            source_dir = os.path.dirname(source_path)
-            model_name = os.path.basename(source_path)
-            model_basename, model_ext = os.path.splitext(model_name)
-            
-            # 获取目标路径,并使用当前目录作为初始目录
-            target_dir = filedialog.askdirectory(title="选择要复制到的文件夹", initialdir=source_dir)
-            if not target_dir:
-                progress_window.destroy()
-                return
-            
-            # 检查目标文件是否存在，如果存在则重命名
-            target_path = os.path.join(target_dir, model_name)
-            counter = 1
-            while os.path.exists(target_path):
-                new_basename = f"{model_basename}(副本){counter if counter > 1 else ''}"
-                target_path = os.path.join(target_dir, new_basename + model_ext)
-                counter += 1
-            
-            new_model_basename = os.path.splitext(os.path.basename(target_path))[0]
-            
-            # 复制模型文件
-            update_status("正在复制模型文件...", 0)
-            total_size = os.path.getsize(source_path)
-            copied_size = 0
-            shutil.copy2(source_path, target_path)
-            
-            with open(source_path, 'rb') as fsrc, open(target_path, 'wb') as fdst:
-                while True:
-                    buf = fsrc.read(10 * 1024 * 1024)  # 每次读取10MB
-                    if not buf:
-                        break
-                    fdst.write(buf)
-                    copied_size += len(buf)
-                    progress = (copied_size / total_size) * 80  # 模型文件占总进度的80%
-                    update_status(f"正在复制模型文件... {copied_size/1024/1024:.1f}MB / {total_size/1024/1024:.1f}MB", progress)
-            
-            # 复制同名json文件（如果存在）
-            json_path = os.path.join(source_dir, f"{model_basename}.json")
-            if os.path.exists(json_path):
-                new_json_path = os.path.join(target_dir, f"{new_model_basename}.json")
-                shutil.copy2(json_path, new_json_path)
-            
-            # 复制预览图（如果存在）
-            update_status("正在复制预览图...", 80)
-            for ext in self.supported_image_extensions:
-                preview_name = model_basename + ext
-                preview_path = os.path.join(source_dir, preview_name)
-                if os.path.exists(preview_path):
-                    target_preview = os.path.join(target_dir, new_model_basename + ext)
-                    shutil.copy2(preview_path, target_preview)
-                    break
-            
-            # 复制适配CS生成的配置文件夹（如果存在）
-            update_status("正在复制配置文件...", 90)
-            cs_folder = os.path.join(source_dir, model_basename)
-            if os.path.exists(cs_folder) and os.path.isdir(cs_folder):
-                target_cs_folder = os.path.join(target_dir, new_model_basename)
-                shutil.copytree(cs_folder, target_cs_folder)
-            
-            # 复制模型信息（如果目标路径在程序目录下）
-            update_status("正在复制模型信息...", 95)
-            try:
-                relative_target = os.path.relpath(target_path, BASE_PATH)
-                info_file = 'model_info.json'
-                if os.path.exists(info_file):
-                    with open(info_file, 'r', encoding='utf-8') as f:
-                        all_info = json.load(f)
-                    if self.current_file in all_info:
-                        # 复制模型信息，但重置收藏状态
-                        model_info = all_info[self.current_file].copy()
-                        model_info['is_favorite'] = False
-                        all_info[relative_target] = model_info
-                        with open(info_file, 'w', encoding='utf-8') as f:
-                            json.dump(all_info, f, ensure_ascii=False, indent=2)
-            except ValueError:
-                # 目标路径不在程序目录下，忽略信息复制
-                pass
-            
-            update_status("复制完成！", 100)
-            
-            # 刷新文件列表
-            self.refresh_files()
-            
-            # 延迟关闭窗口
-            progress_window.after(1000, progress_window.destroy)
-            self.show_popup_message("模型及相关文件复制成功")
-            
+            transaction = plan_model_transfer(OP_COPY, BASE_PATH, source_path, target_dir,
+                                              self.supported_image_extensions, new_basename=new_model_basename)
         except Exception as e:
-            progress_window.destroy()
             self.show_popup_message(f"复制模型时发生错误：{str(e)}")
+            return
+        
+        def on_copied(transaction):
+            # 刷新文件列表
+            self.refresh_files()
+            if transaction.link_type == METHOD_REFLINK:
+                self.show_popup_message("已创建写时复制副本")
+            elif transaction.link_type == METHOD_HARDLINK:
+                self.show_popup_message("已创建硬链接副本")
+            else:
+                self.show_popup_message("模型及相关文件复制成功")
+        
+        self.run_model_transfer("复制模型", transaction, on_copied, copy_mode=mode)
 
 
     def show_cf_node_menu(self):
@@ -5890,6 +6190,11 @@ https://pan.quark.cn/s/75450b122a53"""
             command=lambda: self.batch_process('sd'),
             font=self.base_font
         )
+        menu.add_command(
+            label="一键导出内嵌预览图",
+            command=lambda: self.batch_process('thumbnail'),
+            font=self.base_font
+        )
         menu.add_separator()
         menu.add_command(
             label="一键从Liblib抓取",
@@ -5901,6 +6206,27 @@ https://pan.quark.cn/s/75450b122a53"""
             command=self.batch_fetch_from_civitai,
             font=self.base_font
         )
+        menu.add_command(
+            label="一键从Civitai抓取（忽略缓存）",
+            command=lambda: self.batch_fetch_from_civitai(force_refresh=True),
+            font=self.base_font
+        )
+        menu.add_separator()
+        menu.add_command(
+            label="批量移动模型",
+            command=self.batch_move_models,
+            font=self.base_font
+        )
+        menu.add_command(
+            label="后台任务",
+            command=self.show_job_panel,
+            font=self.base_font
+        )
+        menu.add_command(
+            label="查找重复模型",
+            command=self.find_duplicate_models,
+            font=self.base_font
+        )
         
         # 在按钮右侧显示菜单
         button = self.batch_btn
@@ -5908,208 +6234,609 @@ https://pan.quark.cn/s/75450b122a53"""
         y = button.winfo_rooty()
         menu.post(x, y)
 
-    def batch_process(self, process_type):
-        """批量处理功能"""
-        # 确认对话框的消息
-        messages = {
-            'hash': "是否要为所有模型计算哈希值？\n如果大文件较多，可能需要较长时间，请耐心等待",
-            'cs': "是否要为所有模型创建CS配置文件？\n将会在模型文件夹中创建或替换Describe.txt和Trigger_Words.txt文件",
-            'sd': "是否要为所有模型创建SD配置文件？\n将会在模型文件夹中创建或替换.json文件"
+    def batch_process(self, process_type):
+        """批量处理功能（在后台任务队列中运行）"""
+        # 确认对话框的消息
+        messages = {
+            'hash': "是否要为以下范围内的模型计算哈希值？",
+            'cs': "是否要为以下范围内的模型创建CS配置文件？\n将会在模型文件夹中创建或替换Describe.txt和Trigger_Words.txt文件",
+            'sd': "是否要为以下范围内的模型创建SD配置文件？\n将会在模型文件夹中创建或替换.json文件",
+            'thumbnail': "是否要为以下范围内没有预览图的模型导出内嵌预览图？\n将会在模型文件夹中创建与模型同名的图片文件"
+        }
+        
+        self.choose_batch_scope(process_type, messages[process_type],
+                                lambda models: self.submit_batch_job(process_type, models))
+
+    def batch_fetch_from_liblib(self):
+        """批量从Liblib抓取模型信息（在后台任务队列中运行）"""
+        def confirm(models):
+            # 询问预览图处理方式
+            replace_all = messagebox.askyesno("预览图处理", "是否替换所有模型的预览图？\n选择\"是\"将替换所有预览图\n选择\"否\"将只为没有预览图的模型添加预览图")
+            self.submit_batch_job('liblib', models, {'replace_all': replace_all})
+        
+        self.choose_batch_scope('liblib', "是否要从Liblib批量抓取模型信息？\n此操作会对范围内所有包含Liblib网址的模型信息进行覆盖，请谨慎操作\n由于网络波动原因，并不保证一定抓取成功，请手动查漏补缺", confirm)
+
+    def batch_fetch_from_civitai(self, force_refresh=False):
+        """
+        批量从Civitai抓取模型信息（在后台任务队列中运行）
+        Args:
+            force_refresh: 忽略本地缓存的查询结果，全部重新查询
+        """
+        def confirm(models):
+            # 询问预览图处理方式
+            replace_all = messagebox.askyesno("预览图处理", "是否替换所有模型的预览图？\n选择\"是\"将替换所有预览图\n选择\"否\"将只为没有预览图的模型添加预览图")
+            self.submit_batch_job('civitai', models, {'replace_all': replace_all, 'force_refresh': force_refresh})
+        
+        self.choose_batch_scope('civitai', "是否要从Civitai批量抓取模型信息？\n此操作需要先计算模型哈希值\n本过程将自动跳过已存在Liblib网址的模型\n由于网络（科学网络必须）波动原因，并不保证一定抓取成功，请手动查漏补缺", confirm)
+
+    def get_batch_scopes(self):
+        """
+        批量操作可选的范围
+        Returns:
+            list: [(范围名称, [(文件名, 相对路径)])]，多选时第一个为选中的模型
+        """
+        scopes = []
+        if len(self.selected_files) > 1:
+            # 按列表中的显示顺序
+            selected = [(os.path.basename(path), os.path.dirname(path))
+                        for path in self.file_frames if path in self.selected_files]
+            scopes.append(("选中的模型", selected))
+        
+        category = self.category_combobox.get()
+        location = category
+        if self.current_subfolder:
+            location += f" > {self.current_subfolder}"
+        search_term = self.search_var.get().strip()
+        if search_term:
+            location += f"，搜索“{search_term}”"
+        scopes.append((f"当前列表（{location}）", self.filter_files(category, search_term)))
+        scopes.append(("全部模型", list(self.all_files)))
+        return scopes
+
+    def get_all_model_info(self):
+        """一次读取全部模型信息（批量预估等需要查看很多模型时使用）"""
+        try:
+            with open('model_info.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"读取模型信息时发生错误：{str(e)}")
+            return {}
+
+    def model_has_embedded_thumbnail(self, model_path):
+        """
+        模型是否有内嵌预览图（读取文件头缓存）
+        Returns:
+            bool 或 None（无法读取文件头）
+        """
+        if not model_path.lower().endswith('.safetensors'):
+            return False
+        summary = self.header_cache.get(model_path)
+        if not summary or 'error' in summary:
+            return None
+        return bool(summary.get('embedded_thumbnail'))
+
+    def choose_batch_scope(self, kind, message, on_confirm):
+        """
+        选择批量操作的范围（选中的模型、当前列表或全部模型），显示每个范围的预估后确认
+        Args:
+            on_confirm: on_confirm([(文件名, 相对路径)])，确认后以需要处理的模型调用
+        """
+        catalog = self.get_all_model_info()
+        workers = self.job_queue.job_types[kind].workers
+        plans = [(name, self.batch_planner.plan(kind, models, catalog, workers))
+                 for name, models in self.get_batch_scopes()]
+        
+        dialog = tk.Toplevel(self.master)
+        dialog.title("确认")
+        dialog.transient(self.master)
+        dialog.grab_set()
+        
+        # 居中显示对话框
+        dialog.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 300}+"
+                        f"{self.master.winfo_y() + self.master.winfo_height()//2 - 150}")
+        
+        main_frame = ttk.Frame(dialog)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        ttk.Label(main_frame, text=message, wraplength=580, justify=tk.LEFT).pack(anchor='w', pady=(0, 10))
+        
+        # 所选范围的预估明细
+        detail_label = ttk.Label(main_frame, text="", wraplength=580, justify=tk.LEFT)
+        
+        def show_detail():
+            detail_label.config(text=plans[scope_var.get()][1].describe())
+        
+        # 范围选项（默认选中第一个：有多选时为选中的模型，否则为当前列表）
+        scope_var = tk.IntVar(value=0)
+        for index, (name, plan) in enumerate(plans):
+            ttk.Radiobutton(
+                main_frame,
+                text=f"{name}：{plan.summary_line()}",
+                variable=scope_var,
+                value=index,
+                command=show_detail
+            ).pack(anchor='w', pady=2)
+        
+        ttk.Separator(main_frame, orient='horizontal').pack(fill=tk.X, pady=(8, 8))
+        detail_label.pack(anchor='w')
+        show_detail()
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
+        
+        def confirm():
+            plan = plans[scope_var.get()][1]
+            dialog.destroy()
+            if not plan.items:
+                self.show_popup_message("所选范围内没有需要处理的模型")
+                return
+            on_confirm(plan.items)
+        
+        ttk.Button(
+            button_frame,
+            text="取消",
+            command=dialog.destroy,
+            style='primary.TButton',
+            width=10
+        ).pack(side=tk.RIGHT, padx=(5, 0))
+        
+        ttk.Button(
+            button_frame,
+            text="确认",
+            command=confirm,
+            style='primary.TButton',
+            width=10
+        ).pack(side=tk.RIGHT)
+
+    def create_job_queue(self):
+        """创建后台任务队列，注册各批量操作；进度事件由主线程定时读取"""
+        job_types = {
+            'hash': JobType("计算哈希值", self.job_calculate_hash),
+            'cs': JobType("适配CS", lambda *args: self.job_export_sidecars(SIDECAR_CS, *args),
+                          workers=SIDECAR_WORKERS, prepare=self.prepare_catalog_items, batch_size=SIDECAR_BATCH_SIZE),
+            'sd': JobType("适配SD", lambda *args: self.job_export_sidecars(SIDECAR_SD, *args),
+                          workers=SIDECAR_WORKERS, prepare=self.prepare_catalog_items, batch_size=SIDECAR_BATCH_SIZE),
+            'thumbnail': JobType("导出内嵌预览图", self.job_export_thumbnail),
+            'move': JobType("移动模型", self.job_move_model),
+            'liblib': JobType("从Liblib抓取", self.job_fetch_liblib, workers=PAGE_POOL_SIZE,
+                              prepare=self.prepare_catalog_items, batch_size=LIBLIB_BATCH_SIZE),
+            'civitai': JobType(
+                "从Civitai抓取", self.job_fetch_civitai, workers=FETCH_WORKERS,
+                prepare=self.prepare_civitai_items, batch_size=BULK_LOOKUP_SIZE,
+                on_start=self.civitai_client.reset,
+                on_stop=self.civitai_client.cancel,  # 正在等待重试的请求立即停止
+                on_finish=self.civitai_client.response_cache.save
+            ),
         }
-        
-        if not messagebox.askyesno("确认", messages[process_type]):
+        self.job_events = ProgressStream()
+        self.job_events.attach(self.master, self.handle_job_events)
+        return JobQueue(job_types, events=self.job_events)
+
+    def submit_batch_job(self, kind, models, options=None):
+        """
+        把模型提交为后台任务，并打开任务面板
+        Args:
+            models: [(文件名, 相对路径)]
+        """
+        model_paths = [os.path.join(path, file) for file, path in models]
+        self.job_queue.submit(kind, model_paths, options)
+        self.show_job_panel()
+
+    def handle_job_events(self, events):
+        """在主线程中处理后台任务的进度事件（每个周期的事件一起处理）"""
+        finished_keys = set()
+        for event in events:
+            if event['kind'] == EVENT_ITEM_DONE:
+                finished_keys.add(event['key'])
+            elif event['kind'] == EVENT_JOB_DONE:
+                self.on_job_done(event['title'], event['state'], event['summary'])
+        
+        # 当前选中的模型被处理后刷新显示的信息和预览图
+        if self.current_file in finished_keys and not self.is_editing:
+            self.load_model_info()
+            self.refresh_current_preview()
+        
+        self.refresh_job_panel()
+
+    def on_job_done(self, title, state, summary):
+        """后台任务结束（完成、暂停或取消）后刷新文件列表，并保存本次测得的速度"""
+        self.throughput.save()
+        self.refresh_files()
+        if state == JOB_FINISHED and summary:
+            self.show_popup_message(
+                f"{title}已完成\n完成 {summary['done']}，跳过 {summary['skipped']}，失败 {summary['failed']}")
+
+    def refresh_job_panel(self):
+        """任务面板打开时刷新任务列表"""
+        if self.job_panel is not None and self.job_panel.winfo_exists():
+            self.job_panel_refresh()
+
+    def show_job_panel(self):
+        """显示后台任务面板（非模态，处理过程中可以继续使用主窗口）"""
+        if self.job_panel is not None and self.job_panel.winfo_exists():
+            self.job_panel.deiconify()
+            self.job_panel.lift()
+            self.job_panel_refresh()
             return
         
-        # 创建进度窗口
-        progress_window = tk.Toplevel(self.master)
-        progress_window.title("批量处理")
-        progress_window.geometry("400x150")
-        progress_window.transient(self.master)
-        progress_window.grab_set()
+        panel = tk.Toplevel(self.master)
+        panel.title("后台任务")
+        panel.geometry("760x320")
+        panel.transient(self.master)
+        self.job_panel = panel
         
         # 居中显示
-        progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                           f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
+        panel.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 380}+"
+                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 160}")
         
-        # 创建主框架
-        main_frame = ttk.Frame(progress_window)
+        main_frame = ttk.Frame(panel)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # 创建状态标签
-        status_label = ttk.Label(main_frame, text="准备处理...", wraplength=380)
-        status_label.pack(pady=(0, 10))
+        # 任务列表
+        columns = ('title', 'state', 'progress', 'failed', 'speed', 'eta')
+        headings = {'title': "任务", 'state': "状态", 'progress': "进度", 'failed': "失败",
+                    'speed': "速度", 'eta': "剩余时间"}
+        widths = {'title': 200, 'state': 80, 'progress': 140, 'failed': 60, 'speed': 100, 'eta': 100}
+        tree = ttk.Treeview(main_frame, columns=columns, show='headings', height=6, selectmode='browse')
+        for column in columns:
+            tree.heading(column, text=headings[column])
+            tree.column(column, width=widths[column], anchor='w' if column == 'title' else 'center')
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        # 当前处理的模型
+        status_label = ttk.Label(main_frame, text="", wraplength=740)
+        status_label.pack(fill=tk.X, pady=(5, 5))
+        
+        def refresh():
+            if not panel.winfo_exists():
+                return
+            jobs = self.job_queue.snapshot()
+            existing = set(tree.get_children())
+            for job in jobs:
+                finished = job['done'] + job['skipped'] + job['failed']
+                values = (
+                    job['title'],
+                    JOB_STATE_NAMES.get(job['state'], job['state']),
+                    f"{finished}/{job['total']}（跳过 {job['skipped']}）",
+                    job['failed'] or '',
+                    format_speed(job['speed']),
+                    format_duration(job['eta'])
+                )
+                if job['id'] in existing:
+                    tree.item(job['id'], values=values)
+                else:
+                    tree.insert('', tk.END, iid=job['id'], values=values)
+            for job_id in existing - {job['id'] for job in jobs}:
+                tree.delete(job_id)
+            # 默认选中正在运行的任务
+            if not tree.selection():
+                running = [job['id'] for job in jobs if job['state'] == JOB_RUNNING]
+                if running:
+                    tree.selection_set(running[0])
+            current = next((job['current'] for job in jobs if job['current']), '')
+            status_label.config(text=f"正在处理: {current}" if current else "")
+        
+        # 由进度事件驱动刷新（见 handle_job_events）
+        self.job_panel_refresh = refresh
+        
+        def run_action(action):
+            for job_id in tree.selection():
+                action(job_id)
+            refresh()
+        
+        # 操作按钮（作用于选中的任务）
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X)
+        actions = [
+            ("暂停", self.job_queue.pause),
+            ("继续", self.job_queue.resume),
+            ("取消", self.job_queue.cancel),
+            ("重试失败项", self.job_queue.retry_failed),
+            ("删除", self.job_queue.remove),
+            ("查看结果", self.show_job_results),
+        ]
+        for text, action in actions:
+            ttk.Button(
+                button_frame,
+                text=text,
+                command=lambda action=action: run_action(action),
+                style='primary.TButton'
+            ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        refresh()
+
+    def show_job_results(self, job_id):
+        """显示任务的处理结果：汇总，以及跳过和失败的模型及原因"""
+        summary = self.job_queue.summary(job_id)
+        if not summary:
+            return
         
-        # 创建进度条
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(
-            main_frame,
-            variable=progress_var,
-            maximum=100,
-            mode='determinate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
+        window = tk.Toplevel(self.master)
+        window.title(f"处理结果 - {summary['title']}")
+        window.geometry("700x400")
+        window.transient(self.master)
         
-        # 创建取消按钮 - 修改这部分
-        cancel_flag = [False]  # 使用列表而不是字典
-        cancel_btn = ttk.Button(
-            main_frame,
-            text="取消",
-            command=lambda: cancel_flag.__setitem__(0, True),  # 修改取消按钮的命令
-            style='primary.TButton'
-        )
-        cancel_btn.pack(pady=(0, 10))
+        main_frame = ttk.Frame(window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        def update_progress(current, total, message):
-            if not progress_window.winfo_exists():
-                return
-            progress = (current / total) * 100
-            progress_var.set(progress)
-            status_label.config(text=message)
-            progress_window.update()
+        ttk.Label(main_frame, text=format_summary(dict(summary, failures=[])), wraplength=680).pack(fill=tk.X, pady=(0, 5))
+        
+        # 只列出跳过和失败的项（完成的项通常很多且不需要查看）
+        columns = ('model', 'status', 'message')
+        tree = ttk.Treeview(main_frame, columns=columns, show='headings')
+        tree.heading('model', text="模型")
+        tree.heading('status', text="结果")
+        tree.heading('message', text="原因")
+        tree.column('model', width=320)
+        tree.column('status', width=60, anchor='center')
+        tree.column('message', width=300)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
         
-        def process():
-            try:
-                total_files = len(self.all_files)
-                processed = 0
-                skipped = 0
-                
-                for file, path in self.all_files:
-                    # 先检查取消标志
-                    if cancel_flag[0]:
-                        update_progress(processed + skipped, total_files, "正在取消...")
-                        break
-                    
-                    full_path = os.path.join(BASE_PATH, path, file)
-                    update_progress(processed, total_files, f"正在处理: \n{file[:18] + '...' if len(file) > 18 else file}")
-                    
-                    try:
-                        # 每个操作前都检查取消标志
-                        if cancel_flag[0]:
-                            break
-                            
-                        if process_type == 'hash':
-                            # 计算哈希值
-                            hash_value = self.calculate_file_hash(full_path)
-                            if hash_value and not cancel_flag[0]:  # 再次检查取消标志
-                                info = self.get_model_info(os.path.join(path, file))
-                                info['hash'] = hash_value
-                                self.save_model_info(os.path.join(path, file), info)
-                        
-                        elif process_type == 'cs':
-                            if cancel_flag[0]:
-                                break
-                            # 创建CS配置文件
-                            model_dir = os.path.dirname(full_path)
-                            model_name = os.path.splitext(os.path.basename(full_path))[0]
-                            custom_dir = os.path.join(model_dir, model_name)
-                            os.makedirs(custom_dir, exist_ok=True)
-                            
-                            info = self.get_model_info(os.path.join(path, file))
-                            description = info.get('description', '')
-                            trigger_words = info.get('trigger_words', '')
-                            
-                            if description and not cancel_flag[0]:
-                                with open(os.path.join(custom_dir, "Describe.txt"), 'w', encoding='utf-8') as f:
-                                    f.write(description)
-                            if trigger_words and not cancel_flag[0]:
-                                with open(os.path.join(custom_dir, "Trigger_Words.txt"), 'w', encoding='utf-8') as f:
-                                    f.write(trigger_words)
-                        
-                        elif process_type == 'sd':
-                            if cancel_flag[0]:
-                                break
-                            # 创建SD配置文件
-                            model_dir = os.path.dirname(full_path)
-                            model_name = os.path.splitext(os.path.basename(full_path))[0]
-                            json_path = os.path.join(model_dir, f"{model_name}.json")
-                            
-                            info = self.get_model_info(os.path.join(path, file))
-                            json_data = {
-                                "description": info.get('description', ''),
-                                "sd version": "",
-                                "activation text": info.get('trigger_words', ''),
-                                "preferred weight": 0,
-                                "negative text": "",
-                                "notes": ""
-                            }
-                            
-                            if not cancel_flag[0]:
-                                with open(json_path, 'w', encoding='utf-8') as f:
-                                    json.dump(json_data, f, ensure_ascii=False, indent=4)
-                        
-                        processed += 1
-                    except Exception as e:
-                        logging.error(f"处理文件 {file} 时发生错误: {str(e)}")
-                        skipped += 1
-                    
-                if cancel_flag[0]:
-                    update_progress(processed + skipped, total_files, "操作已取消")
-                else:
-                    update_progress(processed + skipped, total_files, 
-                                  f"已处理: {processed} 个文件 跳过: {skipped} 个文件")
-                
-                # 修改取消按钮为关闭按钮
-                cancel_btn.configure(
-                    text="关闭",
-                    command=lambda: finish_process()
-                )
+        # 失败的排在前面
+        order = {ITEM_FAILED: 0, ITEM_SKIPPED: 1}
+        rows = sorted(
+            ((key, status) for key, status in summary['items'].items() if status in order),
+            key=lambda row: order[row[1]]
+        )
+        for key, status in rows:
+            tree.insert('', tk.END, values=(key, ITEM_STATE_NAMES[status], summary['messages'].get(key, '')))
 
+    def job_calculate_hash(self, model_path, options, extra, cancel_check):
+        """后台任务：计算哈希值并写入模型信息（哈希缓存有效时不读取文件）"""
+        hash_value = self.calculate_file_hash(os.path.join(BASE_PATH, model_path), cancel_check=cancel_check)
+        if cancel_check():
+            return None
+        if not hash_value:
+            raise ValueError("无法计算哈希值")
+        with self.model_info_lock:
+            info = self.get_model_info(model_path)
+            info['hash'] = hash_value
+            self.save_model_info(model_path, info)
+        return ITEM_DONE
+
+    def prepare_catalog_items(self, model_paths, options, cancel_check):
+        """后台任务预处理：一次读取一批模型的信息，分发给各个模型（配置文件导出和Liblib抓取共用）"""
+        catalog = self.get_all_model_info()
+        return {model_path: catalog.get(model_path, {}) for model_path in model_paths}
+
+    def job_export_sidecars(self, kind, model_path, options, info, cancel_check):
+        """后台任务：导出一个模型的CS或SD配置文件，内容没有变化的文件不写入"""
+        written, unchanged = export_sidecars(kind, os.path.join(BASE_PATH, model_path), info or {})
+        if written:
+            return ItemResult(ITEM_DONE, f"写入 {written} 个文件" + (f"，{unchanged} 个没有变化" if unchanged else ""))
+        if unchanged:
+            return ItemResult(ITEM_SKIPPED, "配置文件没有变化")
+        return ItemResult(ITEM_SKIPPED, "没有描述和触发词")
+
+    def job_export_thumbnail(self, model_path, options, extra, cancel_check):
+        """后台任务：为没有预览图的模型导出内嵌预览图"""
+        file, path = os.path.basename(model_path), os.path.dirname(model_path)
+        # 已有预览图文件或没有内嵌预览图的模型跳过
+        if self.has_preview((file, path)):
+            return ItemResult(ITEM_SKIPPED, "已有预览图")
+        full_path = os.path.join(BASE_PATH, model_path)
+        thumbnail = read_embedded_thumbnail(full_path)
+        if not thumbnail:
+            return ItemResult(ITEM_SKIPPED, "没有内嵌预览图")
+        data, extension = thumbnail
+        image_path = os.path.splitext(full_path)[0] + extension
+        # 先写临时文件再替换，避免留下不完整的图片
+        temp_path = image_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, image_path)
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        return ITEM_DONE
+
+    def job_move_model(self, model_path, options, extra, cancel_check):
+        """后台任务：移动一个模型及所有相关文件（失败或中断时撤销这个模型已完成的步骤）"""
+        full_path = os.path.join(BASE_PATH, model_path)
+        target_dir = options['target_dir']
+        if os.path.normcase(os.path.abspath(os.path.dirname(full_path))) == os.path.normcase(os.path.abspath(target_dir)):
+            return ItemResult(ITEM_SKIPPED, "已在目标文件夹中")
+        transaction = plan_model_transfer(OP_MOVE, BASE_PATH, full_path, target_dir, self.supported_image_extensions)
+        try:
+            transaction.execute(
+                apply_catalog=self.apply_model_transfer,
+                cancel_check=cancel_check,
+                expected_hash=self.hash_cache.lookup(full_path),
+                io_throttle=self.io_scheduler.bulk_throttle
+            )
+        except CopyCancelled:
+            return None
+        return ITEM_DONE
+
+    def job_fetch_liblib(self, model_path, options, info, cancel_check):
+        """后台任务：从Liblib抓取一个模型的信息（没有Liblib网址的模型跳过）"""
+        url = (info or {}).get('url', '').strip()
+        if not (url and 'liblib.art' in url):
+            return ItemResult(ITEM_SKIPPED, "没有Liblib网址")
+        
+        start = time.monotonic()
+        file, path = os.path.basename(model_path), os.path.dirname(model_path)
+        # 有预览图且不替换时跳过预览图处理
+        need_preview = options.get('replace_all') or self.get_image_path(file, path) is None
+        page_info, _ = fetch_liblib_info(
+            url, self.get_liblib_browser_pool(), need_preview, session=self.liblib_session)
+        
+        # 保存预览图
+        message = ''
+        img_url = page_info['image_url']
+        if need_preview and img_url:
+            # 直接写入预览图文件，而不是使用replace_preview_image方法
+            if not download_image(img_url, self.get_preview_save_path(file, path), session=self.liblib_session,
+                                  rate_limiter=self.download_limiter, cancel_check=cancel_check):
+                message = "预览图下载失败"
+        
+        updates = {}
+        if page_info['trigger_words']:
+            updates['trigger_words'] = ", ".join(page_info['trigger_words'])
+        if page_info['description_lines']:
+            liblib_marker = "=== 从Liblib抓取的描述 ==="
+            updates['description'] = liblib_marker + "\n" + "\n\n".join(page_info['description_lines'])
+        if not cancel_check():
+            self.throughput.record_fetch(FETCH_HOSTS['liblib'], time.monotonic() - start)
+        if not updates and not img_url:
+            return ItemResult(ITEM_SKIPPED, "页面中没有找到模型信息")
+        
+        # 保存更新后的信息（重新读取，避免覆盖其他线程的修改）
+        with self.model_info_lock:
+            info = self.get_model_info(model_path)
+            info.update(updates)
+            self.save_model_info(model_path, info)
+        return ItemResult(ITEM_DONE, message)
+
+    def prepare_civitai_items(self, model_paths, options, cancel_check):
+        """
+        后台任务预处理：按顺序计算一批模型的哈希值（顺序读取磁盘），再合并为一次批量查询
+        Returns:
+            dict: {模型相对路径: {'skip'} 或 {'hash', 'data'（批量查询有结果时）}}
+        """
+        extras = {}
+        catalog = self.get_all_model_info()
+        for model_path in model_paths:
+            if cancel_check():
+                break
+            # 跳过已有Liblib网址的模型
+            url = catalog.get(model_path, {}).get('url', '').strip()
+            if url and 'liblib.art' in url:
+                extras[model_path] = {'skip': True}
+                continue
+            # 获取或计算哈希值（哈希缓存有效时不读取文件）
+            hash_value = self.calculate_file_hash(os.path.join(BASE_PATH, model_path), cancel_check=cancel_check)
+            if hash_value:
+                extras[model_path] = {'hash': hash_value}
+        
+        hashes = [extra['hash'] for extra in extras.values() if 'hash' in extra]
+        if hashes and not cancel_check():
+            try:
+                lookup = self.civitai_client.get_versions_by_hashes(hashes, force_refresh=options.get('force_refresh', False))
+            except FetchCancelled:
+                lookup = {}
+            for extra in extras.values():
+                if extra.get('hash') in lookup:
+                    extra['data'] = lookup[extra['hash']]
+        return extras
+
+    def job_fetch_civitai(self, model_path, options, extra, cancel_check):
+        """后台任务：从Civitai抓取一个模型的信息（只访问网络，不读取模型文件）"""
+        if not extra:
+            if cancel_check():
+                return None
+            raise ValueError("无法计算哈希值")
+        if extra.get('skip'):
+            return ItemResult(ITEM_SKIPPED, "已有Liblib网址")
+        
+        # 批量查询已有结果时直接使用，否则单独查询
+        start = time.monotonic()
+        hash_value = extra['hash']
+        if 'data' in extra:
+            data = extra['data']
+        else:
+            data = self.civitai_client.get_version_by_hash(hash_value, force_refresh=options.get('force_refresh', False))
+        if not data:
+            return ItemResult(ITEM_SKIPPED, "Civitai上没有找到该模型")
+        
+        file, path = os.path.basename(model_path), os.path.dirname(model_path)
+        updates = {'hash': hash_value}
+        
+        # 获取模型URL
+        model_id = data.get('modelId')
+        version_id = data.get('id')
+        if model_id and version_id:
+            updates['url'] = f"https://civitai.com/models/{model_id}?modelVersionId={version_id}"
+        
+        # 获取预览图
+        message = ''
+        need_preview = options.get('replace_all') or self.get_image_path(file, path) is None
+        if need_preview and 'images' in data and len(data['images']) > 0:
+            image_url = data['images'][0].get('url')
+            if image_url:
+                # 通过 Civitai 客户端下载（共用连接池、退避重试和取消）
+                if not download_image(image_url, self.get_preview_save_path(file, path), session=self.civitai_client,
+                                      rate_limiter=self.download_limiter, cancel_check=cancel_check):
+                    message = "预览图下载失败"
+        
+        # 获取触发词
+        if 'trainedWords' in data:
+            updates['trigger_words'] = ", ".join(data['trainedWords'])
+        
+        # 获取描述
+        if updates.get('url'):
+            try:
+                page_response = self.civitai_client.get(updates['url'])
+                if page_response.status_code == 200:
+                    description = self.parse_civitai_description(page_response.text)
+                    if description:
+                        updates['description'] = "=== 从Civitai抓取的描述 ===\n" + description
+            except FetchCancelled:
+                raise
             except Exception as e:
-                self.show_popup_message(f"批量处理时发生错误：{str(e)}")
-
-        def finish_process():
-            """完成处理后的清理工作"""
-            progress_window.destroy()
-            # 刷新文件列表
-            self.refresh_files()
-
-        
-        # 在新线程中执行处理
-        threading.Thread(target=process, daemon=True).start()
-
-    def batch_fetch_from_liblib(self):
-        """批量从Liblib抓取模型信息"""
-        if not messagebox.askyesno("确认", "是否要从Liblib批量抓取模型信息？\n此操作会对所有包含Liblib网址的模型信息进行覆盖，请谨慎操作\n由于网络波动原因，并不保证一定抓取成功，请手动查漏补缺"):
+                logging.error(f"获取描述失败：{str(e)}")
+        if not cancel_check():
+            self.throughput.record_fetch(FETCH_HOSTS['civitai'], time.monotonic() - start)
+        
+        # 保存更新后的信息（重新读取，避免覆盖其他线程的修改）
+        with self.model_info_lock:
+            info = self.get_model_info(model_path)
+            info.update(updates)
+            self.save_model_info(model_path, info)
+        return ItemResult(ITEM_DONE, message)
+
+    def parse_civitai_description(self, html):
+        """从 Civitai 模型页面的 json-ld 中提取描述文字（保留段落）"""
+        soup = BeautifulSoup(html, 'html.parser')
+        json_script = soup.find('script', type='application/ld+json')
+        if not json_script:
+            return ''
+        json_data = json.loads(json_script.string)
+        description = json_data.get('description', '')
+        if not description:
+            return ''
+        desc_soup = BeautifulSoup(description, 'html.parser')
+        description_lines = []
+        for element in desc_soup.descendants:
+            if isinstance(element, NavigableString):
+                text = element.strip()
+                if text:
+                    description_lines.append(text)
+            elif element.name in ['p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                # 连续的段落分隔只保留一个空行
+                if description_lines and description_lines[-1]:
+                    description_lines.append('')
+        return '\n'.join(description_lines).strip()
+
+    def find_duplicate_models(self):
+        """查找重复模型（按大小、抽样摘要、完整哈希逐步筛选）"""
+        if not self.all_files:
+            self.show_popup_message("没有可检查的模型")
             return
         
-        # 询问预览图处理方式
-        replace_all = messagebox.askyesno("预览图处理", "是否替换所有模型的预览图？\n选择\"是\"将替换所有预览图\n选择\"否\"将只为没有预览图的模型添加预览图")
-        
-        # 保存当前选中的文件
-        current_selected_file = self.current_file
-        
-        # 取消当前选中状态
-        self.current_file = None
-        if current_selected_file in self.file_frames:
-            frame, path_label, name_label = self.file_frames[current_selected_file]
-            frame.configure(style='List.TFrame')
-            path_label.configure(style='Left.TLabel')
-            name_label.configure(style='Left.TLabel')
-            # 重置所有子部件的样式
-            for widget in frame.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='List.TFrame')
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Left.TLabel')
-        
         # 创建进度窗口
         progress_window = tk.Toplevel(self.master)
-        progress_window.title("批量抓取")
+        progress_window.title("查找重复模型")
         progress_window.geometry("400x150")
         progress_window.transient(self.master)
-        progress_window.grab_set()
         
         # 居中显示
         progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
+                           f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
         
         # 创建主框架
         main_frame = ttk.Frame(progress_window)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # 创建状态标签
-        status_label = ttk.Label(main_frame, text="准备抓取...", wraplength=380)
+        status_label = ttk.Label(main_frame, text="正在按文件大小分组...", wraplength=380)
         status_label.pack(pady=(0, 10))
         
         # 创建进度条
@@ -6124,473 +6851,107 @@ https://pan.quark.cn/s/75450b122a53"""
         progress_bar.pack(fill=tk.X, pady=(0, 10))
         
         # 创建取消按钮
-        cancel_flag = [False]  # 使用列表而不是字典
+        cancel_flag = [False]
         cancel_btn = ttk.Button(
             main_frame,
             text="取消",
-            command=lambda: cancel_flag.__setitem__(0, True),  # 修改取消按钮的命令
+            command=lambda: cancel_flag.__setitem__(0, True),
             style='primary.TButton'
         )
         cancel_btn.pack(pady=(0, 10))
         
-        def update_progress(current, total, message):
+        stage_names = {'sample': "正在比较抽样数据", 'hash': "正在计算候选文件哈希值"}
+        linked_from = dict(self.model_links)
+        
+        def update_progress(stage, done, total):
+            def apply():
+                if not progress_window.winfo_exists():
+                    return
+                progress_var.set((done / total) * 100 if total else 100)
+                status_label.config(text=f"{stage_names[stage]}... {done}/{total}")
+            self.ui_dispatcher.post(apply)
+        
+        def on_finished(groups):
             if not progress_window.winfo_exists():
                 return
-            progress = (current / total) * 100
-            #print(f"进度: {progress},当前: {current},总数: {total}")
-            progress_var.set(progress)
-            status_label.config(text=message)
-            progress_window.update()
+            progress_window.destroy()
+            if cancel_flag[0]:
+                self.show_popup_message("已取消查找")
+            elif not groups:
+                self.show_popup_message("没有发现重复模型")
+            else:
+                self.show_duplicate_report(groups)
         
         def process():
+            groups = []
             try:
-                # 保存当前选中的文件
-                current_selected_file = self.current_file
-                
-                total_files = len(self.all_files)
-                processed = 0
-                skipped = 0
-                success = 0
-                
+                # 使用扫描得到的文件列表和文件大小
+                files = []
                 for file, path in self.all_files:
-                    if cancel_flag[0]:  # 检查取消标志
-                        break
-                    
-                    full_path = os.path.join(BASE_PATH, path, file)
-                    update_progress(processed, total_files, f"正在处理: \n{file[:18] + '...' if len(file) > 18 else file}")
-                    
-                    try:
-                        # 获取模型信息
-                        info = self.get_model_info(os.path.join(path, file))
-                        url = info.get('url', '').strip()
-                        
-                        # 检查是否有Liblib网址
-                        if url and 'liblib.art' in url:
-                            # 检查预览图
-                            has_preview = self.get_image_path(file, path) is not None
-                            if has_preview and not replace_all:
-                                # 如果有预览图且不替换，跳过预览图处理
-                                need_preview = False
-                            else:
-                                need_preview = True
-                            
-                            def get_browser_path():
-                                """获取 Firefox 浏览器路径"""
-                                try:
-                                    if getattr(sys, 'frozen', False):
-                                        # 打包环境
-                                        base_dir = sys._MEIPASS
-                                        firefox_path = os.path.join(base_dir, 'firefox', 'firefox', 'firefox.exe')  # 注意这里添加了两次 firefox
-                                        if os.path.exists(firefox_path):
-                                            print(f"使用打包的Firefox: {firefox_path}")
-                                            return firefox_path
-                                    
-                                    # 开发环境
-                                    return None
-                                except Exception as e:
-                                    logging.error(f"获取浏览器路径失败：{str(e)}")
-                                return None     
-
-                            # 使用 playwright 抓取信息
-                            with sync_playwright() as p:
-                                browser = None
-                                try:
-                                    browser = None
-                                    browser_path = get_browser_path()
-                                    print(f"浏览器路径: {browser_path}")
-                                    # 启动浏览器时显式指定可执行文件路径
-                                    browser = p.firefox.launch(
-                                        headless=True,
-                                        executable_path = browser_path # 指定浏览器路径
-                                    )
-                                    page = browser.new_page()
-                                    
-                                    # 访问页面
-                                    page.goto(url)
-                                    
-                                    # 标记是否有任何内容被抓取
-                                    content_found = False
-                                    
-                                    # 尝试获取预览图
-                                    if need_preview:
-                                        try:
-                                            if page.wait_for_selector(".ModelVersion_modelVersion__4cm1k .relative.cursor-pointer img", timeout=3000):
-                                                img_element = page.query_selector(".ModelVersion_modelVersion__4cm1k .relative.cursor-pointer img")
-                                                if img_element:
-                                                    img_url = img_element.get_attribute("src")
-                                                    if img_url:
-                                                        headers = {
-                                                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                                                        }
-                                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                                                            img_response = requests.get(img_url, headers=headers)
-                                                            if img_response.status_code == 200:
-                                                                temp_file.write(img_response.content)
-                                                                # 直接保存预览图，而不是使用replace_preview_image方法
-                                                                preview_path = os.path.join(BASE_PATH, path, f"{os.path.splitext(file)[0]}.png")
-                                                                with Image.open(temp_file.name) as img:
-                                                                    img.save(preview_path, "PNG")
-                                        except Exception as e:
-                                            logging.error(f"当前文件: {file} 获取预览图失败：{str(e)}")
-                                except Exception as e:
-                                    logging.error(f"启动浏览器失败：{str(e)}")
-
-                                # 获取触发词
-                                try:
-                                    if page.wait_for_selector(".ModelDetailCard_triggerTxt__cKZOL", timeout=1000):
-                                        trigger_elements = page.query_selector_all(".ModelDetailCard_triggerTxt__cKZOL")
-                                        if trigger_elements:
-                                            trigger_words = [element.inner_text() for element in trigger_elements]
-                                            if trigger_words:
-                                                info['trigger_words'] = ", ".join(trigger_words)
-                                except Exception as e:
-                                    logging.error(f"当前文件: {file} 获取触发词失败：{str(e)}")
-                                
-                                # 获取描述
-                                try:
-                                    if page.wait_for_selector('.ModelDescription_desc__EoTMz', timeout=1000):
-                                        description_container = page.query_selector('.ModelDescription_desc__EoTMz')
-                                        if description_container:
-                                            script = """
-                                            (element) => {
-                                                const texts = [];
-                                                const walk = (node) => {
-                                                    if (node.nodeType === 3 && node.textContent.trim()) {
-                                                        texts.push(node.textContent.trim());
-                                                    } else if (node.nodeType === 1) {
-                                                        if (node.tagName === 'BR') {
-                                                            texts.push('');
-                                                        }
-                                                        for (const child of node.childNodes) {
-                                                            walk(child);
-                                                        }
-                                                        if (['P', 'DIV', 'LI'].includes(node.tagName)) {
-                                                            texts.push('');
-                                                        }
-                                                    }
-                                                };
-                                                walk(element);
-                                                return texts.filter(text => text !== '');
-                                            }
-                                            """
-                                            description_lines = description_container.evaluate(script)
-                                            if description_lines:
-                                                liblib_marker = "=== 从Liblib抓取的描述 ==="
-                                                new_desc = liblib_marker + "\n" + "\n\n".join(description_lines)
-                                                info['description'] = new_desc
-                                except Exception as e:
-                                    logging.error(f"当前文件: {file} 获取描述失败：{str(e)}")
-                                
-                                browser.close()
-                            
-                            # 保存更新后的信息
-                            self.save_model_info(os.path.join(path, file), info)
-                            success += 1
-                        else:
-                            skipped += 1
-                        
-                        processed += 1
-                        
-                    except Exception as e:
-                        logging.error(f"处理文件 {file} 时发生错误: {str(e)}")
-                        skipped += 1
-                    
-                
-                if cancel_flag[0]:
-                    update_progress(processed + skipped, total_files, "操作已取消")
-                else:
-                    update_progress(processed + skipped, total_files, 
-                                  f"已处理: {processed} 个文件 成功: {success} 个 跳过: {skipped} 个")
-                    progress_var.set(100)
-                    
-                # 修改取消按钮为关闭按钮
-                cancel_btn.configure(
-                    text="关闭",
-                    command=lambda: finish_process(current_selected_file)
+                    file_info = self.fs_cache.get_file_info(os.path.join(BASE_PATH, path, file))
+                    if file_info:
+                        files.append((os.path.join(path, file), file_info['size']))
+                groups = find_duplicate_files(
+                    self.hash_cache,
+                    files,
+                    progress_callback=update_progress,
+                    cancel_check=lambda: cancel_flag[0],
+                    linked_from=linked_from
                 )
-            
             except Exception as e:
-                self.show_popup_message(f"批量抓取时发生错误：{str(e)}")
-                progress_window.destroy()
-        
-        def finish_process(selected_file):
-            """完成处理后的清理工作"""
-            # 关闭进度窗口
-            progress_window.destroy()
-            
-            # 刷新文件列表
-            self.refresh_files()
-            
-            # 如果之前有选中的文件，重新选中并刷新其信息
-            if selected_file:
-                file_name = os.path.basename(selected_file)
-                relative_path = os.path.dirname(selected_file)
-                
-                # 清空当前输入框的内容
-                if isinstance(self.model_type, tk.Text):
-                    self.model_type.delete("1.0", tk.END)
-                if isinstance(self.model_url, tk.Text):
-                    self.model_url.delete("1.0", tk.END)
-                if isinstance(self.model_desc, tk.Text):
-                    self.model_desc.delete("1.0", tk.END)
-                if isinstance(self.trigger_words, tk.Text):
-                    self.trigger_words.delete("1.0", tk.END)
-                
-                # 重新选中文件
-                self.select_file(file_name, relative_path)
-                
-                # 强制重新加载模型信息
-                self.load_model_info()
-                
-                # 重新加载预览图
-                self.load_preview(file_name, relative_path)
-                
-                # 确保界面更新
-                self.master.update_idletasks()
+                logging.error(f"查找重复模型时发生错误：{str(e)}")
+            self.ui_dispatcher.post(on_finished, groups)
         
-        # 在新线程中执行处理
+        # 在新线程中执行查找
         threading.Thread(target=process, daemon=True).start()
 
-    def batch_fetch_from_civitai(self):
-        """批量从Civitai抓取模型信息"""
-        if not messagebox.askyesno("确认", "是否要从Civitai批量抓取模型信息？\n此操作需要先计算模型哈希值，可能需要较长时间\n本过程将自动跳过已存在Liblib网址的模型\n由于网络（科学网络必须）波动原因，并不保证一定抓取成功，请手动查漏补缺"):
-            return
-        
-        # 询问预览图处理方式
-        replace_all = messagebox.askyesno("预览图处理", "是否替换所有模型的预览图？\n选择\"是\"将替换所有预览图\n选择\"否\"将只为没有预览图的模型添加预览图")
-        
-        # 保存当前选中的文件
-        current_selected_file = self.current_file
+    def show_duplicate_report(self, groups):
+        """显示重复模型报告"""
+        def format_size(size):
+            for unit in ['B', 'KB', 'MB', 'GB']:
+                if size < 1024:
+                    return f"{size:.1f} {unit}"
+                size /= 1024
+            return f"{size:.1f} TB"
         
-        # 取消当前选中状态
-        self.current_file = None
-        if current_selected_file in self.file_frames:
-            frame, path_label, name_label = self.file_frames[current_selected_file]
-            frame.configure(style='List.TFrame')
-            path_label.configure(style='Left.TLabel')
-            name_label.configure(style='Left.TLabel')
-            # 重置所有子部件的样式
-            for widget in frame.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='List.TFrame')
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Left.TLabel')
-    
-        # 创建进度窗口
-        progress_window = tk.Toplevel(self.master)
-        progress_window.title("批量抓取")
-        progress_window.geometry("400x150")
-        progress_window.transient(self.master)
-        progress_window.grab_set()
-    
-        # 居中显示
-        progress_window.geometry(f"+{self.master.winfo_x() + self.master.winfo_width()//2 - 200}+"
-                       f"{self.master.winfo_y() + self.master.winfo_height()//2 - 75}")
-    
-        # 创建主框架
-        main_frame = ttk.Frame(progress_window)
+        total_reclaimable = sum(group['reclaimable'] for group in groups)
+        lines = [f"共发现 {len(groups)} 组重复模型，可释放 {format_size(total_reclaimable)}", ""]
+        for index, group in enumerate(groups, 1):
+            lines.append(f"重复组 {index}：{len(group['files'])} 个文件，每个 {format_size(group['size'])}，"
+                         f"可释放 {format_size(group['reclaimable'])}")
+            lines.append(f"SHA256: {group['hash']}")
+            linked = set(group.get('linked', []))
+            for rel_path in group['files']:
+                lines.append(f"    {rel_path}（链接副本，共享存储）" if rel_path in linked else f"    {rel_path}")
+            lines.append("")
+        report = "\n".join(lines)
+        
+        # 创建报告窗口
+        report_window = tk.Toplevel(self.master)
+        report_window.title("重复模型报告")
+        report_window.geometry("800x500")
+        report_window.transient(self.master)
+        
+        main_frame = ttk.Frame(report_window)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    
-        # 创建状态标签
-        status_label = ttk.Label(main_frame, text="准备抓取...", wraplength=380)
-        status_label.pack(pady=(0, 10))
-    
-        # 创建进度条
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(
-            main_frame,
-            variable=progress_var,
-            maximum=100,
-            mode='determinate',
-            style='primary.Horizontal.TProgressbar'
-        )
-        progress_bar.pack(fill=tk.X, pady=(0, 10))
-    
-        # 创建取消按钮
-        cancel_flag = [False]
-        cancel_btn = ttk.Button(
-            main_frame,
-            text="取消",
-            command=lambda: cancel_flag.__setitem__(0, True),
-            style='primary.TButton'
-        )
-        cancel_btn.pack(pady=(0, 10))
-    
-        def update_progress(current, total, message):
-            if not progress_window.winfo_exists():
-                return
-            progress = (current / total) * 100
-            progress_var.set(progress)
-            status_label.config(text=message)
-            progress_window.update()
-    
-        def process():
-            try:
-                total_files = len(self.all_files)
-                processed = 0
-                skipped = 0
-                success = 0
-                
-                for file, path in self.all_files:
-                    if cancel_flag[0]:
-                        break
-                    
-                    full_path = os.path.join(BASE_PATH, path, file)
-                    update_progress(processed, total_files, f"正在处理: \n{file[:18] + '...' if len(file) > 18 else file}")
-                    
-                    try:
-                        # 获取模型信息
-                        info = self.get_model_info(os.path.join(path, file))
-                        
-                        # 检查是否已有Liblib网址
-                        url = info.get('url', '').strip()
-                        if url and 'liblib.art' in url:
-                            skipped += 1
-                            processed += 1
-                            continue
-                        
-                        # 获取或计算哈希值
-                        hash_value = info.get('hash', '')
-                        if not hash_value:
-                            hash_value = self.calculate_file_hash(full_path)
-                            info['hash'] = hash_value
-                        
-                        if hash_value:
-                            # 检查预览图
-                            has_preview = self.get_image_path(file, path) is not None
-                            if has_preview and not replace_all:
-                                need_preview = False
-                            else:
-                                need_preview = True
-                            
-                            # 使用API获取信息
-                            api_url = f"https://civitai.com/api/v1/model-versions/by-hash/{hash_value}"
-                            headers = {
-                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                            }
-                            
-                            response = requests.get(api_url, headers=headers, timeout=30)
-                            
-                            if response.status_code == 200:
-                                data = response.json()
-                                
-                                # 获取模型URL
-                                model_id = data.get('modelId')
-                                version_id = data.get('id')
-                                if model_id and version_id:
-                                    info['url'] = f"https://civitai.com/models/{model_id}?modelVersionId={version_id}"
-                                
-                                # 获取预览图
-                                if need_preview and 'images' in data and len(data['images']) > 0:
-                                    image_url = data['images'][0].get('url')
-                                    if image_url:
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                                            img_response = requests.get(image_url, headers=headers)
-                                            if img_response.status_code == 200:
-                                                temp_file.write(img_response.content)
-                                                preview_path = os.path.join(BASE_PATH, path, f"{os.path.splitext(file)[0]}.png")
-                                                with Image.open(temp_file.name) as img:
-                                                    img.save(preview_path, "PNG")
-                                
-                                # 获取触发词
-                                if 'trainedWords' in data:
-                                    info['trigger_words'] = ", ".join(data['trainedWords'])
-                                
-                                # 获取描述
-                                if info['url']:
-                                    try:
-                                        page_response = requests.get(info['url'], headers=headers, timeout=30)
-                                        if page_response.status_code == 200:
-                                            soup = BeautifulSoup(page_response.text, 'html.parser')
-                                            json_script = soup.find('script', type='application/ld+json')
-                                            if json_script:
-                                                json_data = json.loads(json_script.string)
-                                                description = json_data.get('description', '')
-                                                if description:
-                                                    desc_soup = BeautifulSoup(description, 'html.parser')
-                                                    description_lines = []
-                                                    for element in desc_soup.descendants:
-                                                        if isinstance(element, NavigableString):
-                                                            text = element.strip()
-                                                            if text:
-                                                                description_lines.append(text)
-                                                        elif element.name in ['p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                                                            description_lines.append('')
-                                                
-                                                formatted_description = '\n'.join(description_lines).strip()
-                                                if formatted_description:
-                                                    info['description'] = "=== 从Civitai抓取的描述 ===\n" + formatted_description
-                                    except Exception as e:
-                                        logging.error(f"获取描述失败：{str(e)}")
-                                
-                                # 保存更新后的信息
-                                self.save_model_info(os.path.join(path, file), info)
-                                success += 1
-                            else:
-                                skipped += 1
-                        else:
-                            skipped += 1
-                        
-                        processed += 1
-                        
-                    except Exception as e:
-                        logging.error(f"处理文件 {file} 时发生错误: {str(e)}")
-                        skipped += 1
-                                    
-                if cancel_flag[0]:
-                    update_progress(processed + skipped, total_files, "操作已取消")
-                else:
-                    update_progress(processed + skipped, total_files, 
-                                  f"已处理: {processed} 个文件 成功: {success} 个 跳过: {skipped} 个")
-                    progress_var.set(100)
-                
-                # 修改取消按钮为关闭按钮
-                cancel_btn.configure(
-                    text="关闭",
-                    command=lambda: finish_process(current_selected_file)
-                )
-                
-            except Exception as e:
-                self.show_popup_message(f"批量抓取时发生错误：{str(e)}")
-                progress_window.destroy()
         
-        def finish_process(selected_file):
-            """完成处理后的清理工作"""
-            # 关闭进度窗口
-            progress_window.destroy()
-            
-            # 刷新文件列表
-            self.refresh_files()
-            
-            # 如果之前有选中的文件，重新选中并刷新其信息
-            if selected_file:
-                file_name = os.path.basename(selected_file)
-                relative_path = os.path.dirname(selected_file)
-                
-                # 清空当前输入框的内容
-                if isinstance(self.model_type, tk.Text):
-                    self.model_type.delete("1.0", tk.END)
-                if isinstance(self.model_url, tk.Text):
-                    self.model_url.delete("1.0", tk.END)
-                if isinstance(self.model_desc, tk.Text):
-                    self.model_desc.delete("1.0", tk.END)
-                if isinstance(self.trigger_words, tk.Text):
-                    self.trigger_words.delete("1.0", tk.END)
-                
-                # 重新选中文件
-                self.select_file(file_name, relative_path)
-                
-                # 强制重新加载模型信息
-                self.load_model_info()
-                
-                # 重新加载预览图
-                self.load_preview(file_name, relative_path)
-                
-                # 确保界面更新
-                self.master.update_idletasks()
+        text_widget = tk.Text(main_frame, wrap=tk.NONE, font=self.base_font)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=text_widget.yview)
+        text_widget.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text_widget.insert("1.0", report)
+        text_widget.configure(state='disabled')
         
-        # 在新线程中执行处理
-        threading.Thread(target=process, daemon=True).start()
+        def copy_report():
+            self.master.clipboard_clear()
+            self.master.clipboard_append(report)
+            self.show_popup_message("报告已复制")
+        
+        button_frame = ttk.Frame(report_window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="复制报告", command=copy_report, style='primary.TButton').pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="关闭", command=report_window.destroy, style='primary.TButton').pack(side=tk.RIGHT)
 
     def update_stats_label(self):
         """更新统计信息标签"""
@@ -6605,11 +6966,20 @@ https://pan.quark.cn/s/75450b122a53"""
             # 计算文件总数
             total_count = len(filtered_files)
             
-            # 计算总大小
+            # 计算总大小（硬链接和链接副本共享存储，只计算一次）
             total_size = 0
+            linked_count = 0
+            counted_storage = set()
             for file, path in filtered_files:
                 try:
-                    full_path = os.path.join(BASE_PATH, path, file)
+                    model_path = os.path.join(path, file)
+                    full_path = os.path.join(BASE_PATH, model_path)
+                    root = resolve_link_root(model_path, self.model_links)
+                    storage_key = get_storage_key(os.path.join(BASE_PATH, root)) or root
+                    if storage_key in counted_storage:
+                        linked_count += 1
+                        continue
+                    counted_storage.add(storage_key)
                     total_size += os.path.getsize(full_path)
                 except:
                     continue
@@ -6628,6 +6998,8 @@ https://pan.quark.cn/s/75450b122a53"""
                 location_text += f" > {subfolder}"
             
             stats_text = f"共 {total_count} 个模型，总计 {format_size(total_size)}"
+            if linked_count:
+                stats_text += f"（{linked_count} 个链接副本不计大小）"
             
             # 更新标签文本
             self.stats_label.configure(text=stats_text)
@@ -6853,4 +7225,7 @@ if __name__ == "__main__":
     app = SafetensorsViewer(root)
     
     # 启动主循环
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    
+    # 关闭抓取时启动的浏览器
+    app.close_liblib_browser_pool()
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+CS / SD WebUI 配置文件导出
+在内存中生成配置文件内容，与已有文件比较（先比较大小，再比较内容哈希），只在内容变化时写入；
+写入先写临时文件再替换，避免留下不完整的文件
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import hashlib  # 内容比较
+import logging  # 日志记录
+
+# 导出类型
+SIDECAR_CS = 'cs'
+SIDECAR_SD = 'sd'
+
+# CS 配置文件（放在与模型同名的文件夹中）
+CS_DESCRIPTION_FILE = 'Describe.txt'
+CS_TRIGGER_WORDS_FILE = 'Trigger_Words.txt'
+
+# 批量导出时并发写入的线程数
+SIDECAR_WORKERS = 4
+
+# 批量导出时每次读取模型信息后处理的模型数
+SIDECAR_BATCH_SIZE = 1000
+
+
+def get_cs_dir(model_path):
+    """CS 配置文件所在的文件夹（与模型同名）"""
+    return os.path.splitext(model_path)[0]
+
+
+def get_sd_path(model_path):
+    """SD 配置文件路径（与模型同名的 .json）"""
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def render_cs_files(info):
+    """
+    生成 CS 配置文件内容（描述和触发词为空时不生成对应文件）
+    Returns:
+        dict: {文件名: 文本}
+    """
+    files = {}
+    description = info.get('description', '')
+    trigger_words = info.get('trigger_words', '')
+    if description:
+        files[CS_DESCRIPTION_FILE] = description
+    if trigger_words:
+        files[CS_TRIGGER_WORDS_FILE] = trigger_words
+    return files
+
+
+def render_sd_file(info):
+    """生成 SD 配置文件内容（与 WebUI 的模型信息格式一致）"""
+    json_data = {
+        "description": info.get('description', ''),
+        "sd version": "",
+        "activation text": info.get('trigger_words', ''),
+        "preferred weight": 0,
+        "negative text": "",
+        "notes": ""
+    }
+    return json.dumps(json_data, ensure_ascii=False, indent=4)
+
+
+def render_sidecars(kind, model_path, info):
+    """
+    生成一个模型的配置文件
+    Args:
+        model_path: 模型文件的完整路径
+    Returns:
+        list: [(配置文件路径, 文本)]
+    """
+    if kind == SIDECAR_CS:
+        cs_dir = get_cs_dir(model_path)
+        return [(os.path.join(cs_dir, name), text) for name, text in render_cs_files(info).items()]
+    return [(get_sd_path(model_path), render_sd_file(info))]
+
+
+def encode_text(text):
+    """按文本模式写入时的字节内容（换行转换为系统换行符），用于和已有文件比较"""
+    return text.replace('\n', os.linesep).encode('utf-8')
+
+
+def file_matches(path, data):
+    """已有文件的内容是否与 data 相同（大小不同时不读取文件）"""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            existing = f.read()
+    except OSError:
+        return False
+    return hashlib.sha256(existing).digest() == hashlib.sha256(data).digest()
+
+
+def write_if_changed(path, text):
+    """
+    内容变化时写入文件（先写同目录的临时文件再替换）
+    Returns:
+        bool: 是否写入
+    """
+    data = encode_text(text)
+    if file_matches(path, data):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return True
+
+
+def export_sidecars(kind, model_path, info):
+    """
+    导出一个模型的配置文件，内容没有变化的文件不写入
+    Returns:
+        tuple: (写入的文件数, 没有变化的文件数)
+    """
+    written = 0
+    unchanged = 0
+    for path, text in render_sidecars(kind, model_path, info):
+        if write_if_changed(path, text):
+            written += 1
+        else:
+            unchanged += 1
+    return written, unchanged
+
+
+def has_sidecars(kind, model_path):
+    """模型是否已经导出过配置文件（编辑后只更新已导出的）"""
+    if kind == SIDECAR_CS:
+        return os.path.isdir(get_cs_dir(model_path))
+    return os.path.exists(get_sd_path(model_path))
+
+
+def sync_sidecars(model_path, info):
+    """
+    模型信息修改后，更新已经导出过的配置文件
+    Returns:
+        int: 写入的文件数
+    """
+    written = 0
+    for kind in (SIDECAR_CS, SIDECAR_SD):
+        if not has_sidecars(kind, model_path):
+            continue
+        try:
+            written += export_sidecars(kind, model_path, info)[0]
+        except Exception as e:
+            logging.error(f"更新配置文件时发生错误 {model_path}：{str(e)}")
+    return written
@@ -0,0 +1,207 @@
+"""
+LoRA 训练标签索引
+从文件头元数据 ss_tag_frequency 建立 标签 -> 模型 的倒排索引，用于按训练标签搜索和推荐触发词
+"""
+
+import os  # 操作系统相关
+import json  # JSON处理
+import logging  # 日志记录
+import threading  # 多线程
+from model_header import get_metadata_json  # 解析元数据中的 JSON
+
+# 标签索引文件（与 model_info.json 放在同一目录）
+TAG_INDEX_FILE = 'tag_index.json'
+TAG_INDEX_VERSION = 1
+
+# 每个模型最多保存的标签数量（按训练次数从多到少）
+MAX_TAGS_PER_MODEL = 200
+
+# 推荐触发词的默认数量
+SUGGESTION_COUNT = 10
+
+
+def parse_tag_frequency(metadata):
+    """
+    解析 ss_tag_frequency（{数据集目录: {标签: 次数}}），合并所有目录
+    Returns:
+        dict: {标签: 次数}
+    """
+    tag_frequency = get_metadata_json(metadata, 'ss_tag_frequency')
+    if not isinstance(tag_frequency, dict):
+        return {}
+    counts = {}
+    for tags in tag_frequency.values():
+        if not isinstance(tags, dict):
+            continue
+        for tag, count in tags.items():
+            tag = str(tag).strip()
+            if not tag:
+                continue
+            try:
+                counts[tag] = counts.get(tag, 0) + int(count)
+            except (TypeError, ValueError):
+                continue
+    return counts
+
+
+class TagIndex:
+    """
+    持久化的训练标签索引
+    文件中保存一张标签表和每个模型的 [标签编号, 次数] 列表，加载后在内存中建立倒排索引
+    """
+
+    def __init__(self, base_path, index_file=TAG_INDEX_FILE):
+        self.base_path = base_path
+        self.index_file = index_file
+        self.lock = threading.RLock()
+        self.models = {}  # 相对路径 -> {'size', 'mtime_ns', 'tags': {标签: 次数}}
+        self.inverted = {}  # 小写标签 -> {相对路径: 次数}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载索引"""
+        with self.lock:
+            self.models = {}
+            self.inverted = {}
+            if not os.path.exists(self.index_file):
+                return
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != TAG_INDEX_VERSION:
+                    return
+                tag_table = data.get('tags', [])
+                for rel_path, entry in data.get('models', {}).items():
+                    size, mtime_ns, pairs = entry
+                    tags = {tag_table[tag_id]: count for tag_id, count in pairs}
+                    self._set_model(rel_path, size, mtime_ns, tags)
+            except Exception as e:
+                logging.error(f"读取标签索引时发生错误：{str(e)}")
+
+    def save(self):
+        """保存索引到磁盘（紧凑格式：标签只保存一次，模型记录只保存编号）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            tag_ids = {}
+            models = {}
+            for rel_path, entry in self.models.items():
+                pairs = []
+                for tag, count in entry['tags'].items():
+                    if tag not in tag_ids:
+                        tag_ids[tag] = len(tag_ids)
+                    pairs.append([tag_ids[tag], count])
+                models[rel_path] = [entry['size'], entry['mtime_ns'], pairs]
+            data = {'version': TAG_INDEX_VERSION, 'tags': list(tag_ids), 'models': models}
+            temp_file = self.index_file + '.tmp'
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_file, self.index_file)
+                self.dirty = False
+            except Exception as e:
+                logging.error(f"保存标签索引时发生错误：{str(e)}")
+
+    def _set_model(self, rel_path, size, mtime_ns, tags):
+        self._remove_model(rel_path)
+        if not tags:
+            return
+        self.models[rel_path] = {'size': size, 'mtime_ns': mtime_ns, 'tags': tags}
+        for tag, count in tags.items():
+            models = self.inverted.setdefault(tag.lower(), {})
+            models[rel_path] = models.get(rel_path, 0) + count
+
+    def _remove_model(self, rel_path):
+        entry = self.models.pop(rel_path, None)
+        if not entry:
+            return
+        for tag in entry['tags']:
+            models = self.inverted.get(tag.lower())
+            if models:
+                models.pop(rel_path, None)
+                if not models:
+                    del self.inverted[tag.lower()]
+
+    def update(self, summaries):
+        """
+        根据文件头摘要增量更新索引，文件未变化的模型不重新解析
+        Args:
+            summaries: {模型相对路径: 文件头摘要}
+        """
+        with self.lock:
+            for rel_path, summary in summaries.items():
+                try:
+                    stat = os.stat(os.path.join(self.base_path, rel_path))
+                except OSError:
+                    continue
+                entry = self.models.get(rel_path)
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                counts = parse_tag_frequency((summary or {}).get('metadata', {}))
+                top_tags = sorted(counts.items(), key=lambda x: -x[1])[:MAX_TAGS_PER_MODEL]
+                if not top_tags and rel_path not in self.models:
+                    continue
+                self._set_model(rel_path, stat.st_size, stat.st_mtime_ns, dict(top_tags))
+                self.dirty = True
+
+    def prune(self, existing_paths):
+        """删除已不存在的模型"""
+        with self.lock:
+            for rel_path in [path for path in self.models if path not in existing_paths]:
+                self._remove_model(rel_path)
+                self.dirty = True
+
+    def rename(self, old_path, new_path):
+        """模型移动后更新索引中的路径"""
+        with self.lock:
+            entry = self.models.get(old_path)
+            if entry:
+                self._remove_model(old_path)
+                self._set_model(new_path, entry['size'], entry['mtime_ns'], entry['tags'])
+                self.dirty = True
+
+    def discard(self, rel_path):
+        """删除某个模型的记录"""
+        with self.lock:
+            if rel_path in self.models:
+                self._remove_model(rel_path)
+                self.dirty = True
+
+    def models_with_tag(self, tag):
+        """
+        查询用某个标签训练过的模型（不区分大小写）
+        Returns:
+            list: [(模型相对路径, 次数)]，按次数从多到少
+        """
+        with self.lock:
+            models = self.inverted.get(tag.strip().lower(), {})
+            return sorted(models.items(), key=lambda x: -x[1])
+
+    def search(self, term):
+        """
+        查找训练标签包含搜索词的模型（不区分大小写）
+        Returns:
+            set: 模型相对路径
+        """
+        term = term.strip().lower()
+        if not term:
+            return set()
+        with self.lock:
+            results = set()
+            for tag, models in self.inverted.items():
+                if term in tag:
+                    results.update(models)
+            return results
+
+    def suggest_trigger_words(self, rel_path, count=SUGGESTION_COUNT):
+        """
+        推荐触发词：该模型训练次数最多的标签
+        Returns:
+            list: 标签列表
+        """
+        with self.lock:
+            entry = self.models.get(rel_path)
+            if not entry:
+                return []
+            return [tag for tag, _ in sorted(entry['tags'].items(), key=lambda x: -x[1])[:count]]
@@ -0,0 +1,4 @@
+"""
+测试（使用本地 HTTP 服务器模拟 Civitai、Liblib 和图片下载，不访问外网）
+运行：python -m pytest -q tests
+"""
@@ -0,0 +1,113 @@
+"""
+测试用的本地 HTTP 服务器
+在后台线程中运行，按路径把请求交给处理函数 handler(request)，
+处理函数可以用 request.send() 返回响应，也可以直接写 request.wfile（如分块传输）
+"""
+
+import json  # JSON处理
+import threading  # 多线程
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 本地 HTTP 服务器
+from urllib.parse import urlsplit  # 解析请求路径
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持长连接（测试连接池复用）
+    disable_nagle_algorithm = True  # 响应头和响应体分开发送，避免长连接上的延迟确认等待
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        self.server.owner.record(self.command, path, self)
+        handler = self.server.owner.find_route(self.command, path)
+        if handler is None:
+            self.send(404, b'not found')
+            return
+        try:
+            handler(self)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+
+    def json(self):
+        """请求体解析为 JSON"""
+        return json.loads(self.body.decode('utf-8'))
+
+    def send(self, status, body=b'', headers=None, content_type='application/octet-stream'):
+        """发送完整响应（body 为 dict 或 list 时以 JSON 返回）"""
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+            content_type = 'application/json'
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LocalServer:
+    """
+    本地 HTTP 服务器（with 语句中运行）
+    routes: {路径: handler} 或 {(方法, 路径): handler}；以 / 结尾的路径匹配其下所有路径
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.lock = threading.Lock()
+        self.requests = []  # 收到的请求 (方法, 路径)
+        self.connections = set()  # 客户端连接（地址, 端口），用于检查连接复用
+        self.server = None
+        self.thread = None
+
+    def find_route(self, method, path):
+        """完全相同的路径优先，其次是最长的前缀"""
+        best, best_length = None, -1
+        for route, handler in self.routes.items():
+            route_method, route_path = route if isinstance(route, tuple) else (method, route)
+            if route_method != method:
+                continue
+            if route_path == path:
+                return handler
+            if route_path.endswith('/') and path.startswith(route_path) and len(route_path) > best_length:
+                best, best_length = handler, len(route_path)
+        return best
+
+    def record(self, method, path, request):
+        with self.lock:
+            self.requests.append((method, path))
+            self.connections.add(request.client_address)
+
+    def count(self, method=None, path=None):
+        """统计收到的请求数（path 以 / 结尾时按前缀匹配）"""
+        with self.lock:
+            return sum(
+                1 for request_method, request_path in self.requests
+                if (method is None or request_method == method)
+                and (path is None or request_path == path or (path.endswith('/') and request_path.startswith(path)))
+            )
+
+    def url(self, path=''):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _RequestHandler)
+        self.server.daemon_threads = True
+        self.server.owner = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
@@ -0,0 +1,328 @@
+"""
+Civitai 请求客户端测试（本地模拟的 Civitai API）
+包括连接复用、并发限制、退避重试、取消、响应缓存、批量按哈希查询及其降级，
+以及 1000 个哈希批量查询与逐个查询的请求数和耗时对比
+"""
+
+import os  # 操作系统相关
+import random  # 打乱批量查询的返回顺序
+import shutil  # 删除临时目录
+import tempfile  # 临时目录
+import threading  # 多线程
+import time  # 时间相关
+import unittest  # 测试框架
+from concurrent.futures import ThreadPoolExecutor  # 逐个查询时的并发
+
+from civitai_client import (BULK_LOOKUP_SIZE, FETCH_WORKERS, CivitaiClient, FetchCancelled, ResponseCache)
+from tests.http_server import LocalServer
+
+API_PATH = '/api/v1'
+BY_HASH_PATH = API_PATH + '/model-versions/by-hash'
+
+# 对比批量查询和逐个查询时使用的哈希数量，以及模拟的服务器处理时间（秒）
+BENCHMARK_HASHES = 1000
+BENCHMARK_LATENCY = 0.005
+
+
+def make_hash(index):
+    return f"{index:064X}"
+
+
+def make_version(index):
+    return {
+        'id': 1000 + index,
+        'modelId': index,
+        'files': [{'hashes': {'SHA256': make_hash(index), 'AutoV2': make_hash(index)[:10]}}],
+        'trainedWords': [f"word{index}"],
+    }
+
+
+class FakeCivitaiApi:
+    """
+    模拟的 Civitai 按哈希查询接口
+    偶数编号的哈希能找到模型版本，奇数编号找不到
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.bulk_status = None  # 批量接口固定返回的状态码（None 表示正常返回）
+        self.reject_hashes = set()  # 批量查询中包含这些哈希时返回 400
+        self.failures = []  # 依次返回的失败响应 (状态码, 响应头)
+        self.active = 0
+        self.max_active = 0
+
+    def routes(self):
+        return {
+            ('GET', BY_HASH_PATH + '/'): self.get_by_hash,
+            ('POST', BY_HASH_PATH): self.post_by_hash,
+        }
+
+    def find(self, hash_value):
+        index = int(hash_value, 16)
+        return make_version(index) if index % 2 == 0 else None
+
+    def _begin(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failure = self.failures.pop(0) if self.failures else None
+        if self.latency:
+            time.sleep(self.latency)
+        return failure
+
+    def _end(self):
+        with self.lock:
+            self.active -= 1
+
+    def get_by_hash(self, request):
+        failure = self._begin()
+        try:
+            if failure:
+                request.send(failure[0], {'error': 'busy'}, headers=failure[1])
+                return
+            hash_value = request.path.rsplit('/', 1)[-1].split('?')[0]
+            version = self.find(hash_value)
+            etag = f'"{hash_value[-8:]}"'
+            if version is None:
+                request.send(404, {'error': 'Model not found'})
+            elif request.headers.get('If-None-Match') == etag:
+                request.send(304, headers={'ETag': etag})
+            else:
+                request.send(200, version, headers={'ETag': etag})
+        finally:
+            self._end()
+
+    def post_by_hash(self, request):
+        failure = self._begin()
+        try:
+            if failure:
+                request.send(failure[0], {'error': 'busy'}, headers=failure[1])
+                return
+            if self.bulk_status:
+                request.send(self.bulk_status, {'error': 'unsupported'})
+                return
+            hash_values = request.json()
+            if self.reject_hashes & set(hash_values):
+                request.send(400, {'error': 'invalid hash'})
+                return
+            versions = [version for version in map(self.find, hash_values) if version]
+            random.shuffle(versions)
+            request.send(200, versions)
+        finally:
+            self._end()
+
+
+class CivitaiClientTestCase(unittest.TestCase):
+    latency = 0
+
+    def setUp(self):
+        self.api = FakeCivitaiApi(self.latency)
+        self.server = LocalServer(self.api.routes()).__enter__()
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(os.path.join(self.temp_dir, 'civitai_cache.json'))
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_client(self, response_cache=None, **kwargs):
+        kwargs.setdefault('backoff_base', 0.01)
+        return CivitaiClient(api_base=self.server.url(API_PATH), response_cache=response_cache, **kwargs)
+
+
+class RequestTest(CivitaiClientTestCase):
+    def test_connection_reused(self):
+        client = self.make_client()
+        for index in range(20):
+            client.get_version_by_hash(make_hash(index))
+        self.assertEqual(self.server.count('GET'), 20)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_host_concurrency(self):
+        self.api.latency = 0.05
+        client = self.make_client(host_concurrency=2)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(client.get_version_by_hash, [make_hash(index) for index in range(16)]))
+        self.assertEqual(self.api.max_active, 2)
+
+    def test_retry_after(self):
+        self.api.failures = [(429, {'Retry-After': '0.2'}), (503, {})]
+        client = self.make_client()
+        start = time.monotonic()
+        self.assertEqual(client.get_version_by_hash(make_hash(2))['id'], 1002)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(client.stats['retries'], 2)
+        self.assertEqual(client.stats['requests'], 3)
+
+    def test_retries_exhausted(self):
+        self.api.failures = [(503, {})] * 3
+        client = self.make_client(max_retries=2)
+        response = client.get(self.server.url(BY_HASH_PATH + '/' + make_hash(2)))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(client.stats['requests'], 3)
+
+    def test_cancel_during_backoff(self):
+        self.api.failures = [(429, {'Retry-After': '10'})]
+        client = self.make_client()
+        threading.Timer(0.2, client.cancel).start()
+        start = time.monotonic()
+        with self.assertRaises(FetchCancelled):
+            client.get_version_by_hash(make_hash(2))
+        self.assertLess(time.monotonic() - start, 2)
+
+        # 取消后不再发送请求，reset() 之后恢复
+        with self.assertRaises(FetchCancelled):
+            client.get_version_by_hash(make_hash(4))
+        self.assertEqual(self.server.count(), 1)
+        client.reset()
+        self.assertEqual(client.get_version_by_hash(make_hash(4))['id'], 1004)
+
+    def test_connection_error(self):
+        client = self.make_client(max_retries=1)
+        url = self.server.url(BY_HASH_PATH + '/' + make_hash(2))
+        self.server.__exit__(None, None, None)
+        try:
+            with self.assertRaises(Exception):
+                client.get(url)
+            self.assertEqual(client.stats['retries'], 1)
+        finally:
+            self.server = LocalServer(self.api.routes()).__enter__()
+
+
+class ResponseCacheTest(CivitaiClientTestCase):
+    def test_cached_lookup(self):
+        client = self.make_client(self.cache)
+        self.assertEqual(client.get_version_by_hash(make_hash(2))['id'], 1002)
+        self.assertIsNone(client.get_version_by_hash(make_hash(3)))
+        # 找到和未找到的结果都使用缓存，哈希不区分大小写
+        self.assertEqual(client.get_version_by_hash(make_hash(2).lower())['id'], 1002)
+        self.assertIsNone(client.get_version_by_hash(make_hash(3)))
+        self.assertEqual(self.server.count(), 2)
+        self.assertEqual(client.stats['cache_hits'], 2)
+
+    def test_conditional_request_after_expiry(self):
+        client = self.make_client(self.cache)
+        client.get_version_by_hash(make_hash(2))
+        self.cache.ttl = 0
+        self.assertEqual(client.get_version_by_hash(make_hash(2))['id'], 1002)
+        self.assertEqual(client.stats['not_modified'], 1)
+        self.assertEqual(self.server.count(), 2)
+
+    def test_force_refresh(self):
+        client = self.make_client(self.cache)
+        client.get_version_by_hash(make_hash(2))
+        client.get_version_by_hash(make_hash(2), force_refresh=True)
+        self.assertEqual(client.stats['not_modified'], 0)
+        self.assertEqual(self.server.count(), 2)
+
+    def test_saved_to_disk(self):
+        client = self.make_client(self.cache)
+        client.get_version_by_hash(make_hash(2))
+        self.cache.save()
+        self.assertFalse(os.path.exists(self.cache.cache_file + '.tmp'))
+        reloaded = ResponseCache(self.cache.cache_file)
+        client = self.make_client(reloaded)
+        self.assertEqual(client.get_version_by_hash(make_hash(2))['id'], 1002)
+        self.assertEqual(self.server.count(), 1)
+
+
+class BulkLookupTest(CivitaiClientTestCase):
+    def test_bulk_lookup(self):
+        hashes = [make_hash(index) for index in range(250)]
+        client = self.make_client(self.cache)
+        results = client.get_versions_by_hashes(hashes)
+        self.assertEqual(set(results), set(hashes))
+        self.assertEqual(results[make_hash(10)]['id'], 1010)
+        self.assertIsNone(results[make_hash(11)])
+        self.assertEqual(self.server.count('POST'), 3)
+        self.assertEqual(client.stats['bulk_requests'], 3)
+
+        # 结果写入缓存，之后逐个查询不再发送请求
+        self.assertEqual(client.get_version_by_hash(make_hash(10))['id'], 1010)
+        self.assertIsNone(client.get_version_by_hash(make_hash(11)))
+        self.assertEqual(self.server.count(), 3)
+
+    def test_bulk_uses_cache_first(self):
+        client = self.make_client(self.cache)
+        client.get_version_by_hash(make_hash(0))
+        results = client.get_versions_by_hashes([make_hash(0)])
+        self.assertEqual(results[make_hash(0)]['id'], 1000)
+        self.assertEqual(self.server.count('POST'), 0)
+
+    def test_unsupported_endpoint(self):
+        self.api.bulk_status = 404
+        hashes = [make_hash(index) for index in range(250)]
+        client = self.make_client()
+        self.assertEqual(client.get_versions_by_hashes(hashes), {})
+        # 接口不存在时本次任务中不再尝试
+        self.assertEqual(self.server.count('POST'), 1)
+        self.assertFalse(client.bulk_supported)
+        self.assertEqual(client.get_versions_by_hashes(hashes), {})
+        self.assertEqual(self.server.count('POST'), 1)
+
+        # 新任务开始时重新尝试
+        self.api.bulk_status = None
+        client.reset()
+        self.assertEqual(len(client.get_versions_by_hashes(hashes)), 250)
+        self.assertEqual(self.server.count('POST'), 4)
+
+    def test_rejected_batch_only(self):
+        hashes = [make_hash(index) for index in range(250)]
+        # 第二批中有一个哈希被拒绝
+        self.api.reject_hashes = {make_hash(150)}
+        client = self.make_client()
+        results = client.get_versions_by_hashes(hashes)
+        self.assertTrue(client.bulk_supported)
+        self.assertEqual(self.server.count('POST'), 3)
+        rejected = set(hashes[BULK_LOOKUP_SIZE:2 * BULK_LOOKUP_SIZE])
+        self.assertEqual(set(results), set(hashes) - rejected)
+
+        # 下一次批量查询照常进行
+        self.api.reject_hashes = set()
+        self.assertEqual(len(client.get_versions_by_hashes(hashes[:10])), 10)
+        self.assertEqual(self.server.count('POST'), 4)
+
+    def test_server_error_skips_batch(self):
+        self.api.failures = [(500, {})] * 3
+        hashes = [make_hash(index) for index in range(150)]
+        client = self.make_client(max_retries=2)
+        results = client.get_versions_by_hashes(hashes)
+        self.assertTrue(client.bulk_supported)
+        self.assertEqual(set(results), set(hashes[BULK_LOOKUP_SIZE:]))
+
+
+class BulkBenchmarkTest(CivitaiClientTestCase):
+    """1000 个哈希：批量查询与逐个查询（FETCH_WORKERS 个线程）的请求数和耗时"""
+
+    latency = BENCHMARK_LATENCY
+
+    def lookup_each(self, client, hashes):
+        with ThreadPoolExecutor(FETCH_WORKERS) as executor:
+            return dict(zip(hashes, executor.map(client.get_version_by_hash, hashes)))
+
+    def test_bulk_vs_single(self):
+        hashes = [make_hash(index) for index in range(BENCHMARK_HASHES)]
+
+        client = self.make_client()
+        start = time.perf_counter()
+        bulk_results = client.get_versions_by_hashes(hashes)
+        bulk_seconds = time.perf_counter() - start
+        bulk_requests = client.stats['requests']
+
+        client = self.make_client()
+        start = time.perf_counter()
+        single_results = self.lookup_each(client, hashes)
+        single_seconds = time.perf_counter() - start
+        single_requests = client.stats['requests']
+
+        print(f"\n{BENCHMARK_HASHES} 个哈希：批量查询 {bulk_requests} 个请求 {bulk_seconds:.2f} 秒；"
+              f"逐个查询 {single_requests} 个请求 {single_seconds:.2f} 秒")
+        self.assertEqual(bulk_results, single_results)
+        self.assertEqual(bulk_requests, BENCHMARK_HASHES // BULK_LOOKUP_SIZE)
+        self.assertEqual(single_requests, BENCHMARK_HASHES)
+        self.assertLess(bulk_seconds, single_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
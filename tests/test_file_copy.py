@@ -0,0 +1,221 @@
+"""
+模型文件复制测试
+复制方式的降级顺序（reflink → copy_file_range → sendfile → 读写）、硬链接模式、取消和校验，
+以及与旧的“两遍复制”（shutil.copy2 后再整体重写一遍）在多 GB 稀疏文件上的耗时对比
+"""
+
+import errno  # 错误码
+import hashlib  # 校验复制结果
+import os  # 操作系统相关
+import shutil  # 旧的复制方式
+import tempfile  # 临时目录
+import time  # 时间相关
+import unittest  # 测试框架
+from unittest import mock  # 模拟系统调用失败
+
+import file_copy
+from file_copy import (COPY_CHUNK_SIZE, COPY_MODE_HARDLINK, COPY_MODE_REFLINK, METHOD_COPY_FILE_RANGE,
+                       METHOD_HARDLINK, METHOD_READ_WRITE, METHOD_REFLINK, METHOD_SENDFILE, PARTIAL_SUFFIX,
+                       CopyCancelled, copy_file, get_copy_methods)
+
+# 基准使用的稀疏文件大小
+BENCHMARK_SIZES = (2 * 1024 ** 3, 4 * 1024 ** 3)
+
+# 旧复制方式第二遍读写的块大小
+OLD_COPY_CHUNK_SIZE = 10 * 1024 * 1024
+
+
+def unsupported(*args, **kwargs):
+    raise OSError(errno.EOPNOTSUPP, "不支持")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def old_double_copy(source_path, target_path):
+    """旧的复制方式：shutil.copy2 之后再用 Python 分块读写重写一遍"""
+    shutil.copy2(source_path, target_path)
+    temp_path = target_path + '.tmp'
+    with open(target_path, 'rb') as fsrc, open(temp_path, 'wb') as fdst:
+        for block in iter(lambda: fsrc.read(OLD_COPY_CHUNK_SIZE), b''):
+            fdst.write(block)
+    os.replace(temp_path, target_path)
+
+
+class CopyFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, 'model.safetensors')
+        self.target = os.path.join(self.temp_dir, 'copy.safetensors')
+        # 跨越多个复制块，并包含不能整除的尾部
+        self.data = os.urandom(COPY_CHUNK_SIZE * 2 + 12345)
+        with open(self.source, 'wb') as f:
+            f.write(self.data)
+        os.utime(self.source, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def assert_copied(self):
+        with open(self.target, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.stat(self.target).st_mtime_ns, os.stat(self.source).st_mtime_ns)
+        self.assert_no_partial()
+
+    def assert_no_partial(self):
+        self.assertFalse(os.path.exists(self.target + PARTIAL_SUFFIX))
+
+
+class FallbackChainTest(CopyFileTestCase):
+    def test_default_method(self):
+        method = copy_file(self.source, self.target)
+        self.assertEqual(method, get_copy_methods()[0])
+        self.assert_copied()
+
+    @unittest.skipUnless(METHOD_SENDFILE in get_copy_methods(), "需要 Linux 的 sendfile")
+    def test_copy_file_range_falls_back_to_sendfile(self):
+        with mock.patch.object(os, 'copy_file_range', side_effect=OSError(errno.EXDEV, "跨文件系统"), create=True):
+            self.assertEqual(copy_file(self.source, self.target), METHOD_SENDFILE)
+        self.assert_copied()
+
+    def test_falls_back_to_read_write(self):
+        with mock.patch.object(os, 'copy_file_range', side_effect=OSError(errno.ENOSYS, "不支持"), create=True), \
+                mock.patch.object(os, 'sendfile', side_effect=OSError(errno.EINVAL, "不支持"), create=True):
+            self.assertEqual(copy_file(self.source, self.target), METHOD_READ_WRITE)
+        self.assert_copied()
+
+    def test_reflink_falls_back_through_chain(self):
+        with mock.patch.object(file_copy, 'reflink_file', side_effect=unsupported), \
+                mock.patch.object(os, 'copy_file_range', side_effect=OSError(errno.ENOSYS, "不支持"), create=True), \
+                mock.patch.object(os, 'sendfile', side_effect=OSError(errno.EINVAL, "不支持"), create=True):
+            self.assertEqual(copy_file(self.source, self.target, mode=COPY_MODE_REFLINK), METHOD_READ_WRITE)
+        self.assert_copied()
+
+    def test_reflink_or_full_copy(self):
+        # 在支持 reflink 的文件系统（btrfs / XFS）上共享数据块，其他文件系统上改为完整复制
+        method = copy_file(self.source, self.target, mode=COPY_MODE_REFLINK)
+        self.assertIn(method, [METHOD_REFLINK] + get_copy_methods())
+        self.assert_copied()
+        self.assertNotEqual(os.stat(self.target).st_ino, os.stat(self.source).st_ino)
+
+    def test_reflink_other_errors_not_hidden(self):
+        with mock.patch.object(file_copy, 'reflink_file', side_effect=OSError(errno.ENOSPC, "磁盘已满")):
+            with self.assertRaises(OSError):
+                copy_file(self.source, self.target, mode=COPY_MODE_REFLINK)
+        self.assertFalse(os.path.exists(self.target))
+
+    @unittest.skipUnless(hasattr(os, 'copy_file_range'), "需要 copy_file_range")
+    def test_error_after_first_chunk_not_retried(self):
+        real_copy_file_range = os.copy_file_range
+        calls = []
+
+        def fail_second_chunk(*args):
+            calls.append(1)
+            if len(calls) > 1:
+                raise OSError(errno.EIO, "读取错误")
+            return real_copy_file_range(*args)
+
+        with mock.patch.object(os, 'copy_file_range', side_effect=fail_second_chunk):
+            with self.assertRaises(OSError):
+                copy_file(self.source, self.target)
+        self.assertFalse(os.path.exists(self.target))
+        self.assert_no_partial()
+
+
+class HardlinkTest(CopyFileTestCase):
+    @unittest.skipUnless(hasattr(os, 'link'), "需要硬链接")
+    def test_hardlink(self):
+        progress = []
+        method = copy_file(self.source, self.target, mode=COPY_MODE_HARDLINK,
+                           progress_callback=lambda done, total: progress.append((done, total)))
+        self.assertEqual(method, METHOD_HARDLINK)
+        self.assertEqual(os.stat(self.target).st_ino, os.stat(self.source).st_ino)
+        self.assertEqual(progress, [(len(self.data), len(self.data))])
+        self.assert_copied()
+
+    def test_hardlink_limit_falls_back_to_copy(self):
+        with mock.patch.object(os, 'link', side_effect=OSError(errno.EMLINK, "链接数过多")):
+            method = copy_file(self.source, self.target, mode=COPY_MODE_HARDLINK)
+        self.assertIn(method, get_copy_methods())
+        self.assertNotEqual(os.stat(self.target).st_ino, os.stat(self.source).st_ino)
+        self.assert_copied()
+
+    def test_hardlink_across_filesystems_copies(self):
+        with mock.patch.object(file_copy, 'same_filesystem', return_value=False), \
+                mock.patch.object(os, 'link') as link:
+            method = copy_file(self.source, self.target, mode=COPY_MODE_HARDLINK)
+        link.assert_not_called()
+        self.assertIn(method, get_copy_methods())
+        self.assert_copied()
+
+
+class CopyChecksTest(CopyFileTestCase):
+    def test_cancel_removes_partial(self):
+        calls = []
+        with self.assertRaises(CopyCancelled):
+            copy_file(self.source, self.target, cancel_check=lambda: calls.append(1) or len(calls) > 1)
+        self.assertFalse(os.path.exists(self.target))
+        self.assert_no_partial()
+
+    def test_verify_hash(self):
+        copy_file(self.source, self.target, verify_hash=True)
+        self.assert_copied()
+
+    def test_verify_expected_hash(self):
+        copy_file(self.source, self.target, verify_hash=True, expected_hash=file_sha256(self.source).upper())
+        self.assert_copied()
+
+    def test_hash_mismatch_leaves_no_files(self):
+        with self.assertRaises(OSError):
+            copy_file(self.source, self.target, verify_hash=True, expected_hash='0' * 64)
+        self.assertFalse(os.path.exists(self.target))
+        self.assert_no_partial()
+
+    def test_progress_ends_at_total(self):
+        progress = []
+        copy_file(self.source, self.target, progress_callback=lambda done, total: progress.append((done, total)))
+        self.assertEqual(progress[-1], (len(self.data), len(self.data)))
+
+
+class SparseCopyBenchmarkTest(unittest.TestCase):
+    """多 GB 稀疏文件：旧的两遍复制与单次复制（内核复制和读写）的耗时"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def timed(self, func, *args):
+        target = os.path.join(self.temp_dir, 'copy.safetensors')
+        start = time.perf_counter()
+        result = func(*args, target)
+        seconds = time.perf_counter() - start
+        os.remove(target)
+        return seconds, result
+
+    def test_sparse_copy_benchmark(self):
+        lines = []
+        for size in BENCHMARK_SIZES:
+            source = os.path.join(self.temp_dir, 'model.safetensors')
+            with open(source, 'wb') as f:
+                f.write(os.urandom(1024 * 1024))
+                f.truncate(size)
+            old_seconds, _ = self.timed(old_double_copy, source)
+            new_seconds, method = self.timed(copy_file, source)
+            with mock.patch.object(file_copy, 'get_copy_methods', return_value=[METHOD_READ_WRITE]):
+                read_write_seconds, _ = self.timed(copy_file, source)
+            os.remove(source)
+            lines.append(f"{size // 1024 ** 3} GB：旧方式 {old_seconds:.2f} 秒，单次复制 {new_seconds:.2f} 秒（{method}），"
+                         f"读写 {read_write_seconds:.2f} 秒")
+            self.assertLess(new_seconds, old_seconds)
+        print("\n" + "\n".join(lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+事务式移动 / 复制测试
+执行到一半失败时的撤销、模型信息的恢复，以及启动时根据日志继续完成或撤销上次的事务
+"""
+
+import json  # JSON处理
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import tempfile  # 临时目录
+import unittest  # 测试框架
+from unittest import mock  # 模拟跨磁盘和失败
+
+import file_transaction
+from file_copy import PARTIAL_SUFFIX, CopyCancelled
+from file_transaction import (OP_COPY, OP_MOVE, STEP_COPY, STEP_DONE, STEP_RENAME, STEP_RUNNING, TX_COMMITTING,
+                              TransactionError, plan_model_transfer, recover_transactions)
+
+IMAGE_EXTENSIONS = ('.png', '.preview.png', '.jpg')
+
+
+class FakeCatalog:
+    """模拟 model_info.json，记录 apply_catalog 的调用"""
+
+    def __init__(self, entries):
+        self.entries = dict(entries)
+        self.calls = []
+        self.fail = False
+
+    def apply(self, tx, reverse=False):
+        self.calls.append('reverse' if reverse else 'apply')
+        old_path, new_path = tx.catalog_old, tx.catalog_new
+        if tx.op == OP_MOVE:
+            if reverse:
+                old_path, new_path = new_path, old_path
+            if old_path in self.entries and new_path not in self.entries:
+                self.entries[new_path] = self.entries.pop(old_path)
+        elif reverse:
+            self.entries.pop(new_path, None)
+        elif new_path not in self.entries:
+            self.entries[new_path] = dict(self.entries.get(old_path, {}))
+        if self.fail and not reverse:
+            raise OSError("写入模型信息失败")
+
+
+class TransactionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.journal_dir = os.path.join(self.base, 'file_journal')
+        self.source_dir = os.path.join(self.base, 'models', 'lora')
+        self.target_dir = os.path.join(self.base, 'models', 'archive')
+        os.makedirs(self.source_dir)
+        os.makedirs(self.target_dir)
+        self.files = {
+            'style.safetensors': b'model data' * 1000,
+            'style.png': b'png',
+            'style.preview.png': b'preview',
+            'style.json': b'{}',
+            os.path.join('style', 'Trigger_Words.txt'): b'words',
+        }
+        for name, data in self.files.items():
+            path = os.path.join(self.source_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        self.model_path = os.path.join(self.source_dir, 'style.safetensors')
+        self.old_key = os.path.join('models', 'lora', 'style.safetensors')
+        self.new_key = os.path.join('models', 'archive', 'style.safetensors')
+        self.catalog = FakeCatalog({self.old_key: {'hash': 'ABC', 'is_favorite': True}})
+
+    def tearDown(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def plan(self, op=OP_MOVE):
+        return plan_model_transfer(op, self.base, self.model_path, self.target_dir, IMAGE_EXTENSIONS,
+                                   journal_dir=self.journal_dir)
+
+    def assert_files_in(self, directory, present=True):
+        for name, data in self.files.items():
+            path = os.path.join(directory, name)
+            if present:
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), data, path)
+            else:
+                self.assertFalse(os.path.exists(path), path)
+
+    def assert_no_leftovers(self):
+        names = []
+        for root, dirs, files in os.walk(self.target_dir):
+            names.extend(dirs + files)
+        self.assertEqual(names, [])
+        self.assertEqual(os.listdir(self.journal_dir) if os.path.isdir(self.journal_dir) else [], [])
+
+
+class ExecuteTest(TransactionTestCase):
+    def test_plan_lists_related_files(self):
+        tx = self.plan()
+        sources = sorted(os.path.relpath(step['source'], self.source_dir) for step in tx.steps)
+        self.assertEqual(sources, sorted(self.files.keys() - {os.path.join('style', 'Trigger_Words.txt')} | {'style'}))
+        self.assertTrue(tx.steps[0]['is_model'])
+        self.assertEqual((tx.catalog_old, tx.catalog_new), (self.old_key, self.new_key))
+
+    def test_move(self):
+        self.plan().execute(apply_catalog=self.catalog.apply)
+        self.assert_files_in(self.target_dir)
+        self.assert_files_in(self.source_dir, present=False)
+        self.assertEqual(self.catalog.calls, ['apply'])
+        self.assertEqual(self.catalog.entries, {self.new_key: {'hash': 'ABC', 'is_favorite': True}})
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    def test_move_across_filesystems(self):
+        with mock.patch.object(file_transaction, 'same_filesystem', return_value=False):
+            tx = self.plan()
+            tx.execute(apply_catalog=self.catalog.apply)
+        self.assertTrue(all(step['method'] == STEP_COPY for step in tx.steps))
+        self.assert_files_in(self.target_dir)
+        self.assert_files_in(self.source_dir, present=False)
+
+    def test_copy(self):
+        self.plan(OP_COPY).execute(apply_catalog=self.catalog.apply)
+        self.assert_files_in(self.target_dir)
+        self.assert_files_in(self.source_dir)
+        self.assertIn(self.new_key, self.catalog.entries)
+
+    def test_failure_partway_rolls_back_without_touching_catalog(self):
+        tx = self.plan()
+        # 计划之后、执行之前目标文件夹中出现了同名预览图：模型文件已经移动后才失败
+        conflict = os.path.join(self.target_dir, 'style.preview.png')
+        real_rename = os.rename
+
+        def rename(source, target):
+            real_rename(source, target)
+            if target == tx.model_target:
+                with open(conflict, 'wb') as f:
+                    f.write(b'other')
+
+        with mock.patch.object(os, 'rename', side_effect=rename):
+            with self.assertRaises(TransactionError):
+                tx.execute(apply_catalog=self.catalog.apply)
+        os.remove(conflict)
+
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+        # 模型信息还没有更新，撤销时不调用 apply_catalog(reverse=True)
+        self.assertEqual(self.catalog.calls, [])
+        self.assertEqual(self.catalog.entries, {self.old_key: {'hash': 'ABC', 'is_favorite': True}})
+
+    def test_copy_failure_keeps_existing_target_record(self):
+        # 目标位置已有一条旧的模型信息（文件已被删除）：没有更新模型信息时撤销不能删除它
+        self.catalog.entries[self.new_key] = {'note': 'old record'}
+        calls = []
+        with self.assertRaises(CopyCancelled):
+            self.plan(OP_COPY).execute(apply_catalog=self.catalog.apply,
+                                       cancel_check=lambda: calls.append(1) or len(calls) > 3)
+        self.assertEqual(self.catalog.calls, [])
+        self.assertEqual(self.catalog.entries[self.new_key], {'note': 'old record'})
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+
+    def test_cancel_during_cross_filesystem_move(self):
+        calls = []
+        with mock.patch.object(file_transaction, 'same_filesystem', return_value=False):
+            with self.assertRaises(CopyCancelled):
+                self.plan().execute(apply_catalog=self.catalog.apply,
+                                    cancel_check=lambda: calls.append(1) or len(calls) > 2)
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+        self.assertEqual(self.catalog.calls, [])
+
+    def test_catalog_failure_reverses_catalog_and_files(self):
+        self.catalog.fail = True
+        with self.assertRaises(OSError):
+            self.plan().execute(apply_catalog=self.catalog.apply)
+        self.assertEqual(self.catalog.calls, ['apply', 'reverse'])
+        self.assertEqual(self.catalog.entries, {self.old_key: {'hash': 'ABC', 'is_favorite': True}})
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+
+
+class RecoverTest(TransactionTestCase):
+    def run_steps(self, tx, count, method):
+        """模拟执行了前 count 步后程序意外退出"""
+        for step in tx.steps[:count]:
+            step['method'] = method
+            if method == STEP_RENAME:
+                os.rename(step['source'], step['target'])
+            elif step['is_dir']:
+                shutil.copytree(step['source'], step['target'])
+            else:
+                shutil.copy2(step['source'], step['target'])
+            step['status'] = STEP_DONE
+        tx.save()
+
+    def test_resume_journal_with_files_in_place(self):
+        # 跨磁盘移动：文件都已复制、模型信息已更新，删除源文件前程序退出
+        tx = self.plan()
+        self.run_steps(tx, len(tx.steps), STEP_COPY)
+        tx.catalog_applied = True
+        tx.state = TX_COMMITTING
+        tx.save()
+
+        rolled_back, resumed = recover_transactions(self.catalog.apply, self.journal_dir)
+        self.assertEqual(([item.id for item in rolled_back], [item.id for item in resumed]), ([], [tx.id]))
+        self.assert_files_in(self.target_dir)
+        self.assert_files_in(self.source_dir, present=False)
+        self.assertEqual(self.catalog.calls, ['apply'])
+        self.assertIn(self.new_key, self.catalog.entries)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    def test_roll_back_half_done_journal(self):
+        # 模型文件已重命名，第二步复制到一半（留下 .part 文件）时程序退出
+        tx = self.plan()
+        self.run_steps(tx, 1, STEP_RENAME)
+        step = tx.steps[1]
+        step['method'] = STEP_COPY
+        step['status'] = STEP_RUNNING
+        with open(step['target'] + PARTIAL_SUFFIX, 'wb') as f:
+            f.write(b'partial')
+        tx.save()
+
+        rolled_back, resumed = recover_transactions(self.catalog.apply, self.journal_dir)
+        self.assertEqual(([item.id for item in rolled_back], resumed), ([tx.id], []))
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+        self.assertEqual(self.catalog.calls, [])
+
+    def test_roll_back_journal_after_catalog_update(self):
+        # 文件都已就位、模型信息已更新，但状态还没有改为 committing 时程序退出
+        tx = self.plan()
+        self.run_steps(tx, len(tx.steps), STEP_RENAME)
+        tx.catalog_applied = True
+        tx.save()
+        self.catalog.apply(tx)
+
+        rolled_back, _ = recover_transactions(self.catalog.apply, self.journal_dir)
+        self.assertEqual([item.id for item in rolled_back], [tx.id])
+        self.assertEqual(self.catalog.calls, ['apply', 'reverse'])
+        self.assertEqual(self.catalog.entries, {self.old_key: {'hash': 'ABC', 'is_favorite': True}})
+        self.assert_files_in(self.source_dir)
+        self.assert_no_leftovers()
+
+    def test_incomplete_journal_file_removed(self):
+        os.makedirs(self.journal_dir)
+        with open(os.path.join(self.journal_dir, 'abc.json.tmp'), 'w', encoding='utf-8') as f:
+            f.write('{"version": 1, "id"')
+        with open(os.path.join(self.journal_dir, 'other.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': 999}, f)
+        self.assertEqual(recover_transactions(self.catalog.apply, self.journal_dir), ([], []))
+        self.assertEqual(os.listdir(self.journal_dir), ['other.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+预览图下载测试（本地 HTTP 服务器提供图片）
+检查大小限制（有无 Content-Length）、取消、图片不完整时的处理，以及任何情况下都不留下 .tmp 文件
+"""
+
+import io  # 内存中的图片数据
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import tempfile  # 临时目录
+import time  # 时间相关
+import unittest  # 测试框架
+
+from PIL import Image  # 图片处理
+
+from image_download import DOWNLOAD_CHUNK_SIZE, MAX_IMAGE_BYTES, RateLimiter, download_image
+from tests.http_server import LocalServer
+
+
+def make_image(size=(600, 600), mode='RGB', image_format='PNG'):
+    """随机噪点图片（压缩后仍然较大）"""
+    band_count = len(mode)
+    img = Image.frombytes(mode, size, os.urandom(size[0] * size[1] * band_count))
+    buffer = io.BytesIO()
+    img.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def send_chunked(body, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """分块传输，不发送 Content-Length"""
+    def handler(request):
+        request.send_response(200)
+        request.send_header('Content-Type', 'image/png')
+        request.send_header('Transfer-Encoding', 'chunked')
+        request.end_headers()
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset:offset + chunk_size]
+            request.wfile.write(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b'\r\n')
+        request.wfile.write(b'0\r\n\r\n')
+    return handler
+
+
+def send_cut_off(body, declared_length):
+    """声明的长度大于实际发送的数据，发送一半后断开连接"""
+    def handler(request):
+        request.send_response(200)
+        request.send_header('Content-Type', 'image/png')
+        request.send_header('Content-Length', str(declared_length))
+        request.end_headers()
+        request.wfile.write(body)
+        request.close_connection = True
+    return handler
+
+
+class DownloadImageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.png = make_image()
+        cls.cmyk_jpeg = make_image((300, 200), mode='CMYK', image_format='JPEG')
+        routes = {
+            '/cover.png': lambda request: request.send(200, cls.png, content_type='image/png'),
+            '/cmyk.jpg': lambda request: request.send(200, cls.cmyk_jpeg, content_type='image/jpeg'),
+            '/chunked.png': send_chunked(cls.png),
+            # 声明超过 50MB，实际只发送很少的数据，检查默认上限只靠 Content-Length 就拒绝
+            '/huge.png': send_cut_off(cls.png[:1024], MAX_IMAGE_BYTES + 1),
+            '/cut-off.png': send_cut_off(cls.png[:len(cls.png) // 2], len(cls.png)),
+            '/truncated.png': lambda request: request.send(200, cls.png[:len(cls.png) // 2],
+                                                           content_type='image/png'),
+            '/not-image': lambda request: request.send(200, b'<html>not an image</html>', content_type='text/html'),
+        }
+        cls.server = LocalServer(routes).__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dest_path = os.path.join(self.temp_dir, 'model.preview.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def assert_no_temp_files(self):
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.endswith('.tmp')], [])
+
+    def assert_failed(self, path, **kwargs):
+        self.assertFalse(download_image(self.server.url(path), self.dest_path, **kwargs))
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assert_no_temp_files()
+
+    def test_download_png(self):
+        self.assertTrue(download_image(self.server.url('/cover.png'), self.dest_path))
+        with Image.open(self.dest_path) as img:
+            self.assertEqual(img.format, 'PNG')
+            self.assertEqual(img.size, (600, 600))
+        self.assert_no_temp_files()
+
+    def test_download_chunked_without_content_length(self):
+        self.assertTrue(download_image(self.server.url('/chunked.png'), self.dest_path))
+        self.assertTrue(os.path.exists(self.dest_path))
+        self.assert_no_temp_files()
+
+    def test_convert_and_shrink(self):
+        self.assertTrue(download_image(self.server.url('/cmyk.jpg'), self.dest_path, max_side=150))
+        with Image.open(self.dest_path) as img:
+            self.assertEqual(img.format, 'PNG')
+            self.assertEqual(img.mode, 'RGB')
+            self.assertEqual(img.size, (150, 100))
+        self.assert_no_temp_files()
+
+    def test_size_cap_with_content_length(self):
+        self.assert_failed('/cover.png', max_bytes=len(self.png) - 1)
+
+    def test_default_size_cap_with_content_length(self):
+        self.assert_failed('/huge.png')
+
+    def test_size_cap_without_content_length(self):
+        self.assert_failed('/chunked.png', max_bytes=len(self.png) // 2)
+
+    def test_cancel(self):
+        calls = []
+
+        def cancel_check():
+            calls.append(1)
+            return len(calls) > 2
+
+        self.assert_failed('/chunked.png', cancel_check=cancel_check)
+        self.assertEqual(len(calls), 3)
+
+    def test_connection_closed_early(self):
+        self.assert_failed('/cut-off.png')
+
+    def test_truncated_image(self):
+        self.assert_failed('/truncated.png')
+
+    def test_not_an_image(self):
+        self.assert_failed('/not-image')
+
+    def test_http_error(self):
+        self.assert_failed('/missing.png')
+
+    def test_failure_keeps_existing_preview(self):
+        with open(self.dest_path, 'wb') as f:
+            f.write(b'old preview')
+        self.assertFalse(download_image(self.server.url('/truncated.png'), self.dest_path))
+        with open(self.dest_path, 'rb') as f:
+            self.assertEqual(f.read(), b'old preview')
+        self.assert_no_temp_files()
+
+    def test_rate_limit(self):
+        # 限速 2MB/s 时，下载约 1MB 的图片至少需要约 0.5 秒（减去首个空闲额度的误差）
+        rate_limiter = RateLimiter(2)
+        start = time.monotonic()
+        self.assertTrue(download_image(self.server.url('/cover.png'), self.dest_path, rate_limiter=rate_limiter))
+        expected = len(self.png) / (2 * 1024 * 1024)
+        self.assertGreater(time.monotonic() - start, expected * 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
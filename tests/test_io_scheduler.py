@@ -0,0 +1,125 @@
+"""
+I/O 优先级调度测试
+后台线程以批量优先级计算整个大文件的哈希，同时在 interactive() 中读取预览图，测量预览图读取的延迟
+"""
+
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import statistics  # 中位数
+import tempfile  # 临时目录
+import threading  # 多线程
+import time  # 时间相关
+import unittest  # 测试框架
+
+from io_scheduler import IOScheduler, YIELD_TIMEOUT
+from model_hash import DIGEST_ALGORITHMS, HASH_CHUNK_SIZE, calculate_digests
+
+# 批量哈希的文件大小（稀疏文件，不占用磁盘空间）
+BULK_FILE_SIZE = 2 * 1024 * 1024 * 1024
+
+# 预览图大小和读取次数
+PREVIEW_SIZE = 4 * 1024 * 1024
+PREVIEW_READS = 10
+
+# 模拟预览图解码的时间（秒），期间批量读取应当让出
+PREVIEW_DECODE_SECONDS = 0.05
+
+# 批量哈希进行时，预览图读取的最大延迟（秒）
+PREVIEW_LATENCY_LIMIT = 0.1
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        while f.read(HASH_CHUNK_SIZE):
+            pass
+
+
+class IOSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.bulk_path = os.path.join(self.temp_dir, 'model.safetensors')
+        with open(self.bulk_path, 'wb') as f:
+            f.truncate(BULK_FILE_SIZE)
+        self.preview_path = os.path.join(self.temp_dir, 'model.preview.png')
+        with open(self.preview_path, 'wb') as f:
+            f.write(os.urandom(PREVIEW_SIZE))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def start_bulk_hash(self, scheduler):
+        """在后台线程中以批量优先级计算哈希，返回 (已读取字节数列表, 停止事件, 线程)"""
+        progress = [0]
+        stop = threading.Event()
+
+        def run():
+            calculate_digests(
+                self.bulk_path, DIGEST_ALGORITHMS,
+                progress_callback=lambda done, total: progress.__setitem__(0, done),
+                cancel_check=stop.is_set,
+                io_throttle=scheduler.bulk_throttle
+            )
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        # 等待批量读取开始
+        deadline = time.monotonic() + 5
+        while progress[0] == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return progress, stop, thread
+
+    def test_preview_latency_during_bulk_hash(self):
+        scheduler = IOScheduler()
+        baseline = []
+        for _ in range(PREVIEW_READS):
+            start = time.perf_counter()
+            read_file(self.preview_path)
+            baseline.append(time.perf_counter() - start)
+
+        progress, stop, thread = self.start_bulk_hash(scheduler)
+        latencies = []
+        stalled_bytes = []
+        try:
+            for _ in range(PREVIEW_READS):
+                with scheduler.interactive():
+                    start = time.perf_counter()
+                    read_file(self.preview_path)
+                    latencies.append(time.perf_counter() - start)
+                    # 交互任务开始后，批量读取最多再完成当前的一块
+                    time.sleep(0.005)
+                    before = progress[0]
+                    time.sleep(PREVIEW_DECODE_SECONDS)
+                    stalled_bytes.append(progress[0] - before)
+                time.sleep(0.02)
+            resumed_from = progress[0]
+            time.sleep(0.1)
+            self.assertGreater(progress[0], resumed_from, "交互任务结束后批量读取应当继续")
+        finally:
+            stop.set()
+            thread.join(10)
+
+        print(f"\n预览图读取：空闲时中位数 {statistics.median(baseline) * 1000:.1f} 毫秒，"
+              f"批量哈希时中位数 {statistics.median(latencies) * 1000:.1f} 毫秒、最大 {max(latencies) * 1000:.1f} 毫秒")
+        self.assertLess(max(latencies), PREVIEW_LATENCY_LIMIT)
+        self.assertTrue(all(count <= HASH_CHUNK_SIZE for count in stalled_bytes), stalled_bytes)
+
+    def test_bulk_waits_at_most_yield_timeout(self):
+        scheduler = IOScheduler()
+        with scheduler.interactive():
+            start = time.monotonic()
+            scheduler.bulk_throttle(HASH_CHUNK_SIZE)
+            waited = time.monotonic() - start
+        self.assertGreaterEqual(waited, YIELD_TIMEOUT * 0.9)
+        self.assertLess(waited, YIELD_TIMEOUT + 0.5)
+
+    def test_bulk_rate_limit(self):
+        scheduler = IOScheduler(bulk_rate_limit=20)
+        start = time.monotonic()
+        for _ in range(10):
+            scheduler.bulk_throttle(HASH_CHUNK_SIZE)
+        # 10MB 限速 20MB/s 约需 0.5 秒
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
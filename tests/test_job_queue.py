@@ -0,0 +1,142 @@
+"""
+批量任务队列测试
+任务中途暂停或程序退出后，从 batch_jobs.json 重新加载，继续时只处理未完成的项，重试时只处理失败的项
+"""
+
+import json  # JSON处理
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import tempfile  # 临时目录
+import threading  # 多线程
+import time  # 等待任务状态
+import unittest  # 测试框架
+
+from batch_runner import ITEM_DONE, ITEM_FAILED, ITEM_PENDING, ITEM_SKIPPED, ItemResult
+from job_queue import JOB_FINISHED, JOB_PAUSED, JOB_RUNNING, JOBS_VERSION, JobQueue, JobType
+
+ITEMS = [f"models/{i:02d}.safetensors" for i in range(10)]
+FAILING_ITEM = ITEMS[3]
+PAUSE_ITEM = ITEMS[5]
+
+
+class Handler:
+    """记录处理过的项；FAILING_ITEM 失败，可在处理到 pause_at 时暂停任务"""
+
+    def __init__(self, fail=True):
+        self.calls = []
+        self.fail = fail
+        self.pause_at = None
+        self.queue = None
+        self.job_id = None
+        self.lock = threading.Lock()
+
+    def run_item(self, key, options, extra, cancel_check):
+        if cancel_check():
+            return None
+        with self.lock:
+            self.calls.append(key)
+        if key == self.pause_at:
+            self.queue.pause(self.job_id)
+            return None
+        if key == FAILING_ITEM and self.fail:
+            raise OSError("读取失败")
+        if key == ITEMS[0]:
+            return ItemResult(ITEM_SKIPPED, "已有预览图")
+        return ITEM_DONE
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.jobs_file = os.path.join(self.temp_dir, 'batch_jobs.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def new_queue(self, handler):
+        queue = JobQueue({'test': JobType("测试", handler.run_item)}, jobs_file=self.jobs_file)
+        handler.queue = queue
+        return queue
+
+    def wait_for_state(self, queue, job_id, states, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with queue.lock:
+                if queue.running_id != job_id:
+                    summary = queue.summary(job_id)
+                    if summary['state'] in states:
+                        return summary
+            time.sleep(0.01)
+        self.fail(f"任务没有进入状态 {states}")
+
+    def saved_job(self):
+        with open(self.jobs_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['jobs'][0]
+
+    def test_pause_reload_resume_and_retry(self):
+        handler = Handler()
+        handler.pause_at = PAUSE_ITEM
+        queue = self.new_queue(handler)
+        handler.job_id = job_id = queue.submit('test', ITEMS, options={'overwrite': False})
+        self.wait_for_state(queue, job_id, (JOB_PAUSED,))
+        self.assertEqual(handler.calls, ITEMS[:6])
+
+        # 暂停时的状态已保存：被中断的项和之后的项都是待处理
+        saved = self.saved_job()
+        self.assertEqual(saved['state'], JOB_PAUSED)
+        self.assertEqual(saved['items'][FAILING_ITEM], ITEM_FAILED)
+        self.assertEqual(saved['messages'], {ITEMS[0]: "已有预览图", FAILING_ITEM: "读取失败"})
+        self.assertEqual([key for key, status in saved['items'].items() if status == ITEM_PENDING], ITEMS[5:])
+
+        # 重新加载后继续：只处理剩余的项
+        handler = Handler()
+        queue = self.new_queue(handler)
+        self.assertTrue(queue.has_unfinished())
+        queue.resume(job_id)
+        summary = self.wait_for_state(queue, job_id, (JOB_FINISHED,))
+        self.assertEqual(handler.calls, ITEMS[5:])
+        self.assertEqual(summary['items'][FAILING_ITEM], ITEM_FAILED)
+        self.assertEqual(summary['items'][ITEMS[0]], ITEM_SKIPPED)
+
+        # 重试失败的项：只处理失败的项，说明随之清除
+        handler.calls = []
+        handler.fail = False
+        queue.retry_failed(job_id)
+        summary = self.wait_for_state(queue, job_id, (JOB_FINISHED,))
+        self.assertEqual(handler.calls, [FAILING_ITEM])
+        self.assertEqual(summary['items'][FAILING_ITEM], ITEM_DONE)
+        self.assertEqual(self.saved_job()['messages'], {ITEMS[0]: "已有预览图"})
+        self.assertFalse(queue.has_unfinished())
+
+    def test_reload_after_crash(self):
+        # 程序在任务运行中退出：磁盘上的任务仍是运行中，部分项已完成或失败
+        items = {key: ITEM_PENDING for key in ITEMS}
+        items.update({ITEMS[0]: ITEM_SKIPPED, ITEMS[1]: ITEM_DONE, ITEMS[2]: ITEM_DONE, FAILING_ITEM: ITEM_FAILED})
+        job = {'id': 'crashed', 'kind': 'test', 'title': "测试", 'options': {}, 'state': JOB_RUNNING,
+               'created': time.time(), 'items': items, 'messages': {FAILING_ITEM: "读取失败"}, 'elapsed': 12.5}
+        unknown = dict(job, id='unknown', kind='removed_kind')
+        with open(self.jobs_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': JOBS_VERSION, 'jobs': [job, unknown]}, f)
+
+        handler = Handler(fail=False)
+        queue = self.new_queue(handler)
+        # 中断的任务改为已暂停，不会自动开始；未知类型的任务被忽略
+        self.assertEqual([item['id'] for item in queue.snapshot()], ['crashed'])
+        self.assertEqual(queue.summary('crashed')['state'], JOB_PAUSED)
+        time.sleep(0.05)
+        self.assertEqual(handler.calls, [])
+
+        queue.resume('crashed')
+        summary = self.wait_for_state(queue, 'crashed', (JOB_FINISHED,))
+        self.assertEqual(sorted(handler.calls), ITEMS[4:])
+        self.assertEqual(summary['items'][FAILING_ITEM], ITEM_FAILED)
+        self.assertGreaterEqual(summary['elapsed'], 12.5)
+
+        handler.calls = []
+        queue.retry_failed('crashed')
+        self.wait_for_state(queue, 'crashed', (JOB_FINISHED,))
+        self.assertEqual(handler.calls, [FAILING_ITEM])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+浏览器池测试
+用假的 Playwright（启动较慢）测试并发首次调用、超时、上下文回收和关闭；
+本机装有 Playwright 的 Firefox 时，再用真实浏览器抓取本地页面
+"""
+
+import asyncio  # 假浏览器中的异步等待
+import itertools  # 页面编号
+import threading  # 多线程
+import time  # 时间相关
+import unittest  # 测试框架
+from concurrent.futures import TimeoutError as FutureTimeoutError  # 等待超时
+
+import liblib_browser
+from liblib_browser import BrowserPool
+from tests.http_server import LocalServer
+
+# 假浏览器的启动耗时（秒），足够让多个线程同时等待启动
+FAKE_LAUNCH_SECONDS = 0.5
+
+
+class FakePage:
+    numbers = itertools.count(1)
+
+    def __init__(self):
+        self.number = next(self.numbers)
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+
+    async def new_context(self, **kwargs):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeFirefox:
+    def __init__(self, playwright):
+        self.playwright = playwright
+
+    async def launch(self, **kwargs):
+        self.playwright.launch_calls += 1
+        await asyncio.sleep(FAKE_LAUNCH_SECONDS)
+        if self.playwright.launch_error:
+            raise self.playwright.launch_error
+        self.playwright.browser = FakeBrowser()
+        return self.playwright.browser
+
+
+class FakePlaywright:
+    def __init__(self, launch_error=None):
+        self.launch_calls = 0
+        self.launch_error = launch_error
+        self.browser = None
+        self.stopped = False
+        self.firefox = FakeFirefox(self)
+
+    def __call__(self):
+        # 代替 async_playwright()
+        return self
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+
+async def page_id(page):
+    await asyncio.sleep(0.01)
+    return page.number
+
+
+async def hang(page):
+    await asyncio.sleep(30)
+
+
+async def fail(page):
+    raise RuntimeError('页面出错')
+
+
+class FakeBrowserPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.original = liblib_browser.async_playwright
+        self.playwright = FakePlaywright()
+        liblib_browser.async_playwright = self.playwright
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.shutdown()
+        liblib_browser.async_playwright = self.original
+
+    def make_pool(self, **kwargs):
+        pool = BrowserPool(**kwargs)
+        self.pools.append(pool)
+        return pool
+
+    def run_concurrently(self, func, count):
+        results, errors = [], []
+        barrier = threading.Barrier(count)
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(func())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return results, errors
+
+    def test_concurrent_first_use_waits_for_launch(self):
+        pool = self.make_pool(size=3)
+        results, errors = self.run_concurrently(lambda: pool.run(page_id, timeout=5), 6)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.playwright.launch_calls, 1)
+        self.assertEqual(pool.stats['launches'], 1)
+        self.assertLessEqual(pool.stats['contexts'], 3)
+
+    def test_launch_error_reaches_every_caller(self):
+        self.playwright.launch_error = RuntimeError('找不到浏览器')
+        pool = self.make_pool(size=2)
+        results, errors = self.run_concurrently(lambda: pool.run(page_id, timeout=5), 3)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(str(e) == '找不到浏览器' for e in errors))
+        self.assertTrue(self.playwright.stopped)
+
+    def test_timeout_frees_page_slot(self):
+        pool = self.make_pool(size=1)
+        with self.assertRaises(FutureTimeoutError):
+            pool.run(hang, timeout=0.2)
+        # 唯一的页面已被释放，后续任务不会一直等待
+        start = time.monotonic()
+        self.assertIsInstance(pool.run(page_id, timeout=2), int)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_context_recycled_after_uses(self):
+        pool = self.make_pool(size=1, recycle_after=2)
+        for _ in range(5):
+            pool.run(page_id, timeout=2)
+        self.assertEqual(pool.stats['pages'], 5)
+        self.assertEqual(pool.stats['contexts'], 3)
+        closed = [context for context in self.playwright.browser.contexts if context.closed]
+        self.assertEqual(len(closed), 2)
+
+    def test_failed_page_not_reused(self):
+        pool = self.make_pool(size=1)
+        first = pool.run(page_id, timeout=2)
+        self.assertEqual(pool.run(page_id, timeout=2), first)
+        with self.assertRaises(RuntimeError):
+            pool.run(fail, timeout=2)
+        self.assertNotEqual(pool.run(page_id, timeout=2), first)
+
+    def test_shutdown_closes_browser(self):
+        pool = self.make_pool(size=2)
+        pool.run(page_id, timeout=2)
+        pool.shutdown()
+        self.assertFalse(pool.is_running())
+        self.assertTrue(self.playwright.browser.closed)
+        self.assertTrue(all(context.closed for context in self.playwright.browser.contexts))
+        self.assertTrue(self.playwright.stopped)
+        # 关闭后再次使用时重新启动
+        pool.run(page_id, timeout=2)
+        self.assertEqual(self.playwright.launch_calls, 2)
+
+
+TEST_PAGE = """<!DOCTYPE html>
+<html><head><title>测试</title></head>
+<body><img src="/cover.png"><p id="name">模型名称</p></body></html>
+"""
+
+
+async def read_name(page, url):
+    await page.goto(url)
+    return await page.inner_text('#name')
+
+
+class RealBrowserPoolTest(unittest.TestCase):
+    """需要 playwright install firefox，没有安装时跳过"""
+
+    def setUp(self):
+        self.pool = BrowserPool(size=2)
+        try:
+            self.pool.start()
+        except Exception as e:
+            self.skipTest(f"无法启动 Firefox：{str(e).splitlines()[0]}")
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_fetch_local_page_concurrently(self):
+        routes = {
+            '/model': lambda request: request.send(200, TEST_PAGE, content_type='text/html; charset=utf-8'),
+            '/cover.png': lambda request: request.send(200, b'', content_type='image/png'),
+        }
+        with LocalServer(routes) as server:
+            url = server.url('/model')
+            threads = [threading.Thread(target=lambda: results.append(self.pool.run(read_name, url, timeout=30)))
+                       for _ in range(4)]
+            results = []
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(60)
+            self.assertEqual(results, ['模型名称'] * 4)
+            # 图片被屏蔽，没有请求到服务器
+            self.assertEqual(server.count(path='/cover.png'), 0)
+            self.assertGreater(self.pool.stats['blocked'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Liblib 页面解析测试
+fixtures/liblib 中是三种页面：服务端渲染了模型信息的页面、只有 __NEXT_DATA__ 的页面、需要浏览器渲染的空壳页面
+"""
+
+import os  # 操作系统相关
+import time  # 时间相关
+import unittest  # 测试框架
+
+from liblib_browser import BrowserPool, extract_liblib_page, fetch_liblib_info
+from liblib_page import fetch_liblib_html, has_page_info, parse_liblib_html
+from tests.http_server import LocalServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'liblib')
+
+# 对比直接请求和浏览器抓取时，每种方式抓取的页面数
+BENCHMARK_PAGES = 20
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def page_route(body, status=200, content_type='text/html; charset=utf-8'):
+    return lambda request: request.send(status, body, content_type=content_type)
+
+
+class ParseLiblibHtmlTest(unittest.TestCase):
+    def test_server_rendered_page(self):
+        page_info = parse_liblib_html(read_fixture('server_rendered.html'))
+        # 懒加载的占位图不算预览图，使用 data-src 中的地址；页面元素优先于 __NEXT_DATA__
+        self.assertEqual(page_info['image_url'], 'https://liblibai-online.liblib.cloud/img/cover-sr.png')
+        self.assertEqual(page_info['trigger_words'], ['starry sky', 'night'])
+        self.assertEqual(page_info['description_lines'],
+                         ['星空风格模型', '推荐权重 0.6-0.8', '采样器 DPM++ 2M', '底模：SDXL'])
+        self.assertTrue(has_page_info(page_info))
+
+    def test_next_data_only_page(self):
+        page_info = parse_liblib_html(read_fixture('next_data.html'))
+        self.assertEqual(page_info['image_url'], 'https://liblibai-online.liblib.cloud/img/cover-next.png')
+        self.assertEqual(page_info['trigger_words'], ['ink painting', 'chinese style'])
+        self.assertEqual(page_info['description_lines'], ['水墨画风模型', '推荐权重 0.7', '高清修复 1.5 倍'])
+        self.assertTrue(has_page_info(page_info))
+
+    def test_next_data_trigger_word_list(self):
+        html = ('<script id="__NEXT_DATA__" type="application/json">'
+                '{"props":{"pageProps":{"version":{"triggerWords":["a", " ", 3]}}}}</script>')
+        page_info = parse_liblib_html(html, need_preview=False)
+        self.assertEqual(page_info['trigger_words'], ['a', '3'])
+
+    def test_empty_shell_page(self):
+        page_info = parse_liblib_html(read_fixture('empty_shell.html'))
+        self.assertEqual(page_info, {'image_url': '', 'trigger_words': [], 'description_lines': []})
+        self.assertFalse(has_page_info(page_info))
+        self.assertFalse(has_page_info(page_info, need_preview=False))
+
+    def test_broken_next_data_is_ignored(self):
+        html = '<script id="__NEXT_DATA__" type="application/json">{"props":</script>'
+        self.assertFalse(has_page_info(parse_liblib_html(html), need_preview=False))
+
+    def test_preview_not_needed(self):
+        page_info = parse_liblib_html(read_fixture('server_rendered.html'), need_preview=False)
+        self.assertEqual(page_info['image_url'], '')
+        self.assertTrue(has_page_info(page_info, need_preview=False))
+
+    def test_has_page_info_requires_preview_when_needed(self):
+        page_info = {'image_url': '', 'trigger_words': ['a'], 'description_lines': []}
+        self.assertFalse(has_page_info(page_info))
+        self.assertTrue(has_page_info(page_info, need_preview=False))
+
+
+class FetchLiblibHtmlTest(unittest.TestCase):
+    def test_fetch_pages(self):
+        # 页面声明 GBK 编码、响应头没有 charset 时按页面声明解码
+        gbk_page = read_fixture('server_rendered.html').decode('utf-8').replace(
+            'charset="utf-8"', 'charset="gbk"').encode('gbk')
+        routes = {
+            '/modelinfo/sr': page_route(read_fixture('server_rendered.html')),
+            '/modelinfo/next': page_route(read_fixture('next_data.html')),
+            '/modelinfo/shell': page_route(read_fixture('empty_shell.html')),
+            '/modelinfo/gbk': page_route(gbk_page, content_type='text/html'),
+            '/modelinfo/error': page_route(read_fixture('server_rendered.html'), status=500),
+        }
+        with LocalServer(routes) as server:
+            page_info = fetch_liblib_html(server.url('/modelinfo/sr'))
+            self.assertEqual(page_info['trigger_words'], ['starry sky', 'night'])
+            page_info = fetch_liblib_html(server.url('/modelinfo/next'))
+            self.assertEqual(page_info['trigger_words'], ['ink painting', 'chinese style'])
+            page_info = fetch_liblib_html(server.url('/modelinfo/gbk'))
+            self.assertEqual(page_info['description_lines'][0], '星空风格模型')
+
+            self.assertIsNone(fetch_liblib_html(server.url('/modelinfo/shell')))
+            self.assertIsNone(fetch_liblib_html(server.url('/modelinfo/error')))
+            self.assertIsNone(fetch_liblib_html(server.url('/modelinfo/missing')))
+            unreachable = server.url('/modelinfo/sr')
+        self.assertIsNone(fetch_liblib_html(unreachable))
+
+
+class FakePool:
+    """记录交给浏览器的页面"""
+
+    def __init__(self):
+        self.urls = []
+
+    def run(self, job, url, need_preview, timeout=None):
+        self.urls.append(url)
+        return {'image_url': 'browser.png', 'trigger_words': [], 'description_lines': []}
+
+
+class FetchLiblibInfoTest(unittest.TestCase):
+    def test_browser_only_for_empty_shell(self):
+        routes = {
+            '/modelinfo/sr': page_route(read_fixture('server_rendered.html')),
+            '/modelinfo/shell': page_route(read_fixture('empty_shell.html')),
+        }
+        pool = FakePool()
+        with LocalServer(routes) as server:
+            page_info, source = fetch_liblib_info(server.url('/modelinfo/sr'), pool)
+            self.assertEqual(source, 'http')
+            self.assertEqual(page_info['trigger_words'], ['starry sky', 'night'])
+            self.assertEqual(pool.urls, [])
+
+            page_info, source = fetch_liblib_info(server.url('/modelinfo/shell'), pool)
+            self.assertEqual(source, 'browser')
+            self.assertEqual(page_info['image_url'], 'browser.png')
+            self.assertEqual(pool.urls, [server.url('/modelinfo/shell')])
+
+
+class FetchBenchmarkTest(unittest.TestCase):
+    """直接请求网页与浏览器抓取的耗时对比（没有安装 Firefox 时只测直接请求）"""
+
+    def test_http_vs_browser(self):
+        routes = {'/modelinfo/sr': page_route(read_fixture('server_rendered.html'))}
+        with LocalServer(routes) as server:
+            url = server.url('/modelinfo/sr')
+            start = time.perf_counter()
+            for _ in range(BENCHMARK_PAGES):
+                self.assertIsNotNone(fetch_liblib_html(url))
+            http_seconds = time.perf_counter() - start
+            print(f"\n直接请求：{BENCHMARK_PAGES} 个页面 {http_seconds:.2f} 秒，"
+                  f"平均 {http_seconds / BENCHMARK_PAGES * 1000:.1f} 毫秒")
+
+            pool = BrowserPool(size=3)
+            try:
+                pool.start()
+            except Exception as e:
+                self.skipTest(f"无法启动 Firefox，只测了直接请求：{str(e).splitlines()[0]}")
+            try:
+                start = time.perf_counter()
+                for _ in range(BENCHMARK_PAGES):
+                    page_info = pool.run(extract_liblib_page, url, True, timeout=60)
+                    self.assertEqual(page_info['trigger_words'], ['starry sky', 'night'])
+                browser_seconds = time.perf_counter() - start
+            finally:
+                pool.shutdown()
+            print(f"浏览器：{BENCHMARK_PAGES} 个页面 {browser_seconds:.2f} 秒，"
+                  f"平均 {browser_seconds / BENCHMARK_PAGES * 1000:.1f} 毫秒")
+            self.assertLess(http_seconds, browser_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
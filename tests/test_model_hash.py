@@ -0,0 +1,363 @@
+"""
+模型哈希测试
+哈希缓存按 size、mtime、inode 失效，移动和删除后同步记录，并可从 model_info.json 已保存的哈希值补充
+"""
+
+import json  # JSON处理
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import struct  # 生成 safetensors 文件头
+import tempfile  # 临时目录
+import unittest  # 测试框架
+from unittest import mock  # 统计摘要计算次数
+
+import model_hash
+from model_hash import (HashCache, calculate_digests, calculate_quick_fingerprint, find_duplicate_files, format_model_hashes,
+                        match_model_hash, parse_model_hashes, reconcile_model_records)
+
+# 2 MB 张量数据的固定样本文件（write_safetensors(path, FIXTURE_DATA_SIZE)）的已知摘要
+FIXTURE_DATA_SIZE = 2 * 1024 * 1024
+FIXTURE_SHA256 = '0bdb9ca21ed5b7dc8f6f25f7847f7bdc6c441aa231b401bad5109dc45e0bfde3'
+FIXTURE_AUTOV1 = 'dbca0647'
+FIXTURE_AUTOV3 = '0f6b0b24c8a4fde61974e1cf5cbf78d99bcddbc2a431e7cc57b5c683463a7c73'
+FIXTURE_CRC32 = '6DD9C417'
+
+
+def write_safetensors(path, data_size, seed=0):
+    """生成一个 safetensors 文件，张量数据由 seed 决定"""
+    header = json.dumps({'weight': {'dtype': 'U8', 'shape': [data_size], 'data_offsets': [0, data_size]}}).encode()
+    header += b' ' * (-len(header) % 8)
+    data = bytes((i * 7 + seed) % 251 for i in range(data_size))
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(data)
+    return 8 + len(header)
+
+
+class HashTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.base, 'hash_cache.json')
+        os.makedirs(os.path.join(self.base, 'models'))
+        self.rel_path = os.path.join('models', 'a.safetensors')
+        self.full_path = os.path.join(self.base, self.rel_path)
+        write_safetensors(self.full_path, 300 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def new_cache(self):
+        return HashCache(self.base, self.cache_file)
+
+    def count_calculations(self):
+        """统计完整读取文件计算摘要的次数"""
+        return mock.patch.object(model_hash, 'calculate_digests', side_effect=model_hash.calculate_digests)
+
+
+class HashCacheTest(HashTestCase):
+    def test_cached_digest_survives_reload(self):
+        digests = self.new_cache().get_or_compute_digests(self.rel_path)
+        with self.count_calculations() as calculate:
+            cache = self.new_cache()
+            self.assertEqual(cache.get_or_compute_digests(self.rel_path), digests)
+            self.assertEqual(cache.lookup(self.full_path), digests['sha256'])
+        calculate.assert_not_called()
+
+    def test_size_change_invalidates(self):
+        cache = self.new_cache()
+        old = cache.get_or_compute(self.rel_path)
+        stat = os.stat(self.full_path)
+        with open(self.full_path, 'ab') as f:
+            f.write(b'x')
+        os.utime(self.full_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(cache.lookup(self.rel_path))
+        self.assertNotEqual(cache.get_or_compute(self.rel_path), old)
+
+    def test_mtime_change_invalidates(self):
+        cache = self.new_cache()
+        cache.get_or_compute(self.rel_path)
+        # 大小不变、内容被改写
+        with open(self.full_path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'\xff')
+        stat = os.stat(self.full_path)
+        os.utime(self.full_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(cache.lookup(self.rel_path))
+        self.assertEqual(cache.lookup_digests(self.rel_path), {})
+        with self.count_calculations() as calculate:
+            cache.get_or_compute(self.rel_path)
+        calculate.assert_called_once()
+
+    def test_rename(self):
+        cache = self.new_cache()
+        sha256 = cache.get_or_compute(self.rel_path)
+        new_rel_path = os.path.join('models', 'b.safetensors')
+        os.rename(self.full_path, os.path.join(self.base, new_rel_path))
+        cache.rename(self.full_path, os.path.join(self.base, new_rel_path))
+        self.assertNotIn(self.rel_path, cache.entries)
+        self.assertEqual(cache.lookup(new_rel_path), sha256)
+        cache.save()
+        self.assertEqual(self.new_cache().lookup(new_rel_path), sha256)
+
+    def test_moved_file_found_by_inode(self):
+        cache = self.new_cache()
+        sha256 = cache.get_or_compute(self.rel_path)
+        cache.save()
+        new_rel_path = os.path.join('models', 'moved.safetensors')
+        os.rename(self.full_path, os.path.join(self.base, new_rel_path))
+        cache = self.new_cache()
+        self.assertEqual(cache.lookup(new_rel_path), sha256)
+        self.assertEqual(list(cache.entries), [new_rel_path])
+
+    def test_discard(self):
+        cache = self.new_cache()
+        cache.get_or_compute(self.rel_path)
+        cache.discard(self.full_path)
+        cache.save()
+        self.assertEqual(cache.entries, {})
+        self.assertEqual(cache.inode_index, {})
+        self.assertIsNone(self.new_cache().lookup(self.rel_path))
+
+
+class DigestTest(HashTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fixture = os.path.join(self.base, 'models', 'fixture.safetensors')
+        write_safetensors(self.fixture, FIXTURE_DATA_SIZE)
+
+    def test_known_digests(self):
+        digests = calculate_digests(self.fixture)
+        self.assertEqual(digests['sha256'], FIXTURE_SHA256)
+        self.assertEqual(digests['autov1'], FIXTURE_AUTOV1)
+        self.assertEqual(digests['autov3'], FIXTURE_AUTOV3)
+        self.assertEqual(digests['crc32'], FIXTURE_CRC32)
+        self.assertEqual(len(digests['blake2b']), 128)
+
+    def test_display_names(self):
+        hashes = format_model_hashes(calculate_digests(self.fixture))
+        self.assertEqual(hashes['SHA256'], FIXTURE_SHA256.upper())
+        self.assertEqual(hashes['AutoV1'], FIXTURE_AUTOV1.upper())
+        self.assertEqual(hashes['AutoV2'], FIXTURE_SHA256[:10].upper())
+        self.assertEqual(hashes['AutoV3'], FIXTURE_AUTOV3.upper())
+        self.assertEqual(hashes['CRC32'], FIXTURE_CRC32)
+
+    def test_single_read_matches_separate_reads(self):
+        # 数据块边界与 AutoV1 窗口、文件头不对齐时结果不变
+        expected = calculate_digests(self.fixture)
+        with mock.patch.object(model_hash, 'HASH_CHUNK_SIZE', 65537):
+            self.assertEqual(calculate_digests(self.fixture), expected)
+        for name in model_hash.DIGEST_ALGORITHMS:
+            self.assertEqual(calculate_digests(self.fixture, (name,)), {name: expected[name]})
+
+    def test_autov3_only_for_safetensors(self):
+        other = os.path.join(self.base, 'models', 'fixture.ckpt')
+        shutil.copyfile(self.fixture, other)
+        digests = calculate_digests(other)
+        self.assertNotIn('autov3', digests)
+        self.assertEqual(digests['sha256'], FIXTURE_SHA256)
+
+    def test_cancel(self):
+        self.assertIsNone(calculate_digests(self.fixture, cancel_check=lambda: True))
+
+
+class MatchModelHashTest(unittest.TestCase):
+    def setUp(self):
+        self.info = {'hash': FIXTURE_SHA256.upper(),
+                     'hashes': format_model_hashes({'sha256': FIXTURE_SHA256, 'autov1': FIXTURE_AUTOV1,
+                                                    'autov3': FIXTURE_AUTOV3, 'crc32': FIXTURE_CRC32})}
+
+    def test_prefix_of_any_hash(self):
+        for query in (FIXTURE_SHA256[:8], FIXTURE_SHA256[:10].upper(), FIXTURE_AUTOV1, FIXTURE_AUTOV3[:12],
+                      FIXTURE_CRC32.lower(), f"  {FIXTURE_SHA256}  "):
+            self.assertTrue(match_model_hash(query, self.info), query)
+
+    def test_short_or_unrelated_query(self):
+        self.assertFalse(match_model_hash(FIXTURE_SHA256[:7], self.info))
+        self.assertFalse(match_model_hash('', self.info))
+        self.assertFalse(match_model_hash('ffffffffff', self.info))
+        # 只匹配前缀
+        self.assertFalse(match_model_hash(FIXTURE_SHA256[1:11], self.info))
+
+    def test_legacy_hash_field(self):
+        self.assertTrue(match_model_hash(FIXTURE_SHA256[:8], {'hash': FIXTURE_SHA256.upper()}))
+        self.assertFalse(match_model_hash(FIXTURE_SHA256[:8], {'hash': '', 'hashes': {}}))
+
+
+class DuplicateFilesTest(HashTestCase):
+    def add_file(self, name, seed=0, data_size=300 * 1024):
+        rel_path = os.path.join('models', name)
+        write_safetensors(os.path.join(self.base, rel_path), data_size, seed)
+        return rel_path
+
+    def file_list(self, *rel_paths):
+        return [(rel_path, os.path.getsize(os.path.join(self.base, rel_path))) for rel_path in rel_paths]
+
+    def test_groups_identical_files(self):
+        copy = self.add_file('copy.safetensors')
+        other = self.add_file('other.safetensors', seed=1)
+        small = self.add_file('small.safetensors', data_size=1024)
+        groups = find_duplicate_files(self.new_cache(), self.file_list(self.rel_path, copy, other, small))
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['files'], sorted([self.rel_path, copy]))
+        self.assertEqual(groups[0]['linked'], [])
+        self.assertEqual(groups[0]['reclaimable'], os.path.getsize(self.full_path))
+
+    def test_only_candidates_are_fully_hashed(self):
+        same_size = self.add_file('same_size.safetensors', seed=1)
+        unique_size = self.add_file('unique.safetensors', data_size=1024)
+        with self.count_calculations() as calculate:
+            groups = find_duplicate_files(self.new_cache(), self.file_list(self.rel_path, same_size, unique_size))
+        self.assertEqual(groups, [])
+        # 大小唯一或抽样数据不同的文件不计算完整哈希
+        calculate.assert_not_called()
+
+    def test_linked_copies_are_not_duplicates(self):
+        # 链接副本与来源共享存储，只有两者时不算重复
+        linked = self.add_file('linked.safetensors')
+        linked_from = {linked: self.rel_path}
+        self.assertEqual(find_duplicate_files(self.new_cache(), self.file_list(self.rel_path, linked),
+                                              linked_from=linked_from), [])
+
+        copy = self.add_file('copy.safetensors')
+        groups = find_duplicate_files(self.new_cache(), self.file_list(self.rel_path, linked, copy),
+                                      linked_from=linked_from)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['files'], sorted([self.rel_path, linked, copy]))
+        self.assertEqual(groups[0]['linked'], sorted([self.rel_path, linked]))
+        self.assertEqual(groups[0]['reclaimable'], os.path.getsize(self.full_path))
+
+    @unittest.skipUnless(hasattr(os, 'link'), "当前系统不支持硬链接")
+    def test_hardlinks_share_storage(self):
+        hardlink = os.path.join('models', 'hardlink.safetensors')
+        os.link(self.full_path, os.path.join(self.base, hardlink))
+        self.assertEqual(find_duplicate_files(self.new_cache(), self.file_list(self.rel_path, hardlink)), [])
+
+    def test_cancel(self):
+        self.add_file('copy.safetensors')
+        files = self.file_list(self.rel_path, os.path.join('models', 'copy.safetensors'))
+        self.assertEqual(find_duplicate_files(self.new_cache(), files, cancel_check=lambda: True), [])
+
+
+class ReconcileTest(HashTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = self.new_cache()
+        self.fingerprint = self.cache.get_or_compute_fingerprint(self.rel_path)
+        self.all_info = {
+            '_app_settings': {'theme': 'dark'},
+            self.rel_path: {'hash': 'ABC', 'hashes': {'SHA256': 'ABC'}, 'fingerprint': self.fingerprint,
+                            'is_favorite': True},
+        }
+
+    def scan(self):
+        """按当前文件计算所有模型的快速指纹"""
+        fingerprints = {}
+        for name in os.listdir(os.path.join(self.base, 'models')):
+            rel_path = os.path.join('models', name)
+            fingerprints[rel_path] = self.cache.get_or_compute_fingerprint(rel_path)
+        return fingerprints
+
+    def test_unchanged(self):
+        self.assertEqual(reconcile_model_records(self.all_info, self.scan(), self.base), ([], []))
+        self.assertEqual(self.all_info[self.rel_path]['hash'], 'ABC')
+
+    def test_record_follows_moved_file(self):
+        new_rel_path = os.path.join('models', 'renamed.safetensors')
+        os.rename(self.full_path, os.path.join(self.base, new_rel_path))
+        linked = os.path.join('models', 'linked.safetensors')
+        self.all_info[linked] = {'linked_from': self.rel_path, 'link_type': 'reflink'}
+
+        moved, invalidated = reconcile_model_records(self.all_info, self.scan(), self.base)
+        self.assertEqual((moved, invalidated), ([(self.rel_path, new_rel_path)], []))
+        self.assertNotIn(self.rel_path, self.all_info)
+        self.assertTrue(self.all_info[new_rel_path]['is_favorite'])
+        self.assertEqual(self.all_info[new_rel_path]['hash'], 'ABC')
+        self.assertEqual(self.all_info[linked]['linked_from'], new_rel_path)
+        self.assertEqual(self.all_info['_app_settings'], {'theme': 'dark'})
+        # 缓存通过 inode 找回同一个文件的指纹，不必重新读取
+        self.assertEqual(self.cache.lookup(new_rel_path, 'fingerprint'), self.fingerprint)
+
+    def test_changed_file_clears_hashes(self):
+        write_safetensors(self.full_path, 300 * 1024, seed=1)
+        self.all_info[self.rel_path].update({'linked_from': 'models/source.safetensors', 'link_type': 'hardlink'})
+        moved, invalidated = reconcile_model_records(self.all_info, self.scan(), self.base)
+        self.assertEqual((moved, invalidated), ([], [self.rel_path]))
+        info = self.all_info[self.rel_path]
+        self.assertEqual(info['hash'], '')
+        self.assertNotIn('hashes', info)
+        self.assertNotIn('linked_from', info)
+        self.assertNotEqual(info['fingerprint'], self.fingerprint)
+        self.assertTrue(info['is_favorite'])
+
+    def test_ambiguous_move_is_ignored(self):
+        # 两个新文件内容相同，无法确定旧记录属于哪一个
+        shutil.copy2(self.full_path, os.path.join(self.base, 'models', 'copy.safetensors'))
+        os.rename(self.full_path, os.path.join(self.base, 'models', 'renamed.safetensors'))
+        self.assertEqual(reconcile_model_records(self.all_info, self.scan(), self.base), ([], []))
+        self.assertIn(self.rel_path, self.all_info)
+
+    def test_existing_file_record_is_not_taken(self):
+        # 旧记录对应的文件仍然存在时，内容相同的新文件不会取走它的记录
+        shutil.copy2(self.full_path, os.path.join(self.base, 'models', 'copy.safetensors'))
+        self.assertEqual(reconcile_model_records(self.all_info, self.scan(), self.base), ([], []))
+        self.assertNotIn(os.path.join('models', 'copy.safetensors'), self.all_info)
+
+
+class SeedFromModelInfoTest(HashTestCase):
+    def setUp(self):
+        super().setUp()
+        # 在另一个缓存中计算出哈希值并写入模型信息，然后删除缓存文件
+        other = HashCache(self.base, os.path.join(self.base, 'other_cache.json'))
+        self.digests = other.get_or_compute_digests(self.rel_path)
+        self.all_info = {
+            '_app_settings': {},
+            self.rel_path: {'hash': self.digests['sha256'].upper(), 'hashes': format_model_hashes(self.digests),
+                            'fingerprint': calculate_quick_fingerprint(self.full_path)}
+        }
+
+    def scan(self, cache):
+        """与启动扫描相同：先计算快速指纹，再补充哈希值"""
+        cache.get_or_compute_fingerprint(self.rel_path)
+        return cache.seed_from_model_info(self.all_info)
+
+    def test_parse_model_hashes(self):
+        self.assertEqual(parse_model_hashes(self.all_info[self.rel_path]), self.digests)
+        self.assertEqual(parse_model_hashes({'hash': 'ABCDEF'}), {'sha256': 'abcdef'})
+        self.assertEqual(parse_model_hashes({}), {})
+
+    def test_seeded_digests_are_not_recomputed(self):
+        cache = self.new_cache()
+        self.assertEqual(self.scan(cache), 1)
+        with self.count_calculations() as calculate:
+            self.assertEqual(cache.lookup(self.full_path), self.digests['sha256'])
+            self.assertEqual(cache.get_or_compute_digests(self.rel_path), dict(self.digests, fingerprint=mock.ANY))
+        calculate.assert_not_called()
+        cache.save()
+        self.assertEqual(self.new_cache().lookup(self.rel_path), self.digests['sha256'])
+        # 已补充过的模型不再修改缓存
+        self.assertEqual(cache.seed_from_model_info(self.all_info), 0)
+
+    def test_changed_file_is_not_seeded(self):
+        write_safetensors(self.full_path, 300 * 1024, seed=1)
+        cache = self.new_cache()
+        self.assertEqual(self.scan(cache), 0)
+        self.assertIsNone(cache.lookup(self.rel_path))
+        with self.count_calculations() as calculate:
+            sha256 = cache.get_or_compute(self.rel_path)
+        calculate.assert_called_once()
+        self.assertNotEqual(sha256, self.digests['sha256'])
+
+    def test_record_without_fingerprint_is_not_seeded(self):
+        del self.all_info[self.rel_path]['fingerprint']
+        cache = self.new_cache()
+        self.assertEqual(self.scan(cache), 0)
+        self.assertIsNone(cache.lookup(self.rel_path))
+
+    def test_missing_file_is_skipped(self):
+        os.remove(self.full_path)
+        self.assertEqual(self.new_cache().seed_from_model_info(self.all_info), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
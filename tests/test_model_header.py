@@ -0,0 +1,158 @@
+"""
+模型文件头读取测试和基准
+生成只有文件头的稀疏 safetensors 文件（张量数据部分不占用磁盘），测量整库冷、热索引的耗时
+"""
+
+import json  # JSON处理
+import os  # 操作系统相关
+import shutil  # 删除临时目录
+import struct  # 文件头长度前缀
+import tempfile  # 临时目录
+import time  # 时间相关
+import unittest  # 测试框架
+
+from model_header import HeaderCache, SAFETENSORS_HEADER_LIMIT, read_safetensors_header
+
+# 基准使用的文件数、每个文件的张量数和文件大小
+BENCHMARK_FILES = 1000
+BENCHMARK_TENSORS = 600
+BENCHMARK_FILE_SIZE = 200 * 1024 * 1024
+
+# 对比时完整读取的文件数（完整读取很慢，只取少量估算）
+FULL_READ_FILES = 5
+
+TRAINING_METADATA = {
+    'ss_base_model_version': 'sdxl_base_v1-0',
+    'ss_network_module': 'networks.lora',
+    'ss_network_dim': '32',
+    'ss_network_alpha': '16',
+    'ss_resolution': '(1024, 1024)',
+    'ss_epoch': '10',
+}
+
+
+def make_lora_header(tensor_count, metadata=None):
+    """SDXL LoRA 风格的文件头（每个模块有 down / up / alpha 三个张量）"""
+    header = {'__metadata__': metadata or {}}
+    offset = 0
+    for index in range(tensor_count // 3):
+        prefix = f"lora_unet_output_blocks_{index // 30}_1_transformer_blocks_{index % 30}_attn1_to_q"
+        for suffix, shape in (('lora_down.weight', [32, 640]), ('lora_up.weight', [640, 32]), ('alpha', [])):
+            size = 2
+            for dim in shape:
+                size *= dim
+            header[f"{prefix}.{suffix}"] = {'dtype': 'F16', 'shape': shape, 'data_offsets': [offset, offset + size]}
+            offset += size
+    return header
+
+
+def write_safetensors(path, header, file_size=None):
+    """写入文件头，其余部分是稀疏的空白数据"""
+    header_bytes = json.dumps(header).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        if file_size:
+            f.truncate(file_size)
+    return len(header_bytes)
+
+
+class ReadSafetensorsHeaderTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'model.safetensors')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_raw(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_read_header(self):
+        header_length = write_safetensors(self.path, make_lora_header(30, TRAINING_METADATA), 64 * 1024 * 1024)
+        length, header = read_safetensors_header(self.path)
+        self.assertEqual(length, header_length)
+        self.assertEqual(header['__metadata__'], TRAINING_METADATA)
+        self.assertEqual(len(header), 31)
+
+    def test_too_small(self):
+        self.write_raw(b'\x01\x00')
+        with self.assertRaises(ValueError):
+            read_safetensors_header(self.path)
+
+    def test_header_too_large(self):
+        self.write_raw(struct.pack('<Q', SAFETENSORS_HEADER_LIMIT + 1) + b'{}')
+        with self.assertRaises(ValueError):
+            read_safetensors_header(self.path)
+
+    def test_incomplete_header(self):
+        self.write_raw(struct.pack('<Q', 100) + b'{"a": 1}')
+        with self.assertRaises(ValueError):
+            read_safetensors_header(self.path)
+
+    def test_not_a_dict(self):
+        self.write_raw(struct.pack('<Q', 2) + b'[]')
+        with self.assertRaises(ValueError):
+            read_safetensors_header(self.path)
+
+
+class HeaderIndexBenchmarkTest(unittest.TestCase):
+    """整库索引：每个文件只读取文件头，已缓存且未变化的文件不再读取"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_dir = os.path.join(self.temp_dir, 'models')
+        os.makedirs(self.model_dir)
+        self.header_length = 0
+        self.rel_paths = []
+        for index in range(BENCHMARK_FILES):
+            metadata = dict(TRAINING_METADATA, ss_output_name=f"lora_{index}")
+            rel_path = f"lora_{index:04d}.safetensors"
+            self.header_length = write_safetensors(os.path.join(self.model_dir, rel_path),
+                                                   make_lora_header(BENCHMARK_TENSORS, metadata), BENCHMARK_FILE_SIZE)
+            self.rel_paths.append(rel_path)
+        self.cache_file = os.path.join(self.temp_dir, 'header_cache.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_index_benchmark(self):
+        cache = HeaderCache(self.model_dir, self.cache_file)
+        start = time.perf_counter()
+        summaries = cache.index(self.rel_paths)
+        cold_seconds = time.perf_counter() - start
+
+        summary = summaries[self.rel_paths[7]]
+        self.assertEqual(summary['tensor_count'], BENCHMARK_TENSORS)
+        self.assertEqual(summary['metadata']['ss_output_name'], 'lora_7')
+        self.assertEqual(summary['metadata']['ss_network_dim'], '32')
+
+        # 重新加载缓存文件后再次索引（程序重新启动的情况）
+        cache = HeaderCache(self.model_dir, self.cache_file)
+        start = time.perf_counter()
+        warm = cache.index(self.rel_paths)
+        warm_seconds = time.perf_counter() - start
+        self.assertEqual(warm[self.rel_paths[7]], summary)
+
+        # 修改过的文件重新读取
+        changed = os.path.join(self.model_dir, self.rel_paths[0])
+        write_safetensors(changed, make_lora_header(3, {'ss_output_name': 'changed'}), BENCHMARK_FILE_SIZE)
+        self.assertEqual(cache.get(self.rel_paths[0])['metadata']['ss_output_name'], 'changed')
+
+        start = time.perf_counter()
+        for rel_path in self.rel_paths[1:FULL_READ_FILES + 1]:
+            with open(os.path.join(self.model_dir, rel_path), 'rb') as f:
+                while f.read(1024 * 1024):
+                    pass
+        full_seconds = (time.perf_counter() - start) / FULL_READ_FILES * BENCHMARK_FILES
+
+        print(f"\n{BENCHMARK_FILES} 个 {BENCHMARK_FILE_SIZE // (1024 * 1024)}MB 的 safetensors 文件"
+              f"（文件头 {self.header_length // 1024}KB）：冷索引 {cold_seconds:.2f} 秒，热索引 {warm_seconds:.2f} 秒；"
+              f"完整读取估计 {full_seconds:.1f} 秒")
+        self.assertLess(warm_seconds, cold_seconds)
+        self.assertLess(cold_seconds, full_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
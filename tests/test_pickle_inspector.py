@@ -0,0 +1,105 @@
+"""
+pickle 模型静态检查测试
+构造的 pickle 只被解析，从不加载；包括末尾被改成错误字节、被截断的恶意 pickle
+"""
+
+import io  # 内存中的 zip
+import os  # 操作系统相关
+import pickle  # 生成测试用的 pickle 数据（不加载）
+import shutil  # 删除临时目录
+import tempfile  # 临时目录
+import unittest  # 测试框架
+import zipfile  # torch zip 格式
+from collections import OrderedDict  # state_dict
+
+from model_header import HeaderCache, format_header_details
+from pickle_inspector import VERDICT_DANGEROUS, VERDICT_SAFE, VERDICT_UNKNOWN, inspect_pickle_model
+
+
+class RunCommand:
+    """反序列化时调用 posix.system（测试中只生成数据，不加载）"""
+
+    def __reduce__(self):
+        return os.system, ('echo pwned',)
+
+
+class Unknown:
+    pass
+
+
+def dump(value):
+    return pickle.dumps(value, protocol=2)
+
+
+class InspectPickleModelTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def write_torch_zip(self, name, pickle_data):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('model/data.pkl', pickle_data)
+            archive.writestr('model/data/0', b'\0' * 16)
+        return self.write(name, buffer.getvalue())
+
+    def test_safe_state_dict(self):
+        summary = inspect_pickle_model(self.write('safe.ckpt', dump(OrderedDict(step=1))))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_SAFE)
+        self.assertEqual(summary['pickle']['scan_error'], '')
+
+    def test_dangerous_global(self):
+        summary = inspect_pickle_model(self.write('evil.ckpt', dump({'model': RunCommand()})))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_DANGEROUS)
+        self.assertEqual(summary['analysis']['safety'], VERDICT_DANGEROUS)
+
+    def test_invalid_stop_byte_keeps_dangerous_verdict(self):
+        data = dump({'model': RunCommand()})
+        self.assertEqual(data[-1:], b'.')
+        summary = inspect_pickle_model(self.write('evil.ckpt', data[:-1] + b'\xff'))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_DANGEROUS)
+        self.assertEqual(summary['analysis']['safety'], VERDICT_DANGEROUS)
+        self.assertIn(os.system.__module__ + '.system', summary['pickle']['globals'])
+        self.assertTrue(summary['pickle']['scan_error'])
+
+    def test_truncated_pickle_keeps_dangerous_verdict(self):
+        data = dump({'model': RunCommand()})
+        summary = inspect_pickle_model(self.write('evil.ckpt', data[:-1]))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_DANGEROUS)
+
+    def test_broken_zip_pickle_keeps_dangerous_verdict(self):
+        data = dump({'model': RunCommand()})
+        summary = inspect_pickle_model(self.write_torch_zip('evil.pt', data[:-1] + b'\xff'))
+        self.assertEqual(summary['format'], 'torch-zip')
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_DANGEROUS)
+
+    def test_broken_pickle_with_unknown_global_is_dangerous(self):
+        data = dump({'model': Unknown()})
+        summary = inspect_pickle_model(self.write('odd.ckpt', data[:-1] + b'\xff'))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_DANGEROUS)
+
+    def test_broken_pickle_without_globals_is_not_safe(self):
+        data = dump({'step': 1})
+        summary = inspect_pickle_model(self.write('broken.ckpt', data[:-1] + b'\xff'))
+        self.assertEqual(summary['pickle']['verdict'], VERDICT_UNKNOWN)
+
+    def test_header_cache_keeps_verdict(self):
+        data = dump({'model': RunCommand()})
+        self.write('evil.ckpt', data[:-1] + b'\xff')
+        cache = HeaderCache(self.temp_dir, os.path.join(self.temp_dir, 'header_cache.json'))
+        summary = cache.get('evil.ckpt')
+        self.assertNotIn('error', summary)
+        self.assertEqual(summary['analysis']['safety'], VERDICT_DANGEROUS)
+        self.assertIn('pickle 数据格式错误', format_header_details(summary))
+
+
+if __name__ == '__main__':
+    unittest.main()